@@ -7,6 +7,7 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.db.models import Q, Count
 from django.contrib.admin import DateFieldListFilter
+from django.contrib.admin.views.main import ChangeList
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.contrib.admin.models import LogEntry
@@ -15,6 +16,8 @@ from django.http import Http404
 from datetime import datetime
 import json
 import logging
+from . import image_renditions, mobile_sync
+from .booking_conflicts import prefetch_conflict_summaries
 from .models import (
     Property, Task, TaskImage, Notification, Booking, PropertyOwnership, Profile,
     ChecklistTemplate, ChecklistItem, TaskChecklist, ChecklistResponse, ChecklistPhoto,
@@ -124,6 +127,17 @@ def create_unified_history_view(model_class):
                     # Skip malformed entries
                     continue
         
+        # Add structured TaskHistory rows (tasks no longer append to model.history)
+        if hasattr(obj, 'history_entries'):
+            for entry in obj.history_entries.all():
+                combined_history.append({
+                    'timestamp': entry.created_at,
+                    'user': entry.actor_name or 'Unknown',
+                    'action': 'Changed',
+                    'changes': entry.as_text().partition(': ')[2],
+                    'type': 'dashboard'
+                })
+        
         # Sort by timestamp (newest first)
         combined_history.sort(key=lambda x: x['timestamp'], reverse=True)
         
@@ -305,7 +319,7 @@ class TaskImageInline(admin.TabularInline):
 
     def preview(self, obj):
         if obj.image:
-            return f'<img src="{obj.image.url}" width="100" height="100" style="object-fit: cover;" />'
+            return f'<img src="{image_renditions.url(obj, "thumb") or obj.image.url}" width="100" height="100" style="object-fit: cover;" />'
         return "No image"
     preview.allow_tags = True
     preview.short_description = 'Image Preview'
@@ -359,6 +373,8 @@ class TaskAdmin(ProvenanceStampMixin, admin.ModelAdmin):
                     ]
                     if to_create:
                         ChecklistResponse.objects.bulk_create(to_create)
+                        TaskChecklist.refresh_counters([obj.pk])
+                        mobile_sync.record_checklists([obj.pk], actor=request.user)
 
             for obj in formset.deleted_objects:
                 obj.delete()
@@ -375,7 +391,7 @@ class TaskImageAdmin(ProvenanceStampMixin, admin.ModelAdmin):
     
     def preview(self, obj):
         if obj.image:
-            return f'<img src="{obj.image.url}" width="150" height="150" style="object-fit: cover; border-radius: 8px;" />'
+            return f'<img src="{image_renditions.url(obj, "thumb") or obj.image.url}" width="150" height="150" style="object-fit: cover; border-radius: 8px;" />'
         return "No image"
     preview.allow_tags = True
     preview.short_description = 'Image Preview'
@@ -522,6 +538,14 @@ class PropertyAdmin(ProvenanceStampMixin, admin.ModelAdmin):
         obj.modified_by = request.user
         super().save_model(request, obj, form, change)
         
+class BookingChangeList(ChangeList):
+    """Changelist that analyzes conflicts for the whole page in one pass"""
+
+    def get_results(self, request):
+        super().get_results(request)
+        prefetch_conflict_summaries(self.result_list)
+
+
 class BookingAdmin(ProvenanceStampMixin, admin.ModelAdmin):
     list_display = (
         'id', 'property', 'external_code_display', 'booked_on_display', 'source_display',
@@ -541,6 +565,9 @@ class BookingAdmin(ProvenanceStampMixin, admin.ModelAdmin):
     list_per_page = 25
     actions = ['resolve_conflicts', 'mark_as_reviewed']
     
+    def get_changelist(self, request, **kwargs):
+        return BookingChangeList
+    
     def resolve_conflicts(self, request, queryset):
         """Admin action to mark selected bookings as conflict-resolved"""
         updated = queryset.update(conflict_resolved=True)
@@ -622,13 +649,13 @@ class BookingAdmin(ProvenanceStampMixin, admin.ModelAdmin):
     
     def conflict_status_display(self, obj):
         """Display conflict status with clear visual indicators"""
-        conflicts = obj.check_conflicts()
-        if not conflicts:
+        summary = obj.get_conflict_summary()
+        if not summary['total']:
             return mark_safe('<span style="color: #28a745; font-weight: bold;">✅ No Conflicts</span>')
         
-        conflict_count = len(conflicts)
-        critical_count = len([c for c in conflicts if c['severity'] == 'critical'])
-        high_count = len([c for c in conflicts if c['severity'] == 'high'])
+        conflict_count = summary['total']
+        critical_count = summary['critical']
+        high_count = summary['high']
         
         if critical_count > 0:
             return mark_safe(f'<span style="color: #dc3545; font-weight: bold;" title="Critical conflicts require immediate attention">🚨 {critical_count} Critical</span>')
@@ -640,12 +667,12 @@ class BookingAdmin(ProvenanceStampMixin, admin.ModelAdmin):
     
     def conflict_count_display(self, obj):
         """Display conflict count with quick action button"""
-        conflicts = obj.check_conflicts()
-        if not conflicts:
+        summary = obj.get_conflict_summary()
+        if not summary['total']:
             return mark_safe('<span style="color: #6c757d;">0</span>')
         
-        conflict_count = len(conflicts)
-        critical_count = len([c for c in conflicts if c['severity'] == 'critical'])
+        conflict_count = summary['total']
+        critical_count = summary['critical']
         
         # Create a button to view conflict details
         button_html = f'''
@@ -1586,10 +1613,10 @@ class BookingImportTemplateAdmin(ProvenanceStampMixin, admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 class BookingImportLogAdmin(ProvenanceStampMixin, admin.ModelAdmin):
-    list_display = ('template', 'imported_at', 'imported_by', 'total_rows', 'successful_imports', 'errors_count')
-    list_filter = ('imported_at', 'template')
+    list_display = ('template', 'imported_at', 'imported_by', 'status', 'total_rows', 'successful_imports', 'errors_count')
+    list_filter = ('status', 'imported_at', 'template')
     search_fields = ('template__name',)
-    readonly_fields = ('imported_at',)
+    readonly_fields = ('imported_at', 'status', 'progress', 'started_at', 'finished_at')
 
 
 # ========== PERMISSION MANAGEMENT ADMIN ==========
@@ -1819,6 +1846,9 @@ class AuditEventAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
     list_per_page = 50
+    list_select_related = ['actor']
+    # Skip the unfiltered COUNT(*) over the whole (partitioned) table
+    show_full_result_count = False
     
     def request_id_short(self, obj):
         """Display shortened request ID for better readability."""
@@ -1843,39 +1873,39 @@ class AuditEventAdmin(admin.ModelAdmin):
         """All fields are readonly for audit events."""
         return [field.name for field in self.model._meta.fields]
     
-    actions = ['export_audit_events']
+    actions = ['export_audit_events', 'export_audit_events_ndjson']
+    
+    export_columns = [
+        ('Created At', lambda row: row['created_at'].isoformat()),
+        ('Action', lambda row: row['action']),
+        ('Object Type', lambda row: row['object_type']),
+        ('Object ID', lambda row: row['object_id']),
+        ('Actor', lambda row: row['actor__username'] or 'System'),
+        ('IP Address', lambda row: row['ip_address'] or ''),
+        ('Request ID', lambda row: row['request_id']),
+        ('User Agent', lambda row: row['user_agent']),
+        ('Changes', lambda row: str(row['changes'])),
+    ]
     
     def export_audit_events(self, request, queryset):
-        """Export selected audit events to CSV."""
-        import csv
-        from django.http import HttpResponse
+        """Stream selected audit events as CSV (keyset-paged, see api.audit_storage)."""
         from datetime import datetime
+        from .audit_storage import streaming_export
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="audit_events_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Created At', 'Action', 'Object Type', 'Object ID', 
-            'Actor', 'IP Address', 'Request ID', 'User Agent', 'Changes'
-        ])
-        
-        for event in queryset:
-            writer.writerow([
-                event.created_at.isoformat(),
-                event.action,
-                event.object_type,
-                event.object_id,
-                event.actor.username if event.actor else 'System',
-                event.ip_address or '',
-                event.request_id,
-                event.user_agent,
-                str(event.changes)
-            ])
-        
-        return response
+        filename = f'audit_events_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        return streaming_export(queryset, filename, self.export_columns)
     
     export_audit_events.short_description = "Export selected audit events to CSV"
+    
+    def export_audit_events_ndjson(self, request, queryset):
+        """Stream selected audit events as newline-delimited JSON."""
+        from datetime import datetime
+        from .audit_storage import streaming_export
+        
+        filename = f'audit_events_{datetime.now().strftime("%Y%m%d_%H%M%S")}.ndjson'
+        return streaming_export(queryset, filename, fmt='ndjson')
+    
+    export_audit_events_ndjson.short_description = "Export selected audit events to NDJSON"
 
 
 @admin.register(InviteCode)
@@ -8,4 +8,20 @@ class ApiConfig(AppConfig):
     def ready(self):
         import api.signals
         # Agent's Phase 2: Register audit signals for auto-capture
-        import api.audit_signals
\ No newline at end of file
+        import api.audit_signals
+        # Invalidation hooks for compiled permission maps
+        import api.permission_cache
+        # Invalidation hooks for cached booking conflict results
+        import api.booking_conflicts
+        # Invalidation hooks for cached calendar months
+        import api.calendar_events
+        # Chat search index maintenance (non-PostgreSQL backends)
+        import api.chat_search
+        # Invalidation hooks for cached property autocomplete pages
+        import api.property_autocomplete
+        # Change log for mobile delta sync
+        import api.mobile_sync
+        # Invalidation hooks for cached checklist template items
+        import api.checklist_materializer
+        # Reference counting for content-addressed uploads
+        import api.blob_storage
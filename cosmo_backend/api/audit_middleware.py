@@ -4,6 +4,7 @@ Fixed per GPT agent: compatible with both Django middleware chain and direct tes
 """
 import uuid
 from .audit_signals import set_audit_context, clear_audit_context
+from .audit_writer import get_audit_writer
 
 
 def get_client_ip(request):
@@ -41,14 +42,22 @@ class AuditMiddleware:
             ip_address=ip or None,
             user_agent=user_agent or "",
         )
+        # Buffer this request's audit events; written in one batch at the end
+        request._audit_scope = get_audit_writer().open_scope()
         return None
 
+    def _flush_audit(self, request):
+        get_audit_writer().close_scope(getattr(request, "_audit_scope", None))
+        request._audit_scope = None
+
     def process_response(self, request, response):
-        """Clear audit context after request."""
+        """Flush buffered audit events and clear audit context after request."""
+        self._flush_audit(request)
         clear_audit_context()
         return response
 
     def process_exception(self, request, exception):
-        """Clear audit context on exception."""
+        """Flush buffered audit events and clear audit context on exception."""
+        self._flush_audit(request)
         clear_audit_context()
         return None
@@ -21,9 +21,12 @@ from django.contrib.sessions.models import Session
 from django.db.migrations.recorder import MigrationRecorder
 from django.db import transaction
 from django.conf import settings
+from django.utils import timezone
 import logging
 import json
 
+from .audit_writer import get_audit_writer
+
 logger = logging.getLogger(__name__)
 
 # JSON serialization helpers (Agent recommendation for Cloudinary ImageFieldFile fix)
@@ -163,31 +166,29 @@ def create_audit_event(instance, action, changes=None):
         max_len=getattr(settings, "AUDIT_MAX_CHANGES_BYTES", 10000),
     )
     
-    def _write():
-        try:
-            ae = AuditEvent.objects.create(
-                object_type=instance.__class__.__name__,
-                object_id=str(getattr(instance, "pk", "unknown")),
-                action=action,
-                actor=context["user"],
-                changes=safe_changes,
-                request_id=context["request_id"],
-                ip_address=context["ip_address"],
-                user_agent=context["user_agent"],
-            )
-            logger.debug(f"Created audit event: {ae}")
-        except Exception as e:
-            logger.error(f"Failed to create audit event for {instance.__class__.__name__}:{getattr(instance,'pk',None)}: {e}")
+    event = AuditEvent(
+        object_type=instance.__class__.__name__,
+        object_id=str(getattr(instance, "pk", "unknown")),
+        action=action,
+        actor_id=getattr(context["user"], "pk", None),
+        changes=safe_changes,
+        request_id=context["request_id"],
+        ip_address=context["ip_address"],
+        user_agent=context["user_agent"],
+        created_at=timezone.now(),
+    )
+    # Buffered per request/batch and written in bulk (see api.audit_writer)
+    writer = get_audit_writer()
     
     # Prefer after-commit to avoid breaking main transaction
     conn = transaction.get_connection()
     if conn.in_atomic_block:
         try:
-            transaction.on_commit(_write)
+            transaction.on_commit(lambda: writer.submit(event))
         except Exception as e:
             logger.error(f"Failed to schedule audit event on transaction commit for {instance.__class__.__name__}:{getattr(instance,'pk',None)}: {e}")
     else:
-        _write()
+        writer.submit(event)
 
 
 def _diff_from_snapshot(sender, instance, created):
@@ -0,0 +1,234 @@
+# api/audit_storage.py
+"""
+Time-partitioned AuditEvent storage, pruning and streaming export.
+
+On PostgreSQL, migration 0086 turns ``api_auditevent`` into a table
+partitioned by RANGE (created_at):
+
+- ``api_auditevent_legacy``: the pre-existing rows, attached as one partition
+  covering everything before the month after the migration ran;
+- ``api_auditevent_pYYYY_MM``: one partition per (UTC) month, created ahead of
+  time by ``ensure_partitions()`` (run from ``prune_audit``);
+- ``api_auditevent_default``: catches rows beyond the prepared months.
+
+Pruning detaches and drops partitions that lie entirely before the cutoff and
+keyset-deletes what is left in the partition straddling it. On other
+databases (and on an unpartitioned Postgres table) the keyset delete is the
+whole story, so the same code path works everywhere.
+
+Exports read rows with values() and (created_at, id) keyset pagination and
+stream CSV or NDJSON, so memory stays flat whatever the selection size.
+"""
+
+import csv
+import json
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'api_auditevent'
+LEGACY_PARTITION = f'{TABLE}_legacy'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+AUDIT_PARTITION_MONTHS_AHEAD = getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3)
+AUDIT_PRUNE_BATCH_SIZE = getattr(settings, 'AUDIT_PRUNE_BATCH_SIZE', 5000)
+AUDIT_EXPORT_PAGE_SIZE = getattr(settings, 'AUDIT_EXPORT_PAGE_SIZE', 2000)
+
+_BOUND_RE = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+# ---------------- partitions ----------------
+def month_start(value):
+    """First instant of value's UTC month"""
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def is_partitioned():
+    """True when api_auditevent is a PostgreSQL partitioned table"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _parse_bound(text):
+    if text in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.fromisoformat(text.strip("'")).astimezone(dt_timezone.utc)
+
+
+def list_partitions():
+    """[(name, start, end)] for range partitions; None marks an open bound"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or '')
+        if match:  # the DEFAULT partition has no range
+            partitions.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return partitions
+
+
+def _covered(month, partitions):
+    return any((start is None or start <= month) and (end is None or month < end)
+               for _, start, end in partitions)
+
+
+def create_partition(name, start, end):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(TABLE)} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def ensure_partitions(months_ahead=None, now=None):
+    """Create monthly partitions from the current month through months_ahead; returns the new names"""
+    if not is_partitioned():
+        return []
+    months_ahead = AUDIT_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(now or datetime.now(dt_timezone.utc))
+    partitions = list_partitions()
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if _covered(month, partitions):
+            continue
+        try:
+            with transaction.atomic():
+                create_partition(partition_name(month), month, add_months(month, 1))
+        except DatabaseError as e:
+            # rows for the month already sit in the default partition
+            logger.warning(f"Could not create audit partition {partition_name(month)}: {e}")
+            continue
+        partitions.append((partition_name(month), month, add_months(month, 1)))
+        created.append(partition_name(month))
+    return created
+
+
+def expired_partitions(cutoff):
+    """Partitions holding only rows older than cutoff"""
+    if not is_partitioned():
+        return []
+    return [name for name, _, end in list_partitions() if end is not None and end <= cutoff]
+
+
+def drop_partition(name):
+    quote = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}")
+        cursor.execute(f"DROP TABLE {quote(name)}")
+
+
+# ---------------- pruning ----------------
+def delete_before(cutoff, batch_size=None):
+    """
+    Keyset delete of rows older than cutoff: one id SELECT and one DELETE per
+    batch, walking the primary key forward. Returns the number deleted.
+    """
+    from .models import AuditEvent
+
+    batch_size = batch_size or AUDIT_PRUNE_BATCH_SIZE
+    last_id = 0
+    total = 0
+    while True:
+        ids = list(
+            AuditEvent.objects.filter(created_at__lt=cutoff, pk__gt=last_id)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        # raw delete: audit rows have no dependants, and pre/post_delete
+        # receivers would otherwise load every row
+        batch = AuditEvent.objects.filter(pk__in=ids)
+        total += batch._raw_delete(batch.db)
+        last_id = ids[-1]
+
+
+def prune(cutoff, batch_size=None):
+    """Drop whole expired partitions, then keyset-delete the remainder; returns a report dict"""
+    ensure_partitions()
+    dropped = []
+    for name in expired_partitions(cutoff):
+        drop_partition(name)
+        dropped.append(name)
+        logger.info(f"Dropped audit partition {name}")
+    return {'dropped_partitions': dropped, 'deleted_rows': delete_before(cutoff, batch_size)}
+
+
+# ---------------- export ----------------
+EXPORT_FIELDS = ('id', 'created_at', 'action', 'object_type', 'object_id', 'actor_id', 'actor__username',
+                 'ip_address', 'request_id', 'user_agent', 'changes')
+
+
+def iter_events(queryset, page_size=None):
+    """values() rows newest first, paged on (created_at, id) instead of OFFSET"""
+    page_size = page_size or AUDIT_EXPORT_PAGE_SIZE
+    rows = queryset.order_by('-created_at', '-id').values(*EXPORT_FIELDS)
+    page = list(rows[:page_size])
+    while page:
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        page = list(rows.filter(
+            Q(created_at__lt=last['created_at']) | Q(created_at=last['created_at'], id__lt=last['id'])
+        )[:page_size])
+
+
+class _Echo:
+    """File-like object handing csv.writer output straight back"""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows, columns):
+    """CSV lines for rows; columns is [(header, row -> value)]"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow([value(row) for _, value in columns])
+
+
+def ndjson_stream(rows):
+    for row in rows:
+        row = dict(row, actor=row.pop('actor__username'))
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def streaming_export(queryset, filename, columns=None, fmt='csv'):
+    """StreamingHttpResponse exporting queryset as CSV (with columns) or NDJSON"""
+    rows = iter_events(queryset)
+    if fmt == 'ndjson':
+        response = StreamingHttpResponse(ndjson_stream(rows), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(csv_stream(rows, columns), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -7,9 +7,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
 from django.utils import timezone
-import csv
+from api.audit_storage import streaming_export
 from api.models import AuditEvent
 from api.serializers import AuditEventSerializer
 
@@ -35,6 +34,17 @@ class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ["object_type", "action", "actor__username", "request_id", "ip_address", "user_agent"]
     ordering_fields = ["created_at", "action", "object_type"]
     pagination_class = DefaultPagination
+    export_columns = [
+        ("Created At", lambda row: row["created_at"].isoformat()),
+        ("Action", lambda row: row["action"]),
+        ("Object Type", lambda row: row["object_type"]),
+        ("Object ID", lambda row: row["object_id"]),
+        ("Actor", lambda row: row["actor_id"] or ""),
+        ("Request ID", lambda row: row["request_id"] or ""),
+        ("IP Address", lambda row: row["ip_address"] or ""),
+        ("User Agent", lambda row: row["user_agent"] or ""),
+        ("Changes", lambda row: row["changes"]),
+    ]
 
     def get_queryset(self):
         """Filter queryset based on user permissions."""
@@ -63,29 +73,11 @@ class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=["get"])
     def export(self, request):
-        """Export audit events to CSV."""
-        qs = self.filter_queryset(self.get_queryset()).order_by("-created_at")
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="audit_events.csv"'
-        writer = csv.writer(response)
-        writer.writerow(
-            ["Created At", "Action", "Object Type", "Object ID", "Actor", "Request ID", "IP Address", "User Agent", "Changes"]
-        )
-        for ev in qs:
-            writer.writerow(
-                [
-                    ev.created_at.isoformat(),
-                    ev.action,
-                    ev.object_type,
-                    ev.object_id,
-                    ev.actor_id or "",
-                    ev.request_id or "",
-                    ev.ip_address or "",
-                    ev.user_agent or "",
-                    ev.changes,
-                ]
-            )
-        return response
+        """Stream audit events as CSV (or NDJSON with ?export_format=ndjson)."""
+        qs = self.filter_queryset(self.get_queryset())
+        if request.query_params.get("export_format") == "ndjson":
+            return streaming_export(qs, "audit_events.ndjson", fmt="ndjson")
+        return streaming_export(qs, "audit_events.csv", self.export_columns)
 
     @action(detail=True, methods=["get"])
     def related_events(self, request, pk=None):
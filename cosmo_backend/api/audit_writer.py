@@ -0,0 +1,245 @@
+# api/audit_writer.py
+"""
+Write-behind buffer for AuditEvent rows.
+
+audit_signals used to insert one AuditEvent per model save (on commit when in
+a transaction). AuditWriter collects committed events in a *scope* instead -
+one per request (AuditMiddleware) or per batch job (``audit_batch()``) - and
+writes them when the scope ends:
+
+- 'buffered' (default): one bulk_create per flush;
+- 'spool': append NDJSON lines to AUDIT_SPOOL_DIR, drained into the database
+  by ``manage.py drain_audit_spool``;
+- 'sync': the old behaviour, one insert per event.
+
+Memory is bounded: a scope flushes early once it holds AUDIT_BUFFER_MAX_EVENTS.
+Outside a scope events are written immediately. If a bulk insert (or spool
+write) fails, rows are retried one by one and only rows that still fail are
+dropped; ``snapshot()`` exposes flushed/spooled/dropped counters.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MODES = ('buffered', 'spool', 'sync')
+
+_SPOOL_FIELDS = ('object_type', 'object_id', 'action', 'actor_id', 'changes',
+                 'request_id', 'ip_address', 'user_agent')
+
+# Events committed in the current request/batch; None when no scope is open
+_scope: ContextVar = ContextVar('audit_write_scope', default=None)
+
+
+class AuditWriter:
+    """Buffers AuditEvent instances per scope and writes them in batches"""
+
+    def __init__(self, *, mode='buffered', max_buffer=500, batch_size=500, spool_dir=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown audit write mode {mode!r}; expected one of {MODES}")
+        if mode == 'spool' and not spool_dir:
+            raise ValueError("Audit write mode 'spool' needs AUDIT_SPOOL_DIR")
+        self.mode = mode
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'flushed': 0, 'spooled': 0, 'dropped': 0,
+                      'batches': 0, 'fallback_rows': 0, 'early_flushes': 0}
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            mode=getattr(settings, 'AUDIT_WRITE_MODE', 'buffered'),
+            max_buffer=getattr(settings, 'AUDIT_BUFFER_MAX_EVENTS', 500),
+            batch_size=getattr(settings, 'AUDIT_BULK_BATCH_SIZE', 500),
+            spool_dir=getattr(settings, 'AUDIT_SPOOL_DIR', None),
+        )
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    # ---------------- scopes ----------------
+    def open_scope(self):
+        """Start buffering; returns a token for close_scope (None when nested)"""
+        if _scope.get() is not None:
+            return None
+        return _scope.set([])
+
+    def close_scope(self, token):
+        """Flush and end a scope opened by open_scope"""
+        if token is None:
+            return
+        events = _scope.get() or []
+        try:
+            _scope.reset(token)
+        except ValueError:  # reset from another context; just drop the reference
+            _scope.set(None)
+        self.write(events)
+
+    @contextlib.contextmanager
+    def scope(self):
+        token = self.open_scope()
+        try:
+            yield self
+        finally:
+            self.close_scope(token)
+
+    # ---------------- writing ----------------
+    def submit(self, event):
+        """Accept one unsaved AuditEvent whose transaction has committed"""
+        self._count('submitted')
+        buffer = _scope.get()
+        if buffer is None or self.mode == 'sync':
+            self.write([event])
+            return
+        buffer.append(event)
+        if len(buffer) >= self.max_buffer:
+            self._count('early_flushes')
+            events = buffer[:]
+            buffer.clear()
+            self.write(events)
+
+    def flush(self):
+        """Write what the current scope holds without closing it"""
+        buffer = _scope.get()
+        if buffer:
+            events = buffer[:]
+            buffer.clear()
+            self.write(events)
+
+    def write(self, events):
+        if not events:
+            return
+        if self.mode == 'spool':
+            try:
+                self._spool(events)
+                return
+            except OSError as e:
+                logger.warning(f"Audit spool write failed, writing {len(events)} events directly: {e}")
+        self._bulk_insert(events)
+
+    def _bulk_insert(self, events):
+        from api.models import AuditEvent
+
+        if len(events) > 1:
+            try:
+                with transaction.atomic():
+                    AuditEvent.objects.bulk_create(events, batch_size=self.batch_size)
+                self._count('flushed', len(events))
+                self._count('batches')
+                return
+            except Exception as e:
+                logger.warning(f"Bulk audit insert of {len(events)} events failed, retrying row by row: {e}")
+                self._count('fallback_rows', len(events))
+
+        # sync fallback: one bad row must not lose the whole batch
+        for event in events:
+            try:
+                event.pk = None
+                event.save(force_insert=True)
+                self._count('flushed')
+            except Exception as e:
+                self._count('dropped')
+                logger.error(f"Failed to create audit event for {event.object_type}:{event.object_id}: {e}")
+
+    # ---------------- spool ----------------
+    def _spool_path(self):
+        return self.spool_dir / f"audit-{os.getpid()}.ndjson"
+
+    def _spool(self, events):
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        lines = ''.join(
+            json.dumps({
+                **{name: getattr(event, name) for name in _SPOOL_FIELDS},
+                'created_at': event.created_at.isoformat() if event.created_at else None,
+            }, default=str) + '\n'
+            for event in events
+        )
+        with open(self._spool_path(), 'a', encoding='utf-8') as fh:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            fh.write(lines)
+        self._count('spooled', len(events))
+
+    def drain_spool(self):
+        """Move spooled events into the database; returns the number inserted"""
+        from api.models import AuditEvent
+
+        if not self.spool_dir or not self.spool_dir.exists():
+            return 0
+        # files left behind by an interrupted drain first, then live spool files;
+        # writers reopen the file by name per flush, so after the rename new
+        # events land in a fresh file and the lock waits out a write in flight
+        claimed_files = sorted(self.spool_dir.glob('audit-*.ndjson.draining-*'))
+        for path in sorted(self.spool_dir.glob('audit-*.ndjson')):
+            claimed = path.with_name(f"{path.name}.draining-{time.time_ns()}")
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            claimed_files.append(claimed)
+
+        inserted = 0
+        for claimed in claimed_files:
+            events = []
+            with open(claimed, encoding='utf-8') as fh:
+                if fcntl:
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                for line in fh:
+                    try:
+                        row = json.loads(line)
+                        if row.get('created_at'):
+                            row['created_at'] = datetime.fromisoformat(row['created_at'])
+                        else:
+                            row.pop('created_at', None)
+                        events.append(AuditEvent(**row))
+                    except (ValueError, TypeError) as e:
+                        self._count('dropped')
+                        logger.error(f"Skipping malformed audit spool line in {claimed.name}: {e}")
+            for start in range(0, len(events), self.batch_size):
+                self._bulk_insert(events[start:start + self.batch_size])
+            inserted += len(events)
+            claimed.unlink()
+        return inserted
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'mode': self.mode, 'max_buffer': self.max_buffer,
+                'buffered_in_scope': len(_scope.get() or ())}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """Process-wide AuditWriter built from settings"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter.from_settings()
+        return _writer
+
+
+def audit_batch():
+    """Buffer audit events for a batch job (imports, task generation) until it ends"""
+    return get_audit_writer().scope()
@@ -0,0 +1,202 @@
+# api/blob_storage.py
+"""
+Content-addressed storage for uploaded photos and import files.
+
+Mobile retries and offline replays re-send identical bytes, and each of them
+used to become a new file. The file fields listed in BLOB_FIELDS now store
+through ContentAddressedStorage, which wraps the default storage:
+
+- an upload is hashed (SHA-256) chunk by chunk, never read into memory whole,
+  and stored as ``<upload_to dir>/<digest><ext>``; callers that already know
+  the digest (the booking import) hand it over as ``content.content_digest``;
+- every stored blob has a StoredBlob row counting the field values pointing
+  at it, so saving bytes that are already stored only bumps ref_count;
+- ``delete()`` (FieldFile.delete, or a row going away - see the receivers
+  below) releases one reference. Blobs that reach zero stay in storage so a
+  replayed upload can still reuse them, and are removed after
+  BLOB_GC_GRACE_HOURS by ImportFileCleanupService.collect_unreferenced_blobs
+  (``manage.py cleanup_imports --blobs``).
+
+Files stored before this layer have no StoredBlob row; deleting one removes
+it directly, as before, and deleting its row leaves it alone.
+"""
+
+import hashlib
+import logging
+import os
+import posixpath
+
+from django.apps import apps
+from django.core.files.storage import Storage, default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# model label -> file field stored through ContentAddressedStorage
+BLOB_FIELDS = {
+    'api.TaskImage': 'image',
+    'api.ChecklistPhoto': 'image',
+    'api.LostFoundPhoto': 'image',
+    'api.BookingImportLog': 'import_file',
+}
+
+
+def _blob_model():
+    return apps.get_model('api', 'StoredBlob')
+
+
+def stream_digest(content):
+    """SHA-256 of a Django File, read in chunks"""
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def blob_key(name, digest):
+    """Content-addressed name for an upload the field would have stored as ``name``"""
+    ext = os.path.splitext(name)[1].lower()
+    return posixpath.join(posixpath.dirname(name), f'{digest}{ext}')
+
+
+def release(name):
+    """Drop one reference to a stored blob; False when ``name`` is not a tracked blob"""
+    if not name:
+        return False
+    StoredBlob = _blob_model()
+    if not StoredBlob.objects.filter(name=name).exists():
+        return False
+    released = StoredBlob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    if released:
+        StoredBlob.objects.filter(name=name, ref_count=0, released_at__isnull=True).update(
+            released_at=timezone.now()
+        )
+    return True
+
+
+def count_references(name):
+    """Field values currently pointing at ``name``, across every BLOB_FIELDS model"""
+    return sum(
+        apps.get_model(label)._base_manager.filter(**{field: name}).count()
+        for label, field in BLOB_FIELDS.items()
+    )
+
+
+class ContentAddressedStorage(Storage):
+    """Deduplicating, reference-counted wrapper around another storage"""
+
+    def __init__(self, wrapped=None):
+        self._wrapped = wrapped
+
+    @property
+    def wrapped(self):
+        return self._wrapped if self._wrapped is not None else default_storage
+
+    def get_available_name(self, name, max_length=None):
+        # Names are content addresses: the same name means the same bytes
+        return name
+
+    def _save(self, name, content):
+        digest = getattr(content, 'content_digest', None) or stream_digest(content)
+        key = blob_key(name, digest)
+        StoredBlob = _blob_model()
+
+        blob = StoredBlob.objects.filter(key=key).first()
+        if blob is not None and self.wrapped.exists(blob.name):
+            if StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, released_at=None):
+                return blob.name
+            blob = None  # garbage-collected in the meantime
+
+        stored = self.wrapped.save(key, content)
+        try:
+            with transaction.atomic():
+                if blob is not None:
+                    # Row left behind by a file removed outside this layer
+                    StoredBlob.objects.filter(pk=blob.pk).update(
+                        name=stored, ref_count=F('ref_count') + 1, released_at=None
+                    )
+                else:
+                    StoredBlob.objects.create(key=key, name=stored, digest=digest,
+                                              size=getattr(content, 'size', None) or 0, ref_count=1)
+            return stored
+        except IntegrityError:
+            # Another upload of the same bytes stored it first; keep theirs
+            self.wrapped.delete(stored)
+            blob = StoredBlob.objects.get(key=key)
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, released_at=None)
+            return blob.name
+
+    def delete(self, name):
+        if not release(name) and name:
+            self.wrapped.delete(name)
+
+    def _open(self, name, mode='rb'):
+        return self.wrapped.open(name, mode)
+
+    def exists(self, name):
+        return self.wrapped.exists(name)
+
+    def size(self, name):
+        return self.wrapped.size(name)
+
+    def url(self, name):
+        return self.wrapped.url(name)
+
+    def path(self, name):
+        return self.wrapped.path(name)
+
+    def listdir(self, path):
+        return self.wrapped.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.wrapped.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.wrapped.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.wrapped.get_modified_time(name)
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    """``storage=`` callable for the BLOB_FIELDS file fields"""
+    return blob_storage
+
+
+# ---------------- reference tracking on the owning rows ----------------
+def _release_deleted(sender, instance, **kwargs):
+    """A deleted row no longer references its blob (untracked files are kept)"""
+    release(getattr(instance, BLOB_FIELDS[sender._meta.label]).name)
+
+
+def _remember_replaced(sender, instance, raw=False, **kwargs):
+    """Note the blob an existing row is about to stop referencing"""
+    if raw or instance._state.adding:
+        return
+    file = getattr(instance, BLOB_FIELDS[sender._meta.label])
+    if getattr(file, '_committed', True):
+        return  # no new upload assigned
+    previous = sender._base_manager.filter(pk=instance.pk).values_list(
+        BLOB_FIELDS[sender._meta.label], flat=True
+    ).first()
+    if previous:
+        instance._replaced_blob = previous
+
+
+def _release_replaced(sender, instance, created=False, **kwargs):
+    previous = instance.__dict__.pop('_replaced_blob', None)
+    if previous and previous != getattr(instance, BLOB_FIELDS[sender._meta.label]).name:
+        release(previous)
+
+
+for _label in BLOB_FIELDS:
+    # Per-model senders: a catch-all post_delete receiver would disable fast deletes everywhere
+    post_delete.connect(_release_deleted, sender=_label, dispatch_uid=f'blob_release_deleted:{_label}')
+    pre_save.connect(_remember_replaced, sender=_label, dispatch_uid=f'blob_remember_replaced:{_label}')
+    post_save.connect(_release_replaced, sender=_label, dispatch_uid=f'blob_release_replaced:{_label}')
@@ -0,0 +1,276 @@
+# api/booking_conflicts.py
+"""
+Batch conflict analysis for Booking.check_conflicts.
+
+A booking conflicts with other *active* bookings (booked, confirmed,
+currently hosting) in three ways:
+
+- same_day_checkout_checkin: another property checks in on the day this one
+  checks out;
+- same_day_checkin_checkout: another property checks out on the day this one
+  checks in;
+- overlapping_dates: another booking on the same property overlaps it.
+
+Instead of three queries per booking, analyze_bookings() loads every candidate
+for a batch of bookings with one query (bounded by the merged date windows of
+the batch), joins same-day turnovers on their local dates and finds overlaps
+with a per-property sweep over bookings sorted by check-in.
+
+Results are cached in two tiers, mirroring api.permission_cache:
+
+- request scope: the full conflict list is memoized on the Booking instance;
+- cross request: a small summary (counts + messages) is stored in the cache
+  backend under a versioned key. Any Booking save/delete bumps the version;
+  bulk writes (imports) call invalidate_all() explicitly.
+"""
+
+import heapq
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('booked', 'confirmed', 'currently_hosting')
+
+CACHE_PREFIX = 'bookingconf'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+BOOKING_CONFLICT_CACHE_TIMEOUT = getattr(settings, 'BOOKING_CONFLICT_CACHE_TIMEOUT', 300)
+
+# Same-day turnovers are matched on local dates; pad candidate windows so
+# timezone shifts never push a match outside the query range.
+_WINDOW_PADDING = timedelta(days=1)
+
+# Process-local generation counter so results memoized on instances are
+# dropped after an in-process write even with a DummyCache backend.
+_local_generation = 0
+
+_MEMO_ATTR = '_conflict_memo'
+_SUMMARY_MEMO_ATTR = '_conflict_summary_memo'
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY) or 1
+    return version
+
+
+def invalidate_all():
+    """Invalidate every cached conflict result (any booking write can affect others)."""
+    global _local_generation
+    _local_generation += 1
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+    except Exception as exc:  # pragma: no cover - cache outage must not break writes
+        logger.warning("Could not bump booking conflict cache version: %s", exc)
+
+
+def _summary_key(version, booking_id):
+    return f'{CACHE_PREFIX}:{version}:{booking_id}'
+
+
+def _local_date(value):
+    if timezone.is_aware(value):
+        return timezone.localtime(value).date()
+    return value.date()
+
+
+def _merged_windows(bookings):
+    """Merge the padded [check_in, check_out] ranges of a batch into disjoint windows"""
+    ranges = sorted(
+        (b.check_in_date - _WINDOW_PADDING, b.check_out_date + _WINDOW_PADDING) for b in bookings
+    )
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _load_candidates(bookings):
+    from .models import Booking
+
+    window_filter = Q()
+    for start, end in _merged_windows(bookings):
+        window_filter |= Q(check_in_date__lt=end, check_out_date__gt=start)
+    return list(
+        Booking.objects.filter(window_filter, status__in=ACTIVE_STATUSES).select_related('property')
+    )
+
+
+def _conflict(kind, booking, other):
+    if kind == 'same_day_checkout_checkin':
+        message = (f"Same day conflict: Check-out from {booking.property.name} on "
+                   f"{_local_date(booking.check_out_date)}, check-in at {other.property.name}")
+        severity = 'high'
+    elif kind == 'same_day_checkin_checkout':
+        message = (f"Same day conflict: Check-in at {booking.property.name} on "
+                   f"{_local_date(booking.check_in_date)}, check-out from {other.property.name}")
+        severity = 'high'
+    else:
+        message = (f"Overlapping booking on {booking.property.name}: "
+                   f"{_local_date(other.check_in_date)} - {_local_date(other.check_out_date)}")
+        severity = 'critical'
+    return {'type': kind, 'message': message, 'booking': other, 'severity': severity}
+
+
+def analyze_bookings(bookings):
+    """
+    Compute conflicts for a batch of bookings with a single candidate query.
+
+    ``bookings`` may be a queryset or an iterable of Booking instances.
+    Returns {booking_id: [conflict, ...]} with the same conflict dicts
+    Booking.check_conflicts() has always returned.
+    """
+    targets = [b for b in bookings if b.pk is not None]
+    if not targets:
+        return {}
+
+    target_ids = {b.pk for b in targets}
+    candidates = [c for c in _load_candidates(targets) if c.pk not in target_ids]
+    active = candidates + [b for b in targets if b.status in ACTIVE_STATUSES]
+
+    # Same-day turnovers: hash join on local check-in / check-out dates
+    checkins_by_date = defaultdict(list)
+    checkouts_by_date = defaultdict(list)
+    for other in active:
+        checkins_by_date[_local_date(other.check_in_date)].append(other)
+        checkouts_by_date[_local_date(other.check_out_date)].append(other)
+
+    # Overlaps: per-property sweep over check-ins with a min-heap of check-outs
+    overlaps = defaultdict(list)
+    by_property = defaultdict(dict)
+    for booking in targets + candidates:
+        by_property[booking.property_id][booking.pk] = booking
+    for group in by_property.values():
+        if not target_ids.intersection(group):
+            continue
+        open_heap = []
+        for booking in sorted(group.values(), key=lambda b: (b.check_in_date, b.pk)):
+            while open_heap and open_heap[0][0] <= booking.check_in_date:
+                heapq.heappop(open_heap)
+            for _, _, other in open_heap:
+                if booking.pk in target_ids and other.status in ACTIVE_STATUSES:
+                    overlaps[booking.pk].append(other)
+                if other.pk in target_ids and booking.status in ACTIVE_STATUSES:
+                    overlaps[other.pk].append(booking)
+            heapq.heappush(open_heap, (booking.check_out_date, booking.pk, booking))
+
+    def newest_first(items):
+        return sorted(items, key=lambda b: b.check_in_date, reverse=True)
+
+    results = {}
+    for booking in targets:
+        conflicts = []
+        for other in newest_first(checkins_by_date.get(_local_date(booking.check_out_date), ())):
+            if other.pk != booking.pk and other.property_id != booking.property_id:
+                conflicts.append(_conflict('same_day_checkout_checkin', booking, other))
+        for other in newest_first(checkouts_by_date.get(_local_date(booking.check_in_date), ())):
+            if other.pk != booking.pk and other.property_id != booking.property_id:
+                conflicts.append(_conflict('same_day_checkin_checkout', booking, other))
+        for other in newest_first(overlaps.get(booking.pk, ())):
+            conflicts.append(_conflict('overlapping_dates', booking, other))
+        results[booking.pk] = conflicts
+    return results
+
+
+def analyze_window(start, end, queryset=None):
+    """Conflicts for every booking overlapping [start, end)"""
+    from .models import Booking
+
+    queryset = Booking.objects.all() if queryset is None else queryset
+    bookings = queryset.filter(check_in_date__lt=end, check_out_date__gt=start).select_related('property')
+    return analyze_bookings(bookings)
+
+
+def summarize(conflicts):
+    """Cacheable summary used by admin/calendar displays"""
+    return {
+        'total': len(conflicts),
+        'critical': sum(1 for c in conflicts if c['severity'] == 'critical'),
+        'high': sum(1 for c in conflicts if c['severity'] == 'high'),
+        'messages': [c['message'] for c in conflicts],
+    }
+
+
+def _memo_get(booking, attr):
+    memo = booking.__dict__.get(attr)
+    if memo is not None and memo[0] == _local_generation:
+        return memo[1]
+    return None
+
+
+def _memo_set(booking, attr, value):
+    booking.__dict__[attr] = (_local_generation, value)
+
+
+def get_conflicts(booking):
+    """Full conflict list for one booking, memoized on the instance"""
+    conflicts = _memo_get(booking, _MEMO_ATTR)
+    if conflicts is None:
+        conflicts = analyze_bookings([booking]).get(booking.pk, [])
+        _memo_set(booking, _MEMO_ATTR, conflicts)
+    return conflicts
+
+
+def prefetch_conflict_summaries(bookings):
+    """
+    Attach conflict summaries to a page of bookings: one cache round-trip,
+    plus one candidate query for whatever was not cached.
+    """
+    bookings = [b for b in bookings if b.pk is not None and _memo_get(b, _SUMMARY_MEMO_ATTR) is None]
+    if not bookings:
+        return
+
+    version = _get_version()
+    keys = {b.pk: _summary_key(version, b.pk) for b in bookings}
+    cached = cache.get_many(list(keys.values()))
+
+    missing = []
+    for booking in bookings:
+        summary = cached.get(keys[booking.pk])
+        if summary is None:
+            missing.append(booking)
+        else:
+            _memo_set(booking, _SUMMARY_MEMO_ATTR, summary)
+
+    if not missing:
+        return
+
+    results = analyze_bookings(missing)
+    to_cache = {}
+    for booking in missing:
+        conflicts = results.get(booking.pk, [])
+        summary = summarize(conflicts)
+        _memo_set(booking, _MEMO_ATTR, conflicts)
+        _memo_set(booking, _SUMMARY_MEMO_ATTR, summary)
+        to_cache[keys[booking.pk]] = summary
+    cache.set_many(to_cache, BOOKING_CONFLICT_CACHE_TIMEOUT)
+
+
+def get_conflict_summary(booking):
+    """Conflict summary for one booking (instance memo → cache → analysis)"""
+    summary = _memo_get(booking, _SUMMARY_MEMO_ATTR)
+    if summary is None:
+        prefetch_conflict_summaries([booking])
+        summary = _memo_get(booking, _SUMMARY_MEMO_ATTR) or summarize([])
+    return summary
+
+
+@receiver(post_save, sender='api.Booking')
+@receiver(post_delete, sender='api.Booking')
+def _invalidate_on_booking_change(sender, **kwargs):
+    invalidate_all()
@@ -12,7 +12,8 @@ from django.utils.decorators import method_decorator
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Q
-from django.urls import reverse
+from . import calendar_events
+from .booking_conflicts import prefetch_conflict_summaries
 from .models import Property, User
 from .authz import AuthzHelper
 import json
@@ -46,9 +47,7 @@ def calendar_properties_api(request):
     """
     API endpoint to get calendar data (bookings and tasks) for calendar display
     """
-    from .models import Task, Booking
-    from django.utils import timezone
-    from datetime import datetime, timedelta
+    from datetime import datetime
     
     # Get date parameters
     start_date = request.GET.get('start_date')
@@ -70,95 +69,11 @@ def calendar_properties_api(request):
     status = request.GET.get('status')
     user_id = request.GET.get('user_id')
     
-    # Build base queries
-    tasks_query = Task.objects.filter(
-        is_deleted=False,
-        due_date__date__gte=start_dt,
-        due_date__date__lte=end_dt
-    )
-    
-    bookings_query = Booking.objects.filter(
-        is_deleted=False
-    ).filter(
-        Q(check_in_date__date__lte=end_dt) & Q(check_out_date__date__gte=start_dt)
-    )
-    
-    # Apply property filter
-    if property_id:
-        tasks_query = tasks_query.filter(property_ref_id=property_id)
-        bookings_query = bookings_query.filter(property_id=property_id)
-    
-    # Apply status filter
-    if status:
-        tasks_query = tasks_query.filter(status=status)
-        bookings_query = bookings_query.filter(status=status)
-    
-    # Apply user filter (for tasks only, as bookings don't have assigned users)
-    if user_id:
-        tasks_query = tasks_query.filter(assigned_to_id=user_id)
-    
-    # Execute queries
-    tasks = tasks_query
-    bookings = bookings_query
-    
-    # Enhanced color scheme for better visual distinction and status indication
-    def get_task_color(status):
-        """Get color based on task status - using warm colors to distinguish from bookings"""
-        color_map = {
-            'pending': '#ff6b35',      # Bright orange - needs attention
-            'in-progress': '#ff9f43',  # Light orange - actively being worked on
-            'completed': '#2ecc71',    # Bright green - done
-            'cancelled': '#95a5a6',    # Gray - cancelled
-            'overdue': '#e74c3c',      # Red - urgent/overdue
-            'waiting_dependency': '#f39c12',  # Dark orange - waiting for dependency
-        }
-        return color_map.get(status, '#ff9f43')  # Default light orange for unknown status
-    
-    def get_booking_color(status):
-        """Get color based on booking status - using cool colors to distinguish from tasks"""
-        color_map = {
-            'pending': '#3498db',           # Blue - pending confirmation
-            'confirmed': '#16a085',         # Teal - confirmed
-            'booked': '#2980b9',           # Dark blue - booked
-            'in-progress': '#1abc9c',       # Cyan - currently hosting
-            'currently_hosting': '#1abc9c', # Cyan - currently hosting
-            'owner_staying': '#8e44ad',     # Purple - owner staying
-            'cancelled': '#95a5a6',         # Gray - cancelled
-            'completed': '#27ae60',         # Green - completed
-        }
-        return color_map.get(status, '#3498db')  # Default blue for unknown status
-    
-    # Create events list
-    events = []
-    
-    # Add tasks
-    for task in tasks:
-        events.append({
-            'id': f"task_{task.id}",
-            'title': task.title,
-            'start': task.due_date.isoformat() if task.due_date else None,
-            'end': task.due_date.isoformat() if task.due_date else None,
-            'allDay': True,  # Tasks are all-day events
-            'color': get_task_color(task.status),
-            'type': 'task',
-            'status': task.status,
-            'property': task.property_ref.name if task.property_ref else '',
-            'assigned_to': f"{task.assigned_to.first_name} {task.assigned_to.last_name}".strip() if task.assigned_to and (task.assigned_to.first_name or task.assigned_to.last_name) else (task.assigned_to.username if task.assigned_to else ''),
-        })
-    
-    # Add bookings
-    for booking in bookings:
-        events.append({
-            'id': f"booking_{booking.id}",
-            'title': f"{booking.guest_name} - {booking.property.name}",
-            'start': booking.check_in_date.isoformat() if booking.check_in_date else None,
-            'end': booking.check_out_date.isoformat() if booking.check_out_date else None,
-            'color': get_booking_color(booking.status),
-            'type': 'booking',
-            'status': booking.status,
-            'property': booking.property.name,
-            'guest_name': booking.guest_name,
-        })
+    # Month rows come from the shared calendar cache (api.calendar_events)
+    tasks = calendar_events.task_rows(start_dt, end_dt, property_id=property_id, status=status,
+                                      assigned_to=user_id)
+    bookings = calendar_events.booking_rows(start_dt, end_dt, property_id=property_id, status=status)
+    events = calendar_events.portal_events(tasks, bookings, with_conflicts=True)
     
     return JsonResponse(events, safe=False)
 
@@ -209,12 +124,9 @@ def calendar_stats_api(request):
         'in_progress_tasks': tasks.filter(status='in-progress').count(),
         'completed_tasks': tasks.filter(status='completed').count(),
         'total_bookings': bookings.count(),
-        'active_bookings': bookings.filter(
-            check_in_date__date__lte=today,
-            check_out_date__date__gte=today
-        ).count(),
-        'week_tasks': tasks.filter(due_date__date__range=[week_start, week_end]).count(),
-        'month_tasks': tasks.filter(due_date__date__gte=month_start).count(),
+        'active_bookings': bookings.filter(calendar_events.booking_overlap_q(today, today)).count(),
+        'week_tasks': tasks.filter(calendar_events.task_range_q(week_start, week_end)).count(),
+        'month_tasks': tasks.filter(due_date__gte=calendar_events.day_range(month_start, month_start)[0]).count(),
     }
     
     return JsonResponse(stats)
@@ -225,9 +137,7 @@ def calendar_data_api(request):
     """
     API endpoint to get calendar data (bookings and tasks) without authentication
     """
-    from .models import Task, Booking
-    from django.utils import timezone
-    from datetime import datetime, timedelta
+    from datetime import datetime
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
@@ -241,78 +151,9 @@ def calendar_data_api(request):
     except ValueError:
         return JsonResponse({'error': 'Invalid date format'}, status=400)
     
-    # Get tasks in the date range
-    tasks = Task.objects.filter(
-        is_deleted=False,
-        due_date__date__gte=start_dt,
-        due_date__date__lte=end_dt
-    )
-    
-    # Get bookings in the date range  
-    bookings = Booking.objects.filter(
-        is_deleted=False
-    ).filter(
-        Q(check_in_date__date__lte=end_dt) & Q(check_out_date__date__gte=start_dt)
-    )
-    
-    # Create events list
-    events = []
-    
-    # Enhanced color scheme for better visual distinction and status indication
-    def get_task_color(status):
-        """Get color based on task status - using warm colors to distinguish from bookings"""
-        color_map = {
-            'pending': '#ff6b35',      # Bright orange - needs attention
-            'in-progress': '#ff9f43',  # Light orange - actively being worked on
-            'completed': '#2ecc71',    # Bright green - done
-            'cancelled': '#95a5a6',    # Gray - cancelled
-            'overdue': '#e74c3c',      # Red - urgent/overdue
-            'waiting_dependency': '#f39c12',  # Dark orange - waiting for dependency
-        }
-        return color_map.get(status, '#ff9f43')  # Default light orange for unknown status
-    
-    def get_booking_color(status):
-        """Get color based on booking status - using cool colors to distinguish from tasks"""
-        color_map = {
-            'pending': '#3498db',           # Blue - pending confirmation
-            'confirmed': '#16a085',         # Teal - confirmed
-            'booked': '#2980b9',           # Dark blue - booked
-            'in-progress': '#1abc9c',       # Cyan - currently hosting
-            'currently_hosting': '#1abc9c', # Cyan - currently hosting
-            'owner_staying': '#8e44ad',     # Purple - owner staying
-            'cancelled': '#95a5a6',         # Gray - cancelled
-            'completed': '#27ae60',         # Green - completed
-        }
-        return color_map.get(status, '#3498db')  # Default blue for unknown status
-    
-    # Add tasks
-    for task in tasks:
-        events.append({
-            'id': f"task_{task.id}",
-            'title': task.title,
-            'start': task.due_date.isoformat() if task.due_date else None,
-            'end': task.due_date.isoformat() if task.due_date else None,
-            'allDay': True,  # Tasks are all-day events
-            'color': get_task_color(task.status),
-            'type': 'task',
-            'status': task.status,
-            'property': task.property_ref.name if task.property_ref else '',
-            'assigned_to': f"{task.assigned_to.first_name} {task.assigned_to.last_name}".strip() if task.assigned_to and (task.assigned_to.first_name or task.assigned_to.last_name) else (task.assigned_to.username if task.assigned_to else ''),
-        })
-    
-    # Add bookings
-    for booking in bookings:
-        events.append({
-            'id': f"booking_{booking.id}",
-            'title': f"{booking.guest_name} - {booking.property.name}",
-            'start': booking.check_in_date.isoformat() if booking.check_in_date else None,
-            'end': booking.check_out_date.isoformat() if booking.check_out_date else None,
-            'color': get_booking_color(booking.status),
-            'type': 'booking',
-            'status': booking.status,
-            'property': booking.property.name,
-            'guest_name': booking.guest_name,
-        })
+    tasks = calendar_events.task_rows(start_dt, end_dt)
+    bookings = calendar_events.booking_rows(start_dt, end_dt)
+    events = calendar_events.portal_events(tasks, bookings)
     
     return JsonResponse(events, safe=False)
 
@@ -323,7 +164,6 @@ def calendar_events_api(request):
     """
     API endpoint to get events for a date range (for calendar display)
     """
-    from .models import Task, Booking
     from django.utils import timezone
     from datetime import datetime, timedelta
     
@@ -356,34 +196,6 @@ def calendar_events_api(request):
         except ValueError:
             return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get tasks in the date range
-    tasks = Task.objects.filter(
-        is_deleted=False,
-        due_date__date__gte=start_dt,
-        due_date__date__lte=end_dt
-    )
-    
-    # Get bookings in the date range
-    bookings = Booking.objects.filter(
-        is_deleted=False
-    ).filter(
-        Q(check_in_date__date__lte=end_dt) & Q(check_out_date__date__gte=start_dt)
-    )
-    
-    # Apply property filter
-    if property_id:
-        tasks = tasks.filter(property_ref_id=property_id)
-        bookings = bookings.filter(property_id=property_id)
-    
-    # Apply status filter
-    if status_filter:
-        tasks = tasks.filter(status=status_filter)
-        bookings = bookings.filter(status=status_filter)
-    
-    # Apply user filter (for tasks only, as bookings don't have assigned users)
-    if user_id:
-        tasks = tasks.filter(assigned_to_id=user_id)
-    
     # Apply event type filter
     if event_type_filter:
         if event_type_filter == 'task':
@@ -391,68 +203,13 @@ def calendar_events_api(request):
         elif event_type_filter == 'booking':
             include_tasks = False
     
-    # Manually serialize the data without DRF serializers
-    events = []
-    
-    # Enhanced color scheme for better visual distinction and status indication
-    def get_task_color(status):
-        """Get color based on task status - using warm colors to distinguish from bookings"""
-        color_map = {
-            'pending': '#ff6b35',      # Bright orange - needs attention
-            'in-progress': '#ff9f43',  # Light orange - actively being worked on
-            'completed': '#2ecc71',    # Bright green - done
-            'cancelled': '#95a5a6',    # Gray - cancelled
-            'overdue': '#e74c3c',      # Red - urgent/overdue
-            'waiting_dependency': '#f39c12',  # Dark orange - waiting for dependency
-        }
-        return color_map.get(status, '#ff9f43')  # Default light orange for unknown status
-    
-    def get_booking_color(status):
-        """Get color based on booking status - using cool colors to distinguish from tasks"""
-        color_map = {
-            'pending': '#3498db',           # Blue - pending confirmation
-            'confirmed': '#16a085',         # Teal - confirmed
-            'booked': '#2980b9',           # Dark blue - booked
-            'in-progress': '#1abc9c',       # Cyan - currently hosting
-            'currently_hosting': '#1abc9c', # Cyan - currently hosting
-            'owner_staying': '#8e44ad',     # Purple - owner staying
-            'cancelled': '#95a5a6',         # Gray - cancelled
-            'completed': '#27ae60',         # Green - completed
-        }
-        return color_map.get(status, '#3498db')  # Default blue for unknown status
-    
-    # Add tasks to events (if included)
-    if include_tasks:
-        for task in tasks:
-            events.append({
-                'id': f"task_{task.id}",
-                'title': task.title,
-                'start': task.due_date.isoformat() if task.due_date else None,
-                'end': task.due_date.isoformat() if task.due_date else None,
-                'allDay': True,  # Tasks are all-day events
-                'color': get_task_color(task.status),
-                'type': 'task',
-                'status': task.status,
-                'property': task.property_ref.name if task.property_ref else '',
-                'assigned_to': f"{task.assigned_to.first_name} {task.assigned_to.last_name}".strip() if task.assigned_to and (task.assigned_to.first_name or task.assigned_to.last_name) else (task.assigned_to.username if task.assigned_to else ''),
-                'url': reverse('portal-task-detail', args=[task.id]),
-            })
-    
-    # Add bookings to events (if included)
-    if include_bookings:
-        for booking in bookings:
-            events.append({
-                'id': f"booking_{booking.id}",
-                'title': f"{booking.guest_name} - {booking.property.name}",
-                'start': booking.check_in_date.isoformat() if booking.check_in_date else None,
-                'end': booking.check_out_date.isoformat() if booking.check_out_date else None,
-                'color': get_booking_color(booking.status),
-                'type': 'booking',
-                'status': booking.status,
-                'property': booking.property.name,
-                'guest_name': booking.guest_name,
-                'url': reverse('portal-booking-detail', args=[booking.property.id, booking.id]),
-            })
+    # Month rows come from the shared calendar cache (api.calendar_events);
+    # the user filter applies to tasks only, as bookings don't have assigned users
+    tasks = calendar_events.task_rows(start_dt, end_dt, property_id=property_id, status=status_filter,
+                                      assigned_to=user_id) if include_tasks else []
+    bookings = calendar_events.booking_rows(start_dt, end_dt, property_id=property_id,
+                                            status=status_filter) if include_bookings else []
+    events = calendar_events.portal_events(tasks, bookings, with_urls=True, with_conflicts=True)
     
     return Response(events, status=status.HTTP_200_OK)
 
@@ -464,8 +221,7 @@ def calendar_day_events_api(request):
     API endpoint to get events for a specific day
     """
     from .models import Task, Booking
-    from django.utils import timezone
-    from datetime import datetime, timedelta
+    from datetime import datetime
     from .calendar_serializers import CalendarTaskSerializer, CalendarBookingSerializer
     
     date_str = request.GET.get('date')
@@ -477,19 +233,20 @@ def calendar_day_events_api(request):
     except ValueError:
         return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get tasks for the day
+    # Get tasks for the day (range predicate on due_date, relations joined)
     tasks = Task.objects.filter(
-        due_date__date=target_date,
+        calendar_events.task_range_q(target_date, target_date),
         is_deleted=False
-    )
+    ).select_related('property_ref', 'assigned_to')
     
-    # Get bookings for the day
+    # Get bookings checking in, checking out or staying over on the day
     bookings = Booking.objects.filter(
-        Q(check_in_date__date=target_date) | 
-        Q(check_out_date__date=target_date) |
-        (Q(check_in_date__date__lte=target_date) & Q(check_out_date__date__gte=target_date)),
+        calendar_events.booking_overlap_q(target_date, target_date),
         is_deleted=False
-    )
+    ).select_related('property')
+    bookings = list(bookings)
+    prefetch_conflict_summaries(bookings)
+    property_ids = {booking.id: booking.property_id for booking in bookings}
     
     # Serialize the data
     task_data = CalendarTaskSerializer(tasks, many=True).data
@@ -497,6 +254,8 @@ def calendar_day_events_api(request):
     
     # Convert to calendar events format
     events = []
+    task_url = calendar_events.UrlPattern('portal-task-detail', 1)
+    booking_url = calendar_events.UrlPattern('portal-booking-detail', 2)
     
     for task in task_data:
         events.append({
@@ -510,13 +269,11 @@ def calendar_day_events_api(request):
             'property_name': task['property_name'],
             'assigned_to': task['assigned_to'],
             'description': task['description'],
-            'url': reverse('portal-task-detail', args=[task['id']])
+            'url': task_url(task['id'])
         })
     
     for booking in booking_data:
-        # Get the property_id from the original booking object
-        booking_obj = next((b for b in bookings if b.id == booking['id']), None)
-        property_id = booking_obj.property.id if booking_obj else None
+        property_id = property_ids.get(booking['id'])
         
         events.append({
             'id': f"booking_{booking['id']}",
@@ -530,7 +287,7 @@ def calendar_day_events_api(request):
             'property_name': booking['property_name'],
             'guest_name': booking['guest_name'],
             'description': f"Booking from {booking['check_in_date']} to {booking['check_out_date']}",
-            'url': reverse('portal-booking-detail', args=[property_id, booking['id']]) if property_id else None
+            'url': booking_url(property_id, booking['id']) if property_id else None
         })
     
     return Response({
@@ -562,14 +319,14 @@ def calendar_tasks_api(request):
     if start_date:
         try:
             start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-            tasks = tasks.filter(due_date__date__gte=start_dt)
+            tasks = tasks.filter(due_date__gte=calendar_events.day_range(start_dt, start_dt)[0])
         except ValueError:
             pass
     
     if end_date:
         try:
             end_dt = datetime.strptime(end_date, '%Y-%m-%d').date()
-            tasks = tasks.filter(due_date__date__lte=end_dt)
+            tasks = tasks.filter(due_date__lt=calendar_events.day_range(end_dt, end_dt)[1])
         except ValueError:
             pass
     
@@ -586,7 +343,7 @@ def calendar_tasks_api(request):
     if user_id:
         tasks = tasks.filter(assigned_to_id=user_id)
     
-    serializer = CalendarTaskSerializer(tasks, many=True)
+    serializer = CalendarTaskSerializer(tasks.select_related('property_ref', 'assigned_to'), many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -610,14 +367,14 @@ def calendar_bookings_api(request):
     if start_date:
         try:
             start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
-            bookings = bookings.filter(check_in_date__date__gte=start_dt)
+            bookings = bookings.filter(check_in_date__gte=calendar_events.day_range(start_dt, start_dt)[0])
         except ValueError:
             pass
     
     if end_date:
         try:
             end_dt = datetime.strptime(end_date, '%Y-%m-%d').date()
-            bookings = bookings.filter(check_out_date__date__lte=end_dt)
+            bookings = bookings.filter(check_out_date__lt=calendar_events.day_range(end_dt, end_dt)[1])
         except ValueError:
             pass
     
@@ -630,6 +387,8 @@ def calendar_bookings_api(request):
     if booking_status:
         bookings = bookings.filter(status=booking_status)
     
+    bookings = list(bookings.select_related('property'))
+    prefetch_conflict_summaries(bookings)
     serializer = CalendarBookingSerializer(bookings, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
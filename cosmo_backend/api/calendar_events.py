@@ -0,0 +1,356 @@
+# api/calendar_events.py
+"""
+Calendar event engine shared by calendar_django_views and calendar_views.
+
+The calendar feeds used to filter with ``due_date__date__gte``-style lookups
+(which wrap the column in a date conversion and cannot use an index), read
+property/assignee relations lazily per event and call reverse() per event.
+Here:
+
+- date ranges become half-open datetime predicates on the raw columns
+  (local midnight of the first day to local midnight after the last day),
+  served by the due_date / check-in indexes;
+- rows come from a single values() query per month with the property and
+  assignee columns joined in;
+- detail URLs are reversed once and filled in per event;
+- rows are cached per (user scope, month) under a versioned key. Any Task,
+  Booking or Property save/delete bumps the version; bulk writes call
+  invalidate_all() explicitly.
+
+Status/property/assignee filters are applied to the cached month rows in
+Python, so every filter combination shares one cache entry per month.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'calevents'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+CALENDAR_CACHE_TIMEOUT = getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 300)
+
+# Scope for users who may see every task
+SCOPE_ALL = 'all'
+
+TASK_FIELDS = (
+    'id', 'title', 'description', 'status', 'task_type', 'due_date',
+    'property_ref_id', 'property_ref__name', 'assigned_to_id',
+    'assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name',
+)
+BOOKING_FIELDS = (
+    'id', 'guest_name', 'status', 'check_in_date', 'check_out_date', 'property_id', 'property__name',
+)
+
+# Portal calendar (calendar_django_views): warm colors for tasks, cool for bookings
+PORTAL_TASK_COLORS = {
+    'pending': '#ff6b35',      # Bright orange - needs attention
+    'in-progress': '#ff9f43',  # Light orange - actively being worked on
+    'completed': '#2ecc71',    # Bright green - done
+    'cancelled': '#95a5a6',    # Gray - cancelled
+    'overdue': '#e74c3c',      # Red - urgent/overdue
+    'waiting_dependency': '#f39c12',  # Dark orange - waiting for dependency
+}
+PORTAL_BOOKING_COLORS = {
+    'pending': '#3498db',           # Blue - pending confirmation
+    'confirmed': '#16a085',         # Teal - confirmed
+    'booked': '#2980b9',           # Dark blue - booked
+    'in-progress': '#1abc9c',       # Cyan - currently hosting
+    'currently_hosting': '#1abc9c', # Cyan - currently hosting
+    'owner_staying': '#8e44ad',     # Purple - owner staying
+    'cancelled': '#95a5a6',         # Gray - cancelled
+    'completed': '#27ae60',         # Green - completed
+}
+
+# CalendarViewSet (REST API)
+API_TASK_COLORS = {
+    'pending': '#ffc107',  # amber
+    'waiting_dependency': '#6c757d',  # gray
+    'in-progress': '#007bff',  # blue
+    'completed': '#28a745',  # green
+    'canceled': '#dc3545',  # red
+}
+API_BOOKING_COLORS = {
+    'booked': '#17a2b8',  # info
+    'confirmed': '#007bff',  # primary
+    'currently_hosting': '#28a745',  # success
+    'owner_staying': '#6f42c1',  # purple
+    'cancelled': '#dc3545',  # danger
+    'completed': '#6c757d',  # secondary
+}
+
+# ---------------- ranges ----------------
+def day_range(start_date, end_date):
+    """Half-open [local midnight of start_date, local midnight after end_date)"""
+    tz = timezone.get_current_timezone()
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date + timedelta(days=1), time.min)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+    return start, end
+
+
+def task_range_q(start_date, end_date, prefix=''):
+    """Index-friendly replacement for due_date__date__gte/lte"""
+    start, end = day_range(start_date, end_date)
+    return Q(**{f'{prefix}due_date__gte': start, f'{prefix}due_date__lt': end})
+
+
+def booking_overlap_q(start_date, end_date):
+    """Bookings overlapping the days: check_in__date <= end and check_out__date >= start"""
+    start, end = day_range(start_date, end_date)
+    return Q(check_in_date__lt=end, check_out_date__gte=start)
+
+
+def _months(start_date, end_date):
+    month = date(start_date.year, start_date.month, 1)
+    while month <= end_date:
+        yield month
+        month = date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _month_end(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1) - timedelta(days=1)
+
+
+# ---------------- scope ----------------
+def task_scope(user):
+    """Cache scope for the tasks ``user`` may see: SCOPE_ALL or the user's id"""
+    if user.is_superuser:
+        return SCOPE_ALL
+    profile = getattr(user, 'profile', None)
+    if profile and (profile.has_permission('view_tasks') or profile.has_permission('view_all_tasks')):
+        return SCOPE_ALL
+    return user.pk
+
+
+# ---------------- cache ----------------
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY) or 1
+    return version
+
+
+def invalidate_all():
+    """Drop every cached month (any task or booking write can move events)"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+    except Exception as exc:  # pragma: no cover - cache outage must not break writes
+        logger.warning("Could not bump calendar cache version: %s", exc)
+
+
+def _month_key(version, kind, scope, month):
+    # Only the shared version: every worker must read and write the same keys
+    return f'{CACHE_PREFIX}:{version}:{kind}:{scope}:{month:%Y-%m}'
+
+
+def _query_tasks(month, scope):
+    from .models import Task
+
+    tasks = Task.objects.filter(task_range_q(month, _month_end(month)), is_deleted=False)
+    if scope != SCOPE_ALL:
+        tasks = tasks.filter(Q(assigned_to_id=scope) | Q(created_by_id=scope))
+    return list(tasks.order_by('due_date', 'id').values(*TASK_FIELDS))
+
+
+def _query_bookings(month, scope):
+    from .models import Booking
+
+    bookings = Booking.objects.filter(booking_overlap_q(month, _month_end(month)), is_deleted=False)
+    return list(bookings.order_by('check_in_date', 'id').values(*BOOKING_FIELDS))
+
+
+def _cached_rows(kind, scope, start_date, end_date, query):
+    months = list(_months(start_date, end_date))
+    version = _get_version()
+    keys = {month: _month_key(version, kind, scope, month) for month in months}
+    cached = cache.get_many(list(keys.values()))
+
+    missing = {}
+    rows = []
+    for month in months:
+        month_rows = cached.get(keys[month])
+        if month_rows is None:
+            month_rows = missing[keys[month]] = query(month, scope)
+        rows.extend(month_rows)
+    if missing:
+        cache.set_many(missing, CALENDAR_CACHE_TIMEOUT)
+
+    # bookings spanning a month boundary appear in both months
+    seen = set()
+    unique = []
+    for row in rows:
+        if row['id'] not in seen:
+            seen.add(row['id'])
+            unique.append(row)
+    return unique
+
+
+def task_rows(start_date, end_date, scope=SCOPE_ALL, *, property_id=None, status=None,
+              task_type=None, assigned_to=None):
+    """Task rows due within the days (inclusive), filtered in memory"""
+    start, end = day_range(start_date, end_date)
+    rows = _cached_rows('tasks', scope, start_date, end_date, _query_tasks)
+    return [
+        row for row in rows
+        if start <= row['due_date'] < end
+        and (not property_id or row['property_ref_id'] == int(property_id))
+        and (not status or row['status'] == status)
+        and (not task_type or row['task_type'] == task_type)
+        and (not assigned_to or row['assigned_to_id'] == int(assigned_to))
+    ]
+
+
+def booking_rows(start_date, end_date, *, property_id=None, status=None):
+    """Booking rows overlapping the days (inclusive), filtered in memory"""
+    start, end = day_range(start_date, end_date)
+    rows = _cached_rows('bookings', SCOPE_ALL, start_date, end_date, _query_bookings)
+    return [
+        row for row in rows
+        if row['check_in_date'] < end and row['check_out_date'] >= start
+        and (not property_id or row['property_id'] == int(property_id))
+        and (not status or row['status'] == status)
+    ]
+
+
+# ---------------- events ----------------
+class UrlPattern:
+    """reverse() once, then fill ids in per event"""
+
+    _SENTINELS = (987654321, 987654322)
+
+    def __init__(self, name, arity):
+        args = self._SENTINELS[:arity]
+        self.pattern = reverse(name, args=args)
+        for i, sentinel in enumerate(args):
+            self.pattern = self.pattern.replace(str(sentinel), f'{{{i}}}')
+
+    def __call__(self, *args):
+        return self.pattern.format(*args)
+
+
+def _display_name(row):
+    full_name = f"{row['assigned_to__first_name'] or ''} {row['assigned_to__last_name'] or ''}".strip()
+    return full_name or row['assigned_to__username'] or ''
+
+
+def conflict_totals(rows):
+    """{booking_id: conflict count} for booking rows via api.booking_conflicts"""
+    from .booking_conflicts import prefetch_conflict_summaries
+    from .models import Booking, Property
+
+    bookings = []
+    for row in rows:
+        booking = Booking(id=row['id'], property_id=row['property_id'], status=row['status'],
+                          check_in_date=row['check_in_date'], check_out_date=row['check_out_date'])
+        booking.property = Property(id=row['property_id'], name=row['property__name'])
+        bookings.append(booking)
+    prefetch_conflict_summaries(bookings)
+    return {booking.pk: booking.get_conflict_summary()['total'] for booking in bookings}
+
+
+def portal_events(tasks, bookings, *, with_urls=False, with_conflicts=False):
+    """Event dicts in the portal calendar format (calendar_django_views)"""
+    task_url = UrlPattern('portal-task-detail', 1) if with_urls else None
+    booking_url = UrlPattern('portal-booking-detail', 2) if with_urls else None
+    conflicts = conflict_totals(bookings) if with_conflicts else {}
+
+    events = []
+    for row in tasks:
+        due = row['due_date'].isoformat() if row['due_date'] else None
+        event = {
+            'id': f"task_{row['id']}",
+            'title': row['title'],
+            'start': due,
+            'end': due,
+            'allDay': True,  # Tasks are all-day events
+            'color': PORTAL_TASK_COLORS.get(row['status'], '#ff9f43'),
+            'type': 'task',
+            'status': row['status'],
+            'property': row['property_ref__name'] or '',
+            'assigned_to': _display_name(row) if row['assigned_to_id'] else '',
+        }
+        if task_url:
+            event['url'] = task_url(row['id'])
+        events.append(event)
+
+    for row in bookings:
+        event = {
+            'id': f"booking_{row['id']}",
+            'title': f"{row['guest_name']} - {row['property__name']}",
+            'start': row['check_in_date'].isoformat() if row['check_in_date'] else None,
+            'end': row['check_out_date'].isoformat() if row['check_out_date'] else None,
+            'color': PORTAL_BOOKING_COLORS.get(row['status'], '#3498db'),
+            'type': 'booking',
+            'status': row['status'],
+            'property': row['property__name'],
+            'guest_name': row['guest_name'],
+        }
+        if with_conflicts:
+            event['conflicts'] = conflicts.get(row['id'], 0)
+        if booking_url:
+            event['url'] = booking_url(row['property_id'], row['id'])
+        events.append(event)
+    return events
+
+
+def api_events(tasks, bookings):
+    """Event dicts in the CalendarViewSet.events format"""
+    task_url = UrlPattern('portal-task-detail', 1)
+    booking_url = UrlPattern('portal-booking-detail', 2)
+
+    events = []
+    for row in tasks:
+        events.append({
+            'id': f"task_{row['id']}",
+            'title': row['title'],
+            'start': row['due_date'].isoformat(),
+            'end': None,
+            'allDay': True,
+            'type': 'task',
+            'status': row['status'],
+            'color': API_TASK_COLORS.get(row['status'], '#6c757d'),
+            'property_name': row['property_ref__name'],
+            'assigned_to': row['assigned_to__username'],
+            'description': row['description'],
+            'url': task_url(row['id']),
+        })
+    for row in bookings:
+        check_in, check_out = row['check_in_date'], row['check_out_date']
+        events.append({
+            'id': f"booking_{row['id']}",
+            'title': f"{row['guest_name']} - {row['property__name']}",
+            'start': check_in.isoformat(),
+            'end': check_out.isoformat(),
+            'allDay': False,
+            'type': 'booking',
+            'status': row['status'],
+            'color': API_BOOKING_COLORS.get(row['status'], '#6c757d'),
+            'property_name': row['property__name'],
+            'guest_name': row['guest_name'],
+            'assigned_to': None,
+            'description': f"Check-in: {check_in.strftime('%Y-%m-%d %H:%M')}\nCheck-out: {check_out.strftime('%Y-%m-%d %H:%M')}",
+            'url': booking_url(row['property_id'], row['id']),
+        })
+    return events
+
+
+@receiver(post_save, sender='api.Task')
+@receiver(post_delete, sender='api.Task')
+@receiver(post_save, sender='api.Booking')
+@receiver(post_delete, sender='api.Booking')
+@receiver(post_save, sender='api.Property')
+def _invalidate_on_write(sender, **kwargs):
+    invalidate_all()
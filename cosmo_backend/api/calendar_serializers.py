@@ -47,11 +47,17 @@ class CalendarBookingSerializer(serializers.Serializer):
     check_in_date = serializers.DateTimeField()
     check_out_date = serializers.DateTimeField()
     status = serializers.CharField()
+    conflicts = serializers.SerializerMethodField()
 
     def get_property_name(self, obj):
         prop = getattr(obj, "property", None)
         return prop.name if prop else None
 
+    def get_conflicts(self, obj):
+        # Views prefetch summaries for the whole list (api.booking_conflicts)
+        summary = obj.get_conflict_summary()
+        return {key: summary[key] for key in ("total", "critical", "high")}
+
 
 class CalendarFilterSerializer(serializers.Serializer):
     start_date = serializers.DateField(required=False)
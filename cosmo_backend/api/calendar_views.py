@@ -9,8 +9,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q
 from django.utils import timezone
-from django.urls import reverse
 from datetime import datetime, timedelta
+from . import calendar_events
+from .booking_conflicts import prefetch_conflict_summaries
 from .models import Task, Booking, Property
 from .calendar_serializers import (
     CalendarTaskSerializer,
@@ -49,11 +50,11 @@ class CalendarViewSet(viewsets.ViewSet):
             if filters.get('assigned_to'):
                 queryset = queryset.filter(assigned_to_id=filters['assigned_to'])
             if filters.get('start_date'):
-                queryset = queryset.filter(due_date__date__gte=filters['start_date'])
+                queryset = queryset.filter(due_date__gte=calendar_events.day_range(filters['start_date'], filters['start_date'])[0])
             if filters.get('end_date'):
-                queryset = queryset.filter(due_date__date__lte=filters['end_date'])
+                queryset = queryset.filter(due_date__lt=calendar_events.day_range(filters['end_date'], filters['end_date'])[1])
         
-        return queryset
+        return queryset.select_related('property_ref', 'assigned_to')
     
     def get_queryset_bookings(self, user, filters=None):
         """Get bookings queryset based on user permissions and filters"""
@@ -74,9 +75,9 @@ class CalendarViewSet(viewsets.ViewSet):
             if filters.get('status'):
                 queryset = queryset.filter(status=filters['status'])
             if filters.get('start_date'):
-                queryset = queryset.filter(check_in_date__date__gte=filters['start_date'])
+                queryset = queryset.filter(check_in_date__gte=calendar_events.day_range(filters['start_date'], filters['start_date'])[0])
             if filters.get('end_date'):
-                queryset = queryset.filter(check_out_date__date__lte=filters['end_date'])
+                queryset = queryset.filter(check_out_date__lt=calendar_events.day_range(filters['end_date'], filters['end_date'])[1])
         
         return queryset
     
@@ -98,68 +99,21 @@ class CalendarViewSet(viewsets.ViewSet):
         if not filters.get('end_date'):
             filters['end_date'] = timezone.now().date() + timedelta(days=30)
         
-        events = []
-        
-        # Get tasks if requested
+        # Month rows come from the shared calendar cache (api.calendar_events),
+        # keyed by the tasks this user may see
+        tasks = bookings = []
         if filters.get('include_tasks', True):
-            tasks = self.get_queryset_tasks(request.user, filters)
-            for task in tasks:
-                if task.due_date:
-                    # Determine color based on status
-                    color_map = {
-                        'pending': '#ffc107',  # amber
-                        'waiting_dependency': '#6c757d',  # gray
-                        'in-progress': '#007bff',  # blue
-                        'completed': '#28a745',  # green
-                        'canceled': '#dc3545',  # red
-                    }
-                    
-                    event = {
-                        'id': f"task_{task.id}",
-                        'title': task.title,
-                        'start': task.due_date.isoformat(),
-                        'end': None,
-                        'allDay': True,
-                        'type': 'task',
-                        'status': task.status,
-                        'color': color_map.get(task.status, '#6c757d'),
-                        'property_name': task.property_ref.name if task.property_ref else None,
-                        'assigned_to': task.assigned_to.username if task.assigned_to else None,
-                        'description': task.description,
-                        'url': reverse('portal-task-detail', args=[task.id])
-                    }
-                    events.append(event)
-        
-        # Get bookings if requested
+            tasks = calendar_events.task_rows(
+                filters['start_date'], filters['end_date'], calendar_events.task_scope(request.user),
+                property_id=filters.get('property_id'), status=filters.get('status'),
+                task_type=filters.get('task_type'), assigned_to=filters.get('assigned_to'),
+            )
         if filters.get('include_bookings', True):
-            bookings = self.get_queryset_bookings(request.user, filters)
-            for booking in bookings:
-                # Determine color based on status
-                color_map = {
-                    'booked': '#17a2b8',  # info
-                    'confirmed': '#007bff',  # primary
-                    'currently_hosting': '#28a745',  # success
-                    'owner_staying': '#6f42c1',  # purple
-                    'cancelled': '#dc3545',  # danger
-                    'completed': '#6c757d',  # secondary
-                }
-                
-                event = {
-                    'id': f"booking_{booking.id}",
-                    'title': f"{booking.guest_name} - {booking.property.name}",
-                    'start': booking.check_in_date.isoformat(),
-                    'end': booking.check_out_date.isoformat(),
-                    'allDay': False,
-                    'type': 'booking',
-                    'status': booking.status,
-                    'color': color_map.get(booking.status, '#6c757d'),
-                    'property_name': booking.property.name,
-                    'guest_name': booking.guest_name,
-                    'assigned_to': None,
-                    'description': f"Check-in: {booking.check_in_date.strftime('%Y-%m-%d %H:%M')}\nCheck-out: {booking.check_out_date.strftime('%Y-%m-%d %H:%M')}",
-                    'url': reverse('portal-booking-detail', args=[booking.property.id, booking.id])
-                }
-                events.append(event)
+            bookings = calendar_events.booking_rows(
+                filters['start_date'], filters['end_date'],
+                property_id=filters.get('property_id'), status=filters.get('status'),
+            )
+        events = calendar_events.api_events(tasks, bookings)
         
         return Response(events)
     
@@ -187,7 +141,8 @@ class CalendarViewSet(viewsets.ViewSet):
             return Response(filter_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         filters = filter_serializer.validated_data
-        bookings = self.get_queryset_bookings(request.user, filters)
+        bookings = list(self.get_queryset_bookings(request.user, filters).select_related('property'))
+        prefetch_conflict_summaries(bookings)
         serializer = CalendarBookingSerializer(bookings, many=True)
         return Response(serializer.data)
     
@@ -206,13 +161,16 @@ class CalendarViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
         
         # Get tasks for the day
-        tasks = self.get_queryset_tasks(request.user).filter(due_date__date=target_date)
+        tasks = self.get_queryset_tasks(request.user).filter(calendar_events.task_range_q(target_date, target_date))
         task_serializer = CalendarTaskSerializer(tasks, many=True)
         
         # Get bookings for the day (check-in or check-out on this date)
-        bookings = self.get_queryset_bookings(request.user).filter(
-            Q(check_in_date__date=target_date) | Q(check_out_date__date=target_date)
-        )
+        day_start, day_end = calendar_events.day_range(target_date, target_date)
+        bookings = list(self.get_queryset_bookings(request.user).filter(
+            Q(check_in_date__gte=day_start, check_in_date__lt=day_end)
+            | Q(check_out_date__gte=day_start, check_out_date__lt=day_end)
+        ).select_related('property'))
+        prefetch_conflict_summaries(bookings)
         booking_serializer = CalendarBookingSerializer(bookings, many=True)
         
         return Response({
@@ -0,0 +1,122 @@
+# api/chat_search.py
+"""
+Full-text search over chat messages.
+
+ChatMessageViewSet.search used ``content__icontains``, which scans every
+accessible message. There are two backends, picked by database vendor:
+
+- PostgreSQL: ChatMessage.search_vector (tsvector) is maintained by the
+  trigger from migration 0087 on insert and on content updates (so
+  soft_delete() re-indexes the placeholder text), and is matched with a
+  prefix tsquery through its GIN index and ordered by ts_rank;
+- other databases (SQLite test runs): ChatMessageTerm is an inverted index
+  of (term, frequency) rows per live message, rebuilt for a message whenever
+  its content or is_deleted changes. Every query term must prefix a stored
+  term; rank is the summed frequency of the matched terms.
+
+``rebuild()`` (``manage.py rebuild_chat_search``) backfills either backend.
+"""
+
+import logging
+import re
+from collections import Counter
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'  # the migration 0087 trigger uses pg_catalog.english
+MAX_TERM_LENGTH = 64
+REBUILD_BATCH_SIZE = 1000
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def uses_tsvector():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    """Lower-cased word tokens, in order, truncated to the indexed term length"""
+    return [token[:MAX_TERM_LENGTH] for token in _TOKEN_RE.findall((text or '').lower())]
+
+
+# ---------------- indexing (inverted-index backend) ----------------
+def index_messages(messages):
+    """Replace the ChatMessageTerm rows of ``messages``; deleted messages keep none"""
+    from .models_chat import ChatMessageTerm
+
+    stale = ChatMessageTerm.objects.filter(message_id__in=[message.pk for message in messages])
+    # raw delete: index rows have no dependants and need no delete signals
+    stale._raw_delete(stale.db)
+    rows = [
+        ChatMessageTerm(message_id=message.pk, term=term, frequency=min(count, 32767))
+        for message in messages if not message.is_deleted
+        for term, count in Counter(tokenize(message.content)).items()
+    ]
+    ChatMessageTerm.objects.bulk_create(rows, batch_size=REBUILD_BATCH_SIZE)
+    return len(rows)
+
+
+@receiver(post_save, sender='api.ChatMessage')
+def _index_on_save(sender, instance, update_fields=None, **kwargs):
+    if uses_tsvector():
+        return  # the database trigger keeps search_vector current
+    if update_fields is not None and not {'content', 'is_deleted'} & set(update_fields):
+        return  # e.g. read_by updates
+    index_messages([instance])
+
+
+# ---------------- querying ----------------
+def search(queryset, query):
+    """``queryset`` narrowed to messages matching every word of ``query``, best matches first"""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return queryset.none()
+
+    if uses_tsvector():
+        tsquery = SearchQuery(' & '.join(f'{token}:*' for token in tokens),
+                              search_type='raw', config=SEARCH_CONFIG)
+        return (queryset.filter(search_vector=tsquery)
+                .annotate(search_rank=SearchRank(F('search_vector'), tsquery))
+                .order_by('-search_rank', '-created_at'))
+
+    from .models_chat import ChatMessageTerm
+
+    rank = Value(0)
+    for token in tokens:
+        matches = ChatMessageTerm.objects.filter(message=OuterRef('pk'), term__startswith=token)
+        queryset = queryset.filter(Exists(matches))
+        frequency = matches.order_by().values('message').annotate(total=Sum('frequency')).values('total')
+        rank = rank + Coalesce(Subquery(frequency), 0)
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+# ---------------- backfill ----------------
+def rebuild(batch_size=None):
+    """(Re)index every message in primary-key batches; returns the number of messages processed"""
+    from .models_chat import ChatMessage
+
+    batch_size = batch_size or REBUILD_BATCH_SIZE
+    messages = ChatMessage.objects.order_by('pk')
+    processed = 0
+    last_pk = None
+    while True:
+        batch = messages.filter(pk__gt=last_pk) if last_pk is not None else messages
+        batch = list(batch.only('pk', 'content', 'is_deleted')[:batch_size])
+        if not batch:
+            return processed
+        if uses_tsvector():
+            ChatMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+                search_vector=SearchVector('content', config=SEARCH_CONFIG)
+            )
+        else:
+            index_messages(batch)
+        processed += len(batch)
+        last_pk = batch[-1].pk
+        logger.info(f"Indexed {processed} chat messages")
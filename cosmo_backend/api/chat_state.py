@@ -0,0 +1,177 @@
+# api/chat_state.py
+"""
+Ephemeral chat state kept out of the database.
+
+ChatConsumer used to write ChatTypingIndicator rows on every typing event,
+rewrite a message's read_by JSON for every reader and save the room on every
+message. Here:
+
+- typing and presence are per-(room, user) cache keys with a TTL, so they
+  expire on their own. The cache is Redis in production; LocMemCache stands
+  in for it in development;
+- read receipts are per-participant high-water marks (the newest message
+  read). ``ReadMarkBuffer`` keeps the highest mark per participant in memory
+  and writes ChatParticipant.last_read_at in batches: a timer flushes within
+  CHAT_READ_FLUSH_SECONDS of the first buffered mark, and a flush also runs
+  at CHAT_READ_FLUSH_BATCH marks or when a socket disconnects;
+- the room's modified_at is bumped at most once per CHAT_ROOM_TOUCH_SECONDS.
+
+Only message persistence stays synchronous.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHAT_STATE_CACHE = getattr(settings, 'CHAT_STATE_CACHE', 'default')
+CHAT_TYPING_TTL = getattr(settings, 'CHAT_TYPING_TTL', 10)
+CHAT_PRESENCE_TTL = getattr(settings, 'CHAT_PRESENCE_TTL', 120)
+CHAT_ROOM_TOUCH_SECONDS = getattr(settings, 'CHAT_ROOM_TOUCH_SECONDS', 15)
+CHAT_READ_FLUSH_SECONDS = getattr(settings, 'CHAT_READ_FLUSH_SECONDS', 5)
+CHAT_READ_FLUSH_BATCH = getattr(settings, 'CHAT_READ_FLUSH_BATCH', 200)
+
+
+def _cache():
+    return caches[CHAT_STATE_CACHE]
+
+
+def _key(kind, room_id, user_id):
+    return f'chat:{kind}:{room_id}:{user_id}'
+
+
+# ---------------- typing ----------------
+def set_typing(room_id, user):
+    _cache().set(_key('typing', room_id, user.id),
+                 {'user_id': user.id, 'started_at': time.time()}, CHAT_TYPING_TTL)
+
+
+def clear_typing(room_id, user_id):
+    _cache().delete(_key('typing', room_id, user_id))
+
+
+def typing_user_ids(room_id, user_ids):
+    """{user_id: started_at datetime} for those of ``user_ids`` typing in the room"""
+    found = _cache().get_many([_key('typing', room_id, user_id) for user_id in user_ids])
+    return {entry['user_id']: datetime.fromtimestamp(entry['started_at'], tz=dt_timezone.utc)
+            for entry in found.values()}
+
+
+# ---------------- presence ----------------
+def mark_present(room_id, user_id, channel_name):
+    """Register (or refresh) a connected socket; entries older than CHAT_PRESENCE_TTL count as gone"""
+    key = _key('presence', room_id, user_id)
+    channels = _cache().get(key) or {}
+    channels[channel_name] = time.time()
+    _cache().set(key, channels, CHAT_PRESENCE_TTL)
+
+
+def mark_absent(room_id, user_id, channel_name):
+    key = _key('presence', room_id, user_id)
+    channels = _cache().get(key) or {}
+    channels.pop(channel_name, None)
+    if channels:
+        _cache().set(key, channels, CHAT_PRESENCE_TTL)
+    else:
+        _cache().delete(key)
+
+
+def present_user_ids(room_id, user_ids):
+    """Those of ``user_ids`` with a live socket in the room"""
+    cutoff = time.time() - CHAT_PRESENCE_TTL
+    keys = {_key('presence', room_id, user_id): user_id for user_id in user_ids}
+    found = _cache().get_many(list(keys))
+    return {keys[key] for key, channels in found.items() if any(seen >= cutoff for seen in channels.values())}
+
+
+# ---------------- room activity ----------------
+def touch_room(room_id):
+    """Bump ChatRoom.modified_at unless it was bumped in the last CHAT_ROOM_TOUCH_SECONDS"""
+    from .models_chat import ChatRoom
+
+    if not _cache().add(f'chat:room_touch:{room_id}', 1, CHAT_ROOM_TOUCH_SECONDS):
+        return False
+    ChatRoom.objects.filter(id=room_id).update(modified_at=timezone.now())
+    return True
+
+
+# ---------------- read receipts ----------------
+class ReadMarkBuffer:
+    """Highest read mark per (room, user) since the last flush"""
+
+    def __init__(self, *, flush_seconds=None, batch_size=None):
+        self.flush_seconds = CHAT_READ_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.batch_size = batch_size or CHAT_READ_FLUSH_BATCH
+        self._marks = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def record(self, room_id, user_id, read_at):
+        """Keep read_at if it is the newest mark for the participant; returns True when a flush is due"""
+        key = (str(room_id), user_id)
+        with self._lock:
+            if key not in self._marks or self._marks[key] < read_at:
+                self._marks[key] = read_at
+            self._schedule()
+            return (len(self._marks) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_seconds)
+
+    def _schedule(self):
+        # Caller holds the lock. One pending timer covers every mark buffered before it fires.
+        if self._timer is None and self._marks:
+            self._timer = threading.Timer(self.flush_seconds, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            connections.close_all()  # the timer thread's own connections
+
+    def flush(self):
+        """Advance ChatParticipant.last_read_at for buffered marks (two queries per batch); returns rows updated"""
+        from django.db.models import Q
+        from .models_chat import ChatParticipant
+
+        with self._lock:
+            marks, self._marks = self._marks, {}
+            self._last_flush = time.monotonic()
+        if not marks:
+            return 0
+
+        lookup = Q()
+        for room_id, user_id in marks:
+            lookup |= Q(room_id=room_id, user_id=user_id)
+        try:
+            with transaction.atomic():
+                participants = list(ChatParticipant.objects.select_for_update().filter(lookup))
+                changed = []
+                for participant in participants:
+                    mark = marks[(str(participant.room_id), participant.user_id)]
+                    if participant.last_read_at is None or participant.last_read_at < mark:
+                        participant.last_read_at = mark
+                        changed.append(participant)
+                ChatParticipant.objects.bulk_update(changed, ['last_read_at'])
+        except Exception as e:
+            logger.error(f"Error flushing {len(marks)} chat read marks: {e}", exc_info=True)
+            with self._lock:  # keep them for the next flush
+                for key, mark in marks.items():
+                    if key not in self._marks or self._marks[key] < mark:
+                        self._marks[key] = mark
+                self._schedule()
+            return 0
+        return len(changed)
+
+
+read_marks = ReadMarkBuffer()
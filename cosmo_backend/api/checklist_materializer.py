@@ -0,0 +1,140 @@
+# api/checklist_materializer.py
+"""
+Bulk instantiation of task checklists.
+
+Schedule generation, checklist assignment and auto-created tasks used to
+create a TaskChecklist and then one ChecklistResponse per template item,
+each INSERT going through the audit and sync signal receivers. Here:
+
+- a template's items are read once and cached as (id, is_required) pairs,
+  keyed per template and dropped whenever one of its items is written;
+- ``materialize()`` takes many (task, template) pairs and writes every
+  checklist with one bulk_create and every response with another, with the
+  progress counters filled in up front (nothing is completed yet);
+- ``fill_missing()`` adds the responses existing checklists lack (template
+  items added later) and refreshes their counters with one UPDATE.
+
+Bulk inserts skip post_save, so the new responses are handed to the mobile
+sync log explicitly and produce no per-row audit events.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import mobile_sync
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'checklist_items'
+CHECKLIST_ITEMS_CACHE_TIMEOUT = getattr(settings, 'CHECKLIST_ITEMS_CACHE_TIMEOUT', 3600)
+BULK_BATCH_SIZE = 1000
+
+
+def _items_key(template_id):
+    return f'{CACHE_PREFIX}:{template_id}'
+
+
+def template_items(template_ids):
+    """{template_id: [(item_id, is_required), ...]} with one query for the templates not cached"""
+    from .models import ChecklistItem
+
+    template_ids = set(template_ids)
+    cached = cache.get_many([_items_key(pk) for pk in template_ids])
+    items = {pk: cached[_items_key(pk)] for pk in template_ids if _items_key(pk) in cached}
+    missing = template_ids - set(items)
+    if missing:
+        loaded = {pk: [] for pk in missing}
+        for template_id, item_id, is_required in (ChecklistItem.objects.filter(template_id__in=missing)
+                                                  .values_list('template_id', 'id', 'is_required')):
+            loaded[template_id].append((item_id, is_required))
+        cache.set_many({_items_key(pk): value for pk, value in loaded.items()}, CHECKLIST_ITEMS_CACHE_TIMEOUT)
+        items.update(loaded)
+    return items
+
+
+@receiver(post_save, sender='api.ChecklistItem')
+@receiver(post_delete, sender='api.ChecklistItem')
+def _invalidate_items(sender, instance, **kwargs):
+    cache.delete(_items_key(instance.template_id))
+
+
+def default_templates(task_types):
+    """{task_type: newest active ChecklistTemplate} for the given task types"""
+    from .models import ChecklistTemplate
+
+    templates = {}
+    for template in (ChecklistTemplate.objects.filter(is_active=True, task_type__in=set(task_types))
+                     .order_by('task_type', '-created_at')):
+        templates.setdefault(template.task_type, template)
+    return templates
+
+
+def materialize(pairs, *, actor=None):
+    """
+    Create a checklist with all of its responses for each (task, template)
+    pair whose task has none yet; returns {task_id: TaskChecklist}.
+    """
+    from .models import ChecklistResponse, TaskChecklist
+
+    wanted = {}
+    for task, template in pairs:
+        if template is not None:
+            wanted.setdefault(task.pk, (task, template))
+    if not wanted:
+        return {}
+
+    existing = set(TaskChecklist.objects.filter(task_id__in=wanted).values_list('task_id', flat=True))
+    wanted = {task_id: pair for task_id, pair in wanted.items() if task_id not in existing}
+    if not wanted:
+        return {}
+    items = template_items({template.pk for _, template in wanted.values()})
+
+    checklists = []
+    for task, template in wanted.values():
+        template_rows = items[template.pk]
+        required = sum(1 for _, is_required in template_rows if is_required)
+        checklists.append(TaskChecklist(task=task, template=template, items_total=len(template_rows),
+                                        required_total=required))
+
+    with transaction.atomic():
+        TaskChecklist.objects.bulk_create(checklists, batch_size=BULK_BATCH_SIZE)
+        ChecklistResponse.objects.bulk_create([
+            ChecklistResponse(checklist=checklist, item_id=item_id)
+            for checklist in checklists
+            for item_id, _ in items[checklist.template_id]
+        ], batch_size=BULK_BATCH_SIZE)
+        mobile_sync.record_checklists([checklist.pk for checklist in checklists], actor=actor)
+
+    logger.info(f"Materialized {len(checklists)} checklists")
+    return {checklist.task_id: checklist for checklist in checklists}
+
+
+def fill_missing(checklists, *, actor=None):
+    """Add responses for template items the checklists lack; returns the number of responses created"""
+    from .models import ChecklistResponse, TaskChecklist
+
+    checklists = [checklist for checklist in checklists if checklist.template_id]
+    if not checklists:
+        return 0
+    items = template_items({checklist.template_id for checklist in checklists})
+    have = set(ChecklistResponse.objects.filter(checklist__in=checklists).values_list('checklist_id', 'item_id'))
+    rows = [
+        ChecklistResponse(checklist=checklist, item_id=item_id)
+        for checklist in checklists
+        for item_id, _ in items[checklist.template_id]
+        if (checklist.pk, item_id) not in have
+    ]
+    if not rows:
+        return 0
+
+    ids = [checklist.pk for checklist in checklists]
+    with transaction.atomic():
+        ChecklistResponse.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        TaskChecklist.refresh_counters(ids)
+        mobile_sync.record_checklists(ids, actor=actor)
+    return len(rows)
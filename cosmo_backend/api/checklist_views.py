@@ -7,11 +7,11 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
 from django.utils import timezone
 import json
 
-from api.models import ChecklistTemplate, ChecklistItem, Task, TaskChecklist, ChecklistResponse
+from api.models import ChecklistTemplate, ChecklistItem, Task, TaskChecklist
+from api import checklist_materializer
 from django.contrib.auth.decorators import user_passes_test
 from api.authz import has_role
 
@@ -112,41 +112,19 @@ def assign_checklist_to_task(request, task_id):
             
             template = get_object_or_404(ChecklistTemplate, id=template_id, is_active=True)
             
-            with transaction.atomic():
-                # Create task checklist
-                task_checklist, created = TaskChecklist.objects.get_or_create(
-                    task=task,
-                    template=template,
-                    defaults={
-                        'started_at': None,
-                        'completed_at': None,
-                        'completed_by': None,
-                    }
-                )
-                
-                if not created:
-                    return JsonResponse({
-                        'success': False,
-                        'error': 'Task already has a checklist assigned'
-                    }, status=400)
-                
-                # Create responses for all checklist items
-                for item in template.items.all():
-                    ChecklistResponse.objects.create(
-                        checklist=task_checklist,
-                        item=item,
-                        is_completed=False,
-                        text_response='',
-                        number_response=None,
-                        completed_at=None,
-                        completed_by=None,
-                        notes='',
-                    )
-                
+            if TaskChecklist.objects.filter(task=task).exists():
                 return JsonResponse({
-                    'success': True,
-                    'message': f'Checklist "{template.name}" assigned to task successfully!'
-                })
+                    'success': False,
+                    'error': 'Task already has a checklist assigned'
+                }, status=400)
+            
+            # Checklist and all of its responses in two bulk INSERTs
+            checklist_materializer.materialize([(task, template)], actor=request.user)
+            
+            return JsonResponse({
+                'success': True,
+                'message': f'Checklist "{template.name}" assigned to task successfully!'
+            })
                 
         except Exception as e:
             return JsonResponse({
@@ -186,41 +164,13 @@ def quick_assign_checklists(request):
                 }, status=400)
             
             template = get_object_or_404(ChecklistTemplate, id=template_id, is_active=True)
-            assigned_count = 0
             
-            with transaction.atomic():
-                for task_id in task_ids:
-                    try:
-                        task = Task.objects.get(id=task_id, is_deleted=False)
-                        
-                        # Create task checklist
-                        task_checklist, created = TaskChecklist.objects.get_or_create(
-                            task=task,
-                            template=template,
-                            defaults={
-                                'started_at': None,
-                                'completed_at': None,
-                                'completed_by': None,
-                            }
-                        )
-                        
-                        if created:
-                            # Create responses for all checklist items
-                            for item in template.items.all():
-                                ChecklistResponse.objects.create(
-                                    checklist=task_checklist,
-                                    item=item,
-                                    is_completed=False,
-                                    text_response='',
-                                    number_response=None,
-                                    completed_at=None,
-                                    completed_by=None,
-                                    notes='',
-                                )
-                            assigned_count += 1
-                            
-                    except Task.DoesNotExist:
-                        continue
+            # Tasks that already have a checklist are skipped
+            tasks = Task.objects.filter(id__in=task_ids, is_deleted=False)
+            created = checklist_materializer.materialize(
+                [(task, template) for task in tasks], actor=request.user
+            )
+            assigned_count = len(created)
             
             return JsonResponse({
                 'success': True,
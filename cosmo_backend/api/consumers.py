@@ -6,6 +6,7 @@ Uses Django Channels with Redis as channel layer backend.
 
 import json
 import logging
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
@@ -13,9 +14,47 @@ from django.utils import timezone
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 
+from api import chat_state
+
 logger = logging.getLogger(__name__)
 
 
+def user_from_token_query(scope):
+    """Return the user for the JWT ``token`` query param of a WebSocket scope, or None"""
+    try:
+        # Get token from query params
+        query_string = scope.get('query_string', b'').decode('utf-8')
+        if not query_string:
+            logger.warning("No query string in WebSocket connection")
+            return None
+        
+        # Parse query string (handle URL encoding)
+        from urllib.parse import parse_qs
+        params = parse_qs(query_string)
+        token = params.get('token', [None])[0]
+        
+        if not token:
+            logger.warning("No token provided in WebSocket connection")
+            return None
+        
+        # Verify JWT token
+        access_token = AccessToken(token)
+        user_id = access_token['user_id']
+        
+        # Get user
+        user = User.objects.get(id=user_id)
+        logger.info(f"WebSocket authenticated user: {user.username}")
+        return user
+        
+    except TokenError as e:
+        logger.warning(f"Invalid JWT token: {str(e)}")
+    except User.DoesNotExist:
+        logger.warning(f"User not found for token")
+    except Exception as e:
+        logger.error(f"Authentication error: {str(e)}", exc_info=True)
+    return None
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time chat messaging.
@@ -27,6 +66,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'chat_{self.room_id}'
         self.user = None
+        self.presence_refreshed_at = 0
         
         # Authenticate user from query params (JWT token)
         await self.authenticate_user()
@@ -48,6 +88,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
         
         await self.accept()
+        await self.set_presence(True)
         
         # Send user's unread count
         unread_count = await self.get_unread_count()
@@ -70,9 +111,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
             
-            # Clear typing indicator
+            # Clear typing indicator and presence, write pending read marks
             if self.user:
                 await self.clear_typing_indicator()
+                await self.set_presence(False)
+                await self.flush_read_marks()
                 logger.info(f"User {self.user.username} disconnected from room {self.room_id}")
     
     async def receive(self, text_data):
@@ -81,6 +124,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             data = json.loads(text_data)
             message_type = data.get('type')
             
+            if time.monotonic() - self.presence_refreshed_at > chat_state.CHAT_PRESENCE_TTL / 2:
+                await self.set_presence(True)
+            
             if message_type == 'chat_message':
                 await self.handle_chat_message(data)
             elif message_type == 'typing':
@@ -113,7 +159,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         message = await self.save_message(content, reply_to_id)
         
         if message:
-            # Update room's modified_at timestamp
+            # Update room's modified_at timestamp (throttled)
             await self.update_room_timestamp()
             
             # Broadcast message to room group
@@ -152,7 +198,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """Handle message read receipt"""
         message_id = data.get('message_id')
         if message_id:
-            await self.mark_message_read(message_id)
+            if not await self.mark_message_read(message_id):
+                return
             
             # Broadcast read receipt to room
             await self.channel_layer.group_send(
@@ -208,41 +255,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def authenticate_user(self):
         """Authenticate user from JWT token in query params"""
-        try:
-            # Get token from query params
-            query_string = self.scope.get('query_string', b'').decode('utf-8')
-            if not query_string:
-                logger.warning("No query string in WebSocket connection")
-                self.user = None
-                return
-            
-            # Parse query string (handle URL encoding)
-            from urllib.parse import parse_qs
-            params = parse_qs(query_string)
-            token = params.get('token', [None])[0]
-            
-            if not token:
-                logger.warning("No token provided in WebSocket connection")
-                self.user = None
-                return
-            
-            # Verify JWT token
-            access_token = AccessToken(token)
-            user_id = access_token['user_id']
-            
-            # Get user
-            self.user = User.objects.get(id=user_id)
-            logger.info(f"WebSocket authenticated user: {self.user.username}")
-            
-        except TokenError as e:
-            logger.warning(f"Invalid JWT token: {str(e)}")
-            self.user = None
-        except User.DoesNotExist:
-            logger.warning(f"User not found for token")
-            self.user = None
-        except Exception as e:
-            logger.error(f"Authentication error: {str(e)}", exc_info=True)
-            self.user = None
+        self.user = user_from_token_query(self.scope)
     
     @database_sync_to_async
     def check_participant(self):
@@ -300,11 +313,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def update_room_timestamp(self):
-        """Update room's modified_at timestamp"""
-        from api.models_chat import ChatRoom
-        
+        """Update room's modified_at timestamp, at most once per CHAT_ROOM_TOUCH_SECONDS"""
         try:
-            ChatRoom.objects.filter(id=self.room_id).update(modified_at=timezone.now())
+            chat_state.touch_room(self.room_id)
         except Exception as e:
             logger.error(f"Error updating room timestamp: {str(e)}")
     
@@ -329,42 +340,56 @@ class ChatConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def set_typing_indicator(self):
-        """Set typing indicator for user"""
-        from api.models_chat import ChatTypingIndicator
-        
+        """Set typing indicator for user (expires after CHAT_TYPING_TTL)"""
         try:
-            ChatTypingIndicator.objects.update_or_create(
-                room_id=self.room_id,
-                user=self.user
-            )
+            chat_state.set_typing(self.room_id, self.user)
         except Exception as e:
             logger.error(f"Error setting typing indicator: {str(e)}")
     
     @database_sync_to_async
     def clear_typing_indicator(self):
         """Clear typing indicator for user"""
-        from api.models_chat import ChatTypingIndicator
-        
         try:
-            ChatTypingIndicator.objects.filter(
-                room_id=self.room_id,
-                user=self.user
-            ).delete()
+            chat_state.clear_typing(self.room_id, self.user.id)
         except Exception as e:
             logger.error(f"Error clearing typing indicator: {str(e)}")
     
+    @database_sync_to_async
+    def set_presence(self, present):
+        """Register or drop this socket in the room's presence state"""
+        self.presence_refreshed_at = time.monotonic()
+        try:
+            if present:
+                chat_state.mark_present(self.room_id, self.user.id, self.channel_name)
+            else:
+                chat_state.mark_absent(self.room_id, self.user.id, self.channel_name)
+        except Exception as e:
+            logger.error(f"Error updating presence: {str(e)}")
+    
     @database_sync_to_async
     def mark_message_read(self, message_id):
-        """Mark a specific message as read"""
+        """Advance the user's read mark to this message; written to the database in batches"""
+        from django.core.exceptions import ValidationError
         from api.models_chat import ChatMessage
         
         try:
-            message = ChatMessage.objects.get(id=message_id, room_id=self.room_id)
-            message.mark_read_by(self.user)
-        except ChatMessage.DoesNotExist:
+            created_at = ChatMessage.objects.filter(
+                id=message_id, room_id=self.room_id
+            ).values_list('created_at', flat=True).first()
+        except ValidationError:
+            created_at = None
+        if created_at is None:
             logger.warning(f"Message {message_id} not found")
-        except Exception as e:
-            logger.error(f"Error marking message read: {str(e)}")
+            return False
+        
+        if chat_state.read_marks.record(self.room_id, self.user.id, created_at):
+            chat_state.read_marks.flush()
+        return True
+    
+    @database_sync_to_async
+    def flush_read_marks(self):
+        """Write buffered read marks"""
+        chat_state.read_marks.flush()
     
     @database_sync_to_async
     def mark_room_read(self):
@@ -390,14 +415,15 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         try:
             # Get all participants except sender
-            participants = ChatParticipant.objects.filter(
+            participants = list(ChatParticipant.objects.filter(
                 room_id=self.room_id,
                 left_at__isnull=True
-            ).exclude(user=self.user).select_related('user')
+            ).exclude(user=self.user).select_related('user'))
+            online = chat_state.present_user_ids(self.room_id, [p.user_id for p in participants])
             
             for participant in participants:
-                # Skip if user has muted this room
-                if participant.is_muted_now():
+                # Skip if user is connected to the room or has muted it
+                if participant.user_id in online or participant.is_muted_now():
                     continue
                 
                 # Create notification (will be picked up by notification service)
@@ -408,3 +434,50 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error sending push notifications: {str(e)}", exc_info=True)
 
+
+class ImportJobConsumer(AsyncWebsocketConsumer):
+    """
+    WebSocket consumer streaming background booking import progress.
+    Subscribers receive the same payload as the job status API after every chunk.
+    """
+    
+    async def connect(self):
+        """Handle WebSocket connection"""
+        self.job_id = int(self.scope['url_route']['kwargs']['job_id'])
+        self.user = await database_sync_to_async(user_from_token_query)(self.scope)
+        
+        job_payload = await self.get_job_payload() if self.user else None
+        if job_payload is None:
+            await self.close()
+            return
+        
+        from api.services.import_job_service import job_group_name
+        self.group_name = job_group_name(self.job_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        
+        # Send current state so late subscribers don't wait for the next chunk
+        await self.send(text_data=json.dumps({'type': 'import_progress', 'job': job_payload}))
+    
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection"""
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    
+    async def import_progress(self, event):
+        """Forward a progress event from the import worker"""
+        await self.send(text_data=json.dumps({'type': 'import_progress', 'job': event['job']}))
+    
+    @database_sync_to_async
+    def get_job_payload(self):
+        """Serialized job if it exists and the user may see it, else None"""
+        from api.models import BookingImportLog
+        from api.services.import_job_service import ImportJobService
+        
+        try:
+            job = BookingImportLog.objects.get(pk=self.job_id)
+        except BookingImportLog.DoesNotExist:
+            return None
+        if job.imported_by_id != self.user.id and not self.user.is_superuser:
+            return None
+        return ImportJobService.serialize(job)
@@ -21,10 +21,13 @@ logger = logging.getLogger(__name__)
 # HTTP methods that should be checked for idempotency
 IDEMPOTENT_METHODS = {'POST', 'PATCH', 'PUT', 'DELETE'}
 
-# API paths that support idempotency (task mutations)
+# API paths that support idempotency (task mutations and mobile sync uploads;
+# api.mobile_sync also dedupes individual changes by their client_id)
 IDEMPOTENT_PATHS = [
     '/api/tasks/',
     '/api/tasks',
+    '/api/mobile/offline-sync/',
+    '/api/mobile/sync/push/',
 ]
 
 
@@ -0,0 +1,115 @@
+# api/image_renditions.py
+"""
+Thumbnail and medium renditions of task photos.
+
+Photo grids, comparison pages and admin previews used to load the full
+(up to 2048px) stored image for every tile. Each TaskImage / ChecklistPhoto
+now has fixed-size WebP renditions next to it:
+
+- renditions are content-addressed: ``renditions/<size>/<sha256[:2]>/<sha256>.webp``
+  where the digest is of the stored image bytes, so identical uploads share
+  files and a rendition that already exists is never rendered again;
+- new uploads get them at optimization time (api/services/task_image_processing.py),
+  which also records ``content_digest`` on the row;
+- rows without a digest (legacy images) point at the ``image-rendition``
+  endpoint, which renders on first request, records the digest and redirects;
+  ``manage.py backfill_image_renditions`` does the same ahead of time.
+
+Renditions can be shared between rows, so deleting an image leaves them in place.
+"""
+
+import hashlib
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .utils.image_ops import render_renditions
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = getattr(settings, 'IMAGE_RENDITION_SIZES', {'thumb': 320, 'medium': 1024})
+RENDITION_QUALITY = getattr(settings, 'IMAGE_RENDITION_QUALITY', 80)
+
+# URL kind -> model holding an ``image`` and a ``content_digest``
+KINDS = {
+    'task-image': 'api.TaskImage',
+    'checklist-photo': 'api.ChecklistPhoto',
+}
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def rendition_name(digest, size):
+    return f'renditions/{size}/{digest[:2]}/{digest}.webp'
+
+
+def missing_sizes(digest):
+    """{size: max_dimension} for the renditions of this digest not stored yet"""
+    return {size: dimension for size, dimension in RENDITION_SIZES.items()
+            if not default_storage.exists(rendition_name(digest, size))}
+
+
+def store(digest, rendered):
+    """Save rendered {size: bytes} under their content-addressed names"""
+    for size, data in rendered.items():
+        name = rendition_name(digest, size)
+        saved = default_storage.save(name, ContentFile(data))
+        if saved != name:
+            # Another worker stored the same content first
+            default_storage.delete(saved)
+
+
+def generate(data):
+    """Render and store whatever renditions of these image bytes are missing; returns the digest"""
+    digest = content_digest(data)
+    sizes = missing_sizes(digest)
+    if sizes:
+        store(digest, render_renditions(data, sizes, quality=RENDITION_QUALITY))
+    return digest
+
+
+def ensure(obj):
+    """Renditions for a stored image, generated now if the row has none; returns the digest"""
+    if obj.content_digest:
+        return obj.content_digest
+    with obj.image.open('rb') as fh:
+        data = fh.read()
+    digest = generate(data)
+    type(obj).objects.filter(pk=obj.pk).update(content_digest=digest)
+    obj.content_digest = digest
+    return digest
+
+
+def kind_of(obj):
+    label = obj._meta.label
+    return next(kind for kind, model in KINDS.items() if model == label)
+
+
+def model_for(kind):
+    return apps.get_model(KINDS[kind])
+
+
+def url(obj, size, request=None):
+    """URL of one rendition; None while the image itself is still being processed"""
+    if not obj.image:
+        return None
+    if getattr(obj, 'processing_status', None) in ('pending', 'processing'):
+        return None
+    if obj.content_digest:
+        location = default_storage.url(rendition_name(obj.content_digest, size))
+    else:
+        location = reverse('image-rendition', args=[kind_of(obj), obj.pk, size])
+    return request.build_absolute_uri(location) if request is not None else location
+
+
+def urls(obj, request=None):
+    """{size: url} for every rendition size, or None when there is nothing to render yet"""
+    if url(obj, next(iter(RENDITION_SIZES)), request) is None:
+        return None
+    return {size: url(obj, size, request) for size in RENDITION_SIZES}
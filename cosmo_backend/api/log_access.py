@@ -0,0 +1,286 @@
+# api/log_access.py
+"""
+Seekable, constant-memory access to the files in BASE_DIR/logs.
+
+The superuser log viewer and download used to readlines() whole files. Here:
+
+- ``tail_lines()`` reads blocks backwards from the end of the file;
+- ``LineIndex`` keeps an on-disk (byte offset, level) record per complete line
+  in LOG_INDEX_DIR, extended incrementally as the log grows and rebuilt when
+  the file is rotated or truncated. The viewer pages through it by line
+  number and filters by level without touching unrelated lines;
+- search runs as a forward generator, and ``LogFile.stream()`` feeds
+  StreamingHttpResponse downloads, so memory stays flat for any file size.
+"""
+
+import logging
+import os
+import re
+import struct
+from collections import deque
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+LEVELS = ('UNKNOWN', 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+LEVEL_CODES = {name: code for code, name in enumerate(LEVELS)}
+
+# The record's own levelname: the "level" key of JSONFormatter lines, or for
+# text formats ('{levelname} {asctime} ...', 'date LEVEL message') the first
+# of the leading tokens that is a level name. The levelname precedes the
+# message, so words in the message ("... error ...") never decide the level.
+_JSON_LEVEL = re.compile(rb'"level"\s*:\s*"([A-Za-z]+)"')
+_TOKEN_LEVELS = {name.encode(): name for name in LEVELS[1:]}
+_TOKEN_LEVELS[b'WARN'] = 'WARNING'
+_LEADING_TOKENS = 3
+
+
+def line_level(line):
+    """Level name for a log line (str or bytes) used for colour coding and filtering"""
+    raw = (line.encode('utf-8', 'replace') if isinstance(line, str) else line).lstrip()
+    if raw.startswith(b'{'):
+        match = _JSON_LEVEL.search(raw)
+        return _TOKEN_LEVELS.get(match.group(1).upper(), 'UNKNOWN') if match else 'UNKNOWN'
+    for token in raw.split(None, _LEADING_TOKENS)[:_LEADING_TOKENS]:
+        level = _TOKEN_LEVELS.get(token.strip(b'[]:').upper())
+        if level:
+            return level
+    return 'UNKNOWN'
+
+
+def _decode(raw):
+    return raw.decode('utf-8', 'replace').rstrip('\r\n')
+
+
+def log_dir():
+    return os.path.join(settings.BASE_DIR, 'logs')
+
+
+def available_logs(directory=None):
+    directory = directory or log_dir()
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.endswith('.log'))
+
+
+def tail_lines(path, count, block_size=BLOCK_SIZE):
+    """Last ``count`` lines of a file (decoded, oldest first) via reverse block reads"""
+    lines = []
+    for raw in iter_reverse_lines(path, block_size):
+        lines.append(_decode(raw))
+        if len(lines) >= count:
+            break
+    lines.reverse()
+    return lines
+
+
+def iter_reverse_lines(path, block_size=BLOCK_SIZE):
+    """Raw lines from the end of the file backwards, reading block_size bytes at a time"""
+    with open(path, 'rb') as fh:
+        position = fh.seek(0, os.SEEK_END)
+        remainder = b''
+        at_end = True
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            fh.seek(position)
+            pieces = (fh.read(step) + remainder).split(b'\n')
+            if at_end:
+                if pieces[-1] == b'':
+                    pieces.pop()  # the file's final newline
+                at_end = False
+            remainder = pieces[0]  # may continue in the previous block
+            yield from reversed(pieces[1:])
+        if not at_end:
+            yield remainder
+
+
+class LineIndex:
+    """
+    ``<index dir>/<log name>.idx``: a header (magic, inode, indexed bytes,
+    line count) followed by one (offset, level) record per complete line.
+    """
+
+    MAGIC = b'LOGIDX02'  # bumped when line_level changes, so old indexes rebuild
+    HEADER = struct.Struct('<8sQQQ')
+    RECORD = struct.Struct('<QB')
+    BATCH = 8192
+
+    def __init__(self, log_path, index_dir=None):
+        self.log_path = log_path
+        self.index_dir = index_dir or getattr(settings, 'LOG_INDEX_DIR', None) or \
+            os.path.join(os.path.dirname(log_path), '.index')
+        self.index_path = os.path.join(self.index_dir, os.path.basename(log_path) + '.idx')
+        self.line_count = 0
+        self.indexed_size = 0
+
+    def _read_header(self, idx, stat):
+        idx.seek(0)
+        data = idx.read(self.HEADER.size)
+        if len(data) != self.HEADER.size:
+            return None
+        magic, inode, size, count = self.HEADER.unpack(data)
+        expected_length = self.HEADER.size + count * self.RECORD.size
+        if magic != self.MAGIC or inode != stat.st_ino or size > stat.st_size:
+            return None  # different file (rotated) or truncated
+        if os.fstat(idx.fileno()).st_size < expected_length:
+            return None  # interrupted write
+        return size, count
+
+    def refresh(self):
+        """Index lines appended since the last refresh (or rebuild); returns self"""
+        stat = os.stat(self.log_path)
+        os.makedirs(self.index_dir, exist_ok=True)
+        fd = os.open(self.index_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+b') as idx:
+            if fcntl:
+                fcntl.flock(idx, fcntl.LOCK_EX)
+            state = self._read_header(idx, stat)
+            if state is None:
+                idx.truncate(0)
+                state = (0, 0)
+            position, count = state
+
+            if stat.st_size > position:
+                idx.seek(self.HEADER.size + count * self.RECORD.size)
+                records = []
+                with open(self.log_path, 'rb') as log:
+                    log.seek(position)
+                    for raw in log:
+                        if not raw.endswith(b'\n'):
+                            break  # line still being written
+                        records.append(self.RECORD.pack(position, LEVEL_CODES[line_level(raw)]))
+                        position += len(raw)
+                        count += 1
+                        if len(records) >= self.BATCH:
+                            idx.write(b''.join(records))
+                            records.clear()
+                idx.write(b''.join(records))
+            idx.seek(0)
+            idx.write(self.HEADER.pack(self.MAGIC, stat.st_ino, position, count))
+        self.indexed_size, self.line_count = position, count
+        return self
+
+    def iter_reverse(self, level=None, before=None):
+        """(line number, offset) pairs from the end, optionally by level and below ``before``"""
+        level_code = LEVEL_CODES.get(level) if level else None
+        end = self.line_count if before is None else min(before - 1, self.line_count)
+        with open(self.index_path, 'rb') as idx:
+            while end > 0:
+                start = max(0, end - self.BATCH)
+                idx.seek(self.HEADER.size + start * self.RECORD.size)
+                data = idx.read((end - start) * self.RECORD.size)
+                for i in range(end - start - 1, -1, -1):
+                    offset, code = self.RECORD.unpack_from(data, i * self.RECORD.size)
+                    if level_code is None or code == level_code:
+                        yield start + i + 1, offset
+                end = start
+
+
+class LogFile:
+    """One log file: paged tails, streaming search and downloads"""
+
+    def __init__(self, path, index_dir=None):
+        self.path = path
+        self.index = LineIndex(path, index_dir)
+
+    @classmethod
+    def open(cls, name, directory=None):
+        """LogFile for a listed log name, or None (also guards against path tricks)"""
+        directory = directory or log_dir()
+        if name not in available_logs(directory):
+            return None
+        return cls(os.path.join(directory, name))
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    def _matches(self, raw, level, search):
+        if level and line_level(raw) != level.upper():
+            return False
+        return not search or search in raw.decode('utf-8', 'replace').lower()
+
+    def iter_lines(self, level=None, search=None):
+        """(line number, text) for matching lines, streaming forwards"""
+        search = search.lower() if search else None
+        with open(self.path, 'rb') as fh:
+            for number, raw in enumerate(fh, start=1):
+                if self._matches(raw, level, search):
+                    yield number, _decode(raw)
+
+    def tail(self, count, level=None, search=None, before=None):
+        """
+        The last ``count`` matching lines before line number ``before``, as
+        [{'number', 'content', 'level'}] oldest first.
+        """
+        if search:
+            window = deque(maxlen=count)
+            for number, text in self.iter_lines(level, search):
+                if before is not None and number >= before:
+                    break
+                window.append((number, text))
+            return [self._entry(number, text) for number, text in window]
+
+        try:
+            self.index.refresh()
+        except OSError as e:
+            logger.warning(f"Log index unavailable for {self.path}, reading backwards instead: {e}")
+            entries = []
+            for raw in iter_reverse_lines(self.path):
+                if not level or line_level(raw) == level.upper():
+                    entries.append(self._entry(None, _decode(raw)))
+                    if len(entries) >= count:
+                        break
+            return entries[::-1]
+
+        picked = []
+        for number, offset in self.index.iter_reverse(level.upper() if level else None, before):
+            picked.append((number, offset))
+            if len(picked) >= count:
+                break
+        entries = []
+        with open(self.path, 'rb') as fh:
+            for number, offset in reversed(picked):
+                if fh.tell() != offset:
+                    fh.seek(offset)
+                entries.append(self._entry(number, _decode(fh.readline())))
+        return entries
+
+    @staticmethod
+    def _entry(number, text):
+        return {'number': number, 'content': text, 'level': line_level(text)}
+
+    def stream(self, level=None, search=None, size=None, chunk_size=BLOCK_SIZE):
+        """Byte chunks of the file (filtered by level/search); unfiltered output stops at ``size`` bytes"""
+        if not level and not search:
+            remaining = self.size if size is None else size
+            with open(self.path, 'rb') as fh:
+                while remaining > 0:
+                    chunk = fh.read(min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            return
+
+        buffer, buffered = [], 0
+        search = search.lower() if search else None
+        with open(self.path, 'rb') as fh:
+            for raw in fh:
+                if not self._matches(raw, level, search):
+                    continue
+                buffer.append(raw)
+                buffered += len(raw)
+                if buffered >= chunk_size:
+                    yield b''.join(buffer)
+                    buffer, buffered = [], 0
+        if buffer:
+            yield b''.join(buffer)
@@ -4,7 +4,8 @@ Assign checklist templates to existing tasks
 """
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from api.models import Task, ChecklistTemplate, TaskChecklist, ChecklistResponse
+from api.models import Task, ChecklistTemplate
+from api import checklist_materializer
 
 
 class Command(BaseCommand):
@@ -80,68 +81,62 @@ class Command(BaseCommand):
 
         assigned_count = 0
         skipped_count = 0
+        # best matching template per task type, looked up once per type
+        type_templates = {}
+        # (task, template) pairs for tasks without a checklist, and existing checklists to top up
+        pending = []
+        existing = []
 
-        for task in tasks:
+        for task in tasks.select_related('checklist'):
             # Determine which template to use
             if template_id:
                 task_template = template
             else:
-                # Find best matching template
-                matching_templates = ChecklistTemplate.objects.filter(
-                    task_type=task.task_type,
-                    is_active=True
-                ).order_by('name')
-                
-                if not matching_templates.exists():
+                if task.task_type not in type_templates:
+                    type_templates[task.task_type] = ChecklistTemplate.objects.filter(
+                        task_type=task.task_type,
+                        is_active=True
+                    ).order_by('name').first()
+                task_template = type_templates[task.task_type]
+
+                if task_template is None:
                     self.stdout.write(f'  ⚠️  No template found for task type "{task.task_type}" - {task.title}')
                     skipped_count += 1
                     continue
-                
-                task_template = matching_templates.first()
 
             if dry_run:
                 self.stdout.write(f'  Would assign "{task_template.name}" to "{task.title}"')
                 assigned_count += 1
+                continue
+
+            checklist = getattr(task, 'checklist', None)
+            if checklist is None:
+                pending.append((task, task_template))
+            elif checklist.template_id != task_template.id:
+                self.stdout.write(f'  ❌ Error assigning checklist to "{task.title}": task already has a different checklist')
+                skipped_count += 1
             else:
-                try:
-                    with transaction.atomic():
-                        # Create task checklist
-                        task_checklist, created = TaskChecklist.objects.get_or_create(
-                            task=task,
-                            template=task_template,
-                            defaults={
-                                'started_at': None,
-                                'completed_at': None,
-                                'completed_by': None,
-                            }
-                        )
-                        
-                        if not created and not force:
-                            self.stdout.write(f'  ⚠️  Task already has checklist - {task.title}')
-                            skipped_count += 1
-                            continue
-                        
-                        # Create responses for all checklist items
-                        for item in task_template.items.all():
-                            ChecklistResponse.objects.get_or_create(
-                                checklist=task_checklist,
-                                item=item,
-                                defaults={
-                                    'is_completed': False,
-                                    'text_response': '',
-                                    'number_response': None,
-                                    'completed_at': None,
-                                    'completed_by': None,
-                                    'notes': '',
-                                }
-                            )
-                        
+                existing.append(checklist)
+                self.stdout.write(f'  ✅ Assigned "{task_template.name}" to "{task.title}"')
+                assigned_count += 1
+
+        if pending or existing:
+            try:
+                with transaction.atomic():
+                    created = checklist_materializer.materialize(pending)
+                    checklist_materializer.fill_missing(existing)
+            except Exception as e:
+                self.stdout.write(f'  ❌ Error assigning checklists: {str(e)}')
+                skipped_count += len(pending) + len(existing)
+                assigned_count -= len(existing)
+            else:
+                for task, task_template in pending:
+                    if task.pk in created:
                         self.stdout.write(f'  ✅ Assigned "{task_template.name}" to "{task.title}"')
                         assigned_count += 1
-                        
-                except Exception as e:
-                    self.stdout.write(f'  ❌ Error assigning checklist to "{task.title}": {str(e)}')
-                    skipped_count += 1
+                    else:
+                        self.stdout.write(f'  ⚠️  Task already has checklist - {task.title}')
+                        skipped_count += 1
 
         # Summary
         if dry_run:
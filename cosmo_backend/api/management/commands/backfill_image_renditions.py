@@ -0,0 +1,50 @@
+"""
+Image Rendition Backfill Command
+================================
+Render the thumbnail/medium renditions (api.image_renditions) for TaskImage
+and ChecklistPhoto rows that predate them, so photo pages stop falling back
+to on-demand rendering. Safe to re-run: rows with a content_digest are
+skipped and renditions already in storage are reused.
+
+Usage:
+    python manage.py backfill_image_renditions
+    python manage.py backfill_image_renditions --kind task-image --limit 500
+"""
+
+from django.core.management.base import BaseCommand
+
+from api import image_renditions
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnail/medium renditions for stored task photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=sorted(image_renditions.KINDS), action="append",
+                          help="Only this kind of photo (repeatable; default all)")
+        parser.add_argument("--limit", type=int, default=None,
+                          help="Stop after this many photos per kind")
+        parser.add_argument("--batch-size", type=int, default=200,
+                          help="Rows fetched per query")
+
+    def handle(self, *args, **opts):
+        for kind in opts["kind"] or sorted(image_renditions.KINDS):
+            model = image_renditions.model_for(kind)
+            pending = model.objects.filter(content_digest='').exclude(image='').order_by('pk')
+            if hasattr(model, 'processing_status'):
+                # Uploads still being optimized get renditions from the image worker
+                pending = pending.exclude(processing_status__in=('pending', 'processing'))
+
+            if opts["limit"] is not None:
+                pending = pending[:opts["limit"]]
+
+            done = failed = 0
+            for obj in pending.iterator(chunk_size=opts["batch_size"]):
+                try:
+                    image_renditions.ensure(obj)
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"  {kind} {obj.pk}: {e}"))
+
+            self.stdout.write(self.style.SUCCESS(f"{kind}: rendered {done}, failed {failed}"))
@@ -6,6 +6,7 @@ Usage:
     python manage.py cleanup_imports --stats         # Show storage statistics
     python manage.py cleanup_imports --suggest 100   # Suggest cleanup to stay under 100MB
     python manage.py cleanup_imports --dry-run       # Show what would be deleted
+    python manage.py cleanup_imports --blobs         # Remove upload blobs nothing references
 """
 
 from django.core.management.base import BaseCommand
@@ -37,12 +38,24 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be deleted without actually deleting'
         )
+        parser.add_argument(
+            '--blobs',
+            action='store_true',
+            help='Garbage-collect unreferenced photo/import blobs instead of old import files'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            help='With --blobs: keep blobs released within this many hours (default: BLOB_GC_GRACE_HOURS)'
+        )
 
     def handle(self, *args, **options):
         if options['stats']:
             self._show_stats()
         elif options['suggest']:
             self._show_suggestions(options['suggest'])
+        elif options['blobs']:
+            self._collect_blobs(options['grace_hours'], options['dry_run'])
         else:
             self._perform_cleanup(options['days'], options['dry_run'])
 
@@ -89,6 +102,26 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR("❌ " + suggestion['message']))
                 self.stdout.write(self.style.WARNING("💡 " + suggestion['recommendation']))
 
+    def _collect_blobs(self, grace_hours, dry_run):
+        """Remove content-addressed blobs no photo or import references"""
+        action = "🔍 Dry Run" if dry_run else "🗑️  Blob Collection"
+        self.stdout.write(self.style.SUCCESS(f'{action}: Removing unreferenced upload blobs'))
+        self.stdout.write('=' * 50)
+        
+        result = ImportFileCleanupService.collect_unreferenced_blobs(grace_hours=grace_hours, dry_run=dry_run)
+        
+        self.stdout.write(f"Unreferenced blobs: {result['blobs_found']} (grace: {result['grace_hours']}h)")
+        if result['blobs_restored']:
+            self.stdout.write(self.style.WARNING(f"Still referenced, counts repaired: {result['blobs_restored']}"))
+        if dry_run:
+            self.stdout.write(f"Would free: {result['space_freed_mb']:.1f} MB")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Blobs deleted: {result['blobs_deleted']}, space freed: {result['space_freed_mb']:.1f} MB"
+            ))
+        for error in result['errors']:
+            self.stdout.write(self.style.ERROR(f"  {error}"))
+
     def _perform_cleanup(self, days, dry_run):
         """Perform the actual cleanup"""
         action = "🔍 Dry Run" if dry_run else "🗑️  Cleanup"
@@ -13,6 +13,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.utils import timezone
 from api.models import BookingImportLog
+from api.services.file_cleanup_service import ImportFileCleanupService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -123,6 +124,7 @@ class Command(BaseCommand):
         deleted_count = 0
         freed_space = 0
         errors = []
+        released = []
 
         for file_info in files_to_delete:
             try:
@@ -130,11 +132,9 @@ class Command(BaseCommand):
                 file_path = file_info['path']
                 file_size = file_info['size']
 
-                # Delete the physical file
-                os.remove(file_path)
-                
-                # Update the database record (clear the file reference)
-                log.import_file = None
+                # Release the blob (other imports may share it) and clear the file reference
+                released.append(log.import_file.name)
+                log.import_file.delete(save=False)
                 log.save()
 
                 deleted_count += 1
@@ -148,6 +148,9 @@ class Command(BaseCommand):
                 errors.append(error_msg)
                 logger.error(error_msg)
 
+        # Shared blobs survive until their last import is gone
+        ImportFileCleanupService.collect_unreferenced_blobs(grace_hours=0, names=released)
+
         # Summary
         self.stdout.write(f'\n--- Cleanup Summary ---')
         self.stdout.write(f'Files deleted: {deleted_count}')
@@ -0,0 +1,54 @@
+"""
+Audit Spool Drain Command
+=========================
+Insert audit events spooled to AUDIT_SPOOL_DIR (AUDIT_WRITE_MODE='spool')
+into the AuditEvent table in bulk.
+
+Usage:
+    python manage.py drain_audit_spool            # poll forever
+    python manage.py drain_audit_spool --once     # drain what is there and exit
+
+Procfile suggestion:
+    audit: python cosmo_backend/manage.py drain_audit_spool
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api.audit_writer import AuditWriter
+
+
+class Command(BaseCommand):
+    help = "Move spooled audit events into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                          help="Exit after one pass instead of polling")
+        parser.add_argument("--interval", type=float, default=5.0,
+                          help="Seconds to sleep between passes")
+        parser.add_argument("--spool-dir", default=None,
+                          help="Spool directory (defaults to AUDIT_SPOOL_DIR)")
+
+    def handle(self, *args, **opts):
+        spool_dir = opts["spool_dir"] or getattr(settings, "AUDIT_SPOOL_DIR", None)
+        if not spool_dir:
+            raise CommandError("No spool directory: set AUDIT_SPOOL_DIR or pass --spool-dir")
+
+        writer = AuditWriter(mode="buffered", spool_dir=spool_dir,
+                             batch_size=getattr(settings, "AUDIT_BULK_BATCH_SIZE", 500))
+        total = 0
+        while True:
+            close_old_connections()
+            inserted = writer.drain_spool()
+            total += inserted
+            if inserted:
+                self.stdout.write(f"Inserted {inserted} spooled audit events")
+            if opts["once"]:
+                break
+            time.sleep(opts["interval"])
+
+        dropped = writer.stats["dropped"]
+        self.stdout.write(self.style.SUCCESS(f"Drained {total} audit events ({dropped} dropped)"))
@@ -7,9 +7,10 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import date, datetime, timedelta
 from api.models import (
-    ScheduleTemplate, Task, TaskChecklist, ChecklistResponse, 
-    GeneratedTask, Property
+    ScheduleTemplate, Task, GeneratedTask, Property
 )
+from api import checklist_materializer
+from api.audit_writer import audit_batch
 
 
 class Command(BaseCommand):
@@ -58,26 +59,33 @@ class Command(BaseCommand):
             schedules = schedules.filter(id=schedule_id)
         
         generated_count = 0
+        # (task, checklist template) pairs, materialized together after the loop
+        self.pending_checklists = []
         
-        for schedule in schedules:
-            if schedule.should_generate_task(check_date):
-                try:
-                    if dry_run:
-                        self.stdout.write(
-                            f'Would generate: {schedule.name} for {schedule.property_ref or "All Properties"}'
-                        )
-                        generated_count += 1
-                    else:
-                        task = self.generate_task_from_schedule(schedule, check_date)
-                        if task:
+        # audit rows for the generated checklists/schedules go out in one batch
+        with audit_batch():
+            for schedule in schedules:
+                if schedule.should_generate_task(check_date):
+                    try:
+                        if dry_run:
                             self.stdout.write(
-                                self.style.SUCCESS(f'Generated: {task.title}')
+                                f'Would generate: {schedule.name} for {schedule.property_ref or "All Properties"}'
                             )
                             generated_count += 1
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Error generating task for {schedule.name}: {str(e)}')
-                    )
+                        else:
+                            task = self.generate_task_from_schedule(schedule, check_date)
+                            if task:
+                                self.stdout.write(
+                                    self.style.SUCCESS(f'Generated: {task.title}')
+                                )
+                                generated_count += 1
+                    except Exception as e:
+                        self.stdout.write(
+                            self.style.ERROR(f'Error generating task for {schedule.name}: {str(e)}')
+                        )
+
+            if self.pending_checklists:
+                checklist_materializer.materialize(self.pending_checklists)
         
         if dry_run:
             self.stdout.write(f'Would generate {generated_count} tasks')
@@ -113,20 +121,9 @@ class Command(BaseCommand):
             due_date=due_datetime,
         )
         
-        # Create checklist if template is specified
+        # Queue the checklist if a template is specified (created in bulk by handle)
         if schedule.checklist_template:
-            task_checklist = TaskChecklist.objects.create(
-                task=task,
-                template=schedule.checklist_template
-            )
-            
-            # Create responses for all checklist items
-            for item in schedule.checklist_template.items.all():
-                ChecklistResponse.objects.create(
-                    checklist=task_checklist,
-                    item=item,
-                    is_completed=False  # Start with all items uncompleted
-                )
+            self.pending_checklists.append((task, schedule.checklist_template))
         
         # Record that this task was generated
         GeneratedTask.objects.create(
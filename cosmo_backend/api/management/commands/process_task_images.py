@@ -0,0 +1,54 @@
+"""
+Task Image Worker
+=================
+Optimize pending task image uploads (TaskImage rows with
+processing_status=pending). Use with TASK_IMAGE_PROCESSING_BACKEND='database'
+so web workers only store the raw upload and this process does the encoding.
+Images left in "processing" for longer than TASK_IMAGE_CLAIM_TIMEOUT seconds
+by a worker that died are claimed again. With the in-process 'thread' or
+'process' backends, polling the image detail endpoint requeues uploads whose
+job was lost to a restart; `--once` from cron also picks them up.
+
+Usage:
+    python manage.py process_task_images            # poll forever
+    python manage.py process_task_images --once     # drain the queue and exit
+
+Procfile suggestion:
+    images: python cosmo_backend/manage.py process_task_images
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.services.task_image_processing import TaskImageProcessingService
+
+
+class Command(BaseCommand):
+    help = "Optimize pending task image uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                          help="Exit once the queue is empty instead of polling")
+        parser.add_argument("--interval", type=float, default=2.0,
+                          help="Seconds to sleep between polls when the queue is empty")
+
+    def handle(self, *args, **opts):
+        processed = 0
+        while True:
+            close_old_connections()
+            image_id = TaskImageProcessingService.claim_next()
+            if image_id is None:
+                if opts["once"]:
+                    break
+                time.sleep(opts["interval"])
+                continue
+
+            # Encode in this process; run more workers to go wider
+            image = TaskImageProcessingService.run(image_id, claimed=True, use_pool=False)
+            processed += 1
+            if image is not None:
+                self.stdout.write(f"Task image {image_id} {image.processing_status}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} task images"))
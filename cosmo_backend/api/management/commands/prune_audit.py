@@ -3,8 +3,14 @@ Audit Event Pruning Management Command
 =====================================
 Prune old audit events to keep database lean without losing recent forensics.
 
+On PostgreSQL the audit table is partitioned by month (api.audit_storage):
+months entirely older than the cutoff are dropped as whole partitions,
+upcoming months are prepared, and only the month straddling the cutoff is
+deleted row by row (keyset batches). Other databases use the keyset delete.
+
 Usage:
     python manage.py prune_audit --days 90
+    python manage.py prune_audit --days 90 --dry-run
 
 Cron suggestion:
     0 3 * * * python manage.py prune_audit --days 90
@@ -13,49 +19,40 @@ Cron suggestion:
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
+from api import audit_storage
 from api.models import AuditEvent
 
 class Command(BaseCommand):
     help = "Delete AuditEvent rows older than --days (default 90)."
 
     def add_arguments(self, parser):
-        parser.add_argument("--days", type=int, default=90, 
+        parser.add_argument("--days", type=int, default=90,
                           help="Delete audit events older than this many days")
         parser.add_argument("--dry-run", action="store_true",
                           help="Show what would be deleted without actually deleting")
+        parser.add_argument("--batch-size", type=int, default=None,
+                          help="Rows per keyset delete batch (default AUDIT_PRUNE_BATCH_SIZE)")
 
     def handle(self, *args, **opts):
         cutoff = timezone.now() - timedelta(days=opts["days"])
-        qs = AuditEvent.objects.filter(created_at__lt=cutoff)
-        count = qs.count()
-        
+
         if opts["dry_run"]:
+            count = AuditEvent.objects.filter(created_at__lt=cutoff).count()
+            partitions = audit_storage.expired_partitions(cutoff)
             self.stdout.write(
                 self.style.WARNING(f"DRY RUN: Would delete {count} audit events older than {opts['days']} days")
             )
+            if partitions:
+                self.stdout.write(f"DRY RUN: Would drop partitions: {', '.join(partitions)}")
             return
-        
-        if count == 0:
-            self.stdout.write(
-                self.style.SUCCESS(f"No audit events found older than {opts['days']} days")
-            )
-            return
-        
-        # Delete in batches for large datasets
-        batch_size = 1000
-        deleted_total = 0
-        
-        while True:
-            batch_qs = qs[:batch_size]
-            if not batch_qs.exists():
-                break
-            
-            batch_count = batch_qs.count()
-            batch_qs.delete()
-            deleted_total += batch_count
-            
-            self.stdout.write(f"Deleted batch of {batch_count} audit events...")
-        
+
+        report = audit_storage.prune(cutoff, batch_size=opts["batch_size"])
+        for name in report["dropped_partitions"]:
+            self.stdout.write(f"Dropped partition {name}")
+
         self.stdout.write(
-            self.style.SUCCESS(f"Deleted {deleted_total} audit events older than {opts['days']} days")
+            self.style.SUCCESS(
+                f"Deleted {report['deleted_rows']} audit events older than {opts['days']} days"
+                + (f" and dropped {len(report['dropped_partitions'])} partitions" if report["dropped_partitions"] else "")
+            )
         )
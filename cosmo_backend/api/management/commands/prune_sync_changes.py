@@ -0,0 +1,31 @@
+"""
+Sync Change Pruning Command
+===========================
+Delete SyncChange rows (api.mobile_sync) older than the retention window.
+Clients holding a cursor older than the window get a full snapshot on their
+next sync, so --days should match SYNC_CHANGE_RETENTION_DAYS.
+
+Usage:
+    python manage.py prune_sync_changes
+    python manage.py prune_sync_changes --days 30
+
+Cron suggestion:
+    30 3 * * * python manage.py prune_sync_changes
+"""
+
+from django.core.management.base import BaseCommand
+
+from api import mobile_sync
+from api.models import SyncChange
+
+
+class Command(BaseCommand):
+    help = "Delete SyncChange rows older than --days (default SYNC_CHANGE_RETENTION_DAYS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=mobile_sync.SYNC_CHANGE_RETENTION_DAYS,
+                          help="Delete changes older than this many days")
+
+    def handle(self, *args, **opts):
+        deleted = SyncChange.cleanup_old_changes(days=opts["days"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} sync changes older than {opts['days']} days"))
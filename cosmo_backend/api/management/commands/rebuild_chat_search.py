@@ -0,0 +1,29 @@
+"""
+Chat Search Backfill Command
+============================
+(Re)build the chat message search index (api.chat_search). On PostgreSQL
+this recomputes ChatMessage.search_vector (normally kept current by a
+trigger); elsewhere it rebuilds the ChatMessageTerm inverted index. Run it
+after bulk imports or raw SQL that bypassed ChatMessage.save.
+
+Usage:
+    python manage.py rebuild_chat_search
+    python manage.py rebuild_chat_search --batch-size 5000
+"""
+
+from django.core.management.base import BaseCommand
+
+from api import chat_search
+
+
+class Command(BaseCommand):
+    help = "Backfill the chat message full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                          help="Messages indexed per batch (default 1000)")
+
+    def handle(self, *args, **opts):
+        backend = "tsvector" if chat_search.uses_tsvector() else "inverted index"
+        count = chat_search.rebuild(batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} chat messages ({backend})"))
@@ -0,0 +1,46 @@
+"""
+Checklist Counter Repair Command
+================================
+Recompute TaskChecklist progress counters (items_total, items_completed,
+required_total, required_completed) from ChecklistResponse rows. Counters are
+maintained on every response write; run this after raw SQL or bulk writes
+that bypassed ChecklistResponse.save / TaskChecklist.refresh_counters.
+
+Usage:
+    python manage.py repair_checklist_counters             # fix drifted rows
+    python manage.py repair_checklist_counters --dry-run   # only report them
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from api.models import TaskChecklist
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized TaskChecklist progress counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                          help="Report drifted checklists without fixing them")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                          help="Checklists updated per statement")
+
+    def handle(self, *args, **opts):
+        expected = {f"expected_{name}": expr for name, expr in TaskChecklist.counter_expressions().items()}
+        drift = Q()
+        for name in TaskChecklist.COUNTER_FIELDS:
+            drift |= ~Q(**{name: F(f"expected_{name}")})
+        drifted = list(
+            TaskChecklist.objects.annotate(**expected).filter(drift).order_by("pk").values_list("pk", flat=True)
+        )
+
+        if opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"DRY RUN: {len(drifted)} checklists have drifted counters"))
+            return
+
+        batch_size = opts["batch_size"]
+        for start in range(0, len(drifted), batch_size):
+            TaskChecklist.refresh_counters(drifted[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters on {len(drifted)} checklists"))
@@ -0,0 +1,55 @@
+"""
+Booking Import Job Worker
+=========================
+Drain queued background booking imports (BookingImportLog rows with
+status=queued). Use with BOOKING_IMPORT_JOB_BACKEND='database' so web
+workers only enqueue and this process does the importing. On start, jobs
+left queued or running past BOOKING_IMPORT_JOB_TIMEOUT by a worker that
+died are marked failed.
+
+Usage:
+    python manage.py run_import_jobs            # poll forever
+    python manage.py run_import_jobs --once     # drain the queue and exit
+
+Procfile suggestion:
+    worker: python cosmo_backend/manage.py run_import_jobs
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.services.import_job_service import ImportJobService
+
+
+class Command(BaseCommand):
+    help = "Run queued background booking import jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                          help="Exit once the queue is empty instead of polling")
+        parser.add_argument("--interval", type=float, default=2.0,
+                          help="Seconds to sleep between polls when the queue is empty")
+
+    def handle(self, *args, **opts):
+        stale = ImportJobService.fail_stale()
+        if stale:
+            self.stdout.write(self.style.WARNING(f"Marked {stale} abandoned import jobs failed"))
+        processed = 0
+        while True:
+            close_old_connections()
+            job_id = ImportJobService.claim_next()
+            if job_id is None:
+                if opts["once"]:
+                    break
+                time.sleep(opts["interval"])
+                continue
+
+            self.stdout.write(f"Running import job {job_id}...")
+            job = ImportJobService.run(job_id, claimed=True)
+            processed += 1
+            if job is not None:
+                self.stdout.write(f"Import job {job_id} {job.status}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} import jobs"))
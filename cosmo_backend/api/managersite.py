@@ -95,6 +95,17 @@ def create_unified_history_view(model_class):
                     # Skip malformed entries
                     continue
         
+        # Add structured TaskHistory rows (tasks no longer append to model.history)
+        if hasattr(obj, 'history_entries'):
+            for entry in obj.history_entries.all():
+                combined_history.append({
+                    'timestamp': entry.created_at,
+                    'user': entry.actor_name or 'Unknown',
+                    'action': 'Changed',
+                    'changes': entry.as_text().partition(': ')[2],
+                    'type': 'dashboard'
+                })
+        
         # Sort by timestamp (newest first)
         combined_history.sort(key=lambda x: x['timestamp'], reverse=True)
         
@@ -0,0 +1,52 @@
+# Background import job state on BookingImportLog
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0080_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingimportlog',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('queued', 'Queued'),
+                    ('running', 'Running'),
+                    ('completed', 'Completed'),
+                    ('failed', 'Failed'),
+                ],
+                db_index=True,
+                default='completed',
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name='bookingimportlog',
+            name='sheet_name',
+            field=models.CharField(default='Cleaning schedule', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='bookingimportlog',
+            name='progress',
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text='Per-chunk progress and final result summary',
+            ),
+        ),
+        migrations.AddField(
+            model_name='bookingimportlog',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bookingimportlog',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
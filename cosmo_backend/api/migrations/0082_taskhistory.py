@@ -0,0 +1,130 @@
+# Append-only TaskHistory table, backfilled from the legacy Task.history JSON
+
+import json
+import re
+from datetime import datetime, timezone as dt_timezone
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# "<iso timestamp>: <user> <change>"; the timestamp itself contains ':' but not ': '
+ENTRY_RE = re.compile(r"^(?P<ts>\S+): (?P<actor>\S+) (?P<rest>.*)$", re.DOTALL)
+CHANGE_RE = re.compile(r"^changed (?P<field>\w+) from '(?P<old>.*)' to '(?P<new>.*)'$", re.DOTALL)
+LEGACY_FIELDS = {'assignee': 'assigned_to', 'property': 'property_ref'}
+FIELD_LABELS = {value: key for key, value in LEGACY_FIELDS.items()}
+
+
+def _parse_entry(entry, fallback_ts):
+    match = ENTRY_RE.match(entry) if isinstance(entry, str) else None
+    if not match:
+        return {'created_at': fallback_ts, 'actor_name': '', 'message': str(entry)}
+    try:
+        created_at = datetime.fromisoformat(match['ts'].replace('Z', '+00:00'))
+        if django.utils.timezone.is_naive(created_at):
+            created_at = created_at.replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        return {'created_at': fallback_ts, 'actor_name': '', 'message': entry}
+
+    parsed = {'created_at': created_at, 'actor_name': match['actor'][:150]}
+    change = CHANGE_RE.match(match['rest'])
+    if change:
+        field = change['field']
+        parsed.update(field=LEGACY_FIELDS.get(field, field)[:50], old_value=change['old'], new_value=change['new'])
+    else:
+        parsed['message'] = match['rest']
+    return parsed
+
+
+def backfill_task_history(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    TaskHistory = apps.get_model('api', 'TaskHistory')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    user_ids = dict(User.objects.values_list('username', 'id'))
+
+    tasks = (Task.objects.exclude(history__in=['', '[]'])
+             .only('id', 'history', 'modified_at').order_by('id'))
+    rows, migrated = [], []
+    for task in tasks.iterator(chunk_size=BATCH_SIZE):
+        try:
+            entries = json.loads(task.history or '[]')
+        except json.JSONDecodeError:
+            entries = [task.history]
+        if not isinstance(entries, list):
+            entries = [entries]
+        for entry in entries:
+            parsed = _parse_entry(entry, task.modified_at)
+            rows.append(TaskHistory(task_id=task.id, actor_id=user_ids.get(parsed.get('actor_name')), **parsed))
+        migrated.append(task.id)
+
+        if len(rows) >= BATCH_SIZE:
+            TaskHistory.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            Task.objects.filter(id__in=migrated).update(history='[]')
+            rows, migrated = [], []
+
+    if rows:
+        TaskHistory.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    if migrated:
+        Task.objects.filter(id__in=migrated).update(history='[]')
+
+
+def restore_task_history(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    TaskHistory = apps.get_model('api', 'TaskHistory')
+
+    lines = {}
+    for entry in TaskHistory.objects.order_by('task_id', 'created_at', 'id').iterator(chunk_size=BATCH_SIZE):
+        if entry.field:
+            label = FIELD_LABELS.get(entry.field, entry.field)
+            change = f"changed {label} from '{entry.old_value}' to '{entry.new_value}'"
+        else:
+            change = entry.message
+        lines.setdefault(entry.task_id, []).append(
+            f"{entry.created_at.isoformat()}: {entry.actor_name or 'unknown'} {change}"
+        )
+    for task_id, history in lines.items():
+        Task.objects.filter(id=task_id).update(history=json.dumps(history))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0081_bookingimportlog_job_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor_name', models.CharField(blank=True, help_text='Username at the time of the change', max_length=150)),
+                ('field', models.CharField(blank=True, help_text='Changed field; blank for events', max_length=50)),
+                ('old_value', models.TextField(blank=True)),
+                ('new_value', models.TextField(blank=True)),
+                ('message', models.TextField(blank=True, help_text='Event description when no single field changed')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                                            related_name='task_history_entries', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           related_name='history_entries', to='api.task')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [
+                    models.Index(fields=['task', 'created_at', 'id'], name='taskhist_task_created_idx'),
+                    models.Index(fields=['actor', 'created_at'], name='taskhist_actor_created_idx'),
+                ],
+            },
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='history',
+            field=models.TextField(blank=True, default='[]',
+                                   help_text='Legacy JSON history; new changes are recorded in TaskHistory'),
+        ),
+        migrations.RunPython(backfill_task_history, restore_task_history),
+    ]
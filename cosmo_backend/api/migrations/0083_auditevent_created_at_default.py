@@ -0,0 +1,20 @@
+# AuditEvent.created_at is set when the change is captured, not when the
+# (possibly buffered or spooled) row is finally inserted
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0082_taskhistory'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditevent',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the audited change was made'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Denormalized checklist progress counters on TaskChecklist, backfilled from responses
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    TaskChecklist = apps.get_model('api', 'TaskChecklist')
+    ChecklistResponse = apps.get_model('api', 'ChecklistResponse')
+
+    def count(**filters):
+        responses = (ChecklistResponse.objects.filter(checklist=OuterRef('pk'), **filters)
+                     .order_by().values('checklist').annotate(n=Count('pk')).values('n'))
+        return Coalesce(Subquery(responses), 0)
+
+    TaskChecklist.objects.update(
+        items_total=count(),
+        items_completed=count(is_completed=True),
+        required_total=count(item__is_required=True),
+        required_completed=count(item__is_required=True, is_completed=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0083_auditevent_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskchecklist',
+            name='items_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='taskchecklist',
+            name='items_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='taskchecklist',
+            name='required_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='taskchecklist',
+            name='required_completed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Indexes for index-friendly calendar range predicates (api.calendar_events)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0084_taskchecklist_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['due_date'], name='task_due_date_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['check_out_date', 'check_in_date'], name='booking_checkout_checkin_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Covering index for per-object audit timelines, and (PostgreSQL only)
+# monthly RANGE partitioning of api_auditevent on created_at - see api.audit_storage.
+#
+# Existing rows are not copied: the old table is attached as the
+# api_auditevent_legacy partition covering everything before next month, and
+# new months get their own partitions. Other databases keep the plain table.
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_audit_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    AuditEvent = apps.get_model('api', 'AuditEvent')
+    table = AuditEvent._meta.db_table
+    user_table = AuditEvent._meta.get_field('actor').related_model._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        if cursor.fetchone()[0] == 'p':
+            return
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+        next_id = cursor.fetchone()[0]
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [table])
+        pkey = cursor.fetchone()[0]
+
+    now = datetime.now(timezone.utc)
+    boundary = _add_months(datetime(now.year, now.month, 1, tzinfo=timezone.utc), 1)
+
+    # 1. Move the old table aside, freeing its constraint and index names
+    schema_editor.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    schema_editor.execute(f"ALTER TABLE {table}_legacy DROP CONSTRAINT {pkey}")
+    schema_editor.execute(f"ALTER TABLE {table}_legacy ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    schema_editor.execute(f"ALTER TABLE {table}_legacy ALTER COLUMN id DROP DEFAULT")
+    for index in AuditEvent._meta.indexes:
+        schema_editor.execute(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_legacy")
+
+    # 2. Partitioned parent; the partition key has to be part of the primary key
+    schema_editor.execute(
+        f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    )
+    schema_editor.execute(f"CREATE SEQUENCE {table}_pid_seq START WITH {next_id} OWNED BY {table}.id")
+    schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_pid_seq')")
+    schema_editor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)")
+    schema_editor.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_actor_id_fk FOREIGN KEY (actor_id) "
+        f"REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED"
+    )
+    for index in AuditEvent._meta.indexes:
+        schema_editor.add_index(AuditEvent, index)
+
+    # 3. Old rows become one partition (its renamed indexes attach as-is),
+    #    plus upcoming months and a catch-all default
+    schema_editor.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {table}_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    )
+    for offset in range(MONTHS_AHEAD):
+        start = _add_months(boundary, offset)
+        schema_editor.execute(
+            f"CREATE TABLE {table}_p{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_add_months(start, 1).isoformat()}')"
+        )
+    schema_editor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0085_calendar_range_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditevent',
+            name='api_auditev_object__98f7b1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['object_type', 'object_id', '-created_at'], name='audit_object_timeline_idx'),
+        ),
+        # Partitioned tables are left in place on reverse; Django reads them like the plain table
+        migrations.RunPython(partition_audit_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Full-text search for chat messages - see api.chat_search.
+#
+# PostgreSQL: ChatMessage.search_vector is kept current by a BEFORE INSERT/UPDATE
+# trigger (built-in tsvector_update_trigger), served by a GIN index and
+# backfilled here. Other databases use the ChatMessageTerm inverted index,
+# filled by `manage.py rebuild_chat_search`.
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = 'api_chatmessage'
+CONFIG = 'pg_catalog.english'  # must match api.chat_search.SEARCH_CONFIG
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS chat_message_search_idx ON {TABLE} USING gin (search_vector)"
+    )
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS chat_message_search_update ON {TABLE}")
+    schema_editor.execute(
+        f"CREATE TRIGGER chat_message_search_update BEFORE INSERT OR UPDATE OF content ON {TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(search_vector, '{CONFIG}', content)"
+    )
+    schema_editor.execute(f"UPDATE {TABLE} SET search_vector = to_tsvector('{CONFIG}', content)")
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS chat_message_search_update ON {TABLE}")
+    schema_editor.execute("DROP INDEX IF EXISTS chat_message_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0086_auditevent_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ChatMessageTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.PositiveSmallIntegerField(default=1)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='api.chatmessage')),
+            ],
+            options={
+                'unique_together': {('term', 'message')},
+            },
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,42 @@
+# Trigram indexes for property autocomplete - see api.property_autocomplete.
+#
+# Django compiles icontains/istartswith to UPPER("col"::text) LIKE UPPER(...) on
+# PostgreSQL, so the GIN pg_trgm indexes are built on that same expression.
+# Other databases use the in-process autocomplete backend and need nothing.
+
+from django.db import migrations
+
+TABLE = 'api_property'
+INDEXES = {
+    'property_name_trgm_idx': 'name',
+    'property_address_trgm_idx': 'address',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index, column in INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index} ON {TABLE} "
+            f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0087_chat_message_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,36 @@
+# Change log for mobile delta sync - see api.mobile_sync.
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0088_property_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('task', 'Task'), ('checklist_response', 'Checklist response'), ('booking', 'Booking'), ('notification', 'Notification')], max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False, help_text='Object was deleted or soft-deleted')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, help_text='User who made the change, when known', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(blank=True, help_text='User to notify of the change; empty for everyone who can see the object', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['user', 'seq'], name='syncchange_user_seq_idx'),
+                    models.Index(fields=['entity', 'object_id', 'seq'], name='syncchange_object_seq_idx'),
+                    models.Index(fields=['changed_at'], name='syncchange_changed_at_idx'),
+                ],
+            },
+        ),
+    ]
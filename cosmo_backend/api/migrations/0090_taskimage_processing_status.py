@@ -0,0 +1,27 @@
+# Off-request image optimization - see api/services/task_image_processing.py.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0089_syncchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', help_text='Optimization state of the stored image', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='taskimage',
+            name='processing_error',
+            field=models.TextField(blank=True, help_text='Why optimization failed, if it did'),
+        ),
+        migrations.AddIndex(
+            model_name='taskimage',
+            index=models.Index(fields=['processing_status', 'uploaded_at'], name='taskimage_processing_idx'),
+        ),
+    ]
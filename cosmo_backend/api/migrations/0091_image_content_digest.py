@@ -0,0 +1,23 @@
+# Content-addressed image renditions - see api.image_renditions.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0090_taskimage_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskimage',
+            name='content_digest',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the stored image', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='checklistphoto',
+            name='content_digest',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the stored image', max_length=64),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Content-addressed, reference-counted upload storage - see api.blob_storage.
+
+import api.blob_storage
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0091_image_content_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Content-addressed name requested from storage', max_length=255, unique=True)),
+                ('name', models.CharField(db_index=True, help_text='Name the storage backend stored it under', max_length=255)),
+                ('digest', models.CharField(db_index=True, help_text='SHA-256 of the stored bytes', max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='File field values pointing at this blob')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('released_at', models.DateTimeField(blank=True, help_text='When ref_count last dropped to zero', null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'released_at'], name='storedblob_released_idx')],
+            },
+        ),
+        migrations.AlterField(
+            model_name='taskimage',
+            name='image',
+            field=models.ImageField(storage=api.blob_storage.get_blob_storage, upload_to=api.models.task_image_upload_path, validators=[api.models.validate_task_image]),
+        ),
+        migrations.AlterField(
+            model_name='checklistphoto',
+            name='image',
+            field=models.ImageField(storage=api.blob_storage.get_blob_storage, upload_to='checklist_photos/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='lostfoundphoto',
+            name='image',
+            field=models.ImageField(storage=api.blob_storage.get_blob_storage, upload_to='lost_found/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='bookingimportlog',
+            name='import_file',
+            field=models.FileField(blank=True, null=True, storage=api.blob_storage.get_blob_storage, upload_to='booking_imports/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Claim timestamp for off-request image optimization - see api/services/task_image_processing.py.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0092_storedblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskimage',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker claimed the image; stale claims are reclaimed', null=True),
+        ),
+    ]
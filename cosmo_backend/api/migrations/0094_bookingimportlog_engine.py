@@ -0,0 +1,18 @@
+# Background imports run the engine the caller chose - see api/services/import_job_service.py.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0093_taskimage_processing_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingimportlog',
+            name='engine',
+            field=models.CharField(choices=[('basic', 'Basic import'), ('enhanced', 'Enhanced import'), ('streaming', 'Enhanced streaming import')], default='streaming', help_text='Import engine a background job runs, as chosen by the caller', max_length=16),
+        ),
+    ]
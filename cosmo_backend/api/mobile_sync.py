@@ -0,0 +1,544 @@
+# api/mobile_sync.py
+"""
+Delta sync for the mobile app.
+
+The Flutter client re-downloaded full task lists on every resume and pushed
+offline edits through mobile_offline_sync one UPDATE at a time. Here:
+
+- every write to a Task, ChecklistResponse, Booking or Notification appends
+  a SyncChange row, whose auto-increment ``seq`` is the change sequence.
+  Rows name the user who should hear about the change (assignee, recipient);
+  booking rows name nobody and are filtered by property access when read.
+  Saves and deletes are recorded by the receivers below; bulk writes call
+  ``record()`` themselves;
+- ``changes(user, cursor)`` returns the objects changed after ``cursor`` that
+  the user can still see, plus the ids of those to drop (deleted,
+  soft-deleted or reassigned away). Without a usable cursor it returns a
+  snapshot with ``reset``. Changes younger than SYNC_SETTLE_SECONDS are sent
+  but the returned cursor stays before them, so a slower transaction holding
+  an earlier seq is not skipped;
+- ``apply(user, items)`` applies an uploaded batch in one transaction with
+  one result per item. An item conflicts when somebody else changed the
+  object after the item's ``base_cursor``. Items carrying a ``client_id``
+  are stored as IdempotencyKey rows, so a replayed batch gets the original
+  results back instead of being applied twice.
+"""
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import calendar_events
+from .authz import AuthzHelper
+
+logger = logging.getLogger(__name__)
+
+SYNC_PAGE_SIZE = getattr(settings, 'SYNC_PAGE_SIZE', 500)
+SYNC_MAX_BATCH = getattr(settings, 'SYNC_MAX_BATCH', 200)
+SYNC_SETTLE_SECONDS = getattr(settings, 'SYNC_SETTLE_SECONDS', 5)
+SYNC_CHANGE_RETENTION_DAYS = getattr(settings, 'SYNC_CHANGE_RETENTION_DAYS', 30)
+SYNC_SNAPSHOT_BOOKING_DAYS = getattr(settings, 'SYNC_SNAPSHOT_BOOKING_DAYS', 30)
+SYNC_SNAPSHOT_NOTIFICATIONS = getattr(settings, 'SYNC_SNAPSHOT_NOTIFICATIONS', 200)
+
+TASK = 'task'
+CHECKLIST_RESPONSE = 'checklist_response'
+BOOKING = 'booking'
+NOTIFICATION = 'notification'
+
+# Checklist response fields the client may upload
+RESPONSE_FIELDS = ('is_completed', 'text_response', 'number_response', 'notes')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+# ---------------- cursors ----------------
+def encode_cursor(seq, issued_at):
+    """"<seq>.<unix time>": the issue time tells whether the log still covers the cursor"""
+    return f'{seq}.{int(issued_at.timestamp())}'
+
+
+def decode_cursor(cursor):
+    try:
+        seq, issued = cursor.split('.')
+        return int(seq), datetime.fromtimestamp(int(issued), tz=dt_timezone.utc)
+    except (AttributeError, ValueError, OverflowError, OSError) as exc:
+        raise InvalidCursor('Invalid cursor') from exc
+
+
+def _expired(issued_at, now):
+    # changes after the cursor may have been pruned by cleanup_old_changes()
+    return issued_at <= now - timedelta(days=SYNC_CHANGE_RETENTION_DAYS, seconds=-SYNC_SETTLE_SECONDS)
+
+
+# ---------------- recording ----------------
+def record(entity, changes, *, actor=None):
+    """
+    Append SyncChange rows with one INSERT. ``changes`` are
+    (object_id, user_id, deleted) triples; user_id None addresses everyone.
+    """
+    from .models import SyncChange
+
+    actor_id = getattr(actor, 'pk', actor)
+    now = timezone.now()
+    rows = [SyncChange(entity=entity, object_id=object_id, user_id=user_id, deleted=deleted,
+                       actor_id=actor_id, changed_at=now)
+            for object_id, user_id, deleted in changes]
+    if rows:
+        SyncChange.objects.bulk_create(rows)
+    return len(rows)
+
+
+def record_checklists(checklist_ids, *, actor=None):
+    """Record every response of the given checklists for their task's assignee (after bulk_create)"""
+    from .models import ChecklistResponse
+
+    rows = (ChecklistResponse.objects.filter(checklist_id__in=checklist_ids,
+                                             checklist__task__assigned_to__isnull=False)
+            .values_list('pk', 'checklist__task__assigned_to_id'))
+    return record(CHECKLIST_RESPONSE, [(pk, user_id, False) for pk, user_id in rows], actor=actor)
+
+
+def _is_deleted(instance, kwargs):
+    return kwargs.get('signal') is post_delete or bool(getattr(instance, 'is_deleted', False))
+
+
+@receiver(post_save, sender='api.Task')
+@receiver(post_delete, sender='api.Task')
+def _record_task(sender, instance, **kwargs):
+    deleted = _is_deleted(instance, kwargs)
+    previous = (getattr(instance, '_history_snapshot', None) or {}).get('assigned_to_id')
+    changes = [(instance.pk, user_id, deleted)
+               for user_id in {instance.assigned_to_id, previous} if user_id]
+    record(TASK, changes, actor=instance.modified_by_id)
+
+    if previous != instance.assigned_to_id and instance.assigned_to_id and not deleted:
+        # the new assignee has never been sent this task's checklist
+        from .models import ChecklistResponse
+        response_ids = ChecklistResponse.objects.filter(checklist__task=instance).values_list('pk', flat=True)
+        record(CHECKLIST_RESPONSE, [(pk, instance.assigned_to_id, False) for pk in response_ids],
+               actor=instance.modified_by_id)
+
+
+@receiver(post_save, sender='api.ChecklistResponse')
+@receiver(post_delete, sender='api.ChecklistResponse')
+def _record_checklist_response(sender, instance, **kwargs):
+    from .models import TaskChecklist
+
+    assignee = (TaskChecklist.objects.filter(pk=instance.checklist_id)
+                .values_list('task__assigned_to_id', flat=True).first())
+    if assignee:
+        record(CHECKLIST_RESPONSE, [(instance.pk, assignee, _is_deleted(instance, kwargs))],
+               actor=instance.completed_by_id)
+
+
+@receiver(post_save, sender='api.Booking')
+@receiver(post_delete, sender='api.Booking')
+def _record_booking(sender, instance, **kwargs):
+    record(BOOKING, [(instance.pk, None, _is_deleted(instance, kwargs))])
+
+
+@receiver(post_save, sender='api.Notification')
+@receiver(post_delete, sender='api.Notification')
+def _record_notification(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'push_sent', 'history'}:
+        return  # not part of the synced payload
+    record(NOTIFICATION, [(instance.pk, instance.recipient_id, _is_deleted(instance, kwargs))])
+
+
+# ---------------- entities ----------------
+class SyncEntity:
+    """How one entity is scoped to a user and serialized for the client"""
+
+    def __init__(self, name, key, scope, fields, expressions=None, *, per_user=True, snapshot=None):
+        self.name = name
+        self.key = key
+        self.scope = scope
+        self.fields = fields
+        self.expressions = expressions or {}
+        # per-user rows: an object that is out of scope was removed for this user
+        self.per_user = per_user
+        self.snapshot = snapshot or scope
+
+    def rows(self, queryset):
+        return list(queryset.values(*self.fields, **self.expressions))
+
+
+def _task_scope(user):
+    from .models import Task
+    return Task.objects.filter(assigned_to=user)
+
+
+def _response_scope(user):
+    from .models import ChecklistResponse
+    return ChecklistResponse.objects.filter(checklist__task__assigned_to=user,
+                                            checklist__task__is_deleted=False)
+
+
+def _booking_scope(user):
+    from .models import Booking
+    return Booking.objects.filter(property__in=AuthzHelper.get_accessible_properties(user))
+
+
+def _booking_snapshot(user):
+    since = timezone.now() - timedelta(days=SYNC_SNAPSHOT_BOOKING_DAYS)
+    return _booking_scope(user).filter(check_out_date__gte=since)
+
+
+def _notification_scope(user):
+    from .models import Notification
+    return Notification.objects.filter(recipient=user)
+
+
+def _notification_snapshot(user):
+    return _notification_scope(user).order_by('-timestamp')[:SYNC_SNAPSHOT_NOTIFICATIONS]
+
+
+ENTITIES = {
+    TASK: SyncEntity(
+        TASK, 'tasks', _task_scope,
+        ('id', 'title', 'description', 'status', 'task_type', 'due_date', 'booking_id', 'modified_at'),
+        {'property_id': F('property_ref_id'), 'property_name': F('property_ref__name')},
+    ),
+    CHECKLIST_RESPONSE: SyncEntity(
+        CHECKLIST_RESPONSE, 'checklist_responses', _response_scope,
+        ('id', 'item_id', 'is_completed', 'text_response', 'number_response', 'notes', 'completed_at'),
+        {'task_id': F('checklist__task_id'), 'item_title': F('item__title')},
+    ),
+    BOOKING: SyncEntity(
+        BOOKING, 'bookings', _booking_scope,
+        ('id', 'property_id', 'guest_name', 'check_in_date', 'check_out_date', 'status'),
+        {'property_name': F('property__name')},
+        per_user=False, snapshot=_booking_snapshot,
+    ),
+    NOTIFICATION: SyncEntity(
+        NOTIFICATION, 'notifications', _notification_scope,
+        ('id', 'task_id', 'verb', 'read', 'read_at', 'timestamp'),
+        snapshot=_notification_snapshot,
+    ),
+}
+
+
+# ---------------- download ----------------
+def changes(user, cursor=None, limit=None):
+    """
+    Objects changed for ``user`` since ``cursor``:
+    {'cursor', 'has_more', 'reset', 'changes': {key: {'upserted': [...], 'removed': [ids]}}}.
+    """
+    from .models import SyncChange
+
+    now = timezone.now()
+    limit = max(1, min(limit or SYNC_PAGE_SIZE, SYNC_PAGE_SIZE))
+    after = decode_cursor(cursor) if cursor else None
+    if after is None or _expired(after[1], now):
+        return _snapshot(user, now)
+
+    after_seq = after[0]
+    log = list(
+        SyncChange.objects.filter(seq__gt=after_seq)
+        .filter(Q(user=user) | Q(user__isnull=True))
+        .order_by('seq')
+        .values_list('seq', 'entity', 'object_id', 'deleted', 'changed_at')[:limit + 1]
+    )
+    has_more = len(log) > limit
+    log = log[:limit]
+
+    settled = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    next_seq = after_seq
+    touched = {name: set() for name in ENTITIES}
+    tombstones = {name: set() for name in ENTITIES}
+    for seq, entity, object_id, deleted, changed_at in log:
+        touched[entity].add(object_id)
+        if deleted:
+            tombstones[entity].add(object_id)
+    for seq, _, _, _, changed_at in log:
+        if changed_at > settled:
+            has_more = False  # sent now, and again once settled
+            break
+        next_seq = seq
+
+    payload = {}
+    for name, entity in ENTITIES.items():
+        ids = touched[name]
+        upserted = entity.rows(entity.scope(user).filter(pk__in=ids)) if ids else []
+        found = {row['id'] for row in upserted}
+        removed = sorted(pk for pk in ids - found if entity.per_user or pk in tombstones[name])
+        payload[entity.key] = {'upserted': upserted, 'removed': removed}
+
+    return {'cursor': encode_cursor(next_seq, now), 'has_more': has_more, 'reset': False,
+            'changes': payload}
+
+
+def _snapshot(user, now):
+    """Every object in scope; the client replaces its local copy"""
+    from .models import SyncChange
+
+    # taken before reading so that concurrent writes are sent again next time
+    settled = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    seq = SyncChange.objects.filter(changed_at__lte=settled).aggregate(seq=Max('seq'))['seq'] or 0
+    payload = {entity.key: {'upserted': entity.rows(entity.snapshot(user)), 'removed': []}
+               for entity in ENTITIES.values()}
+    return {'cursor': encode_cursor(seq, now), 'has_more': False, 'reset': True, 'changes': payload}
+
+
+# ---------------- upload ----------------
+def apply(user, items, *, base_cursor=None, endpoint=''):
+    """
+    Apply uploaded edits in one transaction; returns one result per item.
+
+    Items are {client_id?, entity, id, fields, base_cursor?}. Checklist
+    responses may be addressed by (task_id, item_id) instead of id.
+    Results carry status 'applied', 'unchanged', 'conflict' (with the
+    server's row as 'current') or 'error'.
+    """
+    from .models import IdempotencyKey
+
+    if not isinstance(items, list):
+        raise InvalidBatch('changes must be a list')
+    if len(items) > SYNC_MAX_BATCH:
+        raise InvalidBatch(f'At most {SYNC_MAX_BATCH} changes per batch')
+    base_seq = _cursor_seq(base_cursor)
+
+    items = [dict(item, client_id=str(item['client_id'])) if isinstance(item, dict) and item.get('client_id')
+             else item for item in items]
+    results = [None] * len(items)
+    client_ids = {item['client_id'] for item in items if isinstance(item, dict) and item.get('client_id')}
+    seen = {}
+    if client_ids:
+        for key, owner_id, body in IdempotencyKey.objects.filter(key__in=client_ids).values_list(
+                'key', 'user_id', 'response_body'):
+            seen[key] = dict(body, duplicate=True) if owner_id == user.pk else None
+
+    pending = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _error(None, 'Change must be an object')
+            continue
+        client_id = item.get('client_id')
+        if client_id in seen:
+            results[index] = seen[client_id] or _error(item, 'client_id already used')
+        elif client_id and len(client_id) > 64:
+            results[index] = _error(item, 'client_id is too long')
+        else:
+            if client_id:
+                seen[client_id] = None  # repeated within the batch
+            try:
+                item_base = _cursor_seq(item.get('base_cursor'))
+            except InvalidCursor:
+                results[index] = _error(item, 'Invalid base_cursor')
+                continue
+            pending.append((index, dict(item, base_seq=base_seq if item_base is None else item_base)))
+
+    if pending:
+        with transaction.atomic():
+            _Batch(user).run(pending, results)
+            for index, _ in pending:  # rows in results may hold datetimes/decimals
+                results[index] = json.loads(json.dumps(results[index], cls=DjangoJSONEncoder))
+            keys = [IdempotencyKey(key=item['client_id'], user=user, endpoint=endpoint, method='POST',
+                                   response_status=200, response_body=results[index])
+                    for index, item in pending if item.get('client_id')]
+            IdempotencyKey.objects.bulk_create(keys)
+    return results
+
+
+def _error(item, message):
+    item = item or {}
+    return {'client_id': item.get('client_id'), 'entity': item.get('entity'), 'id': item.get('id'),
+            'status': 'error', 'error': message}
+
+
+def _cursor_seq(value):
+    """Sequence number of a cursor (plain integers are accepted too); raises InvalidCursor"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return decode_cursor(value)[0]
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Batch:
+    """Loads every target with one query per entity, then writes the changed ones in bulk"""
+
+    def __init__(self, user):
+        self.user = user
+        self.now = timezone.now()
+
+    def run(self, pending, results):
+        from .models import ChecklistResponse, SyncChange, Task
+
+        task_ids = {_int(item.get('id')) for _, item in pending if item.get('entity') == TASK}
+        response_ids = {_int(item.get('id')) for _, item in pending
+                        if item.get('entity') == CHECKLIST_RESPONSE and item.get('id')}
+        response_pairs = {(_int(item.get('task_id')), _int(item.get('item_id'))) for _, item in pending
+                          if item.get('entity') == CHECKLIST_RESPONSE and not item.get('id')}
+
+        tasks = {task.pk: task for task in (
+            Task.objects.select_for_update(of=('self',)).filter(pk__in=task_ids - {None}, assigned_to=self.user)
+        )}
+        lookup = Q(pk__in=response_ids - {None})
+        for task_id, item_id in response_pairs:
+            if task_id is not None and item_id is not None:
+                lookup |= Q(checklist__task_id=task_id, item_id=item_id)
+        responses = list(
+            ChecklistResponse.objects.select_for_update(of=('self',))
+            .filter(lookup, checklist__task__assigned_to=self.user)
+            .select_related('checklist')
+        )
+        self.responses = {response.pk: response for response in responses}
+        self.response_pairs = {(r.checklist.task_id, r.item_id): r for r in responses}
+        self.tasks = tasks
+        self.old_status = {pk: task.status for pk, task in tasks.items()}
+
+        # newest change per object made by somebody else, for conflict checks
+        self.last_change = {}
+        bases = [item['base_seq'] for _, item in pending if item['base_seq'] is not None]
+        if bases:
+            targets = Q(entity=TASK, object_id__in=list(tasks)) | Q(entity=CHECKLIST_RESPONSE,
+                                                                   object_id__in=list(self.responses))
+            others = (SyncChange.objects.filter(targets, seq__gt=min(bases))
+                      .exclude(actor=self.user).values('entity', 'object_id').annotate(last=Max('seq')))
+            self.last_change = {(row['entity'], row['object_id']): row['last'] for row in others}
+
+        changed_tasks, changed_responses = {}, {}
+        for index, item in pending:
+            try:
+                if item.get('entity') == TASK:
+                    results[index] = self._apply_task(item, changed_tasks)
+                elif item.get('entity') == CHECKLIST_RESPONSE:
+                    results[index] = self._apply_response(item, changed_responses, changed_tasks)
+                else:
+                    results[index] = _error(item, 'Unsupported entity')
+            except ValidationError as e:
+                results[index] = _error(item, '; '.join(e.messages))
+            except (TypeError, ValueError) as e:
+                results[index] = _error(item, str(e))
+        self._write(changed_tasks, changed_responses)
+
+    def _conflict(self, item, entity, pk):
+        base = item['base_seq']
+        last = self.last_change.get((entity, pk))
+        return base is not None and last is not None and last > base
+
+    def _result(self, item, entity, pk, status, **extra):
+        return {'client_id': item.get('client_id'), 'entity': entity, 'id': pk, 'status': status, **extra}
+
+    def _current(self, entity, pk):
+        spec = ENTITIES[entity]
+        rows = spec.rows(spec.scope(self.user).filter(pk=pk))
+        return rows[0] if rows else None
+
+    def _apply_task(self, item, changed):
+        from .models import Task
+
+        task = self.tasks.get(_int(item.get('id')))
+        if task is None:
+            return _error(item, 'Task not found')
+        fields = item.get('fields') or {}
+        unknown = set(fields) - {'status'}
+        if unknown or 'status' not in fields:
+            return _error(item, 'Only status can be updated')
+        if fields['status'] not in dict(Task.STATUS_CHOICES):
+            return _error(item, f"Invalid status '{fields['status']}'")
+        if self._conflict(item, TASK, task.pk):
+            return self._result(item, TASK, task.pk, 'conflict', current=self._current(TASK, task.pk))
+        if task.status == fields['status']:
+            return self._result(item, TASK, task.pk, 'unchanged')
+        task.status = fields['status']
+        changed[task.pk] = task
+        return self._result(item, TASK, task.pk, 'applied')
+
+    def _apply_response(self, item, changed, changed_tasks):
+        if item.get('id'):
+            response = self.responses.get(_int(item['id']))
+        else:
+            response = self.response_pairs.get((_int(item.get('task_id')), _int(item.get('item_id'))))
+        if response is None:
+            return _error(item, 'Checklist response not found')
+        fields = item.get('fields') or {}
+        unknown = set(fields) - set(RESPONSE_FIELDS)
+        if unknown or not fields:
+            return _error(item, f"Only {', '.join(RESPONSE_FIELDS)} can be updated")
+        if self._conflict(item, CHECKLIST_RESPONSE, response.pk):
+            return self._result(item, CHECKLIST_RESPONSE, response.pk, 'conflict',
+                                current=self._current(CHECKLIST_RESPONSE, response.pk))
+
+        updates = {name: value for name, value in fields.items() if getattr(response, name) != value}
+        if 'is_completed' in updates:
+            updates['is_completed'] = bool(updates['is_completed'])
+        if not updates:
+            return self._result(item, CHECKLIST_RESPONSE, response.pk, 'unchanged')
+        for name, value in updates.items():
+            setattr(response, name, value)
+        if 'is_completed' in updates:
+            response.completed_at = self.now if response.is_completed else None
+            response.completed_by = self.user if response.is_completed else None
+        response.full_clean(exclude=['checklist', 'item', 'completed_by'])
+        changed[response.pk] = response
+
+        # completing an item starts a pending task
+        task = self.tasks.get(response.checklist.task_id)
+        if response.is_completed:
+            if task is None:
+                from .models import Task
+                task = Task.objects.select_for_update(of=('self',)).filter(
+                    pk=response.checklist.task_id, assigned_to=self.user).first()
+                if task is not None:
+                    self.tasks[task.pk] = task
+                    self.old_status[task.pk] = task.status
+            if task is not None and task.status == 'pending':
+                task.status = 'in-progress'
+                changed_tasks[task.pk] = task
+        return self._result(item, CHECKLIST_RESPONSE, response.pk, 'applied')
+
+    def _write(self, changed_tasks, changed_responses):
+        from .models import ChecklistResponse, Task, TaskChecklist, TaskHistory
+        from .services.notification_service import NotificationService
+
+        tasks = [task for task in changed_tasks.values() if task.status != self.old_status[task.pk]]
+        if tasks:
+            for task in tasks:
+                task.modified_by = self.user
+                task.modified_at = self.now
+            Task.objects.bulk_update(tasks, ['status', 'modified_by', 'modified_at'])
+            TaskHistory.objects.bulk_create([
+                TaskHistory(task=task, actor=self.user, actor_name=self.user.username, field='status',
+                            old_value=self.old_status[task.pk], new_value=task.status, created_at=self.now)
+                for task in tasks
+            ])
+            record(TASK, [(task.pk, self.user.pk, False) for task in tasks], actor=self.user)
+            # bulk_update skips post_save; drop cached calendar months
+            calendar_events.invalidate_all()
+            try:
+                NotificationService.notify_status_changed(
+                    Task.objects.filter(pk__in=[task.pk for task in tasks]), actor=self.user)
+            except Exception as e:
+                logger.warning(f"Sync notifications failed for user {self.user.username}: {e}")
+
+        responses = list(changed_responses.values())
+        if responses:
+            ChecklistResponse.objects.bulk_update(responses, [
+                *RESPONSE_FIELDS, 'completed_at', 'completed_by'])
+            TaskChecklist.refresh_counters({response.checklist_id for response in responses})
+            record(CHECKLIST_RESPONSE, [(response.pk, self.user.pk, False) for response in responses],
+                   actor=self.user)
@@ -13,6 +13,7 @@ from rest_framework import status, serializers
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, inline_serializer
 from drf_spectacular.types import OpenApiTypes
 
+from . import mobile_sync
 from .models import Task, Property, Booking
 from .authz import AuthzHelper
 
@@ -124,6 +125,7 @@ def mobile_dashboard_data(request):
     examples=[OpenApiExample("Sync response", value={
         "success": True,
         "applied": {"completed_tasks": 2, "status_updates": 1, "checklist_updates": 0},
+        "unchanged": {"completed_tasks": 0, "status_updates": 1, "checklist_updates": 0},
         "errors": [],
         "sync_time": "2025-09-07T12:00:00Z"
     })],
@@ -147,7 +149,8 @@ def mobile_offline_sync(request):
         ]
     }
     
-    Returns compact deltas for what was applied successfully
+    Returns compact deltas for what was applied successfully; changes that
+    were already in place are counted under "unchanged"
     """
     user = request.user
     
@@ -160,77 +163,40 @@ def mobile_offline_sync(request):
             "sync_time": timezone.now().isoformat()
         }
         
-        # Process completed tasks
-        completed_task_ids = data.get('completed_task_ids', [])
-        if completed_task_ids:
-            updated_tasks = Task.objects.filter(
-                id__in=completed_task_ids,
-                assigned_to=user
-            ).update(
-                status='completed',
-                modified_by=user,
-                modified_at=timezone.now()
-            )
-            results["applied"]["completed_tasks"] = updated_tasks
+        # Translated into one mobile_sync batch: a single transaction with
+        # bulk writes and one notification fan-out
+        sections = []
+        for task_id in data.get('completed_task_ids', []):
+            sections.append(('completed_tasks', 'Task update',
+                             {'entity': mobile_sync.TASK, 'id': task_id, 'fields': {'status': 'completed'}}))
+        for update in data.get('task_status_updates', []):
+            update = update if isinstance(update, dict) else {}
+            sections.append(('status_updates', 'Task update',
+                             {'entity': mobile_sync.TASK, 'id': update.get('id'),
+                              'fields': {'status': update.get('status')}}))
+        for update in data.get('checklist_updates', []):
+            update = update if isinstance(update, dict) else {}
+            sections.append(('checklist_updates', 'Checklist update',
+                             {'entity': mobile_sync.CHECKLIST_RESPONSE, 'task_id': update.get('task_id'),
+                              'item_id': update.get('item_id'),
+                              'fields': {'is_completed': bool(update.get('completed', False))}}))
         
-        # Process task status updates
-        task_updates = data.get('task_status_updates', [])
-        applied_updates = 0
-        for update in task_updates:
-            task_id = None
-            try:
-                task_id = update.get('id')
-                new_status = update.get('status')
-                
-                if task_id and new_status:
-                    updated = Task.objects.filter(
-                        id=task_id,
-                        assigned_to=user
-                    ).update(
-                        status=new_status,
-                        modified_by=user,
-                        modified_at=timezone.now()
-                    )
-                    if updated:
-                        applied_updates += 1
-                        
-            except Exception as e:
-                task_id_str = str(task_id) if task_id is not None else "unknown"
-                results["errors"].append(f"Task update {task_id_str}: {str(e)}")
-        
-        results["applied"]["status_updates"] = applied_updates
-        
-        # Process checklist updates (simplified for mobile)
-        checklist_updates = data.get('checklist_updates', [])
-        applied_checklist = 0
-        for update in checklist_updates:
-            task_id = None
-            try:
-                task_id = update.get('task_id')
-                completed = update.get('completed', False)
-                
-                # This is a simplified implementation
-                # In production, you'd want to update specific checklist items
-                if task_id:
-                    task = Task.objects.filter(
-                        id=task_id,
-                        assigned_to=user
-                    ).first()
-                    
-                    if task and completed:
-                        # Mark task as in-progress if not already completed
-                        if task.status == 'pending':
-                            task.status = 'in-progress'
-                            task.modified_by = user
-                            task.modified_at = timezone.now()
-                            task.save(update_fields=['status', 'modified_by', 'modified_at'])
-                            applied_checklist += 1
-                            
-            except Exception as e:
-                task_id_str = str(task_id) if task_id is not None else "unknown"
-                results["errors"].append(f"Checklist update {task_id_str}: {str(e)}")
-        
-        results["applied"]["checklist_updates"] = applied_checklist
+        # apply() caps a batch at SYNC_MAX_BATCH; a device back from a long
+        # offline stretch may hold more, so its queue is applied in chunks
+        outcomes = []
+        for start in range(0, len(sections), mobile_sync.SYNC_MAX_BATCH):
+            chunk = sections[start:start + mobile_sync.SYNC_MAX_BATCH]
+            outcomes.extend(mobile_sync.apply(user, [item for _, _, item in chunk], endpoint=request.path))
+        results["unchanged"] = {}
+        for name in ('completed_tasks', 'status_updates', 'checklist_updates'):
+            results["applied"][name] = 0
+            results["unchanged"][name] = 0
+        for (name, label, item), outcome in zip(sections, outcomes):
+            if outcome['status'] in ('applied', 'unchanged'):
+                results[outcome['status']][name] += 1
+            else:
+                target = item.get('id') or item.get('task_id') or "unknown"
+                results["errors"].append(f"{label} {target}: {outcome.get('error', outcome['status'])}")
         
         return Response(results)
         
@@ -242,6 +208,94 @@ def mobile_offline_sync(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@extend_schema(
+    tags=["Mobile"],
+    operation_id="mobile_sync_changes",
+    summary="Get changes since a sync cursor",
+    description=(
+        "Returns the tasks, checklist responses, bookings and notifications changed since `cursor`. "
+        "Without a cursor (or with one older than the change log) a full snapshot is returned with "
+        "`reset: true`. Call again with the returned cursor while `has_more` is true."
+    ),
+    parameters=[
+        OpenApiParameter(name="cursor", description="Cursor from the previous response", required=False,
+                         type=OpenApiTypes.STR),
+        OpenApiParameter(name="limit", description="Max changes per response", required=False,
+                         type=OpenApiTypes.INT),
+    ],
+    responses={200: dict},
+    examples=[OpenApiExample("Delta", value={
+        "success": True,
+        "cursor": "1042.1757246400",
+        "has_more": False,
+        "reset": False,
+        "changes": {
+            "tasks": {"upserted": [{"id": 4, "title": "Clean room", "status": "in-progress"}], "removed": [7]},
+            "checklist_responses": {"upserted": [], "removed": []},
+            "bookings": {"upserted": [], "removed": []},
+            "notifications": {"upserted": [], "removed": []},
+        },
+        "server_time": "2025-09-07T12:00:00Z"
+    })],
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mobile_sync_changes(request):
+    """
+    Delta download for the mobile app
+    GET /api/mobile/sync/changes/?cursor=<cursor>
+    """
+    try:
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        data = mobile_sync.changes(request.user, request.GET.get('cursor') or None, limit=limit)
+    except ValueError as e:  # including mobile_sync.InvalidCursor
+        return Response({"success": False, "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"success": True, **data, "server_time": timezone.now().isoformat()})
+
+
+@extend_schema(
+    tags=["Mobile"],
+    operation_id="mobile_sync_push",
+    summary="Upload a batch of offline changes",
+    description=(
+        "Applies task status and checklist response edits in one transaction. Each change gets a result: "
+        "`applied`, `unchanged`, `conflict` (somebody else changed the object after `base_cursor`; the "
+        "server's row is returned as `current`) or `error`. Changes with a `client_id` are deduplicated "
+        "when a batch is replayed."
+    ),
+    request=inline_serializer(
+        name="MobileSyncPushPayload",
+        fields={
+            "cursor": serializers.CharField(required=False,
+                                            help_text="Default base_cursor for conflict detection"),
+            "changes": serializers.ListField(child=serializers.DictField()),
+        }
+    ),
+    responses={200: dict},
+    examples=[OpenApiExample("Push", value={
+        "cursor": "1042.1757246400",
+        "changes": [
+            {"client_id": "8b1f0c9e", "entity": "task", "id": 4, "fields": {"status": "completed"}},
+            {"client_id": "2c7d41aa", "entity": "checklist_response", "id": 31,
+             "fields": {"is_completed": True, "notes": "Done"}},
+        ],
+    }, request_only=True)],
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mobile_sync_push(request):
+    """
+    Batched upload for the mobile app
+    POST /api/mobile/sync/push/
+    """
+    try:
+        results = mobile_sync.apply(request.user, request.data.get('changes', []),
+                                    base_cursor=request.data.get('cursor'), endpoint=request.path)
+    except ValueError as e:  # InvalidBatch / InvalidCursor
+        return Response({"success": False, "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"success": True, "results": results, "sync_time": timezone.now().isoformat()})
+
+
 @extend_schema(
     tags=["Mobile"], 
     operation_id="mobile_task_summary",
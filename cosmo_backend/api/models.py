@@ -4,9 +4,9 @@ import json
 from datetime import time, timedelta
 # Removed available_timezones import - using curated timezone choices instead
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q, F
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.utils import timezone
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
@@ -14,6 +14,7 @@ from django.contrib.auth.models import User
 
 # Import soft delete functionality
 from .soft_delete import SoftDeleteMixin, SoftDeleteManager
+from .blob_storage import get_blob_storage
 
 # Postgres-specific features
 from django.contrib.postgres.constraints import ExclusionConstraint
@@ -166,6 +167,8 @@ class Booking(SoftDeleteMixin, models.Model):
             models.Index(fields=['property', 'check_out_date']),
             models.Index(fields=['status']),
             models.Index(fields=['source', 'external_code']),
+            # Portfolio-wide calendar range scans (api.calendar_events)
+            models.Index(fields=['check_out_date', 'check_in_date'], name='booking_checkout_checkin_idx'),
         ]
         constraints = [
             models.CheckConstraint(
@@ -206,91 +209,38 @@ class Booking(SoftDeleteMixin, models.Model):
         return f"Booking {self.property.name} {self.check_in_date:%Y-%m-%d} → {self.check_out_date:%Y-%m-%d}"
     
     def check_conflicts(self):
-        """Check for booking conflicts with other properties"""
-        conflicts = []
-        
-        # Check for same day check-in/check-out conflicts across different properties
-        same_day_conflicts = Booking.objects.filter(
-            check_in_date__date=self.check_out_date.date(),
-            status__in=['booked', 'confirmed', 'currently_hosting']
-        ).exclude(
-            property=self.property  # Exclude same property
-        ).exclude(
-            id=self.id  # Exclude self
-        )
-        
-        for conflict_booking in same_day_conflicts:
-            conflicts.append({
-                'type': 'same_day_checkout_checkin',
-                'message': f"Same day conflict: Check-out from {self.property.name} on {self.check_out_date.date()}, check-in at {conflict_booking.property.name}",
-                'booking': conflict_booking,
-                'severity': 'high'
-            })
-        
-        # Check for same day check-out/check-in conflicts (reverse)
-        reverse_conflicts = Booking.objects.filter(
-            check_out_date__date=self.check_in_date.date(),
-            status__in=['booked', 'confirmed', 'currently_hosting']
-        ).exclude(
-            property=self.property  # Exclude same property
-        ).exclude(
-            id=self.id  # Exclude self
-        )
-        
-        for conflict_booking in reverse_conflicts:
-            conflicts.append({
-                'type': 'same_day_checkin_checkout',
-                'message': f"Same day conflict: Check-in at {self.property.name} on {self.check_in_date.date()}, check-out from {conflict_booking.property.name}",
-                'booking': conflict_booking,
-                'severity': 'high'
-            })
-        
-        # Check for overlapping bookings on same property
-        overlapping_bookings = Booking.objects.filter(
-            property=self.property,
-            check_in_date__lt=self.check_out_date,
-            check_out_date__gt=self.check_in_date,
-            status__in=['booked', 'confirmed', 'currently_hosting']
-        ).exclude(id=self.id)
-        
-        for overlap_booking in overlapping_bookings:
-            conflicts.append({
-                'type': 'overlapping_dates',
-                'message': f"Overlapping booking on {self.property.name}: {overlap_booking.check_in_date.date()} - {overlap_booking.check_out_date.date()}",
-                'booking': overlap_booking,
-                'severity': 'critical'
-            })
-        
-        return conflicts
+        """Check for booking conflicts with other properties (see api.booking_conflicts)"""
+        from .booking_conflicts import get_conflicts
+        return get_conflicts(self)
+    
+    def get_conflict_summary(self):
+        """Cached conflict counts and messages: {'total', 'critical', 'high', 'messages'}"""
+        from .booking_conflicts import get_conflict_summary
+        return get_conflict_summary(self)
     
     def get_conflict_flag(self):
         """Get a formatted conflict flag for admin display"""
-        conflicts = self.check_conflicts()
-        if not conflicts:
+        summary = self.get_conflict_summary()
+        if not summary['total']:
             return "✅ No conflicts"
         
-        conflict_count = len(conflicts)
-        critical_count = len([c for c in conflicts if c['severity'] == 'critical'])
-        high_count = len([c for c in conflicts if c['severity'] == 'high'])
+        critical_count = summary['critical']
+        high_count = summary['high']
         
         if critical_count > 0:
             return f"🔴 {critical_count} Critical, {high_count} High"
         elif high_count > 0:
             return f"🟡 {high_count} High priority conflicts"
         else:
-            return f"⚠️ {conflict_count} conflicts"
+            return f"⚠️ {summary['total']} conflicts"
     
     def get_conflict_details(self):
         """Get detailed conflict information for tooltips"""
-        conflicts = self.check_conflicts()
-        if not conflicts:
+        messages = self.get_conflict_summary()['messages']
+        if not messages:
             return "No conflicts detected"
         
-        details = []
-        for conflict in conflicts:
-            details.append(f"• {conflict['message']}")
-        
-        return "\n".join(details)
+        return "\n".join(f"• {message}" for message in messages)
 
 
 class PropertyOwnership(models.Model):
@@ -359,7 +309,8 @@ class Task(SoftDeleteMixin, models.Model):
         blank=True,
         help_text="Optional deadline for task (stored in UTC)"
     )
-    history      = models.TextField(blank=True, default='[]')
+    history      = models.TextField(blank=True, default='[]',
+                                    help_text="Legacy JSON history; new changes are recorded in TaskHistory")
     depends_on   = models.ManyToManyField('self', blank=True, symmetrical=False, related_name='dependent_tasks',
                                           help_text="This task is blocked by the selected prerequisite tasks")
     
@@ -400,58 +351,44 @@ class Task(SoftDeleteMixin, models.Model):
         prop_name = self.property_ref.name if self.property_ref else "No property"
         return f"{self.title} ({self.task_type}) - {prop_name}"
 
-    def save(self, *args, **kwargs):
-        # Only build history on updates, not on initial creation
-        if self.pk:
-            old = Task.objects.get(pk=self.pk)
-            changes = []
-            user = getattr(self.modified_by, 'username', None) or 'unknown'
-
-            # Status change
-            if old.status != self.status:
-                changes.append(
-                    f"{timezone.now().isoformat()}: {user} changed status "
-                    f"from '{old.status}' to '{self.status}'"
-                )
-
-            # Assigned_to change
-            if old.assigned_to_id != self.assigned_to_id:
-                old_name = getattr(old.assigned_to, 'username', 'unassigned')
-                new_name = getattr(self.assigned_to, 'username', 'unassigned')
-                changes.append(
-                    f"{timezone.now().isoformat()}: {user} changed assignee "
-                    f"from '{old_name}' to '{new_name}'"
-                )
-
-            # Title change
-            if old.title != self.title:
-                changes.append(
-                    f"{timezone.now().isoformat()}: {user} changed title "
-                    f"from '{old.title}' to '{self.title}'"
-                )
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember loaded values so save() can diff without re-fetching the row
+        instance._history_snapshot = instance._history_values()
+        return instance
 
-            # Description change
-            if old.description != self.description:
-                changes.append(
-                    f"{timezone.now().isoformat()}: {user} changed description "
-                    f"from '{old.description}' to '{self.description}'"
-                )
-            # Due date change
-            if old.due_date != self.due_date:
-                old_dt = old.due_date.isoformat() if old.due_date else "None"
-                new_dt = self.due_date.isoformat() if self.due_date else "None"
-                changes.append(
-                    f"{timezone.now().isoformat()}: {user} changed due_date "
-                    f"from '{old_dt}' to '{new_dt}'"
-                )
+    def _history_values(self):
+        # Deferred fields are not in __dict__ and are simply not tracked
+        return {f: self.__dict__[f] for f in TaskHistory.TRACKED_FIELDS if f in self.__dict__}
 
-            if changes:
-                hist = json.loads(old.history or "[]")
-                hist.extend(changes)
-                self.history = json.dumps(hist)
+    def save(self, *args, **kwargs):
+        # Only build history on updates, not on initial creation
+        changes = []
+        if self.pk and not self._state.adding:
+            tracked = TaskHistory.TRACKED_FIELDS
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                names = {self._meta.get_field(name).attname for name in update_fields}
+                tracked = tuple(f for f in tracked if f in names)
+
+            old = dict(getattr(self, '_history_snapshot', None) or {})
+            missing = [f for f in tracked if f not in old]
+            if missing:
+                old.update(Task.all_objects.filter(pk=self.pk).values(*missing).first() or {})
+
+            changes = [
+                (f, old[f], self.__dict__.get(f))
+                for f in tracked
+                if f in old and old[f] != self.__dict__.get(f)
+            ]
 
         super().save(*args, **kwargs)
 
+        if changes:
+            TaskHistory.record_changes(self, changes)
+        self._history_snapshot = self._history_values()
+
     @property
     def is_overdue(self):
         """Check if task is overdue."""
@@ -468,6 +405,10 @@ class Task(SoftDeleteMixin, models.Model):
         return not self.is_overdue and (self.due_date - now).total_seconds() < 86400  # 24 hours
 
     class Meta:
+        indexes = [
+            # Calendar range scans on live tasks (api.calendar_events)
+            models.Index(fields=['due_date'], name='task_due_date_live_idx', condition=models.Q(is_deleted=False)),
+        ]
         constraints = [
             # Prevent multiple tasks from the same template for the same booking (ignores soft-deleted)
             models.UniqueConstraint(
@@ -478,6 +419,111 @@ class Task(SoftDeleteMixin, models.Model):
         ]
 
 
+class TaskHistory(models.Model):
+    """
+    Append-only change log for a task: one row per field change or event.
+
+    Replaces the JSON array in Task.history, which was re-read and rewritten
+    on every save. Rows are inserted by Task.save (field diffs) and by views
+    for events such as photo uploads; they are never updated.
+    """
+    # Task attributes diffed by Task.save, stored under their field name
+    TRACKED_FIELDS = (
+        'status', 'assigned_to_id', 'title', 'description', 'due_date', 'task_type', 'property_ref_id',
+    )
+    FIELD_LABELS = {'assigned_to': 'assignee', 'property_ref': 'property'}
+
+    task = models.ForeignKey('Task', on_delete=models.CASCADE, related_name='history_entries')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='task_history_entries')
+    actor_name = models.CharField(max_length=150, blank=True, help_text="Username at the time of the change")
+    field = models.CharField(max_length=50, blank=True, help_text="Changed field; blank for events")
+    old_value = models.TextField(blank=True)
+    new_value = models.TextField(blank=True)
+    message = models.TextField(blank=True, help_text="Event description when no single field changed")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='taskhist_task_created_idx'),
+            models.Index(fields=['actor', 'created_at'], name='taskhist_actor_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.as_text()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("TaskHistory entries are append-only")
+        super().save(*args, **kwargs)
+
+    def as_text(self):
+        """Render in the legacy "<iso timestamp>: <user> <change>" format"""
+        actor = self.actor_name or 'unknown'
+        if self.field:
+            label = self.FIELD_LABELS.get(self.field, self.field)
+            change = f"changed {label} from '{self.old_value}' to '{self.new_value}'"
+        else:
+            change = self.message
+        return f"{self.created_at.isoformat()}: {actor} {change}"
+
+    @classmethod
+    def log(cls, task, actor=None, message='', field='', old_value='', new_value=''):
+        """Append a single entry (events such as photo uploads)"""
+        return cls.objects.create(
+            task=task,
+            actor=actor,
+            actor_name=getattr(actor, 'username', '') or '',
+            field=field,
+            old_value=old_value,
+            new_value=new_value,
+            message=message,
+        )
+
+    @classmethod
+    def record_changes(cls, task, changes):
+        """Insert one row per (attname, old, new) change made by task.modified_by"""
+        modified_by_field = task._meta.get_field('modified_by')
+        actor_name = ''
+        if modified_by_field.is_cached(task) and task.modified_by is not None:
+            actor_name = task.modified_by.username
+        elif task.modified_by_id:
+            actor_name = User.objects.filter(pk=task.modified_by_id).values_list('username', flat=True).first() or ''
+
+        # Show usernames / property names rather than ids for relation changes
+        names = {}
+        user_ids = {v for f, old, new in changes if f == 'assigned_to_id' for v in (old, new) if v}
+        if user_ids:
+            names['assigned_to_id'] = dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'username'))
+        property_ids = {v for f, old, new in changes if f == 'property_ref_id' for v in (old, new) if v}
+        if property_ids:
+            names['property_ref_id'] = dict(Property.all_objects.filter(pk__in=property_ids).values_list('pk', 'name'))
+
+        def display(attname, value):
+            if value is None:
+                return 'unassigned' if attname == 'assigned_to_id' else 'None'
+            if attname in names:
+                return names[attname].get(value, str(value))
+            if hasattr(value, 'isoformat'):
+                return value.isoformat()
+            return str(value)
+
+        now = timezone.now()
+        cls.objects.bulk_create([
+            cls(
+                task=task,
+                actor_id=task.modified_by_id,
+                actor_name=actor_name,
+                field=attname[:-3] if attname.endswith('_id') else attname,
+                old_value=display(attname, old),
+                new_value=display(attname, new),
+                created_at=now,
+            )
+            for attname, old, new in changes
+        ])
+
+
 def task_image_upload_path(instance, filename):
     """Generate secure upload path for task images with UUID naming"""
     import os
@@ -497,6 +543,9 @@ def task_image_upload_path(instance, filename):
     task_id = instance.task.id if instance.task else 'staging'
     unique_filename = f"{uuid.uuid4().hex}{ext}"
     
+    # Raw uploads wait in a staging folder until the image worker replaces them
+    if getattr(instance, 'processing_status', None) in (TaskImage.PROCESSING_PENDING, TaskImage.PROCESSING_RUNNING):
+        return f'task_images/staging/{task_id}/{unique_filename}'
     return f'task_images/{task_id}/{unique_filename}'
 
 
@@ -536,8 +585,20 @@ class TaskImage(models.Model):
         ('archived', 'Archived'),
     ]
     
+    # Server-side optimization state (api/services/task_image_processing.py)
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_READY = 'ready'
+    PROCESSING_FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (PROCESSING_PENDING, 'Pending'),
+        (PROCESSING_RUNNING, 'Processing'),
+        (PROCESSING_READY, 'Ready'),
+        (PROCESSING_FAILED, 'Failed'),
+    ]
+    
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to=task_image_upload_path, validators=[validate_task_image])
+    image = models.ImageField(upload_to=task_image_upload_path, storage=get_blob_storage, validators=[validate_task_image])
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='uploaded_task_images')
     # Optional link to a specific checklist response when the image originates from checklist UI
@@ -582,6 +643,21 @@ class TaskImage(models.Model):
     width = models.PositiveIntegerField(null=True, blank=True, help_text="Image width in pixels")  
     height = models.PositiveIntegerField(null=True, blank=True, help_text="Image height in pixels")
     original_size_bytes = models.PositiveIntegerField(null=True, blank=True, help_text="Original upload size before optimization")
+    
+    # Uploads are stored raw and optimized off-request; clients poll this until "ready"
+    processing_status = models.CharField(
+        max_length=16,
+        choices=PROCESSING_STATUS_CHOICES,
+        default=PROCESSING_READY,
+        help_text="Optimization state of the stored image"
+    )
+    processing_error = models.TextField(blank=True, help_text="Why optimization failed, if it did")
+    processing_started_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="When a worker claimed the image; stale claims are reclaimed"
+    )
+    # Names the thumbnail/medium renditions (api.image_renditions); empty until generated
+    content_digest = models.CharField(max_length=64, blank=True, db_index=True, help_text="SHA-256 of the stored image")
 
     class Meta:
         ordering = ['task', 'photo_type', 'sequence_number', 'uploaded_at']
@@ -591,6 +667,7 @@ class TaskImage(models.Model):
             models.Index(fields=['photo_status']),
             models.Index(fields=['uploaded_at']),
             models.Index(fields=['checklist_response']),
+            models.Index(fields=['processing_status', 'uploaded_at'], name='taskimage_processing_idx'),
         ]
 
     def __str__(self):
@@ -834,37 +911,30 @@ class Profile(models.Model):
         """
         Check if user has a specific permission
         Priority: User Override > Role Permission > Baseline Role > Default Deny
+
+        Resolved against the compiled permission map (see api.permission_cache),
+        so repeated checks within a request, and across requests while the
+        cache is warm, do not hit the database. Expired overrides are ignored.
         """
-        from django.utils import timezone
-        
-        # Check for user-specific override first
-        try:
-            override = self.user.permission_overrides.get(
-                permission__name=permission_name,
-                permission__is_active=True
-            )
-            # Check if override is expired
-            if override.expires_at and timezone.now() > override.expires_at:
-                override.delete()  # Clean up expired override
-            else:
-                return override.granted
-        except UserPermissionOverride.DoesNotExist:
-            pass
-        
-        # Check role-based permission
-        try:
-            role_perm = RolePermission.objects.get(
-                role=self.role,
-                permission__name=permission_name,
-                permission__is_active=True
-            )
-            return role_perm.granted
-        except RolePermission.DoesNotExist:
-            # Only use baseline if no explicit role permission is defined
-            baseline_perms = self._get_baseline_role_permissions()
-            if permission_name in baseline_perms:
-                return baseline_perms[permission_name]
-        
+        from .permission_cache import get_permission_map, resolve_override
+
+        entry = get_permission_map(self).get(permission_name)
+        if entry is not None:
+            # Check for user-specific override first
+            override_granted = resolve_override(entry)
+            if override_granted is not None:
+                return override_granted
+
+            # Check role-based permission
+            role_granted = entry[0]
+            if role_granted is not None:
+                return role_granted
+
+        # Only use baseline if no explicit role permission is defined
+        baseline_perms = self._get_baseline_role_permissions()
+        if permission_name in baseline_perms:
+            return baseline_perms[permission_name]
+
         # Default deny
         return False
     
@@ -882,39 +952,32 @@ class Profile(models.Model):
         """
         Check if user can grant/revoke a specific permission to others
         """
-        try:
-            role_perm = RolePermission.objects.get(
-                role=self.role,
-                permission__name=permission_name,
-                permission__is_active=True
-            )
-            return role_perm.granted and role_perm.can_delegate
-        except RolePermission.DoesNotExist:
+        from .permission_cache import get_permission_map
+
+        entry = get_permission_map(self).get(permission_name)
+        if entry is None or entry[0] is None:
             return False
+        return entry[0] and bool(entry[1])
     
     def get_all_permissions(self):
         """
         Get all permissions for this user (both role-based and overrides)
         Returns dict with permission names as keys and granted status as values
         """
+        from .permission_cache import get_permission_map, resolve_override
+
         # Start with baseline role permissions
         permissions = self._get_baseline_role_permissions().copy()
         
-        # Override with role permissions from database
-        for role_perm in RolePermission.objects.filter(
-            role=self.role,
-            permission__is_active=True
-        ):
-            permissions[role_perm.permission.name] = role_perm.granted
-        
-        # Apply user overrides (these take precedence)
-        for override in self.user.permission_overrides.filter(
-            permission__is_active=True
-        ):
-            # Skip expired overrides
-            if override.expires_at and timezone.now() > override.expires_at:
-                continue
-            permissions[override.permission.name] = override.granted
+        now_ts = timezone.now().timestamp()
+        for name, entry in get_permission_map(self).items():
+            # Override with role permissions from database
+            if entry[0] is not None:
+                permissions[name] = entry[0]
+            # Apply user overrides (these take precedence); expired ones are skipped
+            override_granted = resolve_override(entry, now_ts)
+            if override_granted is not None:
+                permissions[name] = override_granted
         
         return permissions
     
@@ -1336,30 +1399,75 @@ class TaskChecklist(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     completed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     
+    # Denormalized progress counters, kept in step with ChecklistResponse rows
+    # by refresh_counters() (see ChecklistResponse.save and the signal receivers)
+    items_total = models.PositiveIntegerField(default=0)
+    items_completed = models.PositiveIntegerField(default=0)
+    required_total = models.PositiveIntegerField(default=0)
+    required_completed = models.PositiveIntegerField(default=0)
+    
+    COUNTER_FIELDS = ('items_total', 'items_completed', 'required_total', 'required_completed')
+    
+    @classmethod
+    def counter_expressions(cls):
+        """Subquery counts over responses for each counter field"""
+        from django.db.models import Count, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+
+        def count(**filters):
+            responses = (ChecklistResponse.objects.filter(checklist=OuterRef('pk'), **filters)
+                         .order_by().values('checklist').annotate(n=Count('pk')).values('n'))
+            return Coalesce(Subquery(responses), 0)
+        return {
+            'items_total': count(),
+            'items_completed': count(is_completed=True),
+            'required_total': count(item__is_required=True),
+            'required_completed': count(item__is_required=True, is_completed=True),
+        }
+    
+    @classmethod
+    def refresh_counters(cls, checklists):
+        """
+        Recompute counters for checklist ids (or a queryset) with one UPDATE
+
+        The checklist rows are locked first, in pk order. The UPDATE is then a
+        new statement whose counts see every response committed by a writer
+        that held the lock before us; counting under the UPDATE's own row
+        lock would use the snapshot taken before waiting and could store a
+        count missing the other writer's response.
+        """
+        if not isinstance(checklists, models.QuerySet):
+            checklists = [pk for pk in checklists if pk is not None]
+            if not checklists:
+                return 0
+        with transaction.atomic():
+            locked = list(cls.objects.filter(pk__in=checklists).order_by('pk')
+                          .select_for_update().values_list('pk', flat=True))
+            if not locked:
+                return 0
+            return cls.objects.filter(pk__in=locked).update(**cls.counter_expressions())
+    
     @property
     def is_completed(self):
         """Check if all required items are completed."""
-        required_items = self.responses.filter(item__is_required=True)
-        return all(response.is_completed for response in required_items)
+        return self.required_completed >= self.required_total
     
     @property
     def completion_percentage(self):
         """Calculate completion percentage."""
-        total_required = self.responses.filter(item__is_required=True).count()
-        if total_required == 0:
+        if self.required_total == 0:
             return 100
-        completed_required = self.responses.filter(item__is_required=True, is_completed=True).count()
-        return int((completed_required / total_required) * 100)
+        return int((self.required_completed / self.required_total) * 100)
     
     @property
     def total_items(self):
         """Total number of checklist items."""
-        return self.responses.count()
+        return self.items_total
     
     @property
     def completed_items(self):
         """Number of completed checklist items."""
-        return self.responses.filter(is_completed=True).count()
+        return self.items_completed
     
     @property
     def remaining_items(self):
@@ -1388,6 +1496,27 @@ class ChecklistResponse(models.Model):
     class Meta:
         unique_together = ['checklist', 'item']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_counter_state = (instance.__dict__.get('checklist_id'), instance.__dict__.get('is_completed'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Save and keep the parent checklist's progress counters in the same transaction"""
+        previous = getattr(self, '_loaded_counter_state', None)
+        current = (self.checklist_id, self.is_completed)
+        if previous == current and not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            TaskChecklist.refresh_counters({self.checklist_id, previous[0] if previous else None})
+        self._loaded_counter_state = current
+        # keep an already-loaded parent in step with the new counters
+        checklist = self._state.fields_cache.get('checklist')
+        if checklist is not None:
+            checklist.refresh_from_db(fields=TaskChecklist.COUNTER_FIELDS)
+    
     def __str__(self):
         status = "✓" if self.is_completed else "○"
         return f"{status} {self.item.title}"
@@ -1396,10 +1525,12 @@ class ChecklistResponse(models.Model):
 class ChecklistPhoto(models.Model):
     """Photos attached to checklist responses."""
     response = models.ForeignKey(ChecklistResponse, on_delete=models.CASCADE, related_name='photos')
-    image = models.ImageField(upload_to='checklist_photos/%Y/%m/')
+    image = models.ImageField(upload_to='checklist_photos/%Y/%m/', storage=get_blob_storage)
     caption = models.CharField(max_length=200, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Names the thumbnail/medium renditions (api.image_renditions); empty until generated
+    content_digest = models.CharField(max_length=64, blank=True, db_index=True, help_text="SHA-256 of the stored image")
     
     def __str__(self):
         return f"Photo for {self.response.item.title}"
@@ -1871,7 +2002,7 @@ class LostFoundItem(models.Model):
 class LostFoundPhoto(models.Model):
     """Photos of lost & found items."""
     item = models.ForeignKey(LostFoundItem, on_delete=models.CASCADE, related_name='photos')
-    image = models.ImageField(upload_to='lost_found/%Y/%m/')
+    image = models.ImageField(upload_to='lost_found/%Y/%m/', storage=get_blob_storage)
     caption = models.CharField(max_length=200, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -2097,9 +2228,37 @@ class BookingImportTemplate(models.Model):
 
 
 class BookingImportLog(models.Model):
-    """Log of booking import operations."""
+    """Log of booking import operations (also the job record for background imports)."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ENGINE_BASIC = 'basic'
+    ENGINE_ENHANCED = 'enhanced'
+    ENGINE_STREAMING = 'streaming'
+    ENGINE_CHOICES = [
+        (ENGINE_BASIC, 'Basic import'),
+        (ENGINE_ENHANCED, 'Enhanced import'),
+        (ENGINE_STREAMING, 'Enhanced streaming import'),
+    ]
+    
     template = models.ForeignKey(BookingImportTemplate, on_delete=models.CASCADE, related_name='import_logs', null=True, blank=True)
-    import_file = models.FileField(upload_to='booking_imports/%Y/%m/', null=True, blank=True)
+    import_file = models.FileField(upload_to='booking_imports/%Y/%m/', storage=get_blob_storage, null=True, blank=True)
+    
+    # Background job state (synchronous imports are recorded as completed)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_COMPLETED, db_index=True)
+    sheet_name = models.CharField(max_length=100, default='Cleaning schedule')
+    engine = models.CharField(max_length=16, choices=ENGINE_CHOICES, default=ENGINE_STREAMING,
+                              help_text="Import engine a background job runs, as chosen by the caller")
+    progress = models.JSONField(default=dict, blank=True, help_text="Per-chunk progress and final result summary")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
     
     # Results
     total_rows = models.IntegerField(default=0)
@@ -2312,14 +2471,16 @@ class AuditEvent(models.Model):
     user_agent = models.TextField(blank=True, help_text="User agent string from the request")
     
     # Timestamp
-    created_at = models.DateTimeField(auto_now_add=True, help_text="When the audit event was recorded")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the audited change was made")
     
     class Meta:
         verbose_name = "Audit Event"
         verbose_name_plural = "Audit Events"
         ordering = ['-created_at']
+        # On PostgreSQL the table is partitioned by month on created_at (see api.audit_storage)
         indexes = [
-            models.Index(fields=['object_type', 'object_id']),
+            # Per-object timelines and admin object filters
+            models.Index(fields=['object_type', 'object_id', '-created_at'], name='audit_object_timeline_idx'),
             models.Index(fields=['action']),
             models.Index(fields=['actor']),
             models.Index(fields=['created_at']),
@@ -2362,6 +2523,32 @@ class PasswordResetLog(models.Model):
         return f"{self.user.username} - {self.get_event_type_display()} - {self.timestamp}"
 
 
+# =============================================================================
+# CONTENT-ADDRESSED FILE STORAGE
+# =============================================================================
+
+class StoredBlob(models.Model):
+    """
+    One stored upload shared by every file field value with the same bytes.
+    Maintained by api.blob_storage.ContentAddressedStorage.
+    """
+    key = models.CharField(max_length=255, unique=True, help_text="Content-addressed name requested from storage")
+    name = models.CharField(max_length=255, db_index=True, help_text="Name the storage backend stored it under")
+    digest = models.CharField(max_length=64, db_index=True, help_text="SHA-256 of the stored bytes")
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0, help_text="File field values pointing at this blob")
+    created_at = models.DateTimeField(auto_now_add=True)
+    released_at = models.DateTimeField(null=True, blank=True, help_text="When ref_count last dropped to zero")
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'released_at'], name='storedblob_released_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
 # =============================================================================
 # SECURITY MODELS (JWT & Session Management)
 # =============================================================================
@@ -2370,7 +2557,7 @@ class PasswordResetLog(models.Model):
 from .security_models import UserSession, SecurityEvent, SuspiciousActivity
 
 # Import chat models
-from .models_chat import ChatRoom, ChatParticipant, ChatMessage, ChatTypingIndicator
+from .models_chat import ChatRoom, ChatParticipant, ChatMessage, ChatMessageTerm, ChatTypingIndicator
 
 
 # =============================================================================
@@ -2514,10 +2701,86 @@ class IdempotencyKey(models.Model):
         return deleted
 
 
+# =============================================================================
+# MOBILE DELTA SYNC
+# =============================================================================
+
+class SyncChange(models.Model):
+    """
+    Append-only log of writes to the entities the mobile app syncs (see
+    api.mobile_sync). ``seq`` is the change sequence that sync cursors point
+    into; rows are never updated and are pruned after the retention window.
+    """
+    ENTITY_TASK = 'task'
+    ENTITY_CHECKLIST_RESPONSE = 'checklist_response'
+    ENTITY_BOOKING = 'booking'
+    ENTITY_NOTIFICATION = 'notification'
+    ENTITY_CHOICES = [
+        (ENTITY_TASK, 'Task'),
+        (ENTITY_CHECKLIST_RESPONSE, 'Checklist response'),
+        (ENTITY_BOOKING, 'Booking'),
+        (ENTITY_NOTIFICATION, 'Notification'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=32, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="User to notify of the change; empty for everyone who can see the object"
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="User who made the change, when known"
+    )
+    deleted = models.BooleanField(default=False, help_text="Object was deleted or soft-deleted")
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'seq'], name='syncchange_user_seq_idx'),
+            models.Index(fields=['entity', 'object_id', 'seq'], name='syncchange_object_seq_idx'),
+            models.Index(fields=['changed_at'], name='syncchange_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.entity} {self.object_id}"
+
+    @classmethod
+    def cleanup_old_changes(cls, days=30):
+        """Remove changes older than the specified number of days (raw delete: no dependants)"""
+        cutoff = timezone.now() - timedelta(days=days)
+        stale = cls.objects.filter(changed_at__lt=cutoff)
+        return stale._raw_delete(stale.db)
+
+
 # =============================================================================
 # SIGNAL RECEIVERS
 # =============================================================================
 
+@receiver(post_delete, sender=ChecklistResponse)
+def refresh_checklist_counters_on_delete(sender, instance, **kwargs):
+    """Deletes (including cascades) go through post_delete, not ChecklistResponse.save"""
+    TaskChecklist.refresh_counters([instance.checklist_id])
+
+
+@receiver(post_save, sender=ChecklistItem)
+def refresh_checklist_counters_on_item_change(sender, instance, created, update_fields=None, **kwargs):
+    """is_required feeds the required_* counters of every checklist using the item"""
+    if not created and (update_fields is None or 'is_required' in update_fields):
+        TaskChecklist.refresh_counters(
+            TaskChecklist.objects.filter(responses__item=instance).values('pk')
+        )
+
+
 # Agent's recommendation: Prevent self-dependency in Task.depends_on
 @receiver(m2m_changed, sender=Task.depends_on.through)
 def prevent_task_self_dependency(sender, instance, action, pk_set, **kwargs):
@@ -4,13 +4,80 @@ Chat System Models for Cosmo
 Supports one-on-one and group chats with real-time messaging
 """
 
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Case, Count, Exists, OuterRef, Prefetch, Q, Subquery, When
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 import uuid
 
 
+def _count(queryset, group_by):
+    """Coalesce(Subquery(COUNT(*))) for a queryset correlated on ``group_by``"""
+    counted = queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counted), 0)
+
+
+def unread_count_expression(room_field, last_read_field, user):
+    """
+    Unread messages as an annotation, mirroring ChatRoom.get_unread_count:
+    every live message when ``last_read_field`` is NULL, otherwise newer
+    messages from other senders. Field names refer to the annotated query;
+    ``user`` is a user or an OuterRef().
+    """
+    live = ChatMessage.objects.filter(room=OuterRef(room_field), is_deleted=False)
+    since_read = live.filter(created_at__gt=OuterRef(last_read_field)).exclude(sender=user)
+    return Case(
+        When(**{f'{last_read_field}__isnull': True}, then=_count(live, 'room')),
+        default=_count(since_read, 'room'),
+    )
+
+
+class ChatRoomQuerySet(models.QuerySet):
+
+    def for_participant(self, user):
+        """Rooms the user currently takes part in (EXISTS, so no DISTINCT needed)"""
+        return self.filter(Exists(
+            ChatParticipant.objects.filter(room=OuterRef('pk'), user=user, left_at__isnull=True)
+        ))
+
+    def with_inbox(self, user):
+        """
+        Annotate per-room inbox data for ``user`` in a constant number of queries:
+        ``inbox_unread_count`` and ``inbox_participant_count`` as subqueries,
+        the latest live message prefetched (sliced per room) into
+        ``inbox_last_message`` and every participant, for display names, into
+        ``inbox_participants``.
+        """
+        my_last_read = ChatParticipant.objects.filter(room=OuterRef('pk'), user=user).values('last_read_at')[:1]
+        active = ChatParticipant.objects.filter(room=OuterRef('pk'), left_at__isnull=True)
+        last_message = (ChatMessage.objects.filter(is_deleted=False)
+                        .select_related('sender', 'reply_to__sender').order_by('-created_at'))
+        return self.annotate(
+            inbox_last_read_at=Subquery(my_last_read),
+            inbox_participant_count=_count(active, 'room'),
+        ).annotate(
+            inbox_unread_count=Case(
+                # not a participant at all: nothing is unread
+                When(~Exists(ChatParticipant.objects.filter(room=OuterRef('pk'), user=user)), then=0),
+                default=unread_count_expression('pk', 'inbox_last_read_at', user),
+            ),
+        ).prefetch_related(
+            Prefetch('messages', queryset=last_message[:1], to_attr='inbox_last_message'),
+            Prefetch('participants', queryset=ChatParticipant.objects.select_related('user'),
+                     to_attr='inbox_participants'),
+        )
+
+
+class ChatParticipantQuerySet(models.QuerySet):
+
+    def with_unread_counts(self):
+        """Annotate ``inbox_unread_count`` for each participant row"""
+        return self.annotate(inbox_unread_count=unread_count_expression('room', 'last_read_at', OuterRef('user')))
+
+
 class ChatRoom(models.Model):
     """
     Represents a chat room (one-on-one or group).
@@ -40,6 +107,8 @@ class ChatRoom(models.Model):
     is_active = models.BooleanField(default=True)
     archived_at = models.DateTimeField(null=True, blank=True)
     
+    objects = ChatRoomQuerySet.as_manager()
+    
     class Meta:
         app_label = 'api'
         ordering = ['-modified_at']
@@ -65,9 +134,12 @@ class ChatRoom(models.Model):
         
         if self.room_type == 'direct' and for_user:
             # For direct messages, show the other person's name
-            other_participants = self.participants.exclude(user=for_user)
-            if other_participants.exists():
-                other_user = other_participants.first().user
+            if hasattr(self, 'inbox_participants'):  # prefetched by ChatRoomQuerySet.with_inbox
+                other = next((p for p in self.inbox_participants if p.user_id != for_user.pk), None)
+            else:
+                other = self.participants.exclude(user=for_user).select_related('user').first()
+            if other:
+                other_user = other.user
                 return f"{other_user.get_full_name() or other_user.username}"
         
         if self.task:
@@ -79,6 +151,8 @@ class ChatRoom(models.Model):
     
     def get_last_message(self):
         """Get the most recent message in this room"""
+        if hasattr(self, 'inbox_last_message'):  # prefetched by ChatRoomQuerySet.with_inbox
+            return self.inbox_last_message[0] if self.inbox_last_message else None
         return self.messages.filter(is_deleted=False).first()
     
     def get_unread_count(self, user):
@@ -118,6 +192,8 @@ class ChatParticipant(models.Model):
     # Soft delete
     left_at = models.DateTimeField(null=True, blank=True)
     
+    objects = ChatParticipantQuerySet.as_manager()
+    
     class Meta:
         app_label = 'api'
         unique_together = [['room', 'user']]
@@ -201,6 +277,9 @@ class ChatMessage(models.Model):
     # Read receipts (stored as JSON for scalability)
     read_by = models.JSONField(default=dict, help_text="User IDs and timestamps who have read this message")
     
+    # Full-text search (api.chat_search): maintained by a database trigger on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         app_label = 'api'
         ordering = ['-created_at']
@@ -235,6 +314,23 @@ class ChatMessage(models.Model):
         self.save(update_fields=['is_deleted', 'deleted_at', 'content'])
 
 
+class ChatMessageTerm(models.Model):
+    """
+    Inverted index entry for chat search on databases without tsvector
+    (api.chat_search): one row per distinct term in a live message.
+    """
+    message = models.ForeignKey(ChatMessage, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        app_label = 'api'
+        unique_together = [['term', 'message']]
+        
+    def __str__(self):
+        return f"{self.term} in {self.message_id}"
+
+
 class ChatTypingIndicator(models.Model):
     """
     Temporary model to track who is currently typing in a room.
@@ -17,6 +17,9 @@ from django.core.cache import cache
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from api.models import Task, Notification
+from backend.memory_middleware import get_memory_governor
+from api.audit_writer import get_audit_writer
+from backend.request_profiling import get_request_stats, load_profile
 
 User = get_user_model()
 
@@ -100,6 +103,15 @@ class DetailedHealthCheckView(View):
             
             # Log analysis
             health_data['metrics']['logs'] = self._get_log_metrics()
+
+            # Memory governor decisions for this worker process
+            health_data['metrics']['memory_governor'] = get_memory_governor().snapshot()
+
+            # Write-behind audit buffer counters
+            health_data['metrics']['audit_writer'] = get_audit_writer().snapshot()
+
+            # Per-endpoint latency histograms and query counts for this worker process
+            health_data['metrics']['endpoints'] = get_request_stats().snapshot()
             
             # Performance metrics
             health_data['metrics']['performance'] = {
@@ -365,6 +377,20 @@ class DetailedHealthCheckView(View):
             return {'error': str(e)}
 
 
+@staff_member_required
+def request_profile(request, profile_id):
+    """
+    Sampled stacks of a request profiled with the X-Profile-Request header (superusers only,
+    like the profiling itself)
+    """
+    if not request.user.is_superuser:
+        return JsonResponse({'error': 'Superuser access required'}, status=403)
+    profile = load_profile(profile_id)
+    if profile is None:
+        return JsonResponse({'error': 'Profile not found or expired'}, status=404)
+    return JsonResponse(profile)
+
+
 @csrf_exempt
 def log_client_error(request):
     """
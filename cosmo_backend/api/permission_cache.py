@@ -0,0 +1,166 @@
+# api/permission_cache.py
+"""
+Compiled per-user permission maps for Profile.has_permission.
+
+A user's effective role permissions and overrides are fetched with a single
+query, compiled into a dict keyed by permission name and stored in two tiers:
+
+- request scope: memoized on the Profile instance (``request.user.profile``
+  lives for exactly one request), so repeated checks cost nothing;
+- cross request: stored in the configured cache backend under a versioned
+  key, so other requests and workers skip the query entirely.
+
+Invalidation is done by version bumps instead of key deletes: any write to
+CustomPermission or RolePermission bumps the global version, and a write to
+a UserPermissionOverride bumps that user's version. Stale entries simply stop
+being addressed and age out through PERMISSION_CACHE_TIMEOUT.
+
+Override expiry is evaluated lazily at read time; expired overrides are
+ignored (falling through to the role/baseline decision) and never deleted on
+the read path.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'permmap'
+GLOBAL_VERSION_KEY = f'{CACHE_PREFIX}:version'
+PERMISSION_CACHE_TIMEOUT = getattr(settings, 'PERMISSION_CACHE_TIMEOUT', 300)
+
+# Process-local generation counter. Bumped alongside the shared cache version
+# so request-scoped maps memoized on Profile instances are dropped immediately
+# after an in-process write, even when the cache backend is a DummyCache.
+_local_generation = 0
+
+_MEMO_ATTR = '_compiled_permission_map'
+
+
+def _user_version_key(user_id):
+    return f'{CACHE_PREFIX}:user:{user_id}:version'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key) or 1
+    return version
+
+
+def _bump_version(key):
+    global _local_generation
+    _local_generation += 1
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key missing (or evicted): start a new version sequence
+        cache.set(key, 2, None)
+    except Exception as exc:  # pragma: no cover - cache outage must not break writes
+        logger.warning("Could not bump permission cache version %s: %s", key, exc)
+
+
+def invalidate_all():
+    """Invalidate every compiled permission map (role/permission changes)."""
+    _bump_version(GLOBAL_VERSION_KEY)
+
+
+def invalidate_user(user_id):
+    """Invalidate the compiled permission map for a single user."""
+    _bump_version(_user_version_key(user_id))
+
+
+def compile_permission_map(user_id, role):
+    """
+    Build the permission map for a user with a single query.
+
+    Returns a dict ``{name: (role_granted, role_can_delegate, override_granted,
+    override_expires_ts)}`` containing only active permissions that have a
+    RolePermission for ``role`` and/or an override for ``user_id``. Missing
+    parts are ``None``; expiry is stored as a POSIX timestamp so the map stays
+    cheap to pickle.
+    """
+    from .models import CustomPermission, RolePermission, UserPermissionOverride
+
+    role_perm = RolePermission.objects.filter(role=role, permission=OuterRef('pk'))
+    override = UserPermissionOverride.objects.filter(user_id=user_id, permission=OuterRef('pk'))
+
+    rows = (
+        CustomPermission.objects.filter(is_active=True)
+        .annotate(
+            role_granted=Subquery(role_perm.values('granted')[:1]),
+            role_can_delegate=Subquery(role_perm.values('can_delegate')[:1]),
+            override_granted=Subquery(override.values('granted')[:1]),
+            override_expires_at=Subquery(override.values('expires_at')[:1]),
+        )
+        .filter(Q(role_granted__isnull=False) | Q(override_granted__isnull=False))
+        .values_list('name', 'role_granted', 'role_can_delegate',
+                     'override_granted', 'override_expires_at')
+        .order_by()
+    )
+
+    compiled = {}
+    for name, role_granted, can_delegate, override_granted, expires_at in rows:
+        compiled[name] = (
+            role_granted,
+            can_delegate,
+            override_granted,
+            expires_at.timestamp() if expires_at else None,
+        )
+    return compiled
+
+
+def get_permission_map(profile):
+    """Return the compiled permission map for ``profile`` (memoized, cached)."""
+    memo = getattr(profile, _MEMO_ATTR, None)
+    if memo is not None:
+        generation, role, compiled = memo
+        if generation == _local_generation and role == profile.role:
+            return compiled
+
+    user_id = profile.user_id
+    key = (
+        f'{CACHE_PREFIX}:{_get_version(GLOBAL_VERSION_KEY)}:'
+        f'{_get_version(_user_version_key(user_id))}:{user_id}:{profile.role}'
+    )
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_permission_map(user_id, profile.role)
+        cache.set(key, compiled, PERMISSION_CACHE_TIMEOUT)
+
+    setattr(profile, _MEMO_ATTR, (_local_generation, profile.role, compiled))
+    return compiled
+
+
+def resolve_override(entry, now_ts=None):
+    """Return the override decision from a map entry, or None if absent/expired."""
+    _, _, override_granted, expires_ts = entry
+    if override_granted is None:
+        return None
+    if expires_ts is not None:
+        if now_ts is None:
+            now_ts = timezone.now().timestamp()
+        if now_ts > expires_ts:
+            return None
+    return override_granted
+
+
+@receiver(post_save, sender='api.CustomPermission')
+@receiver(post_delete, sender='api.CustomPermission')
+@receiver(post_save, sender='api.RolePermission')
+@receiver(post_delete, sender='api.RolePermission')
+def _invalidate_on_permission_change(sender, **kwargs):
+    invalidate_all()
+
+
+@receiver(post_save, sender='api.UserPermissionOverride')
+@receiver(post_delete, sender='api.UserPermissionOverride')
+def _invalidate_on_override_change(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
@@ -0,0 +1,268 @@
+# api/property_autocomplete.py
+"""
+Property autocomplete for the search endpoint and the property pickers.
+
+property_search used to run ``icontains`` + COUNT + OFFSET for every
+keystroke, and the task form / calendar filters rendered every property into
+a <select>. Here:
+
+- matches are ranked: name prefix, then a word in the name starting with the
+  query, then an address (word) prefix, then any other substring; ties are
+  ordered by lower-cased name and id;
+- pages are keyset cursors over (rank, name, id) instead of OFFSET, and the
+  total is only reported when it is free (in-process backend);
+- there are two backends, picked by PROPERTY_AUTOCOMPLETE_BACKEND:
+  ``trigram`` queries the database, whose pg_trgm GIN indexes (migration
+  0088) serve the ``UPPER(col) LIKE`` lookups that ``icontains`` and
+  ``istartswith`` compile to; ``memory`` ranks a process-local copy of
+  (id, name, address) and needs no database extension. ``auto`` uses
+  ``trigram`` on PostgreSQL and ``memory`` elsewhere;
+- first pages of short ("hot") queries are cached per cache version; any
+  Property save/delete bumps the version, which also rebuilds the in-process
+  index. Queryset ``update()`` calls bypass the signals and are only picked
+  up when cached pages expire (PROPERTY_AUTOCOMPLETE_CACHE_TIMEOUT).
+"""
+
+import base64
+import bisect
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.forms import Select
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'propac'
+VERSION_KEY = f'{CACHE_PREFIX}:version'
+PROPERTY_AUTOCOMPLETE_BACKEND = getattr(settings, 'PROPERTY_AUTOCOMPLETE_BACKEND', 'auto')
+PROPERTY_AUTOCOMPLETE_CACHE_TIMEOUT = getattr(settings, 'PROPERTY_AUTOCOMPLETE_CACHE_TIMEOUT', 300)
+# Queries up to this many characters have their first page cached
+HOT_PREFIX_LENGTH = getattr(settings, 'PROPERTY_AUTOCOMPLETE_HOT_PREFIX_LENGTH', 3)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+RANK_NAME_PREFIX = 0
+RANK_NAME_WORD = 1
+RANK_ADDRESS = 2
+RANK_SUBSTRING = 3
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# ---------------- cache version ----------------
+# Process-local generation so MemoryBackend rebuilds after an in-process write even
+# with a DummyCache; cache keys use the shared version only, so workers share pages
+_local_generation = 0
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY) or 1
+    return version
+
+
+def invalidate_all():
+    """Drop cached pages and the in-process index (any Property write can reorder results)"""
+    global _local_generation
+    _local_generation += 1
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+    except Exception as exc:  # pragma: no cover - cache outage must not break writes
+        logger.warning("Could not bump property autocomplete version: %s", exc)
+
+
+@receiver(post_save, sender='api.Property')
+@receiver(post_delete, sender='api.Property')
+def _invalidate_on_write(sender, **kwargs):
+    invalidate_all()
+
+
+# ---------------- cursors ----------------
+def encode_cursor(key):
+    raw = json.dumps(list(key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(rank, sort_name, id) from an encoded cursor; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, sort_name, pk = json.loads(raw)
+        return int(rank), str(sort_name), int(pk)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor('Invalid cursor') from exc
+
+
+# ---------------- ranking ----------------
+def rank(query, name, address):
+    """Rank of a property for a lower-cased query (None when it does not match)"""
+    if not query:
+        return RANK_NAME_PREFIX
+    if name.startswith(query):
+        return RANK_NAME_PREFIX
+    if f' {query}' in name:
+        return RANK_NAME_WORD
+    if address.startswith(query) or f' {query}' in address:
+        return RANK_ADDRESS
+    if query in name or query in address:
+        return RANK_SUBSTRING
+    return None
+
+
+def _rank_expression(query):
+    return Case(
+        When(name__istartswith=query, then=Value(RANK_NAME_PREFIX)),
+        When(name__icontains=f' {query}', then=Value(RANK_NAME_WORD)),
+        When(Q(address__istartswith=query) | Q(address__icontains=f' {query}'), then=Value(RANK_ADDRESS)),
+        default=Value(RANK_SUBSTRING),
+        output_field=IntegerField(),
+    )
+
+
+# ---------------- backends ----------------
+class TrigramBackend:
+    """Ranked keyset queries against the (trigram-indexed) property table"""
+
+    def search(self, query, limit, after=None, offset=0):
+        from .models import Property
+
+        properties = Property.objects.filter(is_deleted=False)
+        if query:
+            properties = properties.filter(Q(name__icontains=query) | Q(address__icontains=query))
+            properties = properties.annotate(ac_rank=_rank_expression(query))
+        else:
+            properties = properties.annotate(ac_rank=Value(RANK_NAME_PREFIX, output_field=IntegerField()))
+        properties = properties.annotate(ac_name=Lower('name')).order_by('ac_rank', 'ac_name', 'id')
+        if after is not None:
+            after_rank, after_name, after_id = after
+            properties = properties.filter(
+                Q(ac_rank__gt=after_rank)
+                | Q(ac_rank=after_rank, ac_name__gt=after_name)
+                | Q(ac_rank=after_rank, ac_name=after_name, id__gt=after_id)
+            )
+        rows = list(properties.values_list('ac_rank', 'ac_name', 'id', 'name')[offset:offset + limit + 1])
+        return rows, None
+
+
+class MemoryBackend:
+    """Ranks an in-process copy of every live property, rebuilt when the cache version moves"""
+
+    def __init__(self):
+        self._version = None
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def entries(self):
+        version = (_get_version(), _local_generation)
+        if version != self._version:
+            from .models import Property
+
+            with self._lock:
+                if version != self._version:
+                    rows = Property.objects.filter(is_deleted=False).values_list('id', 'name', 'address')
+                    self._entries = sorted(
+                        (name.lower(), pk, name, (address or '').lower()) for pk, name, address in rows
+                    )
+                    self._version = version
+        return self._entries
+
+    def search(self, query, limit, after=None, offset=0):
+        matches = []
+        for sort_name, pk, name, address in self.entries():
+            match_rank = rank(query, sort_name, address)
+            if match_rank is not None:
+                matches.append((match_rank, sort_name, pk, name))
+        matches.sort()
+        start = bisect.bisect_right(matches, after, key=lambda row: row[:3]) if after is not None else 0
+        start += offset
+        return matches[start:start + limit + 1], len(matches)
+
+
+_backends = {'trigram': TrigramBackend(), 'memory': MemoryBackend()}
+
+
+def get_backend(name=None):
+    name = name or PROPERTY_AUTOCOMPLETE_BACKEND
+    if name == 'auto':
+        name = 'trigram' if connection.vendor == 'postgresql' else 'memory'
+    return _backends[name]
+
+
+# ---------------- search ----------------
+def search(query='', limit=DEFAULT_LIMIT, cursor=None, offset=0, backend=None):
+    """
+    One page of ranked matches for ``query``.
+
+    Returns {'results': [{id, name, display}], 'has_more', 'next_cursor',
+    'total'}; ``total`` is None when counting would need another query.
+    ``offset`` only serves the legacy ``page`` parameter.
+    """
+    query = ' '.join(query.split()).lower()
+    limit = max(1, min(limit, MAX_LIMIT))
+    after = decode_cursor(cursor) if cursor else None
+    backend = get_backend(backend)
+
+    cache_key = None
+    if after is None and not offset and len(query) <= HOT_PREFIX_LENGTH:
+        cache_key = (f'{CACHE_PREFIX}:{_get_version()}:{type(backend).__name__}:'
+                     f'{limit}:{base64.urlsafe_b64encode(query.encode()).decode()}')
+        page = cache.get(cache_key)
+        if page is not None:
+            return page
+
+    rows, total = backend.search(query, limit, after=after, offset=offset)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page = {
+        'results': [{'id': pk, 'name': name, 'display': name} for _, _, pk, name in rows],
+        'has_more': has_more,
+        'next_cursor': encode_cursor(rows[-1][:3]) if has_more else None,
+        'total': total,
+    }
+    if cache_key:
+        cache.set(cache_key, page, PROPERTY_AUTOCOMPLETE_CACHE_TIMEOUT)
+    return page
+
+
+# ---------------- pickers ----------------
+class PropertyAutocompleteSelect(Select):
+    """
+    Property <select> that renders only the chosen option; property-autocomplete.js
+    fetches the rest from the search endpoint. Validation still uses the field's queryset.
+    """
+
+    def __init__(self, attrs=None, choices=()):
+        attrs = {'data-property-autocomplete': '', **(attrs or {})}
+        super().__init__(attrs, choices)
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [v for v in value if str(v).isdigit()]
+        choices = self.choices
+        options = []
+        if getattr(choices, 'field', None) is not None:
+            if choices.field.empty_label is not None:
+                options.append(('', choices.field.empty_label))
+            if selected:
+                options.extend(choices.choice(obj) for obj in choices.queryset.filter(pk__in=selected))
+        else:
+            options = [choice for choice in choices if str(choice[0]) in value]
+        return [
+            (None, [self.create_option(name, option_value, label, str(option_value) in value, index,
+                                       attrs=attrs)], index)
+            for index, (option_value, label) in enumerate(options)
+        ]
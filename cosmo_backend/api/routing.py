@@ -10,5 +10,6 @@ from . import consumers
 # Example: 550e8400-e29b-41d4-a716-446655440000
 websocket_urlpatterns = [
     re_path(r'ws/chat/(?P<room_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/import-jobs/(?P<job_id>\d+)/$', consumers.ImportJobConsumer.as_asgi()),
 ]
 
@@ -17,8 +17,9 @@ from drf_spectacular.utils import extend_schema_field, inline_serializer
 from drf_spectacular.types import OpenApiTypes
 
 from rest_framework import serializers
-from .models import Task, Property, TaskImage, Profile, Device, Notification, UserRole
+from .models import Task, TaskHistory, Property, TaskImage, Profile, Device, Notification, UserRole
 from .models import Booking, PropertyOwnership, AuditEvent, InviteCode  # Agent's Phase 2: Add AuditEvent
+from . import image_renditions
 import json
 import pytz
 
@@ -123,6 +124,8 @@ class TaskImageSerializer(serializers.ModelSerializer):
     uploaded_by_username = serializers.CharField(source='uploaded_by.username', read_only=True)
     photo_type_display = serializers.CharField(source='get_photo_type_display', read_only=True)
     photo_status_display = serializers.CharField(source='get_photo_status_display', read_only=True)
+    # {"thumb": url, "medium": url}; null until the upload has been processed
+    renditions = serializers.SerializerMethodField()
     
     class Meta:
         model = TaskImage
@@ -133,14 +136,22 @@ class TaskImageSerializer(serializers.ModelSerializer):
             'photo_type', 'photo_type_display', 'photo_status', 'photo_status_display',
             'sequence_number', 'is_primary', 'description',
             # Link to checklist response when applicable
-            'checklist_response'
+            'checklist_response',
+            # Off-request optimization state; poll until "ready" or "failed"
+            'processing_status', 'processing_error',
+            'renditions',
         ]
         read_only_fields = ['uploaded_by', 'uploaded_by_username', 'size_bytes', 
-                           'width', 'height', 'original_size_bytes', 'photo_type_display', 'photo_status_display']
+                           'width', 'height', 'original_size_bytes', 'photo_type_display', 'photo_status_display',
+                           'processing_status', 'processing_error']
         extra_kwargs = {
             'task': {'required': False}  # Task is set by the view from URL parameter
         }
     
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_renditions(self, obj):
+        return image_renditions.urls(obj, self.context.get('request'))
+    
     def validate_image(self, file):
         """Agent's enhanced validation: Accept large files, validate before optimization."""
         from django.conf import settings
@@ -194,40 +205,27 @@ class TaskImageSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        """Agent's optimization approach: Transform large uploads before storage."""
-        from api.utils.image_ops import optimize_image  # do NOT call get_image_metadata here
-        from django.core.files.base import ContentFile
+        """Store the raw upload and queue it for optimization (api/services/task_image_processing.py)."""
+        from api.services.task_image_processing import TaskImageProcessingService
         from django.conf import settings
         
         file = validated_data['image']
-        original_size = getattr(file, 'size', None)
-        
-        try:
-            optimized_bytes, optimization_metadata = optimize_image(
-                file,
-                max_dimension=getattr(settings, 'STORED_IMAGE_MAX_DIM', 2048),
-                target_size=getattr(settings, 'STORED_IMAGE_TARGET_BYTES', 5 * 1024 * 1024),
-                use_webp=True
-            )
-            # keep a sane name; extension doesn't strictly matter for storage backends
-            name = getattr(file, 'name', 'upload')
-            optimized_file = ContentFile(optimized_bytes, name=f"opt_{name}")
-        except ValueError:
+        validated_data.update({
+            'processing_status': TaskImage.PROCESSING_PENDING,
+            'original_size_bytes': getattr(file, 'size', None),
+        })
+        instance = super().create(validated_data)
+        TaskImageProcessingService.enqueue(instance)
+
+        # Only the inline backend knows the outcome here; keep its old 400 response
+        if instance.processing_status == TaskImage.PROCESSING_FAILED:
+            instance.image.delete(save=False)
+            instance.delete()
             target_mb = getattr(settings, 'STORED_IMAGE_TARGET_BYTES', 5 * 1024 * 1024) // (1024 * 1024)
             raise serializers.ValidationError({
                 "image": f"We couldn't optimize this photo under {target_mb}MB. Please crop or choose a smaller one."
             })
-
-        validated_data['image'] = optimized_file
-        # DO NOT call get_image_metadata() here; use optimization_metadata from optimize_image()
-        validated_data.update({
-            'size_bytes': optimization_metadata.get('size_bytes'),
-            'width': optimization_metadata.get('width'), 
-            'height': optimization_metadata.get('height'),
-            'original_size_bytes': optimization_metadata.get('original_size_bytes', original_size)
-        })
-
-        return super().create(validated_data)
+        return instance
 
 class TaskSerializer(serializers.ModelSerializer):
     property_name           = serializers.CharField(source='property.name',    read_only=True)
@@ -247,7 +245,7 @@ class TaskSerializer(serializers.ModelSerializer):
     # NEW: “is_muted” for **current** user (read-only)
     is_muted = serializers.SerializerMethodField(read_only=True)
 
-    # Replace ListField with a proper JSON parser:
+    # Most recent TaskHistory entries; detail payloads only (see many_init)
     history                 = serializers.SerializerMethodField()
     
     due_date = serializers.DateTimeField(
@@ -366,15 +364,25 @@ class TaskSerializer(serializers.ModelSerializer):
 
         return ret
 
-    @extend_schema_field(serializers.ListField(child=serializers.DictField()))
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # List payloads don't ship history; clients page through
+        # GET /api/tasks/<id>/history/ instead
+        list_serializer = super().many_init(*args, **kwargs)
+        list_serializer.child.fields.pop('history', None)
+        return list_serializer
+
+    @extend_schema_field(serializers.ListField(child=serializers.CharField()))
     def get_history(self, obj):
         """
-        obj.history is a JSON‐encoded string; decode it to a Python list.
+        The latest TASK_HISTORY_INLINE_LIMIT entries, oldest first, in the
+        legacy "<timestamp>: <user> <change>" string format.
         """
-        try:
-            return json.loads(obj.history or '[]')
-        except json.JSONDecodeError:
+        if not obj.pk:
             return []
+        limit = getattr(settings, 'TASK_HISTORY_INLINE_LIMIT', 50)
+        entries = list(obj.history_entries.order_by('-created_at', '-id')[:limit])
+        return [entry.as_text() for entry in reversed(entries)]
 
     # -------------------- Checklist Helpers --------------------
     @extend_schema_field(OpenApiTypes.INT)
@@ -393,6 +401,7 @@ class TaskSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.DictField())
     def get_checklist_progress(self, obj):
+        # reads TaskChecklist's denormalized counters; no per-task response queries
         try:
             cl = obj.checklist
             return {
@@ -409,37 +418,29 @@ class TaskSerializer(serializers.ModelSerializer):
                 'is_completed': False,
             }
 
-    def _append_history(self, instance, user, changes):
-        existing = self.get_history(instance)
-        timestamp = timezone.now().isoformat()
-        for change in changes:
-            existing.append(f"{timestamp}: {user.username} {change}")
-        return json.dumps(existing)
-
     def create(self, validated_data):
         user = self.context['request'].user
-        # initial history entry
-        validated_data['history']     = json.dumps([f"{timezone.now().isoformat()}: {user.username} created task"])
         validated_data['created_by']  = user
         validated_data['modified_by'] = user
-        return super().create(validated_data)
+        task = super().create(validated_data)
+        # initial history entry
+        TaskHistory.log(task, user, 'created task')
+        return task
 
     def update(self, instance, validated_data):
-        user = self.context['request'].user
-        changes = []
-        for field in ('status', 'title', 'description', 'assigned_to', 'task_type', 'property', 'due_date'):
-            if field in validated_data:
-                old = getattr(instance, field)
-                new = validated_data[field]
-                old_val = getattr(old, 'id', old)
-                new_val = getattr(new, 'id', new)
-                if old_val != new_val:
-                    changes.append(f"changed {field} from '{old_val}' to '{new_val}'")
-        if changes:
-            validated_data['history']     = self._append_history(instance, user, changes)
-            validated_data['modified_by'] = user
+        # Task.save records one TaskHistory row per changed field
+        validated_data['modified_by'] = self.context['request'].user
         return super().update(instance, validated_data)
     
+class TaskHistorySerializer(serializers.ModelSerializer):
+    text = serializers.CharField(source='as_text', read_only=True)
+
+    class Meta:
+        model = TaskHistory
+        fields = ['id', 'field', 'old_value', 'new_value', 'message', 'actor', 'actor_name', 'created_at', 'text']
+        read_only_fields = fields
+
+
 class AdminInviteSerializer(serializers.Serializer):
     email = serializers.EmailField()
     username = serializers.CharField()
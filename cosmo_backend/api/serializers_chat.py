@@ -44,6 +44,8 @@ class ChatParticipantSerializer(serializers.ModelSerializer):
         
     def get_unread_count(self, obj):
         """Get unread message count for this participant"""
+        if hasattr(obj, 'inbox_unread_count'):  # ChatParticipantQuerySet.with_unread_counts
+            return obj.inbox_unread_count
         if not obj.last_read_at:
             return obj.room.messages.filter(is_deleted=False).count()
         
@@ -104,11 +106,38 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return False
         
-        return obj.is_read_by(request.user)
+        if obj.is_read_by(request.user):
+            return True
+        # WebSocket read receipts only advance the participant's read mark
+        read_through = self._read_marks(request.user).get(obj.room_id)
+        return read_through is not None and obj.created_at <= read_through
+    
+    def _read_marks(self, user):
+        """{room_id: last_read_at} for the user, loaded once per serializer context"""
+        marks = self.context.get('_read_marks')
+        if marks is None:
+            marks = self.context['_read_marks'] = dict(
+                ChatParticipant.objects.filter(user=user, last_read_at__isnull=False)
+                .values_list('room_id', 'last_read_at')
+            )
+        return marks
     
     def get_read_count(self, obj):
         """Get number of users who have read this message"""
-        return len(obj.read_by or {})
+        readers = set(obj.read_by or {})
+        readers.update(str(user_id) for user_id, read_through in self._room_read_marks(obj.room_id)
+                       if user_id != obj.sender_id and obj.created_at <= read_through)
+        return len(readers)
+    
+    def _room_read_marks(self, room_id):
+        """[(user_id, last_read_at)] for the room's participants, loaded once per room per serializer context"""
+        rooms = self.context.setdefault('_room_read_marks', {})
+        if room_id not in rooms:
+            rooms[room_id] = list(
+                ChatParticipant.objects.filter(room_id=room_id, last_read_at__isnull=False)
+                .values_list('user_id', 'last_read_at')
+            )
+        return rooms[room_id]
 
 
 class ChatMessageCreateSerializer(serializers.ModelSerializer):
@@ -202,6 +231,8 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return 0
+        if hasattr(obj, 'inbox_unread_count'):  # annotated for request.user by ChatRoomQuerySet.with_inbox
+            return obj.inbox_unread_count
         
         return obj.get_unread_count(request.user)
     
@@ -214,6 +245,8 @@ class ChatRoomSerializer(serializers.ModelSerializer):
     
     def get_participant_count(self, obj):
         """Get active participant count"""
+        if hasattr(obj, 'inbox_participant_count'):
+            return obj.inbox_participant_count
         return obj.participants.filter(left_at__isnull=True).count()
 
 
@@ -337,6 +370,8 @@ class ChatRoomListSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return 0
+        if hasattr(obj, 'inbox_unread_count'):  # annotated for request.user by ChatRoomQuerySet.with_inbox
+            return obj.inbox_unread_count
         return obj.get_unread_count(request.user)
     
     def get_last_message_preview(self, obj):
@@ -355,6 +390,8 @@ class ChatRoomListSerializer(serializers.ModelSerializer):
         return last_msg.created_at if last_msg else obj.created_at
     
     def get_participant_count(self, obj):
+        if hasattr(obj, 'inbox_participant_count'):
+            return obj.inbox_participant_count
         return obj.participants.filter(left_at__isnull=True).count()
 
 
@@ -12,8 +12,11 @@ import io
 from datetime import datetime, timedelta, time
 from decimal import Decimal
 import logging
-from typing import Dict, List, Tuple, Optional, Any
-from django.db import transaction
+from typing import Callable, Dict, List, Tuple, Optional, Any
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.exceptions import ValidationError
@@ -22,10 +25,12 @@ from django.core.files.base import ContentFile
 from api.models import (
     Booking, Property, Task, BookingImportLog, BookingImportTemplate
 )
+from api import booking_conflicts, calendar_events, checklist_materializer, mobile_sync
 
 # Import base ExcelImportService from backup for inheritance
 from .excel_import_service_backup import ExcelImportService
-from .excel_file_utils import validate_excel_file, sha256_bytes
+from .excel_file_utils import validate_excel_file, sha256_bytes, iter_sheet_chunks
+from .notification_service import NotificationService
 from ..utils.json_utils import extract_conflicts_json
 
 logger = logging.getLogger(__name__)
@@ -263,13 +268,131 @@ class BookingConflict:
         return changes
 
 
+class DatabaseBookingLookup:
+    """Candidate booking lookups for conflict detection, one query per lookup"""
+    
+    def cross_property_match(self, source: str, external_code: str, property_obj: Property) -> Optional[Booking]:
+        """Same source+code booked on a different property"""
+        return Booking.objects.filter(
+            source__iexact=source,
+            external_code=external_code
+        ).exclude(property=property_obj).first()
+    
+    def code_match(self, property_obj: Property, source: str, external_code: str) -> Optional[Booking]:
+        """Same property, source and external code"""
+        # GPT Agent Fix: Use scoped booking lookup with case-insensitive source comparison
+        return Booking.objects.filter(
+            property=property_obj,
+            source__iexact=source,  # Case-insensitive source comparison
+            external_code=external_code
+        ).first()
+    
+    def exact_dates_match(self, property_obj: Property, guest_name: str, start_date: datetime, end_date: datetime) -> Optional[Booking]:
+        """Same property and guest with identical check-in/check-out dates"""
+        # GPT Agent Fix: Use __date lookups to handle date-vs-datetime mismatches properly
+        return Booking.objects.filter(
+            property=property_obj,
+            guest_name__iexact=guest_name,
+            check_in_date__date=start_date.date(),
+            check_out_date__date=end_date.date()
+        ).first()
+    
+    def overlap_match(self, property_obj: Property, guest_name: str, start_date: datetime, end_date: datetime) -> Optional[Booking]:
+        """Same property and guest with overlapping (but not identical) dates"""
+        return Booking.objects.filter(
+            property=property_obj,
+            guest_name__iexact=guest_name,
+            check_in_date__lt=end_date.date(),
+            check_out_date__gt=start_date.date()
+        ).exclude(
+            check_in_date__date=start_date.date(),
+            check_out_date__date=end_date.date()
+        ).first()
+
+
+class BookingCandidateIndex:
+    """
+    In-memory conflict lookups over a prefetched set of candidate bookings.
+    
+    Mirrors DatabaseBookingLookup (including Booking's default ordering for
+    "first" match) so a whole chunk of rows can be resolved against one
+    prefetch query. Bookings staged for creation during the import are added
+    with ``add()`` so later rows in the same file see them, as they would
+    after a per-row insert.
+    """
+    
+    def __init__(self, bookings=()):
+        self._by_code = {}
+        self._by_property_guest = {}
+        for booking in bookings:
+            self.add(booking)
+    
+    def add(self, booking: Booking):
+        if booking.external_code:
+            self._by_code.setdefault(booking.external_code, []).append(booking)
+        key = (booking.property_id, (booking.guest_name or '').lower())
+        self._by_property_guest.setdefault(key, []).append(booking)
+    
+    @staticmethod
+    def _first(candidates) -> Optional[Booking]:
+        # Booking.Meta.ordering is ['-check_in_date']
+        return max(candidates, key=lambda b: b.check_in_date, default=None)
+    
+    @staticmethod
+    def _as_datetime(value) -> datetime:
+        # Same coercion Django applies to a date compared against a DateTimeField
+        return timezone.make_aware(datetime.combine(value, time.min), timezone.get_default_timezone())
+    
+    def cross_property_match(self, source: str, external_code: str, property_obj: Property) -> Optional[Booking]:
+        source = source.lower()
+        return self._first(
+            b for b in self._by_code.get(external_code, ())
+            if (b.source or '').lower() == source and b.property_id != property_obj.pk
+        )
+    
+    def code_match(self, property_obj: Property, source: str, external_code: str) -> Optional[Booking]:
+        source = source.lower()
+        return self._first(
+            b for b in self._by_code.get(external_code, ())
+            if (b.source or '').lower() == source and b.property_id == property_obj.pk
+        )
+    
+    def _same_guest(self, property_obj: Property, guest_name: str):
+        return self._by_property_guest.get((property_obj.pk, guest_name.lower()), ())
+    
+    def _is_exact_dates(self, booking: Booking, start_date: datetime, end_date: datetime) -> bool:
+        return (
+            timezone.localtime(booking.check_in_date).date() == start_date.date()
+            and timezone.localtime(booking.check_out_date).date() == end_date.date()
+        )
+    
+    def exact_dates_match(self, property_obj: Property, guest_name: str, start_date: datetime, end_date: datetime) -> Optional[Booking]:
+        return self._first(
+            b for b in self._same_guest(property_obj, guest_name)
+            if self._is_exact_dates(b, start_date, end_date)
+        )
+    
+    def overlap_match(self, property_obj: Property, guest_name: str, start_date: datetime, end_date: datetime) -> Optional[Booking]:
+        window_end = self._as_datetime(end_date.date())
+        window_start = self._as_datetime(start_date.date())
+        return self._first(
+            b for b in self._same_guest(property_obj, guest_name)
+            if b.check_in_date < window_end and b.check_out_date > window_start
+            and not self._is_exact_dates(b, start_date, end_date)
+        )
+
+
 class EnhancedExcelImportService(ExcelImportService):
     """Enhanced service with intelligent conflict detection and resolution"""
     
+    # Rows per chunk for import_excel_file_streaming
+    STREAMING_CHUNK_SIZE = getattr(settings, 'BOOKING_IMPORT_CHUNK_SIZE', 500)
+    
     def __init__(self, user: User, template: Optional[BookingImportTemplate] = None):
         super().__init__(user, template)
         self.conflicts_detected = []
         self.auto_updated_count = 0
+        self.file_hash = None
         self.requires_review = False
     
     def _ensure_default_template(self):
@@ -308,27 +431,10 @@ class EnhancedExcelImportService(ExcelImportService):
             
             logger.info(f"Starting enhanced import with file: {getattr(excel_file, 'name', 'unknown')}")
             
-            # 1) Validate and buffer the upload once
-            is_valid, error_msg, file_data = validate_excel_file(excel_file)
-            if not is_valid:
-                return {"success": False, "error": error_msg}
-            
-            file_hash = sha256_bytes(file_data)
-            logger.info(f"File validated and buffered: {len(file_data)} bytes, SHA-256: {file_hash[:8]}...")
-            
-            # 2) Create import log WITHOUT saving the file yet (prevents stream consumption)
-            self._ensure_default_template()
-            
-            self.import_log = BookingImportLog.objects.create(
-                template=self.template,
-                import_file=None,  # Will be set after successful processing
-                total_rows=0,
-                successful_imports=0,
-                errors_count=0,
-                errors_log="Enhanced import in progress...",
-                imported_by=self.user,
-            )
-            logger.info("Import log created successfully")
+            # 1-2) Validate and buffer the upload once, create the import log
+            file_data, error_result = self._begin_import(excel_file)
+            if error_result:
+                return error_result
             
             # 3) Parse from bytes (safe, repeatable)
             logger.info(f"Reading Excel with pandas, sheet: {sheet_name}")
@@ -356,61 +462,54 @@ class EnhancedExcelImportService(ExcelImportService):
                     logger.error(error_msg)
                     processed_rows += 1
             
-            # Update import log with conflicts
-            self._update_import_log()
-            
-            # 4. Create automated tasks for imported bookings
-            task_count = 0
-            if hasattr(self, 'import_log') and self.import_log:
-                created_bookings = getattr(self.import_log, 'created_bookings', [])
-                if created_bookings:
-                    task_count = self.create_automated_tasks(created_bookings)
-                    self.import_log.total_tasks_created = task_count
-                    self.import_log.save()
-            
-            # Store conflicts in import log for later review
-            if self.conflicts_detected:
-                conflicts_data = [self._serialize_conflict(c) for c in self.conflicts_detected]
-                self.import_log.errors_log += f"\n\nCONFLICTS_DATA:{json.dumps(conflicts_data)}"
-                self.import_log.save()
+            return self._complete_import(excel_file, file_data, processed_rows)
             
-            # Prepare result
-            result = {
-                'success': True,
+        except Exception as e:
+            logger.error(f"Enhanced Excel import failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
                 'total_rows': self.total_rows,
-                'processed_rows': processed_rows,
-                'successful_imports': self.success_count,
-                'auto_updated': self.auto_updated_count,
-                'conflicts_detected': len(self.conflicts_detected),
-                'requires_review': self.requires_review,
-                'errors_count': len(self.errors),
-                'warnings_count': len(self.warnings),
-                'errors': self.errors,
-                'warnings': self.warnings
+                'errors': self.errors
             }
+    
+    def import_excel_file_streaming(self, excel_file, sheet_name: str = 'Cleaning schedule',
+                                    chunk_size: Optional[int] = None,
+                                    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Streaming, batched variant of import_excel_file.
+        
+        The sheet is read in chunks with openpyxl read-only mode. For each
+        chunk, properties are resolved by label and candidate bookings are
+        prefetched in bulk, conflicts are resolved in memory and new bookings
+        are written with bulk_create, so the query count grows per chunk
+        rather than per row. Conflict rules and the result payload are the
+        same as import_excel_file.
+        
+        ``progress_callback`` is called after every chunk with the running
+        counters (see _progress_snapshot).
+        """
+        chunk_size = chunk_size or self.STREAMING_CHUNK_SIZE
+        try:
+            logger.info(f"Starting streaming import with file: {getattr(excel_file, 'name', 'unknown')}")
             
-            # 4) Save the exact bytes to the FileField (safe Cloudinary upload)
-            try:
-                if self.import_log and not self.import_log.import_file:
-                    filename = getattr(excel_file, 'name', f'import_{self.import_log.pk}.xlsx')
-                    self.import_log.import_file.save(filename, ContentFile(file_data), save=True)
-                    logger.info(f"File saved to import log: {filename}")
-            except Exception as e:
-                logger.warning(f"Failed to save file to import log (non-critical): {e}")
-                # Store in errors_log but don't fail the import
-                if self.import_log:
-                    self.import_log.errors_log += f"\n\nFILE_SAVE_WARNING: {str(e)}"
-                    self.import_log.save()
+            file_data, error_result = self._begin_import(excel_file)
+            if error_result:
+                return error_result
             
-            # Add conflicts for review if any
-            if self.conflicts_detected:
-                result['conflicts'] = [self._serialize_conflict(c) for c in self.conflicts_detected]
-                result['import_session_id'] = self.import_log.pk
+            self._property_cache = {}
+            processed_rows = 0
+            for chunk_number, chunk in enumerate(iter_sheet_chunks(file_data, sheet_name, chunk_size), start=1):
+                self.total_rows += len(chunk)
+                processed_rows = self._process_chunk(chunk, processed_rows)
+                if progress_callback:
+                    progress_callback(self._progress_snapshot(chunk_number, processed_rows))
             
-            return result
+            logger.info(f"Streaming import processed {processed_rows} rows in chunks of {chunk_size}")
+            return self._complete_import(excel_file, file_data, processed_rows)
             
         except Exception as e:
-            logger.error(f"Enhanced Excel import failed: {str(e)}")
+            logger.error(f"Streaming Excel import failed: {str(e)}")
             return {
                 'success': False,
                 'error': str(e),
@@ -418,6 +517,346 @@ class EnhancedExcelImportService(ExcelImportService):
                 'errors': self.errors
             }
     
+    def _progress_snapshot(self, chunks: int, processed_rows: int) -> Dict[str, Any]:
+        """Running counters reported to progress callbacks"""
+        return {
+            'chunks': chunks,
+            'rows_read': self.total_rows,
+            'rows_processed': processed_rows,
+            'successful_imports': self.success_count,
+            'auto_updated': self.auto_updated_count,
+            'conflicts': len(self.conflicts_detected),
+            'errors': len(self.errors),
+        }
+    
+    def _begin_import(self, excel_file) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+        """Validate and buffer the upload, then create (or reuse) the import log"""
+        # 1) Validate and buffer the upload once
+        is_valid, error_msg, file_data = validate_excel_file(excel_file)
+        if not is_valid:
+            return b'', {"success": False, "error": error_msg}
+        
+        self.file_hash = file_hash = sha256_bytes(file_data)
+        logger.info(f"File validated and buffered: {len(file_data)} bytes, SHA-256: {file_hash[:8]}...")
+        
+        # Background jobs hand in their queued log (file already stored)
+        if self.import_log is not None:
+            return file_data, None
+        
+        # 2) Create import log WITHOUT saving the file yet (prevents stream consumption)
+        self._ensure_default_template()
+        
+        self.import_log = BookingImportLog.objects.create(
+            template=self.template,
+            import_file=None,  # Will be set after successful processing
+            total_rows=0,
+            successful_imports=0,
+            errors_count=0,
+            errors_log="Enhanced import in progress...",
+            imported_by=self.user,
+        )
+        logger.info("Import log created successfully")
+        return file_data, None
+    
+    def _complete_import(self, excel_file, file_data: bytes, processed_rows: int) -> Dict[str, Any]:
+        """Finalize the import log, store the file and build the result payload"""
+        # Update import log with conflicts
+        self._update_import_log()
+        
+        # 4. Create automated tasks for imported bookings
+        task_count = 0
+        if hasattr(self, 'import_log') and self.import_log:
+            created_bookings = getattr(self.import_log, 'created_bookings', [])
+            if created_bookings:
+                task_count = self.create_automated_tasks(created_bookings)
+                self.import_log.total_tasks_created = task_count
+                self.import_log.save()
+        
+        # Store conflicts in import log for later review
+        if self.conflicts_detected:
+            conflicts_data = [self._serialize_conflict(c) for c in self.conflicts_detected]
+            self.import_log.errors_log += f"\n\nCONFLICTS_DATA:{json.dumps(conflicts_data)}"
+            self.import_log.save()
+        
+        # Prepare result
+        result = {
+            'success': True,
+            'total_rows': self.total_rows,
+            'processed_rows': processed_rows,
+            'successful_imports': self.success_count,
+            'auto_updated': self.auto_updated_count,
+            'conflicts_detected': len(self.conflicts_detected),
+            'requires_review': self.requires_review,
+            'errors_count': len(self.errors),
+            'warnings_count': len(self.warnings),
+            'errors': self.errors,
+            'warnings': self.warnings
+        }
+        
+        # 4) Save the exact bytes to the FileField (safe Cloudinary upload)
+        try:
+            if self.import_log and not self.import_log.import_file:
+                filename = getattr(excel_file, 'name', f'import_{self.import_log.pk}.xlsx')
+                upload = ContentFile(file_data)
+                upload.content_digest = self.file_hash  # already hashed; blob storage reuses it
+                self.import_log.import_file.save(filename, upload, save=True)
+                logger.info(f"File saved to import log: {filename}")
+        except Exception as e:
+            logger.warning(f"Failed to save file to import log (non-critical): {e}")
+            # Store in errors_log but don't fail the import
+            if self.import_log:
+                self.import_log.errors_log += f"\n\nFILE_SAVE_WARNING: {str(e)}"
+                self.import_log.save()
+        
+        # Add conflicts for review if any
+        if self.conflicts_detected:
+            result['conflicts'] = [self._serialize_conflict(c) for c in self.conflicts_detected]
+            result['import_session_id'] = self.import_log.pk
+        
+        return result
+    
+    def _process_chunk(self, chunk: List[Dict[str, Any]], processed_rows: int) -> int:
+        """
+        Process one chunk of sheet rows with bulk lookups and writes.
+        
+        Returns the running processed row count (row numbering matches
+        import_excel_file: blank rows are skipped without consuming a number).
+        """
+        import pandas as pd
+        
+        # Extract row data; per-row errors are recorded and the row skipped
+        extracted = []
+        for values in chunk:
+            row = pd.Series(values, dtype=object)
+            if row.isna().all():
+                continue
+            row_num = processed_rows + 2
+            processed_rows += 1
+            try:
+                booking_data = self._extract_booking_data_enhanced(row, row_num)
+            except Exception as e:
+                self.errors.append(f"Row {row_num}: {str(e)}")
+                continue
+            if booking_data:
+                extracted.append((row_num, row, booking_data))
+        
+        if not extracted:
+            return processed_rows
+        
+        # Resolve every property label in the chunk at once
+        properties = self._prefetch_properties(
+            {data.get('property_label_raw') for _, _, data in extracted}
+        )
+        
+        resolved = []
+        for row_num, row, booking_data in extracted:
+            label = booking_data.get('property_label_raw')
+            property_obj = properties.get(label.lower()) if label else None
+            if not property_obj:
+                error_msg = f"Row {row_num}: Could not create property: {label}"
+                self.errors.append(error_msg)
+                logger.error(error_msg)
+                continue
+            booking_data['property_name'] = property_obj.name
+            resolved.append((row_num, row, booking_data, property_obj))
+        
+        # One query for every candidate booking the chunk could conflict with
+        index = BookingCandidateIndex(self._prefetch_candidate_bookings(resolved))
+        
+        new_bookings = []
+        updated_bookings = {}
+        for row_num, row, booking_data, property_obj in resolved:
+            try:
+                conflict_result = self._detect_conflicts(booking_data, property_obj, row_num, lookup=index)
+                if not conflict_result['has_conflicts']:
+                    booking = self._build_booking(booking_data, property_obj, row, lookup=index)
+                    new_bookings.append((row_num, booking))
+                    index.add(booking)
+                elif conflict_result['auto_resolve']:
+                    booking = conflict_result['existing_booking']
+                    self._apply_auto_update(booking, booking_data)
+                    if booking.pk:
+                        updated_bookings[booking.pk] = booking
+                    self.auto_updated_count += 1
+                    self.success_count += 1
+                elif conflict_result.get('is_exact_duplicate', False):
+                    logger.info(f"Skipped exact duplicate: Row {row_num}")
+                else:
+                    self.conflicts_detected.append(conflict_result['conflict'])
+                    self.requires_review = True
+            except Exception as e:
+                error_msg = f"Row {row_num}: {str(e)}"
+                self.errors.append(error_msg)
+                logger.error(error_msg)
+        
+        self._flush_chunk(new_bookings, list(updated_bookings.values()))
+        if new_bookings or updated_bookings:
+            # Bulk writes skip post_save, so drop cached conflict results and calendar months here
+            booking_conflicts.invalidate_all()
+            calendar_events.invalidate_all()
+        return processed_rows
+    
+    def _prefetch_properties(self, labels) -> Dict[str, Optional[Property]]:
+        """Map lower-cased property labels to properties, caching across chunks"""
+        missing = {label.lower(): label for label in labels if label and label.lower() not in self._property_cache}
+        if missing:
+            exact_matches = Property.objects.annotate(
+                name_lower=Lower('name')
+            ).filter(name_lower__in=list(missing))
+            for property_obj in exact_matches:
+                self._property_cache.setdefault(property_obj.name_lower, property_obj)
+            
+            # Partial matches and creation keep the per-label rules
+            for key, label in missing.items():
+                if key not in self._property_cache:
+                    self._property_cache[key] = self._find_or_create_property(label)
+        return self._property_cache
+    
+    def _prefetch_candidate_bookings(self, resolved) -> List[Booking]:
+        """Fetch every booking matching a chunk's codes or (property, guest) pairs"""
+        codes = set()
+        guests = set()
+        property_ids = set()
+        for _, _, booking_data, property_obj in resolved:
+            if booking_data.get('external_code'):
+                codes.add(booking_data['external_code'])
+            if booking_data.get('guest_name'):
+                guests.add(booking_data['guest_name'].lower())
+                property_ids.add(property_obj.pk)
+        
+        query = Q(external_code__in=codes)
+        if guests:
+            query |= Q(property_id__in=property_ids, guest_name_lower__in=guests)
+        return list(
+            Booking.objects.annotate(guest_name_lower=Lower('guest_name'))
+            .filter(query)
+            .select_related('property')
+        )
+    
+    def _unique_external_code(self, property_obj: Property, source: str, original_code: str,
+                              lookup: Optional['BookingCandidateIndex'] = None) -> str:
+        """
+        _create_booking's "#2", "#3" suffixing within property + source scope,
+        also counting bookings staged in ``lookup`` but not yet written
+        """
+        def taken(code):
+            if lookup is not None and lookup.code_match(property_obj, source, code):
+                return True
+            return Booking.objects.filter(
+                property=property_obj, source__iexact=source, external_code=code
+            ).exists()
+        
+        # The chunk prefetch holds every booking with this exact code, so the
+        # common case needs no query; suffixed codes are checked in the database
+        if lookup is not None and not lookup.code_match(property_obj, source, original_code):
+            return original_code
+        code = original_code
+        i = 1
+        while taken(code):
+            i += 1
+            code = f"{original_code} #{i}"
+        if i > 1:
+            logger.warning(f"Duplicate external code '{original_code}' for property/source - generated unique code: '{code}'")
+        return code
+    
+    def _build_booking(self, booking_data: Dict, property_obj: Property, row,
+                       lookup: Optional['BookingCandidateIndex'] = None) -> Booking:
+        """
+        Build an unsaved Booking from Excel data
+        
+        Status keeps the base importer's substring mapping ("Canceled by
+        guest" is cancelled, blank is booked) and source goes through
+        _normalize_source, so the streaming and row-by-row imports store the
+        same values.
+        """
+        source = _normalize_source(booking_data.get('source', ''))
+        external_code = self._unique_external_code(
+            property_obj, source, booking_data.get('external_code', ''), lookup
+        )
+        
+        nights_value = booking_data.get('nights')
+        if nights_value is None or not isinstance(nights_value, (int, float)):
+            try:
+                if isinstance(booking_data['start_date'], datetime) and isinstance(booking_data['end_date'], datetime):
+                    nights_value = max(1, (booking_data['end_date'] - booking_data['start_date']).days)
+                else:
+                    nights_value = 1
+            except Exception:
+                nights_value = 1
+        
+        return Booking(
+            property=property_obj,
+            check_in_date=booking_data['start_date'],
+            check_out_date=booking_data['end_date'],
+            guest_name=booking_data['guest_name'],
+            guest_contact=booking_data.get('guest_contact', ''),
+            status=self._map_excel_status_to_booking_status(booking_data.get('external_status', '')),
+            external_code=external_code,
+            external_status=booking_data.get('external_status', ''),
+            source=source,
+            listing_name=booking_data.get('listing_name', ''),
+            earnings_amount=booking_data.get('earnings_amount'),
+            earnings_currency='USD',
+            booked_on=booking_data.get('booked_on'),
+            adults=booking_data.get('adults', 1),
+            children=booking_data.get('children', 0),
+            infants=booking_data.get('infants', 0),
+            nights=nights_value,
+            check_in_time=booking_data.get('check_in_time'),
+            check_out_time=booking_data.get('check_out_time'),
+            property_label_raw=booking_data['property_label_raw'],
+            same_day_note=booking_data.get('same_day_note', ''),
+            same_day_flag=bool(booking_data.get('same_day_note')),
+            raw_row=self._serialize_row_data(row),
+        )
+    
+    def _create_booking(self, booking_data: Dict, property_obj: Property, row) -> Booking:
+        """Row-by-row counterpart of _build_booking: same mapping, saved immediately"""
+        booking = self._build_booking(booking_data, property_obj, row)
+        booking.save(force_insert=True)
+        return booking
+    
+    def _apply_auto_update(self, booking: Booking, booking_data: Dict[str, Any]):
+        """In-memory counterpart of _auto_update_booking (status only)"""
+        if 'external_status' in booking_data:
+            booking.external_status = booking_data['external_status']
+            booking.status = _map_external_status(booking_data['external_status'])
+        booking.last_import_update = timezone.now()
+        booking.modified_at = booking.last_import_update
+    
+    def _flush_chunk(self, new_bookings: List[Tuple[int, Booking]], updated_bookings: List[Booking]):
+        """Write a chunk's auto-updates and new bookings in bulk"""
+        if updated_bookings:
+            Booking.objects.bulk_update(
+                updated_bookings,
+                ['external_status', 'status', 'last_import_update', 'modified_at']
+            )
+            mobile_sync.record(mobile_sync.BOOKING, [(b.pk, None, False) for b in updated_bookings])
+        
+        if not new_bookings:
+            return
+        
+        try:
+            with transaction.atomic():
+                created = Booking.objects.bulk_create([booking for _, booking in new_bookings])
+                mobile_sync.record(mobile_sync.BOOKING, [(b.pk, None, False) for b in created if b.pk])
+            self.success_count += len(new_bookings)
+            return
+        except (IntegrityError, ValidationError) as e:
+            logger.warning(f"Bulk insert of {len(new_bookings)} bookings failed ({e}); retrying row by row")
+        
+        # Fall back to per-row inserts so one bad row doesn't sink the chunk
+        for row_num, booking in new_bookings:
+            try:
+                with transaction.atomic():
+                    booking.save(force_insert=True)
+                self.success_count += 1
+            except Exception as e:
+                booking.pk = None
+                error_msg = f"Row {row_num}: {str(e)}"
+                self.errors.append(error_msg)
+                logger.error(error_msg)
+    
     def _extract_booking_data_enhanced(self, row, row_number: int) -> Optional[Dict]:
         """Extract booking data WITHOUT automatic external code suffix addition"""
         try:
@@ -628,8 +1067,16 @@ class EnhancedExcelImportService(ExcelImportService):
             self.success_count += 1
             logger.info(f"Created new booking: {new_booking.external_code}")
     
-    def _detect_conflicts(self, booking_data: Dict[str, Any], property_obj: Property, row_number: int) -> Dict[str, Any]:
-        """Enhanced conflict detection with comprehensive duplicate detection"""
+    def _detect_conflicts(self, booking_data: Dict[str, Any], property_obj: Property, row_number: int,
+                          lookup=None) -> Dict[str, Any]:
+        """
+        Enhanced conflict detection with comprehensive duplicate detection
+        
+        ``lookup`` resolves candidate bookings in memory (streaming import);
+        by default each step queries the database.
+        """
+        if lookup is None:
+            lookup = DatabaseBookingLookup()
         
         external_code = booking_data.get('external_code')
         guest_name = booking_data.get('guest_name')
@@ -644,126 +1091,92 @@ class EnhancedExcelImportService(ExcelImportService):
         
         # Step 0: Check for same source+code on a different property → property_change conflict
         if external_code and source:
-            cross_property_bookings = Booking.objects.filter(
-                source__iexact=source,
-                external_code=external_code
-            ).exclude(property=property_obj)
-            
-            if cross_property_bookings.exists():
-                existing_booking = cross_property_bookings.first()
-                if existing_booking:  # Type guard
-                    conflict = BookingConflict(
-                        existing_booking=existing_booking,
-                        excel_data=booking_data,
-                        conflict_types=[ConflictType.PROPERTY_CHANGE],
-                        row_number=row_number,
-                    )
-                    return {
-                        'has_conflicts': True,
-                        'auto_resolve': False,  # never auto-resolve property changes
-                        'existing_booking': existing_booking,
-                        'conflict': conflict,
-                        'is_exact_duplicate': False
-                    }
+            existing_booking = lookup.cross_property_match(source, external_code, property_obj)
+            if existing_booking:
+                conflict = BookingConflict(
+                    existing_booking=existing_booking,
+                    excel_data=booking_data,
+                    conflict_types=[ConflictType.PROPERTY_CHANGE],
+                    row_number=row_number,
+                )
+                return {
+                    'has_conflicts': True,
+                    'auto_resolve': False,  # never auto-resolve property changes
+                    'existing_booking': existing_booking,
+                    'conflict': conflict,
+                    'is_exact_duplicate': False
+                }
         
         # Step 1: Check for exact external code match (for platform bookings with original codes)
-        # GPT Agent Fix: Use scoped booking lookup with case-insensitive source comparison
         if external_code:
-            existing_bookings = Booking.objects.filter(
-                property=property_obj,
-                source__iexact=source,  # Case-insensitive source comparison
-                external_code=external_code
-            )
-            
-            if existing_bookings.exists():
-                existing_booking = existing_bookings.first()
-                if existing_booking:
-                    conflict_types = self._identify_conflict_types(existing_booking, booking_data)
-                    
-                    # Check if this is an exact duplicate (no meaningful changes)
-                    is_exact_duplicate = len(conflict_types) == 0
-                    
-                    # Status-only changes should be auto-updated for platform bookings
-                    is_status_only_change = len(conflict_types) == 1 and ConflictType.STATUS_CHANGE in conflict_types
-                    
-                    # Guest name changes should always require manual review (per user requirement)
-                    has_guest_change = ConflictType.GUEST_CHANGE in conflict_types
-                    
-                    # AGENT FIX: Only auto-resolve status-only changes for platform bookings
-                    auto_resolve = (not is_direct_booking) and is_status_only_change
-                    
-                    # Always flag external code matches as conflicts for review
-                    conflict = BookingConflict(existing_booking, booking_data, conflict_types, row_number)
-                    return {
-                        'has_conflicts': True,
-                        'auto_resolve': auto_resolve,
-                        'existing_booking': existing_booking,
-                        'conflict': conflict,
-                        'is_exact_duplicate': is_exact_duplicate and not is_status_only_change
-                    }
+            existing_booking = lookup.code_match(property_obj, source, external_code)
+            if existing_booking:
+                conflict_types = self._identify_conflict_types(existing_booking, booking_data)
+                
+                # Check if this is an exact duplicate (no meaningful changes)
+                is_exact_duplicate = len(conflict_types) == 0
+                
+                # Status-only changes should be auto-updated for platform bookings
+                is_status_only_change = len(conflict_types) == 1 and ConflictType.STATUS_CHANGE in conflict_types
+                
+                # Guest name changes should always require manual review (per user requirement)
+                has_guest_change = ConflictType.GUEST_CHANGE in conflict_types
+                
+                # AGENT FIX: Only auto-resolve status-only changes for platform bookings
+                auto_resolve = (not is_direct_booking) and is_status_only_change
+                
+                # Always flag external code matches as conflicts for review
+                conflict = BookingConflict(existing_booking, booking_data, conflict_types, row_number)
+                return {
+                    'has_conflicts': True,
+                    'auto_resolve': auto_resolve,
+                    'existing_booking': existing_booking,
+                    'conflict': conflict,
+                    'is_exact_duplicate': is_exact_duplicate and not is_status_only_change
+                }
         
         # Step 2: Comprehensive duplicate detection for ALL bookings (platform and direct)
         # This catches cases where platform bookings had generated codes on first import
         if guest_name and start_date and end_date and isinstance(start_date, datetime) and isinstance(end_date, datetime):
-            # GPT Agent Fix: Use __date lookups to handle date-vs-datetime mismatches properly
-            potential_duplicates = Booking.objects.filter(
-                property=property_obj,
-                guest_name__iexact=guest_name,
-                check_in_date__date=start_date.date(),
-                check_out_date__date=end_date.date()
-            )
-            
-            if potential_duplicates.exists():
-                existing_booking = potential_duplicates.first()
-                if existing_booking:
-                    conflict_types = self._identify_conflict_types(existing_booking, booking_data)
-                    
-                    # Check if this is an exact duplicate (no meaningful differences)
-                    is_exact_duplicate = len(conflict_types) == 0
-                    
-                    # Status-only changes should be auto-updated for platform bookings
-                    is_status_only_change = len(conflict_types) == 1 and ConflictType.STATUS_CHANGE in conflict_types
-                    
-                    # Guest name changes should always require manual review (per user requirement)
-                    has_guest_change = ConflictType.GUEST_CHANGE in conflict_types
-                    
-                    # AGENT FIX: Only auto-resolve status-only changes for platform bookings
-                    auto_resolve = (not is_direct_booking) and is_status_only_change
-                    
-                    # This is likely a duplicate from the same Excel file
-                    conflict = BookingConflict(existing_booking, booking_data, conflict_types, row_number)
-                    return {
-                        'has_conflicts': True,
-                        'auto_resolve': auto_resolve,
-                        'existing_booking': existing_booking,
-                        'conflict': conflict,
-                        'is_exact_duplicate': is_exact_duplicate and not is_status_only_change
-                    }
+            existing_booking = lookup.exact_dates_match(property_obj, guest_name, start_date, end_date)
+            if existing_booking:
+                conflict_types = self._identify_conflict_types(existing_booking, booking_data)
+                
+                # Check if this is an exact duplicate (no meaningful differences)
+                is_exact_duplicate = len(conflict_types) == 0
+                
+                # Status-only changes should be auto-updated for platform bookings
+                is_status_only_change = len(conflict_types) == 1 and ConflictType.STATUS_CHANGE in conflict_types
+                
+                # Guest name changes should always require manual review (per user requirement)
+                has_guest_change = ConflictType.GUEST_CHANGE in conflict_types
+                
+                # AGENT FIX: Only auto-resolve status-only changes for platform bookings
+                auto_resolve = (not is_direct_booking) and is_status_only_change
+                
+                # This is likely a duplicate from the same Excel file
+                conflict = BookingConflict(existing_booking, booking_data, conflict_types, row_number)
+                return {
+                    'has_conflicts': True,
+                    'auto_resolve': auto_resolve,
+                    'existing_booking': existing_booking,
+                    'conflict': conflict,
+                    'is_exact_duplicate': is_exact_duplicate and not is_status_only_change
+                }
             
             # Step 3: Check for date overlaps (different from exact match)
-            overlapping_bookings = Booking.objects.filter(
-                property=property_obj,
-                guest_name__iexact=guest_name,
-                check_in_date__lt=end_date.date(),
-                check_out_date__gt=start_date.date()
-            ).exclude(
-                check_in_date__date=start_date.date(),
-                check_out_date__date=end_date.date()
-            )
-            
-            if overlapping_bookings.exists():
-                existing_booking = overlapping_bookings.first()
-                if existing_booking:
-                    conflict_types = self._identify_conflict_types(existing_booking, booking_data)
-                    conflict = BookingConflict(existing_booking, booking_data, conflict_types, row_number)
-                    
-                    return {
-                        'has_conflicts': True,
-                        'auto_resolve': False,  # Date overlaps always need manual review
-                        'existing_booking': existing_booking,
-                        'conflict': conflict,
-                        'is_exact_duplicate': False  # Overlaps are not exact duplicates
-                    }
+            existing_booking = lookup.overlap_match(property_obj, guest_name, start_date, end_date)
+            if existing_booking:
+                conflict_types = self._identify_conflict_types(existing_booking, booking_data)
+                conflict = BookingConflict(existing_booking, booking_data, conflict_types, row_number)
+                
+                return {
+                    'has_conflicts': True,
+                    'auto_resolve': False,  # Date overlaps always need manual review
+                    'existing_booking': existing_booking,
+                    'conflict': conflict,
+                    'is_exact_duplicate': False  # Overlaps are not exact duplicates
+                }
         
         return {
             'has_conflicts': False,
@@ -895,7 +1308,7 @@ class EnhancedExcelImportService(ExcelImportService):
         """Create tasks from active templates for imported bookings"""
         from ..models import AutoTaskTemplate
         
-        task_count = 0
+        created_tasks = []
         try:
             active_templates = AutoTaskTemplate.objects.filter(is_active=True)
             
@@ -903,13 +1316,28 @@ class EnhancedExcelImportService(ExcelImportService):
                 for template in active_templates:
                     task = template.create_task_for_booking(booking)
                     if task:
-                        task_count += 1
+                        created_tasks.append(task)
                         logger.info(f"Created task '{task.title}' for booking {booking.external_code}")
                         
         except Exception as e:
             logger.error(f"Error creating automated tasks: {str(e)}")
+
+        if created_tasks:
+            try:
+                # Default checklist per task type, materialized for every new task in bulk
+                templates = checklist_materializer.default_templates(task.task_type for task in created_tasks)
+                checklist_materializer.materialize(
+                    [(task, templates.get(task.task_type)) for task in created_tasks], actor=self.user
+                )
+            except Exception as e:
+                logger.warning(f"Could not create checklists for imported tasks: {str(e)}")
+            try:
+                # One batched fan-out for the whole import instead of per-task inserts
+                NotificationService.notify_on_create_many(created_tasks, actor=self.user)
+            except Exception as e:
+                logger.warning(f"Could not send notifications for imported tasks: {str(e)}")
             
-        return task_count
+        return len(created_tasks)
     
     def _create_cleaning_task(self, *args, **kwargs):
         """Override legacy auto-cleaning to avoid duplicate template tasks."""
@@ -7,7 +7,7 @@ avoiding stream consumption issues and providing validation.
 import io
 import hashlib
 import logging
-from typing import Tuple
+from typing import Any, Dict, Iterator, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -100,3 +100,51 @@ def validate_excel_file(uploaded_file) -> Tuple[bool, str, bytes]:
     except Exception as e:
         logger.error(f"Excel file validation failed: {e}", exc_info=True)
         return False, f"File validation error: {str(e)}", b''
+
+
+def iter_sheet_chunks(data: bytes, sheet_name: str, chunk_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream a worksheet as chunks of ``{header: value}`` dicts.
+    
+    Uses openpyxl in read-only mode so rows are parsed lazily from the
+    archive instead of materializing the whole sheet (as pandas.read_excel
+    does). Header naming follows pandas: blank headers become
+    ``Unnamed: <index>``.
+    
+    Args:
+        data: Raw XLSX bytes (see validate_excel_file)
+        sheet_name: Worksheet to read
+        chunk_size: Maximum number of data rows per yielded chunk
+        
+    Yields:
+        List[Dict[str, Any]]: Up to ``chunk_size`` rows, in sheet order
+        
+    Raises:
+        ValueError: If the worksheet does not exist
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        headers = [
+            str(value) if value is not None else f"Unnamed: {index}"
+            for index, value in enumerate(header_row)
+        ]
+        
+        chunk = []
+        for values in rows:
+            chunk.append(dict(zip(headers, values)))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
@@ -113,7 +113,9 @@ class ExcelImportService:
             self.total_rows = len(df)
             
             # 3) Create import log WITHOUT file to avoid consuming stream
-            self.import_log = self._create_import_log_safe(excel_file, file_data)
+            #    (background jobs hand in their queued log, file already stored)
+            if self.import_log is None:
+                self.import_log = self._create_import_log_safe(excel_file, file_data)
             
             # First pass: identify all unique properties and handle new ones
             new_properties = self._identify_new_properties(df)
@@ -2,7 +2,8 @@
 File Cleanup Utilities for Excel Import System
 
 This module provides utilities for cleaning up old Excel import files
-to prevent disk space from growing indefinitely.
+to prevent disk space from growing indefinitely, and for garbage-collecting
+content-addressed upload blobs (api/blob_storage.py) nothing points at.
 """
 
 import os
@@ -10,8 +11,10 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from api.models import BookingImportLog
+from api import blob_storage
+from api.models import BookingImportLog, StoredBlob
 
 logger = logging.getLogger(__name__)
 
@@ -74,21 +77,17 @@ class ImportFileCleanupService:
         
         # Actually delete files
         deleted_count = 0
-        freed_space = 0
         errors = []
-        
+        released = []
         for file_info in files_info:
             try:
-                os.remove(file_info['file_path'])
-                
-                # Update the database record (clear the file reference)
+                # Releases the blob (other imports may share it) and clears the file reference
                 log = BookingImportLog.objects.get(pk=file_info['log_id'])
-                log.import_file.delete(save=False)  # Delete file reference
+                log.import_file.delete(save=False)
                 log.save()
+                released.append(file_info)
                 
                 deleted_count += 1
-                freed_space += file_info['size']
-                
                 logger.info(f"Deleted old import file: {file_info['file_name']}")
                 
             except Exception as e:
@@ -96,6 +95,15 @@ class ImportFileCleanupService:
                 errors.append(error_msg)
                 logger.error(error_msg)
         
+        # Old imports are past any replay window, so their blobs go without a grace period
+        ImportFileCleanupService.collect_unreferenced_blobs(
+            grace_hours=0, names=[info['file_name'] for info in released]
+        )
+        freed_space = sum(
+            info['size'] for info in {info['file_path']: info for info in released}.values()
+            if not os.path.exists(info['file_path'])
+        )
+        
         result.update({
             'files_deleted': deleted_count,
             'space_freed_bytes': freed_space,
@@ -108,6 +116,74 @@ class ImportFileCleanupService:
         
         return result
     
+    @staticmethod
+    def collect_unreferenced_blobs(grace_hours: Optional[int] = None, dry_run: bool = False,
+                                   names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Delete content-addressed upload blobs that no file field references.
+        
+        Args:
+            grace_hours: Keep blobs released less than this many hours ago
+                (default: settings.BLOB_GC_GRACE_HOURS), so replayed uploads can reuse them
+            dry_run: If True, only report what would be deleted
+            names: Limit collection to these stored names
+        
+        Returns:
+            Dictionary with collection results
+        """
+        if grace_hours is None:
+            grace_hours = getattr(settings, 'BLOB_GC_GRACE_HOURS', 24)
+        cutoff = timezone.now() - timedelta(hours=grace_hours)
+        
+        candidates = StoredBlob.objects.filter(ref_count=0, released_at__lte=cutoff)
+        if names is not None:
+            candidates = candidates.filter(name__in=names)
+        
+        result = {
+            'blobs_found': 0,
+            'blobs_deleted': 0,
+            'blobs_restored': 0,
+            'space_freed_bytes': 0,
+            'grace_hours': grace_hours,
+            'dry_run': dry_run,
+            'errors': [],
+        }
+        storage = blob_storage.get_blob_storage().wrapped
+        
+        for blob_id in candidates.values_list('pk', flat=True):
+            try:
+                with transaction.atomic():
+                    # Re-check under the row lock: an upload may have reused the blob meanwhile
+                    blob = StoredBlob.objects.select_for_update().filter(pk=blob_id, ref_count=0).first()
+                    if blob is None:
+                        continue
+                    result['blobs_found'] += 1
+                    
+                    # Rows changed behind the storage layer's back (e.g. queryset.update) still count
+                    references = blob_storage.count_references(blob.name)
+                    if references:
+                        if not dry_run:
+                            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=references, released_at=None)
+                        result['blobs_restored'] += 1
+                        continue
+                    
+                    if dry_run:
+                        result['space_freed_bytes'] += blob.size
+                        continue
+                    storage.delete(blob.name)
+                    blob.delete()
+                    result['blobs_deleted'] += 1
+                    result['space_freed_bytes'] += blob.size
+            except Exception as e:
+                error_msg = f"Failed to collect blob {blob_id}: {str(e)}"
+                result['errors'].append(error_msg)
+                logger.error(error_msg)
+        
+        result['space_freed_mb'] = round(result['space_freed_bytes'] / (1024 * 1024), 2)
+        if result['blobs_deleted']:
+            logger.info(f"Blob collection: {result['blobs_deleted']} blobs deleted, {result['space_freed_mb']} MB freed")
+        return result
+    
     @staticmethod
     def get_storage_stats() -> Dict[str, Any]:
         """Get current storage statistics for import files"""
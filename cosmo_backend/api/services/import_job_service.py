@@ -0,0 +1,245 @@
+"""
+Background Booking Import Jobs
+
+Uploads are stored on a BookingImportLog row with status "queued" and the
+request returns immediately with the log id as the job id. A worker then runs
+the import engine the caller chose (BookingImportLog.engine: the basic
+ExcelImportService, the row-by-row enhanced import or the streaming import,
+EnhancedExcelImportService.import_excel_file_streaming) and publishes
+progress - per chunk for the streaming engine - to the log row and to the
+Channels group ``import_job_<id>`` (see api.consumers.ImportJobConsumer).
+
+A job still queued or running BOOKING_IMPORT_JOB_TIMEOUT seconds after it
+was queued or started lost its worker; fail_stale() marks it failed. The
+status API applies it to the job being polled and run_import_jobs to all
+jobs when it starts.
+
+Queue backends (settings.BOOKING_IMPORT_JOB_BACKEND):
+- 'thread':    in-process worker pool, BOOKING_IMPORT_WORKERS threads (default)
+- 'database':  jobs stay queued until ``manage.py run_import_jobs`` claims them
+- 'immediate': run inline after commit; used by tests
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from api.audit_writer import audit_batch
+from api.models import BookingImportLog, BookingImportTemplate
+
+logger = logging.getLogger(__name__)
+
+# Keep the per-job result summary small; full errors remain in errors_log
+MAX_RESULT_ERRORS = 50
+
+
+def job_group_name(job_id: int) -> str:
+    """Channels group that receives progress events for a job"""
+    return f"import_job_{job_id}"
+
+
+class ImportJobService:
+    """Enqueue, run and report on background booking imports"""
+
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def _backend() -> str:
+        return getattr(settings, 'BOOKING_IMPORT_JOB_BACKEND', 'thread')
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BOOKING_IMPORT_WORKERS', 2),
+                thread_name_prefix='booking-import',
+            )
+        return cls._executor
+
+    # ---------------- public API ----------------
+    @classmethod
+    def enqueue(cls, user, excel_file, sheet_name: str = 'Cleaning schedule',
+                template: Optional[BookingImportTemplate] = None,
+                engine: str = BookingImportLog.ENGINE_STREAMING) -> BookingImportLog:
+        """Store the upload as a queued job and hand it to the configured backend"""
+        job = BookingImportLog(
+            template=template,
+            imported_by=user,
+            status=BookingImportLog.STATUS_QUEUED,
+            sheet_name=sheet_name,
+            engine=engine,
+            errors_log="Queued for background import...",
+        )
+        job.import_file.save(getattr(excel_file, 'name', 'import.xlsx'), excel_file, save=False)
+        job.save()
+        logger.info(f"Queued booking import job {job.pk} for {user.username} ({job.import_file.name})")
+
+        backend = cls._backend()
+        if backend == 'thread':
+            transaction.on_commit(lambda: cls._get_executor().submit(cls._run_in_worker, job.pk))
+        elif backend == 'immediate':
+            transaction.on_commit(lambda: cls.run(job.pk))
+        # 'database': picked up by run_import_jobs
+        return job
+
+    @classmethod
+    def claim_next(cls) -> Optional[int]:
+        """Atomically mark the oldest queued job as running and return its id"""
+        with transaction.atomic():
+            queued = BookingImportLog.objects.filter(status=BookingImportLog.STATUS_QUEUED).order_by('imported_at')
+            if connection.features.has_select_for_update_skip_locked:
+                queued = queued.select_for_update(skip_locked=True)
+            job = queued.only('pk').first()
+            if job is None:
+                return None
+            BookingImportLog.objects.filter(pk=job.pk).update(
+                status=BookingImportLog.STATUS_RUNNING, started_at=timezone.now()
+            )
+            return job.pk
+
+    @classmethod
+    def run(cls, job_id: int, claimed: bool = False) -> Optional[BookingImportLog]:
+        """Run a queued job to completion; returns the finished job"""
+        if not claimed:
+            started = BookingImportLog.objects.filter(
+                pk=job_id, status=BookingImportLog.STATUS_QUEUED
+            ).update(status=BookingImportLog.STATUS_RUNNING, started_at=timezone.now())
+            if not started:
+                logger.info(f"Import job {job_id} is not queued; skipping")
+                return None
+
+        job = BookingImportLog.objects.select_related('imported_by', 'template').get(pk=job_id)
+        cls.publish(job)
+
+        try:
+            with job.import_file.open('rb') as fh:
+                upload = ContentFile(fh.read(), name=os.path.basename(job.import_file.name))
+
+            with audit_batch():
+                result = cls._import(job, upload)
+        except Exception as e:
+            logger.error(f"Import job {job_id} crashed: {e}", exc_info=True)
+            result = {'success': False, 'error': str(e)}
+
+        job.status = BookingImportLog.STATUS_COMPLETED if result.get('success') else BookingImportLog.STATUS_FAILED
+        job.finished_at = timezone.now()
+        job.progress = {**(job.progress or {}), 'result': cls._summarize(job, result)}
+        if not result.get('success'):
+            job.errors_log = f"Import failed: {result.get('error') or result.get('message') or 'Unknown error'}"
+        job.save()
+        cls.publish(job)
+        logger.info(f"Import job {job_id} finished with status {job.status}")
+        return job
+
+    @classmethod
+    def fail_stale(cls, jobs=None) -> int:
+        """Mark jobs whose worker went away (queued or running past BOOKING_IMPORT_JOB_TIMEOUT) failed"""
+        timeout = getattr(settings, 'BOOKING_IMPORT_JOB_TIMEOUT', 3600)
+        cutoff = timezone.now() - timedelta(seconds=timeout)
+        jobs = BookingImportLog.objects.all() if jobs is None else jobs
+        stale = jobs.filter(
+            Q(status=BookingImportLog.STATUS_QUEUED, imported_at__lt=cutoff)
+            | Q(status=BookingImportLog.STATUS_RUNNING, started_at__lt=cutoff)
+        )
+        failed = 0
+        for job in stale:
+            error = f"Import job was still {job.status} after {timeout} seconds; its worker stopped"
+            progress = {**(job.progress or {}), 'result': {'success': False, 'error': error}}
+            # Only if no worker moved it on since it was read
+            if not BookingImportLog.objects.filter(pk=job.pk, status=job.status).update(
+                status=BookingImportLog.STATUS_FAILED, finished_at=timezone.now(),
+                progress=progress, errors_log=f"Import failed: {error}",
+            ):
+                continue
+            failed += 1
+            logger.warning(f"Import job {job.pk}: {error}")
+            job.refresh_from_db()
+            cls.publish(job)
+        return failed
+
+    @classmethod
+    def publish(cls, job: BookingImportLog, progress: Optional[Dict[str, Any]] = None):
+        """Record progress on the job row and broadcast it to subscribers"""
+        if progress is not None:
+            job.progress = {**(job.progress or {}), **progress}
+            BookingImportLog.objects.filter(pk=job.pk).update(progress=job.progress)
+        cls._broadcast(job.pk, cls.serialize(job))
+
+    @staticmethod
+    def serialize(job: BookingImportLog) -> Dict[str, Any]:
+        """JSON payload used by the status API and the progress channel"""
+        return {
+            'job_id': job.pk,
+            'status': job.status,
+            'sheet_name': job.sheet_name,
+            'progress': job.progress or {},
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'done': job.status in (BookingImportLog.STATUS_COMPLETED, BookingImportLog.STATUS_FAILED),
+        }
+
+    # ---------------- internals ----------------
+    @classmethod
+    def _import(cls, job: BookingImportLog, upload: ContentFile) -> Dict[str, Any]:
+        """Run the job's engine against its queued log"""
+        from .enhanced_excel_import_service import EnhancedExcelImportService
+        from .excel_import_service_backup import ExcelImportService
+
+        if job.engine == BookingImportLog.ENGINE_BASIC:
+            service = ExcelImportService(job.imported_by, job.template)
+        else:
+            service = EnhancedExcelImportService(job.imported_by, job.template)
+        service.import_log = job
+        if job.engine == BookingImportLog.ENGINE_STREAMING:
+            return service.import_excel_file_streaming(
+                upload,
+                job.sheet_name,
+                progress_callback=lambda progress: cls.publish(job, progress),
+            )
+        return service.import_excel_file(upload, job.sheet_name)
+
+    @classmethod
+    def _run_in_worker(cls, job_id: int):
+        close_old_connections()
+        try:
+            cls.run(job_id)
+        except Exception as e:
+            logger.error(f"Import worker failed for job {job_id}: {e}", exc_info=True)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _summarize(job: BookingImportLog, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Result payload for clients, mirroring the synchronous import API"""
+        summary = {key: value for key, value in result.items() if key != 'conflicts'}
+        summary['errors'] = list(result.get('errors') or [])[:MAX_RESULT_ERRORS]
+        summary['warnings'] = list(result.get('warnings') or [])[:MAX_RESULT_ERRORS]
+        if result.get('requires_review') and result.get('import_session_id'):
+            summary['conflict_review_url'] = reverse('conflict-review', args=[result['import_session_id']])
+        return summary
+
+    @staticmethod
+    def _broadcast(job_id: int, payload: Dict[str, Any]):
+        try:
+            from asgiref.sync import async_to_sync
+            from channels.layers import get_channel_layer
+
+            channel_layer = get_channel_layer()
+            if channel_layer is None:
+                return
+            async_to_sync(channel_layer.group_send)(
+                job_group_name(job_id),
+                {'type': 'import.progress', 'job': payload},
+            )
+        except Exception as e:
+            # Progress is also on the job row; polling clients still see it
+            logger.debug(f"Could not broadcast import job {job_id} progress: {e}")
@@ -1,10 +1,21 @@
 # api/services/notification_service.py
 import json
+import logging
+from collections import defaultdict
 from datetime import datetime, timedelta, timezone
-import requests
+from types import SimpleNamespace
+from typing import Iterable
 from django.conf import settings
+from django.db import transaction
 
 from api.models import Notification, Task, NotificationVerb
+from api.services.push_delivery import build_message, get_push_pipeline
+from api import mobile_sync
+
+logger = logging.getLogger(__name__)
+
+# Task fields compared by notify_on_update
+NOTIFY_FIELDS = ('assigned_to_id', 'status', 'title', 'description', 'due_date')
 
 class NotificationService:
     _fcm_token: str | None = None
@@ -30,26 +41,52 @@ class NotificationService:
 
     # ---------------- recipients ----------------
     @staticmethod
-    def _recipients(task: Task, *, actor=None):
-        people = set()
-        if task.assigned_to:
-            people.add(task.assigned_to)
-        if task.created_by and task.created_by != task.assigned_to:
-            people.add(task.created_by)
-        # respect per-task mutes
-        people -= set(task.muted_by.all())
-        # don’t notify the person who performed the action
-        if actor is not None:
-            people.discard(actor)
-        return people
+    def _recipient_ids(tasks: Iterable[Task], *, actor=None) -> dict[int, set[int]]:
+        """Recipient user ids per task id; mutes for all tasks come from one query"""
+        tasks = list(tasks)
+        muted = defaultdict(set)
+        rows = Task.muted_by.through.objects.filter(task_id__in=[t.pk for t in tasks])
+        for task_id, user_id in rows.values_list('task_id', 'user_id'):
+            muted[task_id].add(user_id)
+
+        actor_id = getattr(actor, 'pk', None)
+        recipients = {}
+        for task in tasks:
+            people = {task.assigned_to_id, task.created_by_id} - {None}
+            # respect per-task mutes
+            people -= muted[task.pk]
+            # don’t notify the person who performed the action
+            people.discard(actor_id)
+            recipients[task.pk] = people
+        return recipients
 
     # ---------------- public API ----------------
+    @staticmethod
+    def snapshot(task: Task) -> SimpleNamespace:
+        """Pre-save copy of the fields notify_on_update compares (no query)"""
+        return SimpleNamespace(**{field: getattr(task, field) for field in NOTIFY_FIELDS})
+
     @staticmethod
     def notify_on_create(task: Task, *, actor=None):
         """On creation, ping the assignee (if any) and creator (if different)."""
+        NotificationService.notify_on_create_many([task], actor=actor)
+
+    @staticmethod
+    def notify_on_create_many(tasks: Iterable[Task], *, actor=None):
+        """notify_on_create for a batch of new tasks (e.g. tasks created by an import)"""
         # If an assignee exists, the most useful verb is "assigned"
-        verb = NotificationVerb.ASSIGNED if task.assigned_to else NotificationVerb.CREATED
-        NotificationService._emit(task, [verb], actor=actor)
+        return NotificationService.fan_out(
+            [(task, [NotificationVerb.ASSIGNED if task.assigned_to_id else NotificationVerb.CREATED])
+             for task in tasks],
+            actor=actor,
+        )
+
+    @staticmethod
+    def notify_status_changed(tasks: Iterable[Task], *, actor=None):
+        """STATUS_CHANGED for a batch of tasks updated in bulk"""
+        return NotificationService.fan_out(
+            [(task, [NotificationVerb.STATUS_CHANGED]) for task in tasks], actor=actor
+        )
 
     @staticmethod
     def notify_on_update(old: Task, new: Task, *, actor=None):
@@ -85,53 +122,88 @@ class NotificationService:
             actor=actor,
         )
 
+    @staticmethod
+    def fan_out(events: Iterable[tuple[Task, list[str]]], *, actor=None) -> list[Notification]:
+        """
+        Create notifications for many (task, verbs) events at once.
+
+        Recipients for every task are resolved with one mute query, duplicates
+        are checked against existing unread rows with one query, and the new
+        rows are written with a single bulk_create. Pushes for the new rows
+        are sent after the transaction commits (bulk_create skips post_save).
+        """
+        verbs_by_task = {}
+        tasks = {}
+        for task, verbs in events:
+            tasks[task.pk] = task
+            verbs_by_task.setdefault(task.pk, [])
+            for verb in verbs:
+                if verb not in verbs_by_task[task.pk]:
+                    verbs_by_task[task.pk].append(verb)
+        if not tasks:
+            return []
+
+        recipients = NotificationService._recipient_ids(tasks.values(), actor=actor)
+        wanted = [
+            (user_id, task_id, verb)
+            for task_id, verbs in verbs_by_task.items()
+            for user_id in sorted(recipients[task_id])
+            for verb in verbs
+        ]
+        if not wanted:
+            return []
+
+        # de-dupe: if an unread row for same (user, task, verb) exists newer than the
+        # task's last modification, skip to avoid stacking banners
+        existing = Notification.objects.filter(
+            task_id__in={task_id for _, task_id, _ in wanted},
+            recipient_id__in={user_id for user_id, _, _ in wanted},
+            verb__in={verb for _, _, verb in wanted},
+            read=False,
+        ).values_list('recipient_id', 'task_id', 'verb', 'timestamp')
+        duplicates = {
+            (user_id, task_id, verb)
+            for user_id, task_id, verb, timestamp in existing
+            if tasks[task_id].modified_at is None or timestamp >= tasks[task_id].modified_at
+        }
+
+        notifications = Notification.objects.bulk_create([
+            Notification(recipient_id=user_id, task_id=task_id, verb=verb)
+            for user_id, task_id, verb in wanted
+            if (user_id, task_id, verb) not in duplicates
+        ])
+        ids = [n.pk for n in notifications if n.pk is not None]
+        mobile_sync.record(mobile_sync.NOTIFICATION,
+                           [(n.pk, n.recipient_id, False) for n in notifications if n.pk is not None])
+        if ids:
+            transaction.on_commit(lambda: NotificationService._push_created(ids))
+        return notifications
+
     # ---------------- internals ----------------
     @staticmethod
     def _emit(task: Task, verbs: list[str], *, actor=None):
-        for user in NotificationService._recipients(task, actor=actor):
-            for verb in verbs:
-                # de-dupe: if an unread row for same (user, task, verb) exists newer than the
-                # last modification, skip to avoid stacking banners
-                duplicate = Notification.objects.filter(
-                    recipient=user, task=task, verb=verb, read=False,
-                    timestamp__gte=task.modified_at
-                ).exists()
-                if duplicate:
-                    continue
-                Notification.objects.create(
-                    recipient=user,
-                    task=task,
-                    verb=verb,
-                )
+        NotificationService.fan_out([(task, verbs)], actor=actor)
+
+    @staticmethod
+    def _push_created(notification_ids: list[int]):
+        """Hand freshly bulk-created notifications to the background push pipeline"""
+        try:
+            get_push_pipeline().dispatch(notification_ids)
+        except Exception as e:
+            logger.warning(f"Could not queue pushes for {len(notification_ids)} notification(s): {e}")
 
     @classmethod
     def push_to_device(cls, user, task, verb, notification_id) -> bool:
-        tokens = user.devices.values_list("token", flat=True).order_by().distinct()
+        """
+        Blocking push of one notification to every device of ``user``.
+
+        Notifications created through fan_out() or saved individually are
+        pushed off the request by the pipeline; this stays for direct callers.
+        """
+        tokens = list(user.devices.values_list("token", flat=True).order_by().distinct())
         if not tokens:
             return False
 
-        access_token = cls._get_fcm_token()
-        url = f"https://fcm.googleapis.com/v1/projects/{settings.FIREBASE_PROJECT_ID}/messages:send"
-        headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
-
-        ok = True
-        for token in tokens:
-            payload = {
-                "message": {
-                    "token": token,
-                    "notification": {
-                        "title": f"Task {verb.replace('_', ' ')}",
-                        "body":  f"“{task.title}”",
-                    },
-                    "data": {
-                        "task_id":         str(task.id),
-                        "notification_id": str(notification_id),
-                        "verb":            verb,
-                        "click_action":    "FLUTTER_NOTIFICATION_CLICK",
-                    },
-                }
-            }
-            resp = requests.post(url, headers=headers, json=payload, timeout=10)
-            if resp.status_code != 200:
-                ok = False
-        return ok
\ No newline at end of file
+        notification = Notification(pk=notification_id, recipient=user, task=task, verb=verb)
+        report = get_push_pipeline().deliver([build_message(token, notification) for token in tokens])
+        return not report.failed and notification_id in report.delivered
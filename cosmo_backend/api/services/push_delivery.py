@@ -0,0 +1,335 @@
+# api/services/push_delivery.py
+"""
+FCM push delivery pipeline.
+
+NotificationService used to send one blocking requests.post per device token,
+with a fresh connection each time, from inside the request that created the
+notification. PushDeliveryPipeline instead:
+
+- reads recipients' device tokens with one query in the caller, then hands the
+  messages to a background dispatcher so HTTP latency never reaches the request;
+- lingers briefly so notifications committed close together are merged, and
+  coalesces several notifications for the same device into one push;
+- sends concurrently from a thread pool over a pooled, keep-alive session;
+- retries 429/5xx/connection errors with exponential backoff (honoring
+  Retry-After) and deletes Device rows whose token FCM reports as invalid;
+- flags delivered notifications with one push_sent update.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from requests.adapters import HTTPAdapter
+
+from api.models import Device, Notification
+
+logger = logging.getLogger(__name__)
+
+FCM_SEND_URL = 'https://fcm.googleapis.com/v1/projects/{project_id}/messages:send'
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+INVALID_TOKEN_CODES = frozenset({'UNREGISTERED', 'INVALID_ARGUMENT'})
+
+
+@dataclass
+class PushMessage:
+    """One push for one device token; may carry several notifications"""
+    token: str
+    notification_ids: list
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+
+
+@dataclass
+class DeliveryReport:
+    delivered: set = field(default_factory=set)     # notification ids
+    failed: set = field(default_factory=set)        # notification ids
+    invalid_tokens: set = field(default_factory=set)
+    attempts: int = 0
+
+
+def build_message(token, notification):
+    verb = notification.verb
+    return PushMessage(
+        token=token,
+        notification_ids=[notification.pk],
+        title=f"Task {verb.replace('_', ' ')}",
+        body=f"“{notification.task.title}”",
+        data={
+            "task_id": str(notification.task_id),
+            "notification_id": str(notification.pk),
+            "verb": verb,
+            "click_action": "FLUTTER_NOTIFICATION_CLICK",
+        },
+    )
+
+
+def build_messages(notifications):
+    """
+    One message per (device token, notification). Tokens for every recipient
+    are loaded with a single query; notifications need task selected.
+    """
+    notifications = list(notifications)
+    tokens = {}
+    rows = (Device.objects.filter(user_id__in={n.recipient_id for n in notifications})
+            .values_list('user_id', 'token').order_by())
+    for user_id, token in rows:
+        tokens.setdefault(user_id, set()).add(token)
+    return [
+        build_message(token, notification)
+        for notification in notifications
+        for token in sorted(tokens.get(notification.recipient_id, ()))
+    ]
+
+
+def coalesce(messages):
+    """Merge messages addressed to the same token into a single push"""
+    by_token = {}
+    for message in messages:
+        by_token.setdefault(message.token, []).append(message)
+
+    merged = []
+    for token, group in by_token.items():
+        if len(group) == 1:
+            merged.append(group[0])
+            continue
+        latest = group[-1]
+        ids = [nid for m in group for nid in m.notification_ids]
+        bodies = list(dict.fromkeys(m.body for m in group))
+        verbs = {m.data.get('verb') for m in group}
+        merged.append(PushMessage(
+            token=token,
+            notification_ids=ids,
+            title=f"{len(ids)} task updates",
+            body=", ".join(bodies[:3]) + (f" and {len(bodies) - 3} more" if len(bodies) > 3 else ""),
+            data={
+                **latest.data,
+                "verb": latest.data.get('verb') if len(verbs) == 1 else "multiple",
+                "notification_ids": ",".join(str(nid) for nid in ids),
+            },
+        ))
+    return merged
+
+
+class PushDeliveryPipeline:
+    """Pooled, concurrent FCM sender; see the module docstring"""
+
+    def __init__(self, *, endpoint, token_provider, max_workers=8, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, timeout=5.0, linger=0.2, sleep=time.sleep):
+        self.endpoint = endpoint
+        self.token_provider = token_provider
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.linger = linger
+        self.sleep = sleep
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._senders = None
+        self._dispatcher = None
+        self._pending = []
+        self._flush_scheduled = False
+        self.stats = {'sent': 0, 'failed': 0, 'retried': 0, 'coalesced': 0, 'pruned_tokens': 0}
+
+    @classmethod
+    def from_settings(cls):
+        from api.services.notification_service import NotificationService
+
+        endpoint = getattr(settings, 'FCM_SEND_URL', None) or FCM_SEND_URL.format(
+            project_id=getattr(settings, 'FIREBASE_PROJECT_ID', '')
+        )
+        return cls(
+            endpoint=endpoint,
+            token_provider=NotificationService._get_fcm_token,
+            max_workers=getattr(settings, 'PUSH_MAX_WORKERS', 8),
+            max_retries=getattr(settings, 'PUSH_MAX_RETRIES', 3),
+            backoff_base=getattr(settings, 'PUSH_BACKOFF_BASE_SECONDS', 0.5),
+            backoff_max=getattr(settings, 'PUSH_BACKOFF_MAX_SECONDS', 8.0),
+            timeout=getattr(settings, 'PUSH_TIMEOUT_SECONDS', 5.0),
+            linger=getattr(settings, 'PUSH_LINGER_SECONDS', 0.2),
+        )
+
+    # ---------------- resources ----------------
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def _executor(self, attr, workers, prefix):
+        with self._lock:
+            executor = getattr(self, attr)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix)
+                setattr(self, attr, executor)
+            return executor
+
+    def close(self):
+        with self._lock:
+            executors = [e for e in (self._dispatcher, self._senders) if e is not None]
+            self._dispatcher = self._senders = None
+            session, self._session = self._session, None
+        for executor in executors:
+            executor.shutdown(wait=True)
+        if session is not None:
+            session.close()
+
+    # ---------------- entry points ----------------
+    def dispatch(self, notification_ids):
+        """
+        Queue pushes for notifications without blocking the caller.
+
+        Tokens are looked up here (one query); sending, retries and the
+        resulting database updates happen on the dispatcher thread.
+        """
+        notifications = (Notification.objects.filter(pk__in=list(notification_ids), push_sent=False)
+                         .select_related('task'))
+        messages = build_messages(notifications)
+        if not messages:
+            return
+        with self._lock:
+            self._pending.extend(messages)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._executor('_dispatcher', 1, 'push-dispatch').submit(self._flush_pending)
+
+    def deliver(self, messages):
+        """Send messages now (blocking), then record the outcome; returns a DeliveryReport"""
+        report = self.send(messages)
+        self.record(report)
+        return report
+
+    # ---------------- internals ----------------
+    def _flush_pending(self):
+        if self.linger:
+            self.sleep(self.linger)
+        with self._lock:
+            messages, self._pending = self._pending, []
+            self._flush_scheduled = False
+        try:
+            self.deliver(messages)
+        except Exception:
+            logger.exception("Push delivery batch failed")
+        finally:
+            close_old_connections()
+
+    def send(self, messages):
+        """Coalesce per device and send concurrently; no database access"""
+        messages = list(messages)
+        batch = coalesce(messages)
+        self.stats['coalesced'] += len(messages) - len(batch)
+        report = DeliveryReport()
+        if not batch:
+            return report
+
+        access_token = self.token_provider()
+        senders = self._executor('_senders', self.max_workers, 'push-send')
+        for message, (outcome, attempts) in zip(batch, senders.map(lambda m: self._send_one(m, access_token), batch)):
+            report.attempts += attempts
+            if outcome == 'sent':
+                report.delivered.update(message.notification_ids)
+            else:
+                report.failed.update(message.notification_ids)
+                if outcome == 'invalid_token':
+                    report.invalid_tokens.add(message.token)
+
+        # a notification counts as delivered if any of its devices got it
+        report.failed -= report.delivered
+        self.stats['sent'] += len(report.delivered)
+        self.stats['failed'] += len(report.failed)
+        return report
+
+    def record(self, report):
+        if report.delivered:
+            Notification.objects.filter(pk__in=report.delivered).update(push_sent=True)
+        if report.invalid_tokens:
+            pruned, _ = Device.objects.filter(token__in=report.invalid_tokens).delete()
+            self.stats['pruned_tokens'] += pruned
+            logger.info(f"Pruned {pruned} invalid FCM device token(s)")
+
+    def _send_one(self, message, access_token):
+        """Returns (outcome, attempts) with outcome in sent / invalid_token / failed"""
+        payload = {
+            "message": {
+                "token": message.token,
+                "notification": {"title": message.title, "body": message.body},
+                "data": message.data,
+            }
+        }
+        headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                resp = self.session.post(self.endpoint, headers=headers, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.warning(f"FCM send failed (attempt {attempt}): {e}")
+            else:
+                if resp.status_code == 200:
+                    return 'sent', attempt
+                if self._is_invalid_token(resp):
+                    return 'invalid_token', attempt
+                if resp.status_code not in RETRY_STATUSES:
+                    logger.warning(f"FCM rejected push ({resp.status_code}): {resp.text[:200]}")
+                    return 'failed', attempt
+                retry_after = resp.headers.get('Retry-After')
+
+            if attempt > self.max_retries:
+                return 'failed', attempt
+            self.stats['retried'] += 1
+            self.sleep(self._backoff(attempt, retry_after))
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        delay = min(self.backoff_base * (2 ** (attempt - 1)), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _is_invalid_token(resp):
+        if resp.status_code not in (400, 404):
+            return False
+        try:
+            error = resp.json().get('error', {})
+        except ValueError:
+            return resp.status_code == 404
+        codes = {d.get('errorCode') for d in error.get('details', []) if isinstance(d, dict)}
+        if codes & INVALID_TOKEN_CODES:
+            # INVALID_ARGUMENT also covers malformed payloads; only prune on token errors
+            return 'UNREGISTERED' in codes or 'token' in error.get('message', '').lower()
+        return resp.status_code == 404
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_push_pipeline():
+    """Process-wide pipeline (shares the session and thread pools)"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = PushDeliveryPipeline.from_settings()
+        return _pipeline
@@ -0,0 +1,233 @@
+"""
+Off-request Task Image Optimization
+
+Uploads are stored raw under ``task_images/staging/`` on a TaskImage with
+processing_status "pending" and the upload request returns at once. A worker
+then optimizes the image (api.utils.image_ops.optimize_image), renders its
+thumbnail/medium renditions (api.image_renditions), stores the result at the
+image's regular path, releases the staged original and marks the row "ready" -
+or "failed" with processing_error, keeping the raw upload.
+Clients poll the image detail endpoint until processing_status settles.
+
+A worker claims an image by moving it to "processing" and stamping
+processing_started_at. A claim older than TASK_IMAGE_CLAIM_TIMEOUT seconds
+belongs to a worker that died, and claim_next() hands the image out again;
+results are only stored under the claim that produced them. The in-process
+backends lose their queue on a restart, so requeue_stale() - called when a
+client polls the image - puts an image pending or processing for that long
+back on the queue.
+
+Queue backends (settings.TASK_IMAGE_PROCESSING_BACKEND):
+- 'thread':   after commit, one of TASK_IMAGE_WORKERS threads in the web
+              worker optimizes the image (default)
+- 'process':  as 'thread', but the threads hand the bytes to a pool of spawned
+              processes so encoding never holds the web worker's GIL (opt-in)
+- 'database': images stay pending until ``manage.py process_task_images`` claims them
+- 'inline':   optimize inside the request, as before; used by tests
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api import image_renditions
+from api.models import TaskImage
+from api.utils.image_ops import optimize_image_bytes, render_renditions
+
+logger = logging.getLogger(__name__)
+
+
+class TaskImageProcessingService:
+    """Queue, run and report on task image optimization"""
+
+    _dispatcher: Optional[ThreadPoolExecutor] = None
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def _backend() -> str:
+        return getattr(settings, 'TASK_IMAGE_PROCESSING_BACKEND', 'thread')
+
+    @staticmethod
+    def _options() -> Dict[str, Any]:
+        """optimize_image() arguments; passed explicitly because pool processes have no settings"""
+        return {
+            'max_dimension': getattr(settings, 'STORED_IMAGE_MAX_DIM', 2048),
+            'target_size': getattr(settings, 'STORED_IMAGE_TARGET_BYTES', 5 * 1024 * 1024),
+            'use_webp': True,
+            'time_budget': getattr(settings, 'IMAGE_OPTIMIZE_TIME_BUDGET', 10.0),
+        }
+
+    @classmethod
+    def _get_dispatcher(cls) -> ThreadPoolExecutor:
+        if cls._dispatcher is None:
+            cls._dispatcher = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TASK_IMAGE_WORKERS', 2),
+                thread_name_prefix='task-image',
+            )
+        return cls._dispatcher
+
+    @classmethod
+    def _get_pool(cls) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            # spawn: forking a threaded web worker can copy held locks into the child
+            cls._pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, 'TASK_IMAGE_WORKERS', 2),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return cls._pool
+
+    # ---------------- public API ----------------
+    @classmethod
+    def enqueue(cls, image: TaskImage) -> TaskImage:
+        """Hand a freshly stored pending image to the configured backend"""
+        backend = cls._backend()
+        if backend == 'inline':
+            cls.run(image.pk, use_pool=False)
+            image.refresh_from_db()
+        elif backend in ('thread', 'process'):
+            use_pool = backend == 'process'
+            transaction.on_commit(lambda: cls._get_dispatcher().submit(cls._run_in_worker, image.pk, use_pool))
+        # 'database': picked up by process_task_images
+        return image
+
+    @classmethod
+    def claim_next(cls) -> Optional[int]:
+        """Atomically claim the oldest pending (or abandoned) image and return its id"""
+        stale = timezone.now() - timedelta(seconds=getattr(settings, 'TASK_IMAGE_CLAIM_TIMEOUT', 600))
+        with transaction.atomic():
+            claimable = TaskImage.objects.filter(
+                Q(processing_status=TaskImage.PROCESSING_PENDING)
+                | Q(processing_status=TaskImage.PROCESSING_RUNNING, processing_started_at__lt=stale)
+                | Q(processing_status=TaskImage.PROCESSING_RUNNING, processing_started_at__isnull=True)
+            ).order_by('uploaded_at')
+            if connection.features.has_select_for_update_skip_locked:
+                claimable = claimable.select_for_update(skip_locked=True)
+            image = claimable.only('pk', 'processing_status').first()
+            if image is None:
+                return None
+            if image.processing_status == TaskImage.PROCESSING_RUNNING:
+                logger.warning(f"Reclaiming task image {image.pk}; its previous worker did not finish")
+            TaskImage.objects.filter(pk=image.pk).update(
+                processing_status=TaskImage.PROCESSING_RUNNING, processing_started_at=timezone.now()
+            )
+            return image.pk
+
+    @classmethod
+    def requeue_stale(cls, images=None) -> int:
+        """Queue again images whose in-process job was lost (pending or processing past the claim timeout)"""
+        if cls._backend() not in ('thread', 'process'):
+            return 0  # 'database' workers reclaim through claim_next; 'inline' never leaves work behind
+        stale = timezone.now() - timedelta(seconds=getattr(settings, 'TASK_IMAGE_CLAIM_TIMEOUT', 600))
+        images = TaskImage.objects.all() if images is None else images
+        candidates = images.filter(
+            Q(processing_status=TaskImage.PROCESSING_RUNNING, processing_started_at__lt=stale)
+            | Q(processing_status=TaskImage.PROCESSING_RUNNING, processing_started_at__isnull=True)
+            | Q(processing_status=TaskImage.PROCESSING_PENDING, processing_started_at__lt=stale)
+            | Q(processing_status=TaskImage.PROCESSING_PENDING, processing_started_at__isnull=True,
+                uploaded_at__lt=stale)
+        ).values_list('pk', 'processing_status', 'processing_started_at')
+        requeued = 0
+        for pk, status, started_at in candidates:
+            # Stamped with the requeue time so polling does not queue it again before the timeout;
+            # only if no worker moved it on since it was read
+            if not TaskImage.objects.filter(pk=pk, processing_status=status,
+                                            processing_started_at=started_at).update(
+                processing_status=TaskImage.PROCESSING_PENDING, processing_started_at=timezone.now()
+            ):
+                continue
+            logger.warning(f"Requeueing task image {pk}; it was still {status} after the claim timeout")
+            cls.enqueue(TaskImage(pk=pk))
+            requeued += 1
+        return requeued
+
+    @classmethod
+    def run(cls, image_id: int, claimed: bool = False, use_pool: bool = True) -> Optional[TaskImage]:
+        """Optimize a pending image and store the result; returns the updated image"""
+        if not claimed:
+            started = TaskImage.objects.filter(
+                pk=image_id, processing_status=TaskImage.PROCESSING_PENDING
+            ).update(processing_status=TaskImage.PROCESSING_RUNNING, processing_started_at=timezone.now())
+            if not started:
+                logger.info(f"Task image {image_id} is not pending; skipping")
+                return None
+
+        image = TaskImage.objects.select_related('task').get(pk=image_id)
+        # Writes below only land while this claim is current, in case the image was reclaimed
+        ours = TaskImage.objects.filter(pk=image_id, processing_status=TaskImage.PROCESSING_RUNNING,
+                                        processing_started_at=image.processing_started_at)
+        staged_name = image.image.name
+        try:
+            with image.image.open('rb') as fh:
+                raw = fh.read()
+            optimized, metadata = cls._call(use_pool, optimize_image_bytes, raw, **cls._options())
+        except Exception as e:
+            logger.warning(f"Task image {image_id} could not be optimized: {e}")
+            ours.update(processing_status=TaskImage.PROCESSING_FAILED, processing_error=str(e)[:500])
+            image.refresh_from_db()
+            return image
+
+        digest = cls._renditions(optimized, use_pool)
+
+        # Store under the regular (non-staging) path for the now-ready image
+        image.processing_status = TaskImage.PROCESSING_READY
+        field = image.image.field
+        stored = ContentFile(optimized)
+        stored.content_digest = digest or None  # blob storage hashes it itself otherwise
+        name = field.storage.save(field.generate_filename(image, f"opt_{os.path.basename(staged_name)}"), stored)
+        updated = ours.update(
+            image=name,
+            processing_status=TaskImage.PROCESSING_READY,
+            processing_error='',
+            content_digest=digest,
+            size_bytes=metadata.get('size_bytes'),
+            width=metadata.get('width'),
+            height=metadata.get('height'),
+        )
+        # Either way one of the two files is now unreferenced
+        field.storage.delete(staged_name if updated else name)
+        if not updated:
+            logger.info(f"Task image {image_id} was deleted or reclaimed while processing")
+            return None
+        image.refresh_from_db()
+        return image
+
+    # ---------------- internals ----------------
+    @classmethod
+    def _call(cls, use_pool: bool, fn, *args, **kwargs):
+        """Run a pure image function in the worker pool (or right here)"""
+        if use_pool:
+            return cls._get_pool().submit(fn, *args, **kwargs).result()
+        return fn(*args, **kwargs)
+
+    @classmethod
+    def _renditions(cls, optimized: bytes, use_pool: bool) -> str:
+        """Store the renditions of the optimized image; '' leaves them to lazy generation"""
+        try:
+            digest = image_renditions.content_digest(optimized)
+            sizes = image_renditions.missing_sizes(digest)
+            if sizes:
+                image_renditions.store(digest, cls._call(use_pool, render_renditions, optimized, sizes,
+                                                         quality=image_renditions.RENDITION_QUALITY))
+            return digest
+        except Exception as e:
+            logger.warning(f"Could not render image renditions: {e}")
+            return ''
+
+    @classmethod
+    def _run_in_worker(cls, image_id: int, use_pool: bool = False):
+        close_old_connections()
+        try:
+            cls.run(image_id, use_pool=use_pool)
+        except Exception as e:
+            logger.error(f"Image worker failed for task image {image_id}: {e}", exc_info=True)
+        finally:
+            connection.close()
@@ -1,15 +1,13 @@
 # api/signals.py
+from django.db import transaction
 from django.dispatch import receiver
 from django.db.models.signals import post_save
 from .models import Notification
-from .services.notification_service import NotificationService
+from .services.push_delivery import get_push_pipeline
 
 @receiver(post_save, sender=Notification)
 def push_notification(sender, instance: Notification, created, **kwargs):
     if not created or instance.push_sent:
         return
-    success = NotificationService.push_to_device(
-        instance.recipient, instance.task, instance.verb, instance.id
-    )
-    if success:
-        instance.mark_pushed()
\ No newline at end of file
+    # delivered off the request by the push pipeline, which flags push_sent
+    transaction.on_commit(lambda: get_push_pipeline().dispatch([instance.id]))
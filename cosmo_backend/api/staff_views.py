@@ -69,6 +69,8 @@ from .models import (
 from .serializers import TaskSerializer
 from .authz import AuthzHelper, can_edit_task, can_view_task
 from .decorators import staff_or_perm
+from .property_autocomplete import PropertyAutocompleteSelect
+from . import mobile_sync
 
 
 @login_required
@@ -303,12 +305,15 @@ def task_detail(request, task_id):
         # If checklist exists but has no responses, backfill from its template
         if checklist and not checklist.responses.exists():
             from django.db import transaction
-            from .models import ChecklistItem, ChecklistResponse
+            from .models import ChecklistItem, ChecklistResponse, TaskChecklist
             with transaction.atomic():
                 items = ChecklistItem.objects.filter(template=checklist.template)
                 ChecklistResponse.objects.bulk_create([
                     ChecklistResponse(checklist=checklist, item=item)
                 for item in items], ignore_conflicts=True)
+                TaskChecklist.refresh_counters([checklist.pk])
+                mobile_sync.record_checklists([checklist.pk], actor=request.user)
+                checklist.refresh_from_db(fields=TaskChecklist.COUNTER_FIELDS)
         # Avoid prefetching legacy `photos` (ChecklistPhoto) here: prefetch caches can
         # create cyclic object graphs (response -> photos -> photo.response -> response)
         # which breaks Django's test template-context copying.
@@ -339,6 +344,9 @@ def task_detail(request, task_id):
                         for item in items
                     ]
                     ChecklistResponse.objects.bulk_create(responses_to_create, ignore_conflicts=True)
+                    TaskChecklist.refresh_counters([checklist.pk])
+                    mobile_sync.record_checklists([checklist.pk], actor=request.user)
+                    checklist.refresh_from_db(fields=TaskChecklist.COUNTER_FIELDS)
                     responses = checklist.responses.select_related('item')
     
     # Attach unified photos (TaskImage) per checklist response.
@@ -562,6 +570,8 @@ class TaskForm(ModelForm):
             'due_date': DateTimeInput(attrs={'type': 'datetime-local'}),
             'task_type': Select(choices=TASK_TYPE_CHOICES),
             'status': Select(choices=Task.STATUS_CHOICES),
+            # Only the selected property is rendered; the rest come from property search
+            'property_ref': PropertyAutocompleteSelect(),
         }
     
     def __init__(self, *args, **kwargs):
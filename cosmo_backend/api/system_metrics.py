@@ -1,6 +1,13 @@
 """
 System Metrics Collection for Cosmo Admin Dashboard
 Provides performance, logging, and health metrics for superuser monitoring.
+
+Dashboards read a cached snapshot (MetricsSnapshot) instead of collecting on
+every request: a daemon thread refreshes it every METRICS_REFRESH_INTERVAL
+seconds, with a cache lock so only one process collects per interval.
+Collection itself issues one conditional-aggregate query per table, log line
+counts come from the incremental api.log_access indexes and log level
+counts from backend.log_stats.LogStatsHandler.
 """
 
 import os
@@ -8,27 +15,38 @@ import sys
 import time
 import psutil
 import logging
+import threading
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db import connection
+from django.db import close_old_connections, connection
 from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db.models import Count, Q
 
+from backend.log_queue import queue_stats
+from backend.log_stats import recent_log_levels
+from .log_access import LineIndex, available_logs, log_dir
 from .models import Task, Property, Notification, Profile
 
 logger = logging.getLogger('api.metrics')
 
+SNAPSHOT_CACHE_KEY = 'system_metrics:snapshot'
+REFRESH_LOCK_KEY = 'system_metrics:refresh_lock'
+
+OPEN_TASK_STATUSES = ('pending', 'in-progress')
+
 
 class SystemMetrics:
     """Collects and provides system performance and health metrics."""
     
     def __init__(self):
         self.start_time = time.time()
+        self._counts = None
     
     def get_all_metrics(self):
         """Get comprehensive system metrics."""
+        self._counts = None
         try:
             return {
                 'system_info': self.get_system_info(),
@@ -67,8 +85,8 @@ class SystemMetrics:
     def get_performance_metrics(self):
         """Get system performance metrics."""
         try:
-            # CPU and Memory
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU and Memory (usage since the previous call - never blocks)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
@@ -121,23 +139,22 @@ class SystemMetrics:
             # Query counts
             queries_count = len(connection.queries) if settings.DEBUG else 0
             
+            counts = self.get_table_counts()
+            
             # Table sizes (simplified)
             table_counts = {
-                'users': User.objects.count(),
-                'tasks': Task.objects.count(),
-                'properties': Property.objects.count(),
-                'notifications': Notification.objects.count(),
-                'profiles': Profile.objects.count(),
+                'users': counts['users']['total'],
+                'tasks': counts['tasks']['total'],
+                'properties': counts['properties']['total'],
+                'notifications': counts['notifications']['total'],
+                'profiles': sum(counts['roles'].values()),
             }
             
             # Recent activity
-            now = timezone.now()
-            today = now.date()
-            
             recent_activity = {
-                'tasks_created_today': Task.objects.filter(created_at__date=today).count(),
-                'users_active_today': User.objects.filter(last_login__date=today).count(),
-                'notifications_sent_today': Notification.objects.filter(timestamp__date=today).count(),
+                'tasks_created_today': counts['tasks']['created_today'],
+                'users_active_today': counts['users']['active_today'],
+                'notifications_sent_today': counts['notifications']['sent_today'],
             }
             
             return {
@@ -154,102 +171,132 @@ class SystemMetrics:
     def get_logging_metrics(self):
         """Get logging activity metrics."""
         try:
-            log_dir = os.path.join(settings.BASE_DIR, 'logs')
+            directory = log_dir()
             log_files = {}
             
-            if os.path.exists(log_dir):
-                for log_file in os.listdir(log_dir):
-                    if log_file.endswith('.log'):
-                        file_path = os.path.join(log_dir, log_file)
-                        try:
-                            stat = os.stat(file_path)
-                            log_files[log_file] = {
-                                'size_mb': round(stat.st_size / (1024**2), 2),
-                                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                                'lines': self._count_file_lines(file_path),
-                            }
-                        except:
-                            log_files[log_file] = {'error': 'Could not read file'}
+            for log_file in available_logs(directory):
+                file_path = os.path.join(directory, log_file)
+                try:
+                    stat = os.stat(file_path)
+                    log_files[log_file] = {
+                        'size_mb': round(stat.st_size / (1024**2), 2),
+                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                        'lines': self._count_file_lines(file_path),
+                    }
+                except OSError:
+                    log_files[log_file] = {'error': 'Could not read file'}
             
-            # Recent log levels from memory (if available)
+            # Per-level counts for the last 24h, maintained by the logging handler
             log_levels = self._get_recent_log_levels()
             
             return {
                 'log_files': log_files,
-                'log_directory': log_dir,
+                'log_directory': directory,
                 'recent_log_levels': log_levels,
+                'log_queue': queue_stats(),  # this process's background writer
                 'logging_configured': bool(settings.LOGGING),
             }
         except Exception as e:
             logger.error(f"Error getting logging metrics: {e}")
             return {'error': str(e)}
     
-    def _count_file_lines(self, file_path, max_lines=1000):
-        """Count lines in a log file (limited for performance)."""
+    def _count_file_lines(self, file_path):
+        """Line count from the log viewer's index, which only reads bytes appended since its last refresh."""
         try:
-            with open(file_path, 'r') as f:
-                count = 0
-                for _ in f:
-                    count += 1
-                    if count >= max_lines:
-                        return f"{max_lines}+"
-                return count
-        except:
+            return LineIndex(file_path).refresh().line_count
+        except OSError:
             return 0
     
     def _get_recent_log_levels(self):
-        """Get recent log levels from cache or estimate."""
+        """Get recent log level counts from the LogStatsHandler cache counters."""
         try:
-            # Try to get from cache (would need to be set by logging handlers)
-            cached_levels = cache.get('recent_log_levels', {})
-            if cached_levels:
-                return cached_levels
-            
-            # Fallback: estimate from recent log files
-            return {
-                'info': 'Unknown',
-                'warning': 'Unknown', 
-                'error': 'Unknown',
-                'debug': 'Unknown',
-            }
-        except:
+            return recent_log_levels()
+        except Exception:
             return {}
     
+    def get_table_counts(self):
+        """
+        Every count the dashboard shows, as one conditional aggregate per table
+        (plus one GROUP BY for profile roles); memoized per collection.
+        """
+        if self._counts is not None:
+            return self._counts
+        
+        now = timezone.now()
+        last_24h = now - timedelta(hours=24)
+        today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        def since(field, start):
+            return Count('pk', filter=Q(**{f'{field}__gte': start}))
+        
+        users = User.objects.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+            superusers=Count('pk', filter=Q(is_superuser=True)),
+            logged_in_24h=since('last_login', last_24h),
+            logged_in_7d=since('last_login', now - timedelta(days=7)),
+            logged_in_30d=since('last_login', now - timedelta(days=30)),
+            active_today=since('last_login', today),
+        )
+        tasks = Task.objects.aggregate(
+            total=Count('pk'),
+            pending=Count('pk', filter=Q(status='pending')),
+            in_progress=Count('pk', filter=Q(status='in-progress')),
+            completed=Count('pk', filter=Q(status='completed')),
+            created_24h=since('created_at', last_24h),
+            created_today=since('created_at', today),
+            overdue=Count('pk', filter=Q(due_date__lt=now, status__in=OPEN_TASK_STATUSES)),
+            completed_24h=Count('pk', filter=Q(modified_at__gte=last_24h, status='completed')),
+        )
+        notifications = Notification.objects.aggregate(
+            total=Count('pk'),
+            sent_24h=since('timestamp', last_24h),
+            sent_today=since('timestamp', today),
+            unread=Count('pk', filter=Q(read_at__isnull=True)),
+        )
+        roles = dict(Profile.objects.values_list('role').annotate(count=Count('pk')).order_by())
+        
+        self._counts = {
+            'users': users,
+            'tasks': tasks,
+            'notifications': notifications,
+            'properties': Property.objects.aggregate(total=Count('pk')),
+            'roles': roles,
+        }
+        return self._counts
+    
     def get_application_metrics(self):
         """Get application-specific metrics."""
         try:
-            now = timezone.now()
-            last_24h = now - timedelta(hours=24)
-            last_7d = now - timedelta(days=7)
+            counts = self.get_table_counts()
+            users, tasks = counts['users'], counts['tasks']
+            notifications = counts['notifications']
             
             return {
                 'task_metrics': {
-                    'total': Task.objects.count(),
-                    'pending': Task.objects.filter(status='pending').count(),
-                    'in_progress': Task.objects.filter(status='in_progress').count(),
-                    'completed': Task.objects.filter(status='completed').count(),
-                    'created_24h': Task.objects.filter(created_at__gte=last_24h).count(),
-                    'overdue': Task.objects.filter(
-                        due_date__lt=now, 
-                        status__in=['pending', 'in_progress']
-                    ).count(),
+                    'total': tasks['total'],
+                    'pending': tasks['pending'],
+                    'in_progress': tasks['in_progress'],
+                    'completed': tasks['completed'],
+                    'created_24h': tasks['created_24h'],
+                    'overdue': tasks['overdue'],
                 },
                 'user_metrics': {
-                    'total': User.objects.count(),
-                    'active': User.objects.filter(is_active=True).count(),
-                    'staff': User.objects.filter(profile__role='staff').count(),
-                    'managers': User.objects.filter(profile__role='manager').count(),
-                    'superusers': User.objects.filter(is_superuser=True).count(),
-                    'logged_in_24h': User.objects.filter(last_login__gte=last_24h).count(),
-                    'with_profiles': Profile.objects.count(),
+                    'total': users['total'],
+                    'active': users['active'],
+                    'staff': counts['roles'].get('staff', 0),
+                    'managers': counts['roles'].get('manager', 0),
+                    'superusers': users['superusers'],
+                    'logged_in_24h': users['logged_in_24h'],
+                    'with_profiles': sum(counts['roles'].values()),
                 },
                 'property_metrics': {
-                    'total': Property.objects.count(),
+                    'total': counts['properties']['total'],
                 },
                 'notification_metrics': {
-                    'total': Notification.objects.count(),
-                    'sent_24h': Notification.objects.filter(timestamp__gte=last_24h).count(),
-                    'unread': Notification.objects.filter(read_at__isnull=True).count(),
+                    'total': notifications['total'],
+                    'sent_24h': notifications['sent_24h'],
+                    'unread': notifications['unread'],
                 },
             }
         except Exception as e:
@@ -285,7 +332,8 @@ class SystemMetrics:
         """Check database connectivity and performance."""
         try:
             start_time = time.time()
-            User.objects.count()  # Simple query
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')  # Simple round trip
             query_time = time.time() - start_time
             
             return {
@@ -393,23 +441,18 @@ class SystemMetrics:
     def get_user_activity_metrics(self):
         """Get user activity and engagement metrics."""
         try:
-            now = timezone.now()
-            last_24h = now - timedelta(hours=24)
-            last_7d = now - timedelta(days=7)
-            last_30d = now - timedelta(days=30)
+            counts = self.get_table_counts()
+            users, tasks = counts['users'], counts['tasks']
             
             return {
                 'login_activity': {
-                    'last_24h': User.objects.filter(last_login__gte=last_24h).count(),
-                    'last_7d': User.objects.filter(last_login__gte=last_7d).count(),
-                    'last_30d': User.objects.filter(last_login__gte=last_30d).count(),
+                    'last_24h': users['logged_in_24h'],
+                    'last_7d': users['logged_in_7d'],
+                    'last_30d': users['logged_in_30d'],
                 },
                 'task_activity': {
-                    'created_24h': Task.objects.filter(created_at__gte=last_24h).count(),
-                    'completed_24h': Task.objects.filter(
-                        modified_at__gte=last_24h, 
-                        status='completed'
-                    ).count(),
+                    'created_24h': tasks['created_24h'],
+                    'completed_24h': tasks['completed_24h'],
                 },
                 'role_distribution': self._get_role_distribution(),
                 'most_active_users': self._get_most_active_users(),
@@ -421,8 +464,10 @@ class SystemMetrics:
     def _get_role_distribution(self):
         """Get distribution of user roles."""
         try:
-            return Profile.objects.values('role').annotate(count=Count('role')).order_by('-count')
-        except:
+            roles = self.get_table_counts()['roles']
+            return [{'role': role, 'count': count}
+                    for role, count in sorted(roles.items(), key=lambda item: -item[1])]
+        except Exception:
             return []
     
     def _get_most_active_users(self, limit=5):
@@ -441,7 +486,68 @@ class SystemMetrics:
             return []
 
 
+class MetricsSnapshot:
+    """
+    The latest collected metrics, shared through the cache with a timestamp.
+    
+    ``get()`` is a single cache read (falling back to this process's last
+    snapshot, or a synchronous collection the very first time) and lazily
+    starts the background refresher thread.
+    """
+    
+    def __init__(self, interval=None, collector=None):
+        self.interval = getattr(settings, 'METRICS_REFRESH_INTERVAL', 30) if interval is None else interval
+        self.collector = collector or SystemMetrics()
+        self._latest = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+    
+    def get(self):
+        snapshot = cache.get(SNAPSHOT_CACHE_KEY) or self._latest
+        if snapshot is None:
+            snapshot = self.refresh()
+        self.start()
+        collected_at = snapshot.get('collected_at', time.time())
+        # shallow copy: callers add request context to the result
+        return dict(snapshot, snapshot_age_seconds=round(time.time() - collected_at, 1))
+    
+    def refresh(self):
+        """Collect now and publish the snapshot"""
+        with self._refresh_lock:
+            snapshot = self.collector.get_all_metrics()
+        snapshot['collected_at'] = time.time()
+        self._latest = snapshot
+        if 'error' not in snapshot:
+            cache.set(SNAPSHOT_CACHE_KEY, snapshot, max(self.interval * 3, 60))
+        return snapshot
+    
+    def start(self):
+        """Start the refresher thread once per process (no-op when the interval is 0)"""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='system-metrics-refresh', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                # one collector per interval across all processes sharing the cache
+                if cache.add(REFRESH_LOCK_KEY, os.getpid(), self.interval):
+                    self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing system metrics snapshot: {e}")
+            finally:
+                close_old_connections()
+
+
+_snapshot = MetricsSnapshot()
+
+
 def get_system_metrics():
-    """Convenience function to get all system metrics."""
-    metrics_collector = SystemMetrics()
-    return metrics_collector.get_all_metrics()
+    """Latest system metrics snapshot (see MetricsSnapshot)."""
+    return _snapshot.get()
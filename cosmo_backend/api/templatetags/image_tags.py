@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from typing import Any
+
+from django import template
+
+from api import image_renditions
+
+register = template.Library()
+
+
+@register.filter
+def rendition(photo: Any, size: str = 'thumb'):
+    """URL of a TaskImage/ChecklistPhoto rendition, e.g. ``{{ photo|rendition:"thumb" }}``.
+
+    Falls back to the stored image while the upload is still being processed.
+    """
+
+    if not getattr(photo, 'image', None):
+        return ''
+    return image_renditions.url(photo, size) or photo.image.url
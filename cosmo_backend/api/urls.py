@@ -28,6 +28,7 @@ from .views import (
     TaskImageCreateView,
     TaskImageListView,
     TaskImageDetailView,
+    image_rendition,
     AdminInviteUserView,
     AdminPasswordResetView,
     mark_all_notifications_read,
@@ -43,7 +44,7 @@ from .views import (
     portal_home, portal_calendar, portal_property_list, portal_property_detail, portal_booking_detail,
     portal_task_detail, portal_photo_management_view,
     excel_import_view, excel_import_api, property_approval_create,
-    enhanced_excel_import_view, enhanced_excel_import_api,
+    enhanced_excel_import_view, enhanced_excel_import_api, import_job_status_api,
     ConflictReviewView, resolve_conflicts, get_conflict_details,
     preview_conflict_resolution, quick_resolve_conflict,
     file_cleanup_api, user_permissions, available_permissions, 
@@ -95,12 +96,15 @@ from .monitoring import (
     HealthCheckView,
     DetailedHealthCheckView,
     log_client_error,
+    request_profile,
 )
 
 # Mobile-optimized endpoints
 from .mobile_views import (
     mobile_dashboard_data,
     mobile_offline_sync,
+    mobile_sync_changes,
+    mobile_sync_push,
     mobile_task_summary,
 )
 
@@ -148,6 +152,8 @@ urlpatterns = [
     # Mobile-optimized endpoints
     path('mobile/dashboard/', mobile_dashboard_data, name='mobile-dashboard'),
     path('mobile/offline-sync/', mobile_offline_sync, name='mobile-offline-sync'),
+    path('mobile/sync/changes/', mobile_sync_changes, name='mobile-sync-changes'),
+    path('mobile/sync/push/', mobile_sync_push, name='mobile-sync-push'),
     path('mobile/tasks/summary/', mobile_task_summary, name='mobile-task-summary'),
     
     path(
@@ -165,6 +171,7 @@ urlpatterns = [
         TaskImageDetailView.as_view(),    # ← new detail route
         name='taskimage-detail'
     ),
+    path('renditions/<slug:kind>/<int:pk>/<slug:size>/', image_rendition, name='image-rendition'),
     path('properties/', PropertyListCreate.as_view(), name='property-list'),
     path('properties/search/', property_search, name='property-search'),  # AJAX autocomplete
     path('properties/<int:pk>/', PropertyDetail.as_view(), name='property-detail'),
@@ -196,6 +203,7 @@ urlpatterns = [
     # Monitoring and health check endpoints
     path('health/', HealthCheckView.as_view(), name='health-check'),
     path('health/detailed/', DetailedHealthCheckView.as_view(), name='detailed-health-check'),
+    path('health/profiles/<str:profile_id>/', request_profile, name='request-profile'),
     path('log-client-error/', log_client_error, name='log-client-error'),
 
     # Portal (web) routes
@@ -251,6 +259,7 @@ urlpatterns = [
     # Enhanced Excel Import endpoints
     path('enhanced-excel-import/', enhanced_excel_import_view, name='enhanced-excel-import'),
     path('enhanced-excel-import/api/', enhanced_excel_import_api, name='enhanced-excel-import-api'),
+    path('import-jobs/<int:job_id>/', import_job_status_api, name='import-job-status'),
     path('manager/enhanced-excel-import/', enhanced_excel_import_view, name='manager-enhanced-excel-import'),
     path('admin/enhanced-excel-import/', enhanced_excel_import_view, name='admin-enhanced-excel-import'),
     
@@ -6,6 +6,9 @@ then server-side optimize to storage target (≤5MB) with quality compression
 and dimension scaling while preserving good visual quality.
 """
 
+import math
+import os
+import time
 from io import BytesIO
 from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
@@ -28,6 +31,12 @@ except Exception as e:
 # Supported input formats
 ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "HEIC", "HEIF"}
 
+# Quality search (see _optimize_quality)
+MAX_QUALITY = 95
+QUALITY_TOLERANCE = 5       # stop once the fitting/failing bracket is this narrow
+QUALITY_PER_HALVING = 15    # rough quality drop that halves the encoded size
+WEBP_METHOD = 4             # 6 is ~2x slower for a few percent smaller files
+
 
 def validate_max_upload(file):
     """
@@ -96,58 +105,87 @@ def _resize_maintain_aspect(img, max_dimension):
     return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
 
-def _optimize_quality(img, target_size, min_quality, use_webp):
+def _encode_image(img, quality, use_webp=True):
+    """Encode a prepared image (see _prepare_for_encoding) at the given quality."""
+    output = BytesIO()
+    if use_webp:
+        img.save(output, format="WEBP", quality=quality, method=WEBP_METHOD)
+    else:
+        img.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def _prepare_for_encoding(img, use_webp):
+    """Convert the image mode once so every encode attempt starts from the same pixels."""
+    if use_webp:
+        # Agent's critical fix: Ensure WebP-safe mode to prevent crashes
+        return _to_webp_safe_mode(img)
+    # JPEG has no alpha: flatten onto white
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA'):
+        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+        rgb_img.paste(img, mask=img.split()[-1])
+        return rgb_img
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _estimate_quality(quality, size, target_size, min_quality):
+    """Quality expected to land at target_size, given one encode of `size` bytes at `quality`."""
+    guess = quality - int(QUALITY_PER_HALVING * math.log2(size / target_size)) - 1
+    return max(min_quality, min(quality - 1, guess))
+
+
+def _optimize_quality(img, target_size, min_quality, use_webp, max_quality=MAX_QUALITY, time_budget=None):
     """
-    Agent's iterative quality optimization to meet target file size.
+    Find the highest quality that fits target_size.
+    
+    One encode at max_quality settles most photos. Otherwise the file size at
+    that quality seeds an estimate, and a bisection between min_quality and the
+    last failing quality refines it until the bracket is narrower than
+    QUALITY_TOLERANCE or the per-image time budget runs out.
     
     Args:
         img: PIL Image instance
         target_size: Target file size in bytes
         min_quality: Minimum quality threshold
-        use_webp: Prefer WebP format
+        use_webp: Encode as WebP (else JPEG)
+        max_quality: Quality tried first
+        time_budget: Seconds to spend searching (default IMAGE_OPTIMIZE_TIME_BUDGET)
         
     Returns:
         bytes: Optimized image data
     """
-    def encode_image(img_to_encode, quality, use_webp=True):
-        """Encode image with specified quality and format."""
-        output = BytesIO()
-        
-        if use_webp:
-            # Agent's critical fix: Ensure WebP-safe mode to prevent crashes
-            safe_img = _to_webp_safe_mode(img_to_encode)
-            safe_img.save(output, format="WEBP", quality=quality, method=6)
-        else:
-            # JPEG fallback (convert RGBA to RGB)
-            if img_to_encode.mode in ('RGBA', 'LA', 'P'):
-                # Convert to RGB for JPEG
-                rgb_img = Image.new('RGB', img_to_encode.size, (255, 255, 255))
-                if img_to_encode.mode == 'P':
-                    img_to_encode = img_to_encode.convert('RGBA')
-                rgb_img.paste(img_to_encode, mask=img_to_encode.split()[-1] if img_to_encode.mode in ('RGBA', 'LA') else None)
-                rgb_img.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
-            else:
-                img_to_encode.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
-        
-        return output.getvalue()
+    if time_budget is None:
+        time_budget = getattr(settings, 'IMAGE_OPTIMIZE_TIME_BUDGET', 10.0)
+    deadline = time.monotonic() + time_budget
+    img = _prepare_for_encoding(img, use_webp)
     
-    # Start with high quality and iteratively reduce
-    qualities = [95, 85, 75, 65, 55, 45, 35] + list(range(min_quality, 25, -5))
+    data = _encode_image(img, max_quality, use_webp)
+    if len(data) <= target_size:
+        return data
     
-    for quality in qualities:
-        # Try WebP first if requested
-        if use_webp:
-            data = encode_image(img, quality, use_webp=True)
-            if len(data) <= target_size:
-                return data
-        
-        # Try JPEG fallback
-        data = encode_image(img, quality, use_webp=False)
+    best = None
+    low, high = min_quality, max_quality  # high is known to be too large
+    quality = _estimate_quality(max_quality, len(data), target_size, min_quality)
+    while low < high and time.monotonic() < deadline:
+        data = _encode_image(img, quality, use_webp)
         if len(data) <= target_size:
-            return data
+            best = data
+            low = quality + 1
+        else:
+            high = quality
+        if best is not None and high - low < QUALITY_TOLERANCE:
+            break
+        quality = (low + high) // 2
+    
+    if best is not None:
+        return best
     
-    # If still too large, check if target is unreasonably small
-    best_effort = encode_image(img, min_quality, use_webp=use_webp)
+    # Nothing fits: fall back to the minimum quality (if it was not just tried)
+    best_effort = data if quality == min_quality else _encode_image(img, min_quality, use_webp)
     if len(best_effort) > target_size * 2:  # If best effort is more than 2x target, fail
         raise ValueError(f"Cannot optimize image to target size {target_size} bytes. Best effort: {len(best_effort)} bytes")
     
@@ -155,11 +193,24 @@ def _optimize_quality(img, target_size, min_quality, use_webp):
     return best_effort
 
 
+def _file_size(image_file):
+    """Size of an uploaded or in-memory file without reading it."""
+    size = getattr(image_file, 'size', None)
+    if size is not None:
+        return size
+    pos = image_file.tell()
+    image_file.seek(0, os.SEEK_END)
+    size = image_file.tell()
+    image_file.seek(pos)
+    return size
+
+
 def optimize_image(image_file, 
                   max_dimension: int = 2048, 
                   target_size: int = 5 * 1024 * 1024,
                   min_quality: int = 30,
-                  use_webp: bool = True) -> tuple[bytes, dict]:
+                  use_webp: bool = True,
+                  time_budget: float | None = None) -> tuple[bytes, dict]:
     """
     Agent's enhanced image optimization system.
     Accepts large files, optimizes to storage targets server-side.
@@ -170,6 +221,7 @@ def optimize_image(image_file,
         target_size: Target file size in bytes (default 5MB)
         min_quality: Minimum quality threshold (default 30)
         use_webp: Prefer WebP format (default True)
+        time_budget: Seconds allowed for the quality search (default IMAGE_OPTIMIZE_TIME_BUDGET)
         
     Returns:
         tuple: (optimized_bytes, metadata_dict)
@@ -197,8 +249,7 @@ def optimize_image(image_file,
                 raise ValueError(f"Image dimensions too large: {width}x{height} exceeds {MAX_DIMENSION_SINGLE}px limit")
             
             # Capture original metadata
-            original_size_bytes = len(image_file.read())
-            image_file.seek(0)  # Reset for processing
+            original_size_bytes = _file_size(image_file)
             
             metadata = {
                 'width': width,
@@ -208,6 +259,10 @@ def optimize_image(image_file,
                 'mode': img.mode
             }
             
+            # Let the JPEG decoder downscale by a power of two while it decodes
+            if width > max_dimension or height > max_dimension:
+                img.draft(None, (max_dimension, max_dimension))
+            
             # Agent's EXIF orientation handling
             img = _transpose_exif_orientation(img)
             
@@ -219,8 +274,9 @@ def optimize_image(image_file,
                 metadata['new_width'] = current_img.size[0]
                 metadata['new_height'] = current_img.size[1]
             
-            # Agent's iterative quality optimization
-            optimized_bytes = _optimize_quality(current_img, target_size, min_quality, use_webp)
+            # Quality search (single encode for most photos)
+            optimized_bytes = _optimize_quality(current_img, target_size, min_quality, use_webp,
+                                                time_budget=time_budget)
             metadata['size_bytes'] = len(optimized_bytes)
             metadata['compression_ratio'] = original_size_bytes / len(optimized_bytes) if len(optimized_bytes) > 0 else 1.0
             metadata['format_used'] = 'WebP' if use_webp else 'JPEG'
@@ -235,6 +291,31 @@ def optimize_image(image_file,
         raise ValueError(f"Image processing failed: {str(e)}")
 
 
+def optimize_image_bytes(data: bytes, **options) -> tuple[bytes, dict]:
+    """
+    optimize_image() for raw bytes; the entry point for image worker processes.
+    Pass time_budget explicitly there, since worker processes have no Django settings.
+    """
+    return optimize_image(BytesIO(data), **options)
+
+
+def render_renditions(data: bytes, sizes: dict, quality: int = 80) -> dict:
+    """
+    Downscaled WebP copies of an image, one per entry in sizes ({name: max_dimension}).
+    Pure PIL like optimize_image_bytes, so it can run in an image worker process.
+    """
+    rendered = {}
+    with Image.open(BytesIO(data)) as img:
+        largest = max(sizes.values())
+        img.draft(None, (largest, largest))
+        img = _to_webp_safe_mode(_transpose_exif_orientation(img))
+        for name, max_dimension in sorted(sizes.items(), key=lambda item: -item[1]):
+            copy = img.copy()
+            copy.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            rendered[name] = _encode_image(copy, quality, use_webp=True)
+    return rendered
+
+
 def get_image_metadata(file):
     """
     Extract metadata from optimized image for database storage.
@@ -9,10 +9,10 @@ from .services.notification_service import NotificationService
 from .models import (
     NotificationVerb, Booking, BookingImportTemplate, BookingImportLog,
     CustomPermission, RolePermission, UserPermissionOverride, UserRole,
-    Task, Property, TaskImage, Device, Notification, PropertyOwnership
+    Task, TaskHistory, Property, TaskImage, Device, Notification, PropertyOwnership
 )
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponseRedirect, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -34,9 +34,11 @@ from .utils.json_utils import extract_conflicts_json
 from .authz import AuthzHelper, can_edit_task
 from .filters import TaskFilter
 from .system_metrics import get_system_metrics
+from backend.request_profiling import get_request_stats
+from . import image_renditions, mobile_sync
 
 from rest_framework import generics, permissions, viewsets, filters
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -56,6 +58,7 @@ from rest_framework.permissions import (
 from .serializers import (
     ManagerUserSerializer,
     TaskSerializer,
+    TaskHistorySerializer,
     PropertySerializer,
     UserSerializer,
     UserRegistrationSerializer,
@@ -77,8 +80,16 @@ from .permissions import (
 )
 
 
+class TaskHistoryPagination(CursorPagination):
+    """Keyset pagination over the (task, created_at, id) history index"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
+
+
 class TaskViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+    queryset = Task.objects.select_related('checklist')
     serializer_class = TaskSerializer
     permission_classes = [DynamicTaskPermissions, IsOwnerOrAssignedOrReadOnly]
 
@@ -125,8 +136,8 @@ class TaskViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
         NotificationService.notify_on_create(task, actor=self.request.user)
 
     def perform_update(self, serializer):
-        # capture old BEFORE saving
-        old = Task.objects.get(pk=serializer.instance.pk)
+        # capture old BEFORE saving (from the instance; no re-fetch)
+        old = NotificationService.snapshot(serializer.instance)
         task = serializer.save(modified_by=self.request.user)
         NotificationService.notify_on_update(old, task, actor=self.request.user)
         
@@ -160,6 +171,17 @@ class TaskViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
             'overdue': overdue,
         })
     
+    @action(detail=True, methods=['get'], url_path='history')
+    def history(self, request, pk=None):
+        """
+        GET /api/tasks/<id>/history/?cursor=...
+        Newest-first change history for a task, cursor paginated.
+        """
+        task = self.get_object()
+        paginator = TaskHistoryPagination()
+        page = paginator.paginate_queryset(task.history_entries.all(), request)
+        return paginator.get_paginated_response(TaskHistorySerializer(page, many=True).data)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def mute(self, request, pk=None):
         """
@@ -199,7 +221,7 @@ class TaskViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def assign_to_me(self, request, pk=None):
         task = self.get_object()
-        old = Task.objects.get(pk=task.pk)
+        old = NotificationService.snapshot(task)
         task.assigned_to = request.user
         task.modified_by = request.user
         task.save(update_fields=['assigned_to', 'modified_by', 'modified_at'])
@@ -213,7 +235,7 @@ class TaskViewSet(DefaultAuthMixin, viewsets.ModelViewSet):
         valid = {s for s, _ in Task.STATUS_CHOICES}
         if new_status not in valid:
             return Response({'error': 'Invalid status'}, status=400)
-        old = Task.objects.get(pk=task.pk)
+        old = NotificationService.snapshot(task)
         task.status = new_status
         task.modified_by = request.user
         task.save(update_fields=['status', 'modified_by', 'modified_at'])
@@ -528,9 +550,7 @@ class TaskImageCreateView(DefaultAuthMixin, generics.CreateAPIView):
         )
         
         # 4) update task history
-        history = json.loads(task.history or '[]')
-        history.append(f"{timezone.now().isoformat()}: {self.request.user.username} added photo {image.image.url}")
-        Task.objects.filter(pk=task.pk).update(history=json.dumps(history))
+        TaskHistory.log(task, self.request.user, f"added photo {image.image.url}")
         
         # 5) notify stakeholders
         NotificationService.notify_task_photo(task, added=True, actor=self.request.user)
@@ -572,6 +592,16 @@ class TaskImageDetailView(DefaultAuthMixin, generics.RetrieveUpdateDestroyAPIVie
             raise DRFPermissionDenied("You can't modify images on this task.")
         return obj
     
+    def retrieve(self, request, *args, **kwargs):
+        from .services.task_image_processing import TaskImageProcessingService
+        
+        image = self.get_object()
+        # Clients poll here until processing settles; requeue work a restarted worker lost
+        if image.processing_status in (TaskImage.PROCESSING_PENDING, TaskImage.PROCESSING_RUNNING):
+            if TaskImageProcessingService.requeue_stale(TaskImage.objects.filter(pk=image.pk)):
+                image.refresh_from_db()
+        return Response(self.get_serializer(image).data)
+    
     def check_permissions(self, request):
         """Override permission checking for photo approval"""
         super().check_permissions(request)
@@ -647,16 +677,12 @@ class TaskImageDetailView(DefaultAuthMixin, generics.RetrieveUpdateDestroyAPIVie
         user = self.request.user
         
         # Add to task history
-        history_entry = (
-            f"{timezone.now().isoformat()}: {user.username} changed photo status "
-            f"from '{old_status}' to '{new_status}' for {instance.get_photo_type_display()} photo"
+        TaskHistory.log(
+            task, user,
+            f"changed photo status from '{old_status}' to '{new_status}' "
+            f"for {instance.get_photo_type_display()} photo"
         )
         
-        history = json.loads(task.history or '[]')
-        history.append(history_entry)
-        task.history = json.dumps(history)
-        task.save(update_fields=['history'])
-        
         # Log to audit events
         from api.models import AuditEvent
         AuditEvent.objects.create(
@@ -684,13 +710,7 @@ class TaskImageDetailView(DefaultAuthMixin, generics.RetrieveUpdateDestroyAPIVie
             verb = 'photo_added'  # This will be handled by the existing system
         
         # Send notification using the existing system
-        from api.models import Notification, NotificationVerb
-        for recipient in NotificationService._recipients(task, actor=user):
-            Notification.objects.create(
-                recipient=recipient,
-                task=task,
-                verb=verb
-            )
+        NotificationService.fan_out([(task, [verb])], actor=user)
 
     def perform_destroy(self, instance):
         # 1) capture metadata before deletion
@@ -698,14 +718,38 @@ class TaskImageDetailView(DefaultAuthMixin, generics.RetrieveUpdateDestroyAPIVie
         url = instance.image.url
         # 2) delete the TaskImage record (and its file)
         instance.delete()
-        # 3) append a "deleted photo" entry to task.history
-        history = json.loads(task.history or '[]')
-        history.append(f"{timezone.now().isoformat()}: {self.request.user.username} deleted photo {url}")
-        Task.objects.filter(pk=task.pk).update(history=json.dumps(history))
+        # 3) append a "deleted photo" entry to the task history
+        TaskHistory.log(task, self.request.user, f"deleted photo {url}")
         # notify
         NotificationService.notify_task_photo(task, added=False, actor=self.request.user)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def image_rendition(request, kind, pk, size):
+    """
+    GET /api/renditions/{kind}/{pk}/{size}/
+    Redirect to a stored rendition, rendering it first for legacy images
+    (see api.image_renditions).
+    """
+    if kind not in image_renditions.KINDS or size not in image_renditions.RENDITION_SIZES:
+        return Response({'detail': 'Unknown rendition.'}, status=status.HTTP_404_NOT_FOUND)
+    obj = get_object_or_404(image_renditions.model_for(kind), pk=pk)
+    task = obj.task if kind == 'task-image' else obj.response.checklist.task
+    if not AuthzHelper.can_view_task(request.user, task):
+        raise DRFPermissionDenied("You can't view images for this task.")
+
+    try:
+        image_renditions.ensure(obj)
+    except Exception as e:
+        logger.warning(f"Could not render {kind} {pk}: {e}")
+        return HttpResponseRedirect(obj.image.url)
+    response = HttpResponseRedirect(image_renditions.url(obj, size))
+    # The target never changes for this digest; let the browser skip this hop
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegistrationSerializer
@@ -728,37 +772,8 @@ class TaskDetail(DefaultAuthMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [DynamicTaskPermissions, IsOwnerOrAssignedOrReadOnly]
 
     def perform_update(self, serializer):
-        old = Task.objects.get(pk=serializer.instance.pk)
-        instance = serializer.save(modified_by=self.request.user)
-
-        changes = []
-        for field in ('status', 'title', 'description', 'assigned_to', 'task_type'):
-            old_val = getattr(old, field)
-            new_val = getattr(instance, field)
-            if field == 'assigned_to':
-                old_val = old.assigned_to.username if old.assigned_to else None
-                new_val = instance.assigned_to.username if instance.assigned_to else None
-
-            if old_val != new_val:
-                changes.append(
-                    f"{timezone.now().isoformat()}: "
-                    f"{self.request.user.username} changed {field} "
-                    f"from '{old_val or ''}' to '{new_val or ''}'"
-                )
-
-        # Check property_ref changes separately  
-        old_prop = old.property_ref.name if old.property_ref else None
-        new_prop = instance.property_ref.name if instance.property_ref else None
-        if old_prop != new_prop:
-            changes.append(
-                f"{timezone.now().isoformat()}: "
-                f"{self.request.user.username} changed property "
-                f"from '{old_prop or ''}' to '{new_prop or ''}'"
-            )
-
-        history = json.loads(old.history or '[]')
-        history.extend(changes)
-        Task.objects.filter(pk=instance.pk).update(history=json.dumps(history))
+        # Task.save records the field changes as TaskHistory rows
+        serializer.save(modified_by=self.request.user)
 
 
 class PropertyListCreate(generics.ListCreateAPIView):
@@ -982,10 +997,13 @@ def mark_notification_read(request, pk):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_all_notifications_read(request):
-    count = Notification.objects.filter(recipient=request.user, read=False).update(
+    unread = list(Notification.objects.filter(recipient=request.user, read=False).values_list('pk', flat=True))
+    count = Notification.objects.filter(pk__in=unread).update(
         read=True,
         read_at=timezone.now()
     )
+    # queryset.update() skips post_save; tell synced devices
+    mobile_sync.record(mobile_sync.NOTIFICATION, [(pk, request.user.pk, False) for pk in unread])
     return Response({'success': True, 'marked_count': count})
 
 # ---------- Manager dashboard: overview ----------
@@ -1454,6 +1472,9 @@ def system_metrics_dashboard(request):
         # Get comprehensive system metrics
         metrics = get_system_metrics()
         
+        # Endpoint latency and query counts, live from this worker process
+        metrics['endpoints'] = get_request_stats().snapshot(limit=15)
+        
         # Add request context
         metrics['request_info'] = {
             'user': request.user.username,
@@ -1500,6 +1521,7 @@ def system_metrics_api(request):
     """
     try:
         metrics = get_system_metrics()
+        metrics['endpoints'] = get_request_stats().snapshot(limit=15)
         return JsonResponse(metrics)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1515,51 +1537,36 @@ def system_logs_viewer(request):
     if not request.user.is_superuser:
         raise DjangoPermissionDenied("Log viewer is only available to superusers.")
     
-    import os
+    from .log_access import LogFile, available_logs
     
-    log_dir = os.path.join(settings.BASE_DIR, 'logs')
     log_file = request.GET.get('file', 'debug.log')
     lines = int(request.GET.get('lines', 100))
     search = request.GET.get('search', '')
     level = request.GET.get('level', '')
+    before = request.GET.get('before')
+    # "All lines" pages through the file instead of rendering it whole
+    max_lines = getattr(settings, 'LOG_VIEWER_MAX_LINES', 5000)
     
     log_content = []
     available_files = []
     error_message = None
+    older_before = None
     
     try:
-        # Get available log files
-        if os.path.exists(log_dir):
-            available_files = [f for f in os.listdir(log_dir) if f.endswith('.log')]
-            available_files.sort()
-        
-        # Read selected log file
-        log_path = os.path.join(log_dir, log_file)
-        if os.path.exists(log_path) and log_file in available_files:
-            with open(log_path, 'r') as f:
-                all_lines = f.readlines()
-                
-                # Apply filters
-                filtered_lines = all_lines
-                
-                if search:
-                    filtered_lines = [line for line in filtered_lines if search.lower() in line.lower()]
-                
-                if level:
-                    filtered_lines = [line for line in filtered_lines if level.upper() in line]
-                
-                # Get last N lines
-                log_content = filtered_lines[-lines:] if lines > 0 else filtered_lines
-                
-                # Add line numbers
-                log_content = [
-                    {
-                        'number': len(all_lines) - len(filtered_lines) + i + 1,
-                        'content': line.rstrip('\n'),
-                        'level': _extract_log_level(line),
-                    }
-                    for i, line in enumerate(log_content)
-                ]
+        available_files = available_logs()
+        
+        # Page backwards from the end (or from ?before=<line number>)
+        log = LogFile.open(log_file)
+        if log:
+            log_content = log.tail(
+                min(lines, max_lines) if lines > 0 else max_lines,
+                level=level or None,
+                search=search or None,
+                before=int(before) if before else None,
+            )
+            first_number = log_content[0]['number'] if log_content else None
+            if first_number and first_number > 1:
+                older_before = first_number
         else:
             error_message = f"Log file '{log_file}' not found or not accessible."
             
@@ -1573,6 +1580,7 @@ def system_logs_viewer(request):
         'lines_shown': lines,
         'search_term': search,
         'level_filter': level,
+        'older_before': older_before,
         'error_message': error_message,
         'title': 'System Logs Viewer',
         'log_levels': ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
@@ -1587,45 +1595,23 @@ def system_logs_download(request):
     Download log files for superusers
     Supports downloading filtered logs with search and level filters
     """
+    from django.http import HttpResponse, StreamingHttpResponse
+    from .log_access import LogFile
+    
     # Only allow superusers to download logs
     if not request.user.is_superuser:
         return HttpResponse("Log download is only available to superusers.", status=403)
     
-    import os
-    from django.http import HttpResponse
-    
-    log_dir = os.path.join(settings.BASE_DIR, 'logs')
     log_file = request.GET.get('file', 'debug.log')
     search = request.GET.get('search', '')
     level = request.GET.get('level', '')
     
     try:
-        # Get available log files
-        available_files = []
-        if os.path.exists(log_dir):
-            available_files = [f for f in os.listdir(log_dir) if f.endswith('.log')]
-        
         # Validate log file
-        if log_file not in available_files:
+        log = LogFile.open(log_file)
+        if log is None:
             return HttpResponse(f"Log file '{log_file}' not found or not accessible.", status=404)
         
-        # Read and filter log file
-        log_path = os.path.join(log_dir, log_file)
-        with open(log_path, 'r') as f:
-            all_lines = f.readlines()
-            
-            # Apply filters
-            filtered_lines = all_lines
-            
-            if search:
-                filtered_lines = [line for line in filtered_lines if search.lower() in line.lower()]
-            
-            if level:
-                filtered_lines = [line for line in filtered_lines if level.upper() in line]
-            
-            # Join filtered lines
-            log_content = ''.join(filtered_lines)
-        
         # Create filename with timestamp and filters
         timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
         filename_parts = [log_file.replace('.log', ''), timestamp]
@@ -1637,10 +1623,15 @@ def system_logs_download(request):
         
         filename = f"{'_'.join(filename_parts)}.log"
         
-        # Create response
-        response = HttpResponse(log_content, content_type='text/plain')
+        # Stream in constant memory; the length is only known up front when unfiltered,
+        # and then the download stops at the size seen now even if the log keeps growing
+        size = log.size
+        response = StreamingHttpResponse(
+            log.stream(level=level or None, search=search or None, size=size), content_type='text/plain'
+        )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response['Content-Length'] = len(log_content.encode('utf-8'))
+        if not search and not level:
+            response['Content-Length'] = size
         
         return response
         
@@ -1648,22 +1639,6 @@ def system_logs_download(request):
         return HttpResponse(f"Error downloading log file: {str(e)}", status=500)
 
 
-def _extract_log_level(log_line):
-    """Extract log level from a log line for color coding"""
-    log_line_upper = log_line.upper()
-    if 'ERROR' in log_line_upper:
-        return 'ERROR'
-    elif 'WARNING' in log_line_upper or 'WARN' in log_line_upper:
-        return 'WARNING'
-    elif 'INFO' in log_line_upper:
-        return 'INFO'
-    elif 'DEBUG' in log_line_upper:
-        return 'DEBUG'
-    elif 'CRITICAL' in log_line_upper:
-        return 'CRITICAL'
-    return 'UNKNOWN'
-
-
 @login_required
 def system_crash_recovery(request):
     """
@@ -1676,6 +1651,7 @@ def system_crash_recovery(request):
     
     import os
     import subprocess
+    from .log_access import line_level, tail_lines
     
     recovery_info = {
         'system_status': 'operational',
@@ -1690,16 +1666,15 @@ def system_crash_recovery(request):
         error_log_path = os.path.join(log_dir, 'error.log')
         
         if os.path.exists(error_log_path):
-            with open(error_log_path, 'r') as f:
-                recent_lines = f.readlines()[-50:]  # Last 50 error lines
-                recovery_info['recent_errors'] = [
-                    {
-                        'line': line.strip(),
-                        'level': _extract_log_level(line),
-                        'timestamp': _extract_timestamp(line),
-                    }
-                    for line in recent_lines if line.strip()
-                ]
+            recent_lines = tail_lines(error_log_path, 50)  # Last 50 error lines
+            recovery_info['recent_errors'] = [
+                {
+                    'line': line.strip(),
+                    'level': line_level(line),
+                    'timestamp': _extract_timestamp(line),
+                }
+                for line in recent_lines if line.strip()
+            ]
         
         # System diagnostic information
         try:
@@ -1940,6 +1915,9 @@ def excel_import_api(request):
         
         logger.info(f"User {request.user.username} uploading file via API: {excel_file.name} ({excel_file.size} bytes)")
         
+        if _wants_background_import(request):
+            return _enqueue_import_job(request, excel_file, 'Cleaning schedule', BookingImportLog.ENGINE_BASIC)
+        
         # Process the Excel file
         import_service = ExcelImportService(request.user)
         result = import_service.import_excel_file(excel_file)
@@ -2247,7 +2225,10 @@ def enhanced_excel_import_view(request):
         try:
             # Use enhanced import service
             enhanced_service = EnhancedExcelImportService(request.user)
-            result = enhanced_service.import_excel_file(excel_file, sheet_name)
+            if request.POST.get('import_mode') == 'streaming':
+                result = enhanced_service.import_excel_file_streaming(excel_file, sheet_name)
+            else:
+                result = enhanced_service.import_excel_file(excel_file, sheet_name)
             
             if result['success']:
                 # Check for conflicts requiring review
@@ -2326,10 +2307,18 @@ def enhanced_excel_import_api(request):
     
     logger.info(f"User {request.user.username} starting API import of {excel_file.name} ({excel_file.size} bytes)")
     
+    if _wants_background_import(request):
+        engine = (BookingImportLog.ENGINE_STREAMING if request.POST.get('import_mode') == 'streaming'
+                  else BookingImportLog.ENGINE_ENHANCED)
+        return _enqueue_import_job(request, excel_file, sheet_name, engine)
+    
     try:
         # Use enhanced import service
         enhanced_service = EnhancedExcelImportService(request.user)
-        result = enhanced_service.import_excel_file(excel_file, sheet_name)
+        if request.POST.get('import_mode') == 'streaming':
+            result = enhanced_service.import_excel_file_streaming(excel_file, sheet_name)
+        else:
+            result = enhanced_service.import_excel_file(excel_file, sheet_name)
         
         # Add conflict resolution URL if conflicts detected
         if result.get('requires_review') and result.get('import_session_id'):
@@ -2345,6 +2334,46 @@ def enhanced_excel_import_api(request):
         })
 
 
+def _wants_background_import(request):
+    """Clients opt into background imports with run_async=1"""
+    return request.POST.get('run_async', '').lower() in ('1', 'true', 'on')
+
+
+def _enqueue_import_job(request, excel_file, sheet_name, engine):
+    """Queue an import on the engine the synchronous request would have used; answer 202 with the job id"""
+    from .services.import_job_service import ImportJobService
+    
+    try:
+        job = ImportJobService.enqueue(request.user, excel_file, sheet_name, engine=engine)
+    except Exception as e:
+        logger.error(f"Failed to queue import for {request.user.username}: {str(e)}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    
+    payload = ImportJobService.serialize(job)
+    payload.update({
+        'success': True,
+        'status_url': reverse('import-job-status', args=[job.pk]),
+        'websocket_path': f'/ws/import-jobs/{job.pk}/',
+    })
+    return JsonResponse(payload, status=202)
+
+
+@login_required
+@user_passes_test(is_superuser_or_manager)
+@require_http_methods(["GET"])
+def import_job_status_api(request, job_id):
+    """Poll the state and progress of a background booking import"""
+    from .services.import_job_service import ImportJobService
+    
+    job = get_object_or_404(BookingImportLog, pk=job_id)
+    if job.imported_by_id != request.user.id and not request.user.is_superuser:
+        return JsonResponse({'error': 'Import job not found'}, status=404)
+    if job.status in (BookingImportLog.STATUS_QUEUED, BookingImportLog.STATUS_RUNNING):
+        if ImportJobService.fail_stale(BookingImportLog.objects.filter(pk=job.pk)):
+            job.refresh_from_db()
+    return JsonResponse(ImportJobService.serialize(job))
+
+
 @staff_or_perm('manage_files')
 @require_http_methods(["GET", "POST"])
 def file_cleanup_api(request):
@@ -3156,20 +3185,18 @@ def chat_view(request):
         ws_token = None
     
     # Get user's chat rooms
-    rooms = ChatRoom.objects.filter(
-        participants__user=request.user,
-        participants__left_at__isnull=True,
+    rooms = ChatRoom.objects.for_participant(request.user).filter(
         is_active=True
-    ).select_related('created_by', 'task', 'property').prefetch_related(
+    ).with_inbox(request.user).select_related('created_by', 'task', 'property').prefetch_related(
         'participants__user'
-    ).distinct().order_by('-modified_at')[:50]  # Limit to 50 most recent
+    ).order_by('-modified_at')[:50]  # Limit to 50 most recent
     
     # Pre-process room display names for template
     rooms_with_display_names = []
     for room in rooms:
         display_name = room.get_display_name(for_user=request.user)
         last_message = room.get_last_message()
-        unread_count = room.get_unread_count(request.user)
+        unread_count = room.inbox_unread_count
         rooms_with_display_names.append({
             'room': room,
             'display_name': display_name,
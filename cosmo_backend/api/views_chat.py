@@ -31,6 +31,7 @@ from .serializers_chat import (
     ChatParticipantSerializer,
     TypingIndicatorSerializer,
 )
+from . import chat_search, chat_state
 from .permissions_chat import (
     IsChatParticipant,
     IsMessageSender,
@@ -105,27 +106,21 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
         # For retrieve/update/delete actions, don't filter by participants
         # Let permissions handle access control (to return 403 instead of 404)
         if self.action in ['retrieve', 'update', 'partial_update', 'destroy']:
-            queryset = ChatRoom.objects.all().select_related(
-                'created_by', 'task', 'property'
-            ).prefetch_related(
-                Prefetch(
-                    'participants',
-                    queryset=ChatParticipant.objects.select_related('user').filter(left_at__isnull=True)
-                )
-            )
+            queryset = ChatRoom.objects.all()
         else:
             # For list actions, filter by participation
-            queryset = ChatRoom.objects.filter(
-                participants__user=user,
-                participants__left_at__isnull=True
-            ).select_related(
-                'created_by', 'task', 'property'
-            ).prefetch_related(
+            queryset = ChatRoom.objects.for_participant(user)
+        
+        # Unread counts, last message and participant counts are annotated or
+        # prefetched, so the query count does not grow with the number of rooms
+        queryset = queryset.with_inbox(user).select_related('created_by', 'task', 'property')
+        if self.action != 'list':
+            queryset = queryset.prefetch_related(
                 Prefetch(
                     'participants',
-                    queryset=ChatParticipant.objects.select_related('user').filter(left_at__isnull=True)
+                    queryset=ChatParticipant.objects.with_unread_counts().select_related('user').filter(left_at__isnull=True)
                 )
-            ).distinct()
+            )
         
         # Filter by active status
         if self.request.query_params.get('include_archived') != 'true':
@@ -348,12 +343,11 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         queryset = ChatMessage.objects.filter(
-            room__participants__user=user,
-            room__participants__left_at__isnull=True,
+            room__in=ChatRoom.objects.for_participant(user).values('pk'),
             is_deleted=False
         ).select_related(
             'sender', 'room', 'reply_to', 'reply_to__sender'
-        ).distinct()
+        )
         
         # Filter by room if specified
         room_id = self.request.query_params.get('room')
@@ -408,7 +402,8 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         summary="Search messages",
-        description="Full-text search across all messages in accessible rooms.",
+        description="Full-text search across all messages in accessible rooms. Every word must match "
+                    "(as a word prefix); results are paginated and ordered by relevance, newest first on ties.",
         parameters=[
             OpenApiParameter(
                 name='q',
@@ -436,16 +431,10 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        queryset = self.get_queryset().filter(
-            Q(content__icontains=query)
-        )
-        
-        # Limit to specific room if provided
-        room_id = request.query_params.get('room')
-        if room_id:
-            queryset = queryset.filter(room_id=room_id)
+        # get_queryset() already limits to ?room= when provided
+        queryset = chat_search.search(self.get_queryset(), query)
         
-        # Paginate results
+        # Paginate results (best matches first)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -586,33 +575,29 @@ class TypingIndicatorViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated, IsChatParticipant]
     
     def get_queryset(self):
-        """Return typing indicators for accessible rooms"""
-        user = self.request.user
-        room_id = self.request.query_params.get('room')
-        
+        # Typing state lives in api.chat_state (cache with a TTL), not in rows
+        return ChatTypingIndicator.objects.none()
+    
+    def list(self, request, *args, **kwargs):
+        """Users currently typing in ?room= (excluding the current user)"""
+        page = self.paginate_queryset(self.typing_indicators(request.query_params.get('room')))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    def typing_indicators(self, room_id):
+        """Unsaved ChatTypingIndicator instances built from the cached typing state"""
         if not room_id:
-            return ChatTypingIndicator.objects.none()
+            return []
         
         # Check if user is participant in the room
-        is_participant = ChatParticipant.objects.filter(
-            room_id=room_id,
-            user=user,
-            left_at__isnull=True
-        ).exists()
-        
-        if not is_participant:
-            return ChatTypingIndicator.objects.none()
-        
-        # Return typing indicators, excluding current user
-        queryset = ChatTypingIndicator.objects.filter(
-            room_id=room_id
-        ).exclude(
-            user=user
-        ).select_related('user')
-        
-        # Remove stale indicators (older than 10 seconds)
-        stale_cutoff = timezone.now() - timezone.timedelta(seconds=10)
-        ChatTypingIndicator.objects.filter(started_at__lt=stale_cutoff).delete()
-        
-        return queryset
+        participants = ChatParticipant.objects.filter(room_id=room_id, left_at__isnull=True)
+        if not participants.filter(user=self.request.user).exists():
+            return []
+        
+        others = {p.user_id: p.user for p in participants.exclude(user=self.request.user).select_related('user')}
+        typing = chat_state.typing_user_ids(room_id, list(others))
+        return [
+            ChatTypingIndicator(room_id=room_id, user=others[user_id], started_at=started_at)
+            for user_id, started_at in sorted(typing.items(), key=lambda item: item[1])
+        ]
 
@@ -3,12 +3,16 @@ Custom logging formatters for structured logging
 """
 import json
 import logging
-import traceback
 from datetime import datetime
 from django.conf import settings
-from django.utils import timezone
 import pytz
 
+# Always use Tampa, FL timezone for consistency
+LOG_TIMEZONE = pytz.timezone('America/New_York')
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request'}
+
 
 class JSONFormatter(logging.Formatter):
     """
@@ -16,15 +20,17 @@ class JSONFormatter(logging.Formatter):
     Perfect for production monitoring and log aggregation systems
     """
     
+    _environment = None
+    
     def format(self, record):
         """Format the log record as JSON"""
-        # Base log data
-        # Always use Tampa, FL timezone for consistency
-        tampa_tz = pytz.timezone('America/New_York')
-        now = timezone.now().astimezone(tampa_tz)
-        
+        return json.dumps(self.build(record), default=str, ensure_ascii=False)
+    
+    def build(self, record):
+        """The log record as a dict; subclasses add their sections here"""
         log_data = {
-            'timestamp': now.isoformat(),
+            # record.created: records may be written a little later by the log queue writer
+            'timestamp': datetime.fromtimestamp(record.created, LOG_TIMEZONE).isoformat(),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -36,40 +42,32 @@ class JSONFormatter(logging.Formatter):
             'thread_name': record.threadName,
         }
         
-        # Add exception information if present
+        # Add exception information if present (queued records arrive with exc_text
+        # already set: log_queue.prepare formats it once for all handlers)
         if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
             log_data['exception'] = {
                 'type': record.exc_info[0].__name__,
                 'message': str(record.exc_info[1]),
-                'traceback': traceback.format_exception(*record.exc_info)
+                'traceback': record.exc_text.splitlines(),
             }
         
         # Add extra fields from the log record
-        extra_fields = {}
-        for key, value in record.__dict__.items():
-            if key not in [
-                'name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 
-                'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
-                'lineno', 'funcName', 'created', 'msecs', 'relativeCreated',
-                'thread', 'threadName', 'processName', 'process', 'message'
-            ]:
-                extra_fields[key] = value
-        
+        extra_fields = {key: value for key, value in record.__dict__.items() if key not in RESERVED_ATTRS}
         if extra_fields:
             log_data['extra'] = extra_fields
         
         # Add environment information
-        log_data['environment'] = {
-            'debug': getattr(settings, 'DEBUG', False),
-            'service': 'cosmo-backend',
-            'version': getattr(settings, 'VERSION', '1.0.0'),
-        }
+        log_data['environment'] = self._get_environment()
         
         # Add request information if available
         if hasattr(record, 'request'):
             request = record.request
-            # Check if this is actually a Django request object (not a socket)
-            if hasattr(request, 'META') and hasattr(request, 'method'):
+            if isinstance(request, dict):
+                # Already snapshotted on the request thread (backend.log_queue)
+                log_data['request'] = request
+            elif hasattr(request, 'META') and hasattr(request, 'method'):
                 log_data['request'] = {
                     'method': getattr(request, 'method', None),
                     'path': getattr(request, 'path', None),
@@ -92,7 +90,18 @@ class JSONFormatter(logging.Formatter):
                 'slow_query': record.duration > 1000,  # Flag slow operations
             }
         
-        return json.dumps(log_data, default=str, ensure_ascii=False)
+        return log_data
+    
+    @classmethod
+    def _get_environment(cls):
+        # Settings are still loading when formatters are built, so read them on first use
+        if cls._environment is None:
+            JSONFormatter._environment = {
+                'debug': getattr(settings, 'DEBUG', False),
+                'service': 'cosmo-backend',
+                'version': getattr(settings, 'VERSION', '1.0.0'),
+            }
+        return cls._environment
     
     def _get_client_ip(self, request):
         """Get the real client IP address"""
@@ -114,9 +123,8 @@ class SecurityFormatter(JSONFormatter):
     Adds security context and sanitizes sensitive data
     """
     
-    def format(self, record):
-        # Get base JSON format
-        log_data = json.loads(super().format(record))
+    def build(self, record):
+        log_data = super().build(record)
         
         # Add security context
         log_data['security'] = {
@@ -134,7 +142,7 @@ class SecurityFormatter(JSONFormatter):
             ua = log_data['request']['user_agent']
             log_data['request']['user_agent'] = ua[:200] if len(ua) > 200 else ua
         
-        return json.dumps(log_data, default=str, ensure_ascii=False)
+        return log_data
     
     def _get_security_severity(self, level):
         """Map log level to security severity"""
@@ -176,9 +184,8 @@ class PerformanceFormatter(JSONFormatter):
     Adds performance metrics and timing information
     """
     
-    def format(self, record):
-        # Get base JSON format
-        log_data = json.loads(super().format(record))
+    def build(self, record):
+        log_data = super().build(record)
         
         # Add performance-specific fields
         if hasattr(record, 'duration'):
@@ -203,7 +210,7 @@ class PerformanceFormatter(JSONFormatter):
                 'peak_mb': getattr(record, 'peak_memory', 0),
             }
         
-        return json.dumps(log_data, default=str, ensure_ascii=False)
+        return log_data
     
     def _categorize_performance(self, duration_ms):
         """Categorize performance based on duration"""
@@ -0,0 +1,186 @@
+"""
+Non-blocking log delivery for the file and console handlers
+
+Formatting JSON and writing to RotatingFileHandlers used to happen on the
+request thread, once per handler. setup_logging (see logging_config) now
+wraps those handlers in QueuedHandler: the request thread only merges the
+message arguments, formats any traceback once for all handlers, snapshots
+the request and puts (handler, record) on one bounded in-memory queue. A
+single writer thread per process takes records off the queue and lets the
+real handler format and write them; it is started on first use and again
+in each forked worker.
+
+The queue never blocks a caller: when it is full the record is dropped and
+counted per level, and the writer reports the drops once it catches up.
+queue_stats() exposes the counters to the system metrics dashboard.
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueListener
+
+QUEUE_SIZE = 10000
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_listener = None
+_listener_pid = None
+_start_lock = threading.Lock()
+_drop_lock = threading.Lock()
+_dropped = {}
+_reported = {}
+_exc_formatter = logging.Formatter()
+
+
+def request_context(request):
+    """Plain-data snapshot of a Django request, safe to read from another thread"""
+    if not (hasattr(request, 'META') and hasattr(request, 'method')):
+        return {'type': type(request).__name__, 'note': 'Non-Django request object'}
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    return {
+        'method': request.method,
+        'path': getattr(request, 'path', None),
+        'user_id': getattr(getattr(request, 'user', None), 'id', None),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        'remote_addr': (forwarded.split(',')[0] if forwarded else request.META.get('REMOTE_ADDR')) or 'unknown',
+        'content_type': request.META.get('CONTENT_TYPE', ''),
+    }
+
+
+def prepare(record):
+    """Copy of ``record`` that no longer depends on anything the caller may change or free"""
+    if record.exc_info and not record.exc_text:
+        # Cached on the original, so every handler's copy shares one formatted traceback
+        record.exc_text = _exc_formatter.formatException(record.exc_info)
+    record = copy.copy(record)
+    record.msg = record.getMessage()
+    record.args = None
+    if hasattr(record, 'request'):
+        record.request = request_context(record.request)
+    return record
+
+
+class _Writer(QueueListener):
+    """Hands each queued record to the handler it was queued for"""
+
+    def handle(self, item):
+        handler, record = item
+        handler.handle(record)
+        if _dropped != _reported:
+            _report_drops()
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # wait for room; a full queue must still stop
+
+
+def _report_drops():
+    with _drop_lock:
+        new = {level: count - _reported.get(level, 0) for level, count in _dropped.items()
+               if count != _reported.get(level, 0)}
+        _reported.update(_dropped)
+    if new:
+        logging.getLogger('api').warning(
+            f"Log queue was full; dropped {sum(new.values())} records",
+            extra={'dropped_records': new},
+        )
+
+
+def _ensure_writer():
+    """Start the writer thread on first use in this process"""
+    global _listener, _listener_pid
+    if _listener_pid is not None:
+        return
+    with _start_lock:
+        if _listener_pid is not None:
+            return
+        _listener = _Writer(_queue)
+        _listener.start()
+        _listener_pid = os.getpid()
+
+
+def _reset_after_fork():
+    # The writer thread does not survive a fork, and its queue lock may have been held
+    global _queue, _listener, _listener_pid, _start_lock, _drop_lock
+    _queue = queue.Queue(maxsize=_queue.maxsize)
+    _listener = _listener_pid = None
+    _start_lock, _drop_lock = threading.Lock(), threading.Lock()
+    _dropped.clear()
+    _reported.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def stop():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener_pid
+    if _listener_pid is not None:
+        _listener.stop()
+        _listener_pid = None
+
+
+atexit.register(stop)
+
+
+class QueuedHandler(logging.Handler):
+    """Queues records for ``target``, which formats and writes them on the writer thread"""
+
+    def __init__(self, target):
+        super().__init__(target.level)
+        self.target = target
+        self.name = target.name
+
+    def emit(self, record):
+        _ensure_writer()
+        try:
+            _queue.put_nowait((self.target, prepare(record)))
+        except queue.Full:
+            with _drop_lock:
+                _dropped[record.levelname] = _dropped.get(record.levelname, 0) + 1
+        except Exception:
+            self.handleError(record)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def flush(self):
+        pass  # the writer flushes the target after every record
+
+    def close(self):
+        try:
+            self.target.close()
+        finally:
+            super().close()
+
+
+def install(handler_names, maxsize=QUEUE_SIZE):
+    """Route the named handlers of every configured logger through the queue"""
+    global _queue
+    if _listener_pid is None:
+        _queue = queue.Queue(maxsize=maxsize)
+    wrapped = {}
+    loggers = [logging.getLogger()] + [
+        logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)
+    ]
+    for logger in loggers:
+        for i, handler in enumerate(logger.handlers):
+            if handler.name in handler_names:
+                if handler not in wrapped:
+                    wrapped[handler] = QueuedHandler(handler)
+                logger.handlers[i] = wrapped[handler]
+    return list(wrapped.values())
+
+
+def queue_stats():
+    """Queue depth and dropped-record counters for this process"""
+    with _drop_lock:
+        dropped = dict(_dropped)
+    return {
+        'queued': _queue.qsize(),
+        'capacity': _queue.maxsize,
+        'dropped': dropped,
+        'dropped_total': sum(dropped.values()),
+        'writer_running': _listener_pid is not None,
+    }
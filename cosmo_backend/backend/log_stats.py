@@ -0,0 +1,96 @@
+"""
+Incremental log level statistics for the system metrics dashboard
+
+LogStatsHandler is attached to every configured logger (see logging_config)
+and counts records per level in memory. Every FLUSH_SECONDS the counts are
+added to hourly cache counters shared by all processes, so the dashboard can
+report the last 24 hours of log activity without reading any log file.
+"""
+import logging
+import threading
+import time
+
+FLUSH_SECONDS = 10
+WINDOW_HOURS = 24
+LEVELS = ('debug', 'info', 'warning', 'error', 'critical')
+KEY_PREFIX = 'log_stats'
+
+
+def _bucket(timestamp):
+    return int(timestamp // 3600)
+
+
+def _key(level, bucket):
+    return f'{KEY_PREFIX}:{level}:{bucket}'
+
+
+class LogStatsHandler(logging.Handler):
+    """Counts records per level and periodically flushes them to the cache"""
+
+    def __init__(self, level=logging.NOTSET, flush_seconds=FLUSH_SECONDS):
+        super().__init__(level)
+        self.flush_seconds = flush_seconds
+        self._pending = {}
+        self._last_flush = time.time()
+        self._flushing = threading.local()
+
+    def emit(self, record):
+        level = record.levelname.lower()
+        if level not in LEVELS:
+            return
+        bucket = _bucket(record.created)
+        with self.lock:
+            self._pending[(level, bucket)] = self._pending.get((level, bucket), 0) + 1
+        if record.created - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        # cache backends may log themselves; never re-enter from their records
+        if getattr(self._flushing, 'active', False):
+            return
+        from django.apps import apps
+        if not apps.ready:
+            return  # settings are still loading; keep counting in memory
+
+        with self.lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+        if not pending:
+            return
+
+        from django.core.cache import cache
+        self._flushing.active = True
+        try:
+            timeout = (WINDOW_HOURS + 1) * 3600
+            for (level, bucket), count in pending.items():
+                key = _key(level, bucket)
+                try:
+                    cache.incr(key, count)
+                except ValueError:
+                    if not cache.add(key, count, timeout):
+                        cache.incr(key, count)
+        except Exception:
+            with self.lock:  # cache unavailable: retry on the next flush
+                for item, count in pending.items():
+                    self._pending[item] = self._pending.get(item, 0) + count
+        finally:
+            self._flushing.active = False
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            super().close()
+
+
+def recent_log_levels(hours=WINDOW_HOURS, now=None):
+    """{level: count} for the last ``hours`` hourly buckets (one cache round trip)"""
+    from django.core.cache import cache
+
+    current = _bucket(now if now is not None else time.time())
+    keys = {_key(level, bucket): level
+            for level in LEVELS for bucket in range(current - hours + 1, current + 1)}
+    totals = dict.fromkeys(LEVELS, 0)
+    for key, count in cache.get_many(list(keys)).items():
+        totals[keys[key]] += count
+    return totals
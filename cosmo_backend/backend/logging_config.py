@@ -1,6 +1,7 @@
 """
 Production-ready logging configuration for Cosmo backend
-Provides structured JSON logging with rotation, different log levels, and Sentry integration
+Provides structured JSON logging with rotation, different log levels, and Sentry integration.
+File and console handlers write from a background thread (backend.log_queue).
 """
 import os
 import sys
@@ -14,6 +15,10 @@ LOGS_DIR = BASE_DIR / 'logs'
 # Ensure logs directory exists
 LOGS_DIR.mkdir(exist_ok=True)
 
+# Handlers whose formatting and I/O move off the calling thread; log_stats,
+# mail_admins and sentry stay synchronous (they need the live request/exception)
+QUEUED_HANDLERS = ('console', 'file_debug', 'file_info', 'file_error', 'file_security', 'file_performance')
+
 def get_logging_config(debug=False, sentry_dsn=None):
     """
     Get logging configuration based on environment
@@ -104,6 +109,10 @@ def get_logging_config(debug=False, sentry_dsn=None):
                 'backupCount': 7,  # Weekly rotation
                 'formatter': 'json',
             },
+            'log_stats': {
+                'level': 'DEBUG',
+                '()': 'backend.log_stats.LogStatsHandler',
+            },
             'mail_admins': {
                 'level': 'ERROR',
                 'class': 'django.utils.log.AdminEmailHandler',
@@ -174,6 +183,10 @@ def get_logging_config(debug=False, sentry_dsn=None):
         },
     }
     
+    # Per-level counters for the system metrics dashboard (backend.log_stats)
+    for logger_config in [*config['loggers'].values(), config['root']]:
+        logger_config['handlers'].append('log_stats')
+    
     # Add Sentry handler if DSN is provided
     if sentry_dsn:
         config['handlers']['sentry'] = {
@@ -186,10 +199,21 @@ def get_logging_config(debug=False, sentry_dsn=None):
     
     return config
 
-def setup_logging(debug=False, sentry_dsn=None):
-    """Setup logging with the given configuration"""
+def setup_logging(debug=False, sentry_dsn=None, queue_size=None):
+    """
+    Setup logging with the given configuration
+    
+    Args:
+        queue_size (int): Capacity of the background log queue; 0 writes synchronously
+    """
+    from backend import log_queue
+    
     config = get_logging_config(debug=debug, sentry_dsn=sentry_dsn)
     dictConfig(config)
+    if queue_size is None:
+        queue_size = log_queue.QUEUE_SIZE
+    if queue_size > 0:
+        log_queue.install(QUEUED_HANDLERS, maxsize=queue_size)
     
     # Log that logging has been configured
     import logging
@@ -199,6 +223,7 @@ def setup_logging(debug=False, sentry_dsn=None):
         extra={
             'debug_mode': debug,
             'sentry_enabled': bool(sentry_dsn),
+            'log_queue_size': queue_size,
             'logs_directory': str(LOGS_DIR),
         }
     )
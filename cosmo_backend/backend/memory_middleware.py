@@ -1,77 +1,246 @@
 """
 Memory management middleware for Heroku dynos
+
+Instead of collecting garbage on every request, a process-wide MemoryGovernor
+samples RSS every MEMORY_SAMPLE_EVERY_REQUESTS requests (or once
+MEMORY_SAMPLE_INTERVAL_SECONDS have passed) and only runs a collection when a
+threshold is crossed:
+
+- RSS above MEMORY_SOFT_LIMIT_MB: collect the young generations (gc.collect(1))
+- RSS above MEMORY_HARD_LIMIT_MB: full collection (gc.collect(2))
+
+Collections are rate limited (MEMORY_GC_MIN_INTERVAL_SECONDS) and capped by a
+pause-time budget (MEMORY_GC_PAUSE_BUDGET_MS per MEMORY_GC_BUDGET_WINDOW_SECONDS)
+so a dyno that stays above the limit does not pay for a full collection on
+every sample. The shared cache is never touched.
+
+Decisions are exported through MemoryGovernor.snapshot(), surfaced by the
+detailed health check (api.monitoring.DetailedHealthCheckView).
 """
 import gc
 import psutil
 import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Optional
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+def _process_rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+class MemoryGovernor:
+    """
+    Sampled, budgeted garbage collection driven by process RSS
+    """
+
+    def __init__(
+        self,
+        sample_every: int = 100,
+        sample_interval: float = 30.0,
+        soft_limit_mb: float = 400,
+        hard_limit_mb: float = 460,
+        min_gc_interval: float = 10.0,
+        pause_budget_ms: float = 250.0,
+        budget_window: float = 60.0,
+        trend_size: int = 60,
+        rss_reader: Callable[[], float] = _process_rss_mb,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sample_every = max(1, int(sample_every))
+        self.sample_interval = sample_interval
+        self.soft_limit_mb = soft_limit_mb
+        self.hard_limit_mb = hard_limit_mb
+        self.min_gc_interval = min_gc_interval
+        self.pause_budget_ms = pause_budget_ms
+        self.budget_window = budget_window
+        self._read_rss = rss_reader
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._requests_since_sample = 0
+        self._last_sample_at = clock()
+        self._last_gc_at: Optional[float] = None
+        self._pauses = deque()  # (monotonic time, pause ms) inside the budget window
+
+        self.requests = 0
+        self.samples = 0
+        self.sample_errors = 0
+        self.collections = {0: 0, 1: 0, 2: 0}
+        self.objects_collected = 0
+        self.total_pause_ms = 0.0
+        self.max_pause_ms = 0.0
+        self.last_pause_ms = 0.0
+        self.skipped_cooldown = 0
+        self.skipped_budget = 0
+        self.last_rss_mb: Optional[float] = None
+        self.last_decision = 'none'
+        self.rss_trend = deque(maxlen=max(2, int(trend_size)))  # (unix ts, rss mb)
+
+    @classmethod
+    def from_settings(cls) -> 'MemoryGovernor':
+        return cls(
+            sample_every=getattr(settings, 'MEMORY_SAMPLE_EVERY_REQUESTS', 100),
+            sample_interval=getattr(settings, 'MEMORY_SAMPLE_INTERVAL_SECONDS', 30.0),
+            soft_limit_mb=getattr(settings, 'MEMORY_SOFT_LIMIT_MB', 400),
+            hard_limit_mb=getattr(settings, 'MEMORY_HARD_LIMIT_MB', 460),
+            min_gc_interval=getattr(settings, 'MEMORY_GC_MIN_INTERVAL_SECONDS', 10.0),
+            pause_budget_ms=getattr(settings, 'MEMORY_GC_PAUSE_BUDGET_MS', 250.0),
+            budget_window=getattr(settings, 'MEMORY_GC_BUDGET_WINDOW_SECONDS', 60.0),
+            trend_size=getattr(settings, 'MEMORY_TREND_SAMPLES', 60),
+        )
+
+    def record_request(self) -> Optional[str]:
+        """Count a finished request; samples RSS when due and returns the decision"""
+        with self._lock:
+            self.requests += 1
+            self._requests_since_sample += 1
+            now = self._clock()
+            due = (
+                self._requests_since_sample >= self.sample_every
+                or now - self._last_sample_at >= self.sample_interval
+            )
+            if not due:
+                return None
+            return self._sample(now)
+
+    def sample(self) -> str:
+        """Sample RSS immediately and act on it"""
+        with self._lock:
+            return self._sample(self._clock())
+
+    def _sample(self, now: float) -> str:
+        self._requests_since_sample = 0
+        self._last_sample_at = now
+        try:
+            rss_mb = self._read_rss()
+        except Exception as e:
+            self.sample_errors += 1
+            logger.error(f"Error checking memory usage: {e}")
+            return self._decide('error')
+
+        self.samples += 1
+        self.last_rss_mb = rss_mb
+        self.rss_trend.append((time.time(), round(rss_mb, 2)))
+        logger.debug(f"Memory usage: {rss_mb:.2f} MB")
+
+        if rss_mb >= self.hard_limit_mb:
+            generation = 2
+        elif rss_mb >= self.soft_limit_mb:
+            generation = 1
+        else:
+            return self._decide('ok')
+
+        if self._last_gc_at is not None and now - self._last_gc_at < self.min_gc_interval:
+            self.skipped_cooldown += 1
+            return self._decide('skipped_cooldown')
+
+        while self._pauses and now - self._pauses[0][0] > self.budget_window:
+            self._pauses.popleft()
+        if sum(pause for _, pause in self._pauses) >= self.pause_budget_ms:
+            self.skipped_budget += 1
+            logger.warning(
+                f"High memory usage ({rss_mb:.2f} MB) but GC pause budget is spent; skipping collection"
+            )
+            return self._decide('skipped_budget')
+
+        started = time.perf_counter()
+        collected = gc.collect(generation)
+        pause_ms = (time.perf_counter() - started) * 1000
+
+        self._last_gc_at = now
+        self._pauses.append((now, pause_ms))
+        self.collections[generation] += 1
+        self.objects_collected += collected
+        self.total_pause_ms += pause_ms
+        self.last_pause_ms = pause_ms
+        self.max_pause_ms = max(self.max_pause_ms, pause_ms)
+
+        log = logger.warning if generation == 2 else logger.info
+        log(f"Memory at {rss_mb:.2f} MB: gen{generation} collection freed {collected} objects in {pause_ms:.1f} ms")
+        return self._decide(f'collected_gen{generation}')
+
+    def _decide(self, decision: str) -> str:
+        self.last_decision = decision
+        return decision
+
+    def _trend_mb_per_minute(self) -> Optional[float]:
+        if len(self.rss_trend) < 2:
+            return None
+        (first_ts, first_mb), (last_ts, last_mb) = self.rss_trend[0], self.rss_trend[-1]
+        if last_ts <= first_ts:
+            return None
+        return round((last_mb - first_mb) / ((last_ts - first_ts) / 60), 3)
+
+    def snapshot(self) -> dict:
+        """Metrics describing samples taken and collections run by this process"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'samples': self.samples,
+                'sample_errors': self.sample_errors,
+                'last_rss_mb': round(self.last_rss_mb, 2) if self.last_rss_mb is not None else None,
+                'last_decision': self.last_decision,
+                'collections': {f'gen{gen}': count for gen, count in self.collections.items()},
+                'objects_collected': self.objects_collected,
+                'pause_ms': {
+                    'total': round(self.total_pause_ms, 3),
+                    'last': round(self.last_pause_ms, 3),
+                    'max': round(self.max_pause_ms, 3),
+                },
+                'skipped': {
+                    'cooldown': self.skipped_cooldown,
+                    'budget': self.skipped_budget,
+                },
+                'rss_trend': {
+                    'mb_per_minute': self._trend_mb_per_minute(),
+                    'samples': [
+                        {'at': datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(), 'rss_mb': mb}
+                        for ts, mb in self.rss_trend
+                    ],
+                },
+                'config': {
+                    'sample_every_requests': self.sample_every,
+                    'sample_interval_seconds': self.sample_interval,
+                    'soft_limit_mb': self.soft_limit_mb,
+                    'hard_limit_mb': self.hard_limit_mb,
+                    'min_gc_interval_seconds': self.min_gc_interval,
+                    'pause_budget_ms': self.pause_budget_ms,
+                    'budget_window_seconds': self.budget_window,
+                },
+            }
+
+
+_governor: Optional[MemoryGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_memory_governor() -> MemoryGovernor:
+    """Process-wide governor shared by the middleware and the metrics endpoints"""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = MemoryGovernor.from_settings()
+    return _governor
+
+
 class MemoryManagementMiddleware:
     """
-    Middleware to manage memory usage and prevent memory leaks
+    Middleware that feeds finished requests to the memory governor
     """
-    
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.memory_threshold = 0.8  # 80% memory usage threshold
-        self.max_memory_mb = 400  # Max memory in MB before cleanup
-        
+        self.governor = get_memory_governor()
+
     def __call__(self, request):
-        # Check memory before processing request
-        self._check_memory_usage()
-        
         response = self.get_response(request)
-        
-        # Cleanup after processing request
-        self._cleanup_memory()
-        
+        # Sampling happens after the response is built so it never delays the view
+        self.governor.record_request()
         return response
-    
-    def _check_memory_usage(self):
-        """Check current memory usage and trigger cleanup if needed"""
-        try:
-            process = psutil.Process()
-            memory_info = process.memory_info()
-            memory_mb = memory_info.rss / 1024 / 1024
-            
-            # Log memory usage
-            logger.debug(f"Memory usage: {memory_mb:.2f} MB")
-            
-            # Trigger cleanup if memory usage is high
-            if memory_mb > self.max_memory_mb:
-                logger.warning(f"High memory usage detected: {memory_mb:.2f} MB")
-                self._force_cleanup()
-                
-        except Exception as e:
-            logger.error(f"Error checking memory usage: {e}")
-    
-    def _cleanup_memory(self):
-        """Perform memory cleanup after each request"""
-        try:
-            # Force garbage collection
-            collected = gc.collect()
-            if collected > 0:
-                logger.debug(f"Garbage collected {collected} objects")
-                
-        except Exception as e:
-            logger.error(f"Error during memory cleanup: {e}")
-    
-    def _force_cleanup(self):
-        """Force aggressive memory cleanup"""
-        try:
-            # Multiple garbage collection passes
-            for _ in range(3):
-                gc.collect()
-            
-            # Clear Django's cache if it exists
-            if hasattr(settings, 'CACHES'):
-                from django.core.cache import cache
-                cache.clear()
-                
-            logger.info("Forced memory cleanup completed")
-            
-        except Exception as e:
-            logger.error(f"Error during forced cleanup: {e}")
@@ -4,8 +4,8 @@ Middleware for request logging, performance monitoring, security tracking, and t
 import time
 import logging
 import json
+import random
 from django.utils.deprecation import MiddlewareMixin
-from django.db import connection
 from django.conf import settings
 from django.utils import timezone
 from django.shortcuts import redirect
@@ -61,10 +61,23 @@ class TimezoneMiddleware(MiddlewareMixin):
             timezone.activate('America/New_York')
 
 
+_process = None
+
+
+def _rss_mb():
+    """Resident memory of this process, reusing one psutil handle per process"""
+    global _process
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process()
+    return _process.memory_info().rss / 1024 / 1024
+
+
 class RequestLoggingMiddleware(MiddlewareMixin):
     """
     Middleware to log all HTTP requests with performance metrics
-    Tracks response times, database queries, memory usage, and security events
+    Tracks response times, database queries, memory usage, and security events.
+    Query counts come from request.query_stats (backend.request_profiling), so
+    they are recorded with DEBUG off too.
     """
     
     def __init__(self, get_response):
@@ -76,14 +89,18 @@ class RequestLoggingMiddleware(MiddlewareMixin):
     def process_request(self, request):
         """Start timing and capture initial metrics"""
         request._start_time = time.time()
-        request._start_queries = len(connection.queries)
         
-        # Get initial memory usage
-        try:
-            process = psutil.Process(os.getpid())
-            request._start_memory = process.memory_info().rss / 1024 / 1024  # MB
-        except:
-            request._start_memory = 0
+        # INFO request logs can be sampled (REQUEST_LOG_SAMPLE_RATE); slow and failed requests are always logged
+        sample_rate = getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 1.0)
+        request._log_sampled = sample_rate >= 1 or random.random() < sample_rate
+        
+        # Get initial memory usage (only needed when the request will be logged in full)
+        request._start_memory = 0
+        if request._log_sampled:
+            try:
+                request._start_memory = _rss_mb()
+            except:
+                pass
         
         # Log security-relevant requests
         self._log_security_events(request)
@@ -98,21 +115,27 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         # Calculate timing
         duration = (time.time() - request._start_time) * 1000  # milliseconds
         
-        # Calculate database metrics
-        queries_count = len(connection.queries) - request._start_queries
-        queries_time = sum(float(q['time']) for q in connection.queries[request._start_queries:]) * 1000
-        
-        # Calculate memory usage
-        try:
-            process = psutil.Process(os.getpid())
-            end_memory = process.memory_info().rss / 1024 / 1024  # MB
-            memory_delta = end_memory - request._start_memory
-        except:
-            end_memory = 0
-            memory_delta = 0
-        
         # Determine if this is a slow request
         is_slow = duration > getattr(settings, 'SLOW_REQUEST_THRESHOLD', 1000)
+        is_error = response.status_code >= 400
+        sampled = getattr(request, '_log_sampled', True)
+        if not (is_slow or is_error or sampled):
+            return response
+        
+        # Database metrics collected by RequestProfilingMiddleware
+        query_stats = getattr(request, 'query_stats', None)
+        queries_count = query_stats.count if query_stats else 0
+        queries_time = query_stats.time_ms if query_stats else 0.0
+        
+        # Calculate memory usage
+        end_memory = 0
+        memory_delta = 0
+        if sampled:
+            try:
+                end_memory = _rss_mb()
+                memory_delta = end_memory - request._start_memory
+            except:
+                pass
         
         # Log the request
         log_level = logging.WARNING if is_slow else logging.INFO
@@ -133,7 +156,8 @@ class RequestLoggingMiddleware(MiddlewareMixin):
                 'user_id': getattr(request.user, 'id', None) if hasattr(request, 'user') else None,
                 'is_authenticated': getattr(request.user, 'is_authenticated', False) if hasattr(request, 'user') else False,
                 'content_length': len(response.content) if hasattr(response, 'content') else 0,
-                'slow_queries': self._get_slow_queries() if queries_time > 100 else [],
+                'slow_queries': query_stats.slow if query_stats else [],
+                'sample_rate': 1.0 if is_slow or is_error else getattr(settings, 'REQUEST_LOG_SAMPLE_RATE', 1.0),
             }
         )
         
@@ -212,18 +236,6 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         else:
             ip = request.META.get('REMOTE_ADDR')
         return ip
-    
-    def _get_slow_queries(self):
-        """Get details of slow database queries"""
-        slow_queries = []
-        for query in connection.queries[-10:]:  # Last 10 queries
-            time_taken = float(query['time']) * 1000
-            if time_taken > 100:  # 100ms threshold
-                slow_queries.append({
-                    'sql': query['sql'][:200],  # Truncate long queries
-                    'time_ms': time_taken,
-                })
-        return slow_queries
 
 
 class ErrorLoggingMiddleware(MiddlewareMixin):
@@ -0,0 +1,325 @@
+"""
+Per-request query instrumentation, endpoint latency histograms and an
+opt-in sampling profiler
+
+RequestLoggingMiddleware used to read connection.queries, which Django only
+fills with DEBUG on, so production logs had no query counts or timings.
+RequestProfilingMiddleware now wraps every request:
+
+- QueryStats is installed with connection.execute_wrapper and counts, times
+  and fingerprints each query (SQL with literals and IN-lists collapsed). A
+  fingerprint run QUERY_N_PLUS_ONE_THRESHOLD or more times in one request
+  is logged to api.performance as a likely N+1. The stats are left on
+  ``request.query_stats`` for RequestLoggingMiddleware.
+- EndpointStats keeps per-endpoint (method + URL route) latency histograms,
+  query totals and N+1 counts in process memory. snapshot() is surfaced by
+  the detailed health check (api.monitoring) and the system metrics dashboard.
+- A request carrying ``X-Profile-Request: 1`` is sampled by SamplingProfiler
+  (one at a time per process) unless its session user is known not to be a
+  superuser, or it is anonymous without an Authorization header. If the user
+  turns out to be a superuser the collapsed stacks are cached for PROFILE_TTL
+  seconds and the response gets ``X-Request-Profile: <id>``, readable by
+  superusers at /api/health/profiles/<id>/.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger('api.performance')
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MAX_ENDPOINTS = 500
+OVERFLOW_ENDPOINT = 'other'
+MAX_SLOW_QUERIES = 10
+
+PROFILE_HEADER = 'HTTP_X_PROFILE_REQUEST'
+PROFILE_RESPONSE_HEADER = 'X-Request-Profile'
+PROFILE_CACHE_PREFIX = 'request_profile'
+PROFILE_TTL = 3600
+PROFILE_MAX_DEPTH = 48
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROW_LIST = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """Query shape: literals become ?, IN-lists and VALUES rows collapse to (...)"""
+    shape = _STRING.sub('?', sql).replace('%s', '?')
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(...)', shape)
+    shape = _ROW_LIST.sub('(...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    """execute_wrapper that counts, times and fingerprints one request's queries"""
+
+    def __init__(self, slow_ms: float = 100.0):
+        self.slow_ms = slow_ms
+        self.count = 0
+        self.time_ms = 0.0
+        self.shapes = Counter()
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.time_ms += elapsed
+            self.shapes[fingerprint(sql)] += 1
+            if elapsed >= self.slow_ms and len(self.slow) < MAX_SLOW_QUERIES:
+                self.slow.append({'sql': sql[:200], 'time_ms': round(elapsed, 2)})
+
+    def repeated(self, threshold: int):
+        """[(fingerprint, runs)] for shapes run at least ``threshold`` times, most frequent first"""
+        return [(shape, runs) for shape, runs in self.shapes.most_common() if runs >= threshold]
+
+
+def _percentile(histogram, count, fraction, buckets):
+    """Upper bound of the bucket holding the given fraction of requests (None past the last bucket)"""
+    rank = fraction * count
+    seen = 0
+    for i, n in enumerate(histogram):
+        seen += n
+        if seen >= rank:
+            return buckets[i] if i < len(buckets) else None
+    return None
+
+
+class EndpointStats:
+    """
+    Process-wide per-endpoint latency histograms and query totals
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS, max_endpoints: int = MAX_ENDPOINTS):
+        self.buckets = tuple(buckets)
+        self.max_endpoints = max_endpoints
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.started_at = datetime.now(timezone.utc)
+
+    def record(self, endpoint: str, duration_ms: float, queries: Optional[QueryStats] = None,
+               n_plus_one: bool = False):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                if len(self._endpoints) >= self.max_endpoints:
+                    endpoint = OVERFLOW_ENDPOINT
+                entry = self._endpoints.setdefault(endpoint, {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'histogram': [0] * (len(self.buckets) + 1),
+                    'queries': 0, 'query_ms': 0.0, 'n_plus_one': 0,
+                })
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['histogram'][bisect_left(self.buckets, duration_ms)] += 1
+            if queries is not None:
+                entry['queries'] += queries.count
+                entry['query_ms'] += queries.time_ms
+            entry['n_plus_one'] += int(n_plus_one)
+
+    def snapshot(self, limit: int = 25) -> dict:
+        """Endpoints with the most total time first, with p50/p95/p99 bucket bounds"""
+        with self._lock:
+            endpoints = {name: dict(entry, histogram=list(entry['histogram']))
+                         for name, entry in self._endpoints.items()}
+        labels = [f'<={bound}' for bound in self.buckets] + [f'>{self.buckets[-1]}']
+        rows = []
+        for name, entry in sorted(endpoints.items(), key=lambda item: -item[1]['total_ms'])[:limit]:
+            count = entry['count']
+            rows.append({
+                'endpoint': name,
+                'count': count,
+                'avg_ms': round(entry['total_ms'] / count, 2),
+                'p50_ms': _percentile(entry['histogram'], count, 0.50, self.buckets),
+                'p95_ms': _percentile(entry['histogram'], count, 0.95, self.buckets),
+                'p99_ms': _percentile(entry['histogram'], count, 0.99, self.buckets),
+                'max_ms': round(entry['max_ms'], 2),
+                'avg_queries': round(entry['queries'] / count, 2),
+                'avg_query_ms': round(entry['query_ms'] / count, 2),
+                'n_plus_one': entry['n_plus_one'],
+                'histogram': dict(zip(labels, entry['histogram'])),
+            })
+        return {
+            'since': self.started_at.isoformat(),
+            'pid': os.getpid(),
+            'endpoints_tracked': len(endpoints),
+            'requests': sum(entry['count'] for entry in endpoints.values()),
+            'endpoints': rows,
+        }
+
+
+_stats: Optional[EndpointStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_request_stats() -> EndpointStats:
+    """Process-wide endpoint statistics shared by the middleware and the metrics endpoints"""
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = EndpointStats()
+    return _stats
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread until stopped"""
+
+    def __init__(self, thread_id: int, interval_ms: float = 5.0, max_depth: int = PROFILE_MAX_DEPTH):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+                self.samples += 1
+
+    def _collapse(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}.{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def result(self, limit: int = 200) -> dict:
+        """Collapsed stacks (flame graph input) and the hottest leaf functions"""
+        leaves = Counter()
+        for stack, n in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += n
+        return {
+            'interval_ms': self.interval * 1000,
+            'duration_ms': round(self.duration_ms, 2),
+            'samples': self.samples,
+            'top_functions': [{'function': name, 'samples': n} for name, n in leaves.most_common(25)],
+            'stacks': [{'stack': stack, 'samples': n} for stack, n in self.stacks.most_common(limit)],
+        }
+
+
+# One profiled request at a time per process, so the header cannot pile up sampler threads
+_profiler_slot = threading.Semaphore(1)
+
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    return cache.get(f'{PROFILE_CACHE_PREFIX}:{profile_id}')
+
+
+def endpoint_name(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    route = match.route if match is not None and match.route else '<unresolved>'
+    return f'{request.method} {route}'
+
+
+class RequestProfilingMiddleware:
+    """
+    Middleware that instruments each request's queries and feeds EndpointStats
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.stats = get_request_stats()
+
+    def __call__(self, request):
+        queries = QueryStats(slow_ms=getattr(settings, 'SLOW_QUERY_THRESHOLD', 100))
+        request.query_stats = queries
+        profiler = self._start_profiler(request)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(queries))
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                _profiler_slot.release()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        endpoint = endpoint_name(request)
+        repeated = queries.repeated(getattr(settings, 'QUERY_N_PLUS_ONE_THRESHOLD', 10))
+        if repeated:
+            logger.warning(
+                f"Possible N+1 queries in {endpoint}: {repeated[0][1]} runs of one query shape",
+                extra={
+                    'endpoint': endpoint,
+                    'queries_count': queries.count,
+                    'repeated_queries': [{'sql': shape[:300], 'runs': runs} for shape, runs in repeated[:5]],
+                },
+            )
+        self.stats.record(endpoint, duration_ms, queries, n_plus_one=bool(repeated))
+
+        if profiler is not None and getattr(getattr(request, 'user', None), 'is_superuser', False):
+            # request.user is final here: DRF writes the authenticated API user back to it
+            profile_id = uuid.uuid4().hex
+            cache.set(f'{PROFILE_CACHE_PREFIX}:{profile_id}',
+                      dict(profiler.result(), endpoint=endpoint, queries_count=queries.count,
+                           queries_ms=round(queries.time_ms, 2)),
+                      PROFILE_TTL)
+            response[PROFILE_RESPONSE_HEADER] = profile_id
+        return response
+
+    def _start_profiler(self, request) -> Optional[SamplingProfiler]:
+        if request.META.get(PROFILE_HEADER) != '1' or not self._may_profile(request):
+            return None
+        if not _profiler_slot.acquire(blocking=False):
+            return None
+        interval = getattr(settings, 'REQUEST_PROFILER_INTERVAL_MS', 5)
+        return SamplingProfiler(threading.get_ident(), interval_ms=interval).start()
+
+    @staticmethod
+    def _may_profile(request) -> bool:
+        """
+        Refuse the sampler before it starts unless the caller can still turn out to be a superuser
+
+        A session user is known here; a token or JWT caller is only authenticated later by DRF,
+        so an anonymous request is sampled only if it carries an Authorization header.
+        """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_superuser
+        return bool(request.META.get('HTTP_AUTHORIZATION'))
@@ -163,6 +163,7 @@ MIDDLEWARE = [
     "backend.memory_middleware.MemoryManagementMiddleware",  # Memory management
     # Production logging and monitoring middleware
     "backend.middleware.RequestLoggingMiddleware",
+    "backend.request_profiling.RequestProfilingMiddleware",  # Query counts, endpoint histograms
     "backend.middleware.ErrorLoggingMiddleware", 
     # Exception middleware runs last (process_exception runs in reverse order)
     "api.middleware.ApiExceptionMiddleware",  # Catch all unhandled exceptions for API endpoints
@@ -202,6 +203,22 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Ephemeral chat state (api.chat_state): typing/presence TTLs in the cache,
+# read marks written in batches, room modified_at bumped at most every N seconds
+CHAT_TYPING_TTL = 10
+CHAT_PRESENCE_TTL = 120
+CHAT_ROOM_TOUCH_SECONDS = 15
+CHAT_READ_FLUSH_SECONDS = 5
+CHAT_READ_FLUSH_BATCH = 200
+
+# Background booking imports (api/services/import_job_service.py)
+# 'thread' = in-process worker pool, 'database' = drained by `manage.py run_import_jobs`
+BOOKING_IMPORT_JOB_BACKEND = os.getenv('BOOKING_IMPORT_JOB_BACKEND', 'thread')
+BOOKING_IMPORT_WORKERS = int(os.getenv('BOOKING_IMPORT_WORKERS', '2'))
+BOOKING_IMPORT_CHUNK_SIZE = int(os.getenv('BOOKING_IMPORT_CHUNK_SIZE', '500'))
+# Seconds a job may sit queued or running before it is assumed lost with its worker and marked failed
+BOOKING_IMPORT_JOB_TIMEOUT = int(os.getenv('BOOKING_IMPORT_JOB_TIMEOUT', '3600'))
+
 # Add your REST framework configuration here:
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -343,10 +360,32 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB - Allow large image uploa
 MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))  # 25MB ingress limit
 STORED_IMAGE_TARGET_BYTES = int(os.getenv("STORED_IMAGE_TARGET_BYTES", str(5 * 1024 * 1024)))  # 5MB storage target
 STORED_IMAGE_MAX_DIM = int(os.getenv("STORED_IMAGE_MAX_DIM", "2048"))  # 2048px max dimension
+IMAGE_OPTIMIZE_TIME_BUDGET = float(os.getenv("IMAGE_OPTIMIZE_TIME_BUDGET", "10"))  # seconds of quality search per image
+# Off-request optimization (api/services/task_image_processing.py)
+# 'thread' = worker threads in the web process, 'process' = those threads plus a spawned process pool (opt-in),
+# 'database' = drained by `manage.py process_task_images`
+TASK_IMAGE_PROCESSING_BACKEND = os.getenv("TASK_IMAGE_PROCESSING_BACKEND", "thread")
+TASK_IMAGE_WORKERS = int(os.getenv("TASK_IMAGE_WORKERS", "2"))
+# Seconds after which an image still "processing" is assumed abandoned and claimed again
+TASK_IMAGE_CLAIM_TIMEOUT = int(os.getenv("TASK_IMAGE_CLAIM_TIMEOUT", "600"))
+# Fixed-size WebP renditions served to photo grids (api.image_renditions): name -> max dimension
+IMAGE_RENDITION_SIZES = {"thumb": 320, "medium": 1024}
+IMAGE_RENDITION_QUALITY = int(os.getenv("IMAGE_RENDITION_QUALITY", "80"))
+# Hours an unreferenced upload blob is kept for replays before cleanup_imports --blobs removes it
+BLOB_GC_GRACE_HOURS = int(os.getenv("BLOB_GC_GRACE_HOURS", "24"))
 
 # Audit System Configuration
 AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
 AUDIT_MAX_CHANGES_BYTES = int(os.getenv("AUDIT_MAX_CHANGES_BYTES", "10000"))
+# Write-behind audit buffer (api.audit_writer): 'buffered' | 'spool' | 'sync'
+AUDIT_WRITE_MODE = os.getenv("AUDIT_WRITE_MODE", "buffered")
+AUDIT_BUFFER_MAX_EVENTS = int(os.getenv("AUDIT_BUFFER_MAX_EVENTS", "500"))  # per request/batch before an early flush
+AUDIT_BULK_BATCH_SIZE = 500
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR") or None  # drained by `manage.py drain_audit_spool`
+# Audit storage (api.audit_storage): monthly partitions on PostgreSQL, keyset pruning/export
+AUDIT_PARTITION_MONTHS_AHEAD = 3   # partitions prepared by `manage.py prune_audit`
+AUDIT_PRUNE_BATCH_SIZE = 5000
+AUDIT_EXPORT_PAGE_SIZE = 2000
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -364,6 +403,16 @@ FRONTEND_URL = "http://localhost:3000"
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Memory governor (backend.memory_middleware): RSS is sampled every N requests
+# or after an interval, and GC only runs when a limit is crossed
+MEMORY_SAMPLE_EVERY_REQUESTS = int(os.getenv('MEMORY_SAMPLE_EVERY_REQUESTS', '100'))
+MEMORY_SAMPLE_INTERVAL_SECONDS = float(os.getenv('MEMORY_SAMPLE_INTERVAL_SECONDS', '30'))
+MEMORY_SOFT_LIMIT_MB = float(os.getenv('MEMORY_SOFT_LIMIT_MB', '400'))  # young-generation collection
+MEMORY_HARD_LIMIT_MB = float(os.getenv('MEMORY_HARD_LIMIT_MB', '460'))  # full collection
+MEMORY_GC_MIN_INTERVAL_SECONDS = 10
+MEMORY_GC_PAUSE_BUDGET_MS = 250  # max GC pause per budget window
+MEMORY_GC_BUDGET_WINDOW_SECONDS = 60
+
 # Database connection management
 DATABASES['default'].update({
     'CONN_MAX_AGE': 60,  # Close connections after 60 seconds
@@ -381,6 +430,24 @@ CACHES = {
     }
 }
 
+# Calendar month rows (api.calendar_events); Task/Booking writes bump the cache version
+CALENDAR_CACHE_TIMEOUT = int(os.getenv('CALENDAR_CACHE_TIMEOUT', '300'))
+
+# Property autocomplete (api.property_autocomplete): 'trigram' (PostgreSQL pg_trgm),
+# 'memory' (in-process index) or 'auto'; Property writes bump the page cache version
+PROPERTY_AUTOCOMPLETE_BACKEND = os.getenv('PROPERTY_AUTOCOMPLETE_BACKEND', 'auto')
+PROPERTY_AUTOCOMPLETE_CACHE_TIMEOUT = int(os.getenv('PROPERTY_AUTOCOMPLETE_CACHE_TIMEOUT', '300'))
+
+# Mobile delta sync (api.mobile_sync): changes per download page, changes per upload
+# batch, and how long SyncChange rows are kept (older cursors get a full snapshot)
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '500'))
+SYNC_MAX_BATCH = int(os.getenv('SYNC_MAX_BATCH', '200'))
+SYNC_CHANGE_RETENTION_DAYS = int(os.getenv('SYNC_CHANGE_RETENTION_DAYS', '30'))
+
+# Checklist template items cached for bulk checklist creation (api.checklist_materializer);
+# ChecklistItem writes drop the template's entry
+CHECKLIST_ITEMS_CACHE_TIMEOUT = int(os.getenv('CHECKLIST_ITEMS_CACHE_TIMEOUT', '3600'))
+
 # ============================================================================
 # EMAIL CONFIGURATION (single source of truth)
 # ============================================================================
@@ -419,6 +486,14 @@ FCM_SERVER_KEY = "your-firebase-server-key-here"
 FIREBASE_PROJECT_ID = 'cosmomanagement'
 FIREBASE_CREDENTIALS_FILE = BASE_DIR / 'firebase_credentials.json'
 
+# Push delivery pipeline (api.services.push_delivery)
+PUSH_MAX_WORKERS = int(os.getenv('PUSH_MAX_WORKERS', '8'))  # concurrent sends / pooled connections
+PUSH_MAX_RETRIES = 3              # retries for 429/5xx/connection errors
+PUSH_BACKOFF_BASE_SECONDS = 0.5
+PUSH_BACKOFF_MAX_SECONDS = 8.0
+PUSH_TIMEOUT_SECONDS = 5.0
+PUSH_LINGER_SECONDS = 0.2         # window for merging pushes to the same device
+
 # --- Email digest feature flag ---------------------------------
 # Default: OFF.  Turn ON with   export EMAIL_DIGEST_ENABLED=true
 EMAIL_DIGEST_ENABLED = os.getenv("EMAIL_DIGEST_ENABLED", "false").lower() == "true"
@@ -429,6 +504,13 @@ EMAIL_DIGEST_HOUR_UTC = int(os.getenv("EMAIL_DIGEST_HOUR_UTC", "12"))
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# Superuser log viewer (api.log_access): line-offset/level indexes live beside the logs by default
+LOG_INDEX_DIR = os.getenv("LOG_INDEX_DIR") or str(LOG_DIR / ".index")
+LOG_VIEWER_MAX_LINES = 5000  # cap per page, including "All lines"
+
+# System metrics dashboard (api.system_metrics): snapshot refresh interval in seconds, 0 disables the thread
+METRICS_REFRESH_INTERVAL = int(os.getenv('METRICS_REFRESH_INTERVAL', '30'))
+
 CRONJOBS = [
     (
         f"0 {EMAIL_DIGEST_HOUR_UTC} * * *",
@@ -455,10 +537,17 @@ SENTRY_DSN = os.getenv('SENTRY_DSN', None)
 # Performance monitoring thresholds
 SLOW_REQUEST_THRESHOLD = int(os.getenv('SLOW_REQUEST_THRESHOLD', '1000'))  # milliseconds
 SLOW_QUERY_THRESHOLD = int(os.getenv('SLOW_QUERY_THRESHOLD', '100'))      # milliseconds
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_N_PLUS_ONE_THRESHOLD', '10'))  # runs of one query shape per request
+REQUEST_PROFILER_INTERVAL_MS = float(os.getenv('REQUEST_PROFILER_INTERVAL_MS', '5'))  # X-Profile-Request sampling period
+
+# Background log writer queue (backend.log_queue); 0 writes on the calling thread
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Fraction of INFO request logs RequestLoggingMiddleware writes; slow and 4xx/5xx requests are always logged
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', '1.0'))
 
 # Initialize logging system
 from .logging_config import setup_logging
-setup_logging(debug=DEBUG, sentry_dsn=SENTRY_DSN)
+setup_logging(debug=DEBUG, sentry_dsn=SENTRY_DSN, queue_size=LOG_QUEUE_SIZE)
 
 # Sentry configuration (if DSN is provided)
 if SENTRY_DSN:
@@ -83,6 +83,7 @@ MIDDLEWARE = [
     'backend.memory_middleware.MemoryManagementMiddleware',  # Memory management
     # Production logging and monitoring middleware
     'backend.middleware.RequestLoggingMiddleware',
+    'backend.request_profiling.RequestProfilingMiddleware',  # Query counts, endpoint histograms
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -109,6 +109,9 @@ CACHES = {
     }
 }
 
+# No background metrics refresher thread during tests
+METRICS_REFRESH_INTERVAL = 0
+
 # Disable email sending during tests
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 
@@ -204,6 +207,9 @@ REST_FRAMEWORK = {
 # Add MAX_UPLOAD_BYTES for tests
 MAX_UPLOAD_BYTES = 25 * 1024 * 1024  # 25MB default for tests
 
+# Optimize uploads inside the request so tests see the stored result
+TASK_IMAGE_PROCESSING_BACKEND = 'inline'
+
 # Add missing apps for tests (avoid duplicates)
 if 'rest_framework.authtoken' not in INSTALLED_APPS:
     INSTALLED_APPS = INSTALLED_APPS + [
@@ -3,7 +3,7 @@
  * 
  * Converts standard select elements into autocomplete dropdowns with:
  * - Real-time search
- * - Lazy loading with pagination
+ * - Lazy loading with keyset cursors
  * - Keyboard navigation
  * - Accessibility support
  * 
@@ -18,6 +18,7 @@ export class PropertyAutocomplete {
      * @param {number} options.minChars - Minimum characters before search (default: 0)
      * @param {number} options.debounceMs - Debounce delay in milliseconds (default: 300)
      * @param {number} options.pageSize - Results per page (default: 20)
+     * @param {boolean} options.allowClear - Emptying the input clears the selection (default: false)
      */
     constructor(selectElement, options = {}) {
         this.select = selectElement;
@@ -26,12 +27,13 @@ export class PropertyAutocomplete {
             minChars: 0,
             debounceMs: 300,
             pageSize: 20,
+            allowClear: false,
             ...options
         };
         
         this.currentValue = this.select.value;
         this.searchTimeout = null;
-        this.currentPage = 1;
+        this.nextCursor = null;
         this.hasMore = true;
         this.isLoading = false;
         
@@ -142,7 +144,12 @@ export class PropertyAutocomplete {
         
         // Hide dropdown on blur (with delay for click handling)
         this.input.addEventListener('blur', () => {
-            setTimeout(() => this.hideDropdown(), 200);
+            setTimeout(() => {
+                this.hideDropdown();
+                if (this.options.allowClear && !this.input.value.trim() && this.select.value) {
+                    this.clear(true);
+                }
+            }, 200);
         });
         
         // Keyboard navigation
@@ -168,7 +175,7 @@ export class PropertyAutocomplete {
         const query = this.input.value.trim();
         
         // Reset pagination on new search
-        this.currentPage = 1;
+        this.nextCursor = null;
         this.hasMore = true;
         
         if (query.length >= this.options.minChars) {
@@ -244,13 +251,16 @@ export class PropertyAutocomplete {
      * Search for properties via API
      */
     async search(query) {
+        const firstPage = this.nextCursor === null;
         try {
             this.showLoading();
             
             const url = new URL(this.options.searchUrl, window.location.origin);
             url.searchParams.set('q', query);
-            url.searchParams.set('page', this.currentPage);
             url.searchParams.set('page_size', this.options.pageSize);
+            if (!firstPage) {
+                url.searchParams.set('cursor', this.nextCursor);
+            }
             
             const response = await fetch(url);
             
@@ -261,13 +271,14 @@ export class PropertyAutocomplete {
             const data = await response.json();
             
             // Clear dropdown for first page
-            if (this.currentPage === 1) {
+            if (firstPage) {
                 this.dropdown.innerHTML = '';
             }
             
             // Render results
-            this.renderResults(data.results);
+            this.renderResults(data.results, firstPage);
             this.hasMore = data.has_more;
+            this.nextCursor = data.next_cursor;
             
             this.hideLoading();
             this.showDropdown();
@@ -283,17 +294,16 @@ export class PropertyAutocomplete {
      * Load more results (pagination)
      */
     async loadMore() {
-        if (this.isLoading || !this.hasMore) return;
+        if (this.isLoading || !this.hasMore || !this.nextCursor) return;
         
-        this.currentPage++;
         await this.search(this.input.value.trim());
     }
     
     /**
      * Render search results
      */
-    renderResults(results) {
-        if (results.length === 0 && this.currentPage === 1) {
+    renderResults(results, firstPage) {
+        if (results.length === 0 && firstPage) {
             this.dropdown.innerHTML = '<div class="property-autocomplete-empty">No properties found</div>';
             return;
         }
@@ -333,7 +343,13 @@ export class PropertyAutocomplete {
         const value = item.getAttribute('data-value');
         const text = item.textContent;
         
-        // Update hidden select
+        // Update hidden select (server-rendered pickers only carry the selected option)
+        if (!Array.from(this.select.options).some(option => option.value === value)) {
+            const option = document.createElement('option');
+            option.value = value;
+            option.textContent = text;
+            this.select.appendChild(option);
+        }
         this.select.value = value;
         
         // Update display input
@@ -350,6 +366,20 @@ export class PropertyAutocomplete {
         this.currentValue = value;
     }
     
+    /**
+     * Clear the selection (e.g. when filters are reset)
+     * @param {boolean} notify - Dispatch a change event on the select
+     */
+    clear(notify = false) {
+        this.select.value = '';
+        this.input.value = '';
+        this.input.removeAttribute('data-value');
+        this.currentValue = '';
+        if (notify) {
+            this.select.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+    }
+    
     /**
      * Show dropdown
      */
@@ -244,6 +244,34 @@ function initEnhancedExcelImport() {
     resultContent.innerHTML = renderError(result);
   }
 
+  function sleep(ms) {
+    return new Promise((resolve) => window.setTimeout(resolve, ms));
+  }
+
+  // Poll a background import job, updating the bar from real progress
+  async function pollImportJob(statusUrl) {
+    let progress = 5;
+    for (;;) {
+      const response = await fetch(statusUrl, { headers: { Accept: 'application/json' } });
+      const job = await response.json();
+      if (!response.ok) {
+        return { success: false, error: job.error || 'Could not read import status' };
+      }
+
+      if (job.done) {
+        return job.progress && job.progress.result
+          ? job.progress.result
+          : { success: job.status === 'completed', error: 'Import finished without a result' };
+      }
+
+      // Sheet size is unknown while streaming; creep towards 90% as chunks land
+      const chunks = (job.progress && job.progress.chunks) || 0;
+      progress = Math.min(90, Math.max(progress, 10 + chunks * 10));
+      if (progressFill) progressFill.style.width = `${progress}%`;
+      await sleep(1000);
+    }
+  }
+
   // Form submission with AJAX
   form.addEventListener('submit', async (e) => {
     e.preventDefault();
@@ -256,13 +284,8 @@ function initEnhancedExcelImport() {
     setHidden(progressContainer, false);
     setHidden(resultContainer, true);
 
-    // Simulate progress animation
-    let progress = 0;
-    const progressInterval = window.setInterval(() => {
-      progress += Math.random() * 15;
-      if (progress > 85) progress = 85;
-      if (progressFill) progressFill.style.width = `${progress}%`;
-    }, 500);
+    if (progressFill) progressFill.style.width = '0%';
+    formData.append('run_async', '1');
 
     try {
       const response = await fetch('/api/enhanced-excel-import/api/', {
@@ -270,17 +293,19 @@ function initEnhancedExcelImport() {
         body: formData,
       });
 
-      const result = await response.json();
+      let result = await response.json();
+
+      // Background job: poll until the worker finishes
+      if (response.status === 202 && result.status_url) {
+        result = await pollImportJob(result.status_url);
+      }
 
-      // Complete progress
-      window.clearInterval(progressInterval);
       if (progressFill) progressFill.style.width = '100%';
 
       window.setTimeout(() => {
         showResult(result);
       }, 500);
     } catch (error) {
-      window.clearInterval(progressInterval);
       const err = error instanceof Error ? error : new Error('Network error');
       showResult({
         success: false,
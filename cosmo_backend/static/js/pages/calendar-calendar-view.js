@@ -4,6 +4,9 @@
 
 let calendar;
 let currentFilters = {};
+let propertyFilterAutocomplete = null;
+// Classic script: the widget module is loaded relative to this file
+const propertyAutocompleteModule = new URL('../modules/property-autocomplete.js', document.currentScript.src).href;
 
 document.addEventListener('DOMContentLoaded', function() {
     initializeCalendar();
@@ -118,25 +121,19 @@ function loadCalendarEvents(start, end, successCallback, failureCallback) {
 }
 
 function loadFilterOptions() {
-    // Load properties
-    fetch('/api/calendar/properties/')
-        .then(response => response.json())
-        .then(data => {
-            const propertySelect = document.getElementById('propertyFilter');
-            if (!propertySelect) return;
-            
-            // Handle both array and paginated response formats
-            const properties = Array.isArray(data) ? data : (data.results || data);
-            if (properties && properties.forEach) {
-                properties.forEach(property => {
-                    const option = document.createElement('option');
-                    option.value = property.id;
-                    option.textContent = property.name;
-                    propertySelect.appendChild(option);
+    // Properties are searched on demand instead of loading the full list
+    const propertySelect = document.getElementById('propertyFilter');
+    if (propertySelect) {
+        import(propertyAutocompleteModule)
+            .then(({ PropertyAutocomplete }) => {
+                propertyFilterAutocomplete = new PropertyAutocomplete(propertySelect, {
+                    searchUrl: '/api/properties/search/',
+                    pageSize: 20,
+                    allowClear: true,
                 });
-            }
-        })
-        .catch(error => console.error('Error loading properties:', error));
+            })
+            .catch(error => console.error('Error loading property search:', error));
+    }
 
     // Load users
     fetch('/api/calendar/users/')
@@ -189,7 +186,11 @@ function clearFilters() {
     const includeTasks = document.getElementById('includeTasks');
     const includeBookings = document.getElementById('includeBookings');
 
-    if (propertyFilter) propertyFilter.value = '';
+    if (propertyFilterAutocomplete) {
+        propertyFilterAutocomplete.clear();
+    } else if (propertyFilter) {
+        propertyFilter.value = '';
+    }
     if (statusFilter) statusFilter.value = '';
     if (taskTypeFilter) taskTypeFilter.value = '';
     if (assignedToFilter) assignedToFilter.value = '';
@@ -126,9 +126,10 @@ class PhotoComparison {
 
         const statusClass = `status-${photo.photo_status}`;
         const uploadedDate = new Date(photo.uploaded_at).toLocaleDateString();
+        const cardSrc = (photo.renditions && photo.renditions.medium) || photo.image;
 
         card.innerHTML = `
-            <img src="${photo.image}" class="photo-image" alt="${photo.description || 'Photo'}">
+            <img src="${cardSrc}" class="photo-image" alt="${photo.description || 'Photo'}">
             <div class="photo-overlay">
                 <div class="photo-status ${statusClass}">${photo.photo_status}</div>
                 <div class="photo-actions">
@@ -1,6 +1,9 @@
+import { PropertyAutocomplete } from '../modules/property-autocomplete.js';
+
 let calendar;
 let currentFilters = {};
 let currentEvent = null;
+let propertyFilterAutocomplete = null;
 
 document.addEventListener('DOMContentLoaded', () => {
     wireActions();
@@ -174,29 +177,15 @@ function loadFilterOptions() {
         // Get CSRF token from meta tag
         const csrfToken = document.querySelector('meta[name="csrf-token"]').getAttribute('content');
         
-        // Load properties
-        fetch('/api/calendar/properties/', {
-            method: 'GET',
-            headers: {
-                'X-CSRFToken': csrfToken,
-                'Content-Type': 'application/json',
-            },
-            credentials: 'include'
-        })
-            .then(response => response.json())
-            .then(data => {
-                const propertySelect = document.getElementById('propertyFilter');
-                const properties = Array.isArray(data) ? data : (data.results || data);
-                if (properties && properties.forEach) {
-                    properties.forEach(property => {
-                        const option = document.createElement('option');
-                        option.value = property.id;
-                        option.textContent = property.name;
-                        propertySelect.appendChild(option);
-                    });
-                }
-            })
-            .catch(error => console.error('Error loading properties:', error));
+        // Properties are searched on demand instead of loading the full list
+        const propertySelect = document.getElementById('propertyFilter');
+        if (propertySelect) {
+            propertyFilterAutocomplete = new PropertyAutocomplete(propertySelect, {
+                searchUrl: '/api/properties/search/',
+                pageSize: 20,
+                allowClear: true,
+            });
+        }
 
         // Load users
         fetch('/api/calendar/users/', {
@@ -242,7 +231,11 @@ function applyFilters() {
 }
 
 function clearFilters() {
-        document.getElementById('propertyFilter').value = '';
+        if (propertyFilterAutocomplete) {
+            propertyFilterAutocomplete.clear();
+        } else {
+            document.getElementById('propertyFilter').value = '';
+        }
         document.getElementById('statusFilter').value = '';
         document.getElementById('assignedToFilter').value = '';
         document.getElementById('eventTypeFilter').value = '';
@@ -224,7 +224,8 @@ function renderGrid(items) {
     card.setAttribute('data-photo-id', p.id);
 
     if (p.image) {
-      img.src = p.image;
+      // Grid tiles use the thumbnail rendition; the modal shows the full image
+      img.src = (p.renditions && p.renditions.thumb) || p.image;
       img.alt = `Photo ${p.id}`;
       img.addEventListener('click', () => openPhotoModal(p.image, p));
     } else {
@@ -0,0 +1,126 @@
+"""
+Tests for content-addressed upload storage (api.blob_storage)
+"""
+
+import io
+import os
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.models import BookingImportLog, LostFoundItem, LostFoundPhoto, Property, StoredBlob, Task, TaskImage
+from api.services.file_cleanup_service import ImportFileCleanupService
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user('blob_user', 'blobs@example.com', 'pass')
+
+
+def _import_log(user, content, name='bookings.xlsx'):
+    log = BookingImportLog.objects.create(imported_by=user)
+    log.import_file.save(name, SimpleUploadedFile(name, content), save=True)
+    return log
+
+
+def test_identical_uploads_share_one_blob(user):
+    content = os.urandom(2048)
+
+    first = _import_log(user, content)
+    second = _import_log(user, content, name='bookings-retry.xlsx')
+
+    assert first.import_file.name == second.import_file.name
+    blob = StoredBlob.objects.get(name=first.import_file.name)
+    assert blob.ref_count == 2 and blob.size == 2048
+    assert blob.digest in blob.name and blob.name.endswith('.xlsx')
+
+
+def test_deleting_rows_releases_and_gc_removes_after_grace(user):
+    content = os.urandom(1024)
+    first, second = _import_log(user, content), _import_log(user, content)
+    name = first.import_file.name
+
+    first.delete()
+    assert StoredBlob.objects.get(name=name).ref_count == 1
+    second.import_file.delete(save=True)
+
+    blob = StoredBlob.objects.get(name=name)
+    assert blob.ref_count == 0 and blob.released_at is not None
+    assert first.import_file.storage.exists(name)
+
+    kept = ImportFileCleanupService.collect_unreferenced_blobs()
+    assert kept['blobs_deleted'] == 0
+
+    collected = ImportFileCleanupService.collect_unreferenced_blobs(grace_hours=0)
+    assert collected['blobs_deleted'] == 1 and collected['space_freed_bytes'] == 1024
+    assert not first.import_file.storage.exists(name)
+    assert not StoredBlob.objects.filter(name=name).exists()
+
+
+def test_released_blob_is_reused_and_gc_repairs_stale_counts(user):
+    content = os.urandom(512)
+    log = _import_log(user, content)
+    name = log.import_file.name
+    log.import_file.delete(save=True)
+
+    replay = _import_log(user, content)
+    assert replay.import_file.name == name
+    assert StoredBlob.objects.get(name=name).ref_count == 1
+
+    # A reference the storage layer never saw (queryset.update) keeps the blob alive
+    BookingImportLog.objects.filter(pk=log.pk).update(import_file=name)
+    StoredBlob.objects.filter(name=name).update(ref_count=0, released_at=timezone.now())
+    result = ImportFileCleanupService.collect_unreferenced_blobs(grace_hours=0)
+
+    assert result['blobs_restored'] == 1 and result['blobs_deleted'] == 0
+    assert StoredBlob.objects.get(name=name).ref_count == 2
+    assert replay.import_file.storage.exists(name)
+
+
+def test_untracked_legacy_files_are_left_alone_on_row_delete(user):
+    prop = Property.objects.create(name='Blob House')
+    item = LostFoundItem.objects.create(property_ref=prop, title='Keys', description='Set of keys',
+                                        found_location='Hallway', found_by=user)
+    storage = LostFoundPhoto._meta.get_field('image').storage
+    legacy = storage.wrapped.save('lost_found/legacy/keys.jpg', ContentFile(b'legacy bytes'))
+    photo = LostFoundPhoto.objects.create(item=item, image=legacy, uploaded_by=user)
+
+    photo.delete()
+
+    assert storage.exists(legacy)
+    storage.delete(legacy)
+    assert not storage.exists(legacy)
+
+
+@override_settings(TASK_IMAGE_PROCESSING_BACKEND='database')
+def test_replayed_photo_upload_is_stored_once(user):
+    user.is_superuser = user.is_staff = True
+    user.save()
+    client = APIClient()
+    client.force_authenticate(user)
+    task = Task.objects.create(title='Blob task', property_ref=Property.objects.create(name='Blob Loft'),
+                               created_by=user)
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (64, 48), os.urandom(64 * 48 * 3)).save(buffer, format='JPEG')
+
+    ids = [client.post(f'/api/tasks/{task.id}/images/create/',
+                       {'image': SimpleUploadedFile('phone.jpg', buffer.getvalue(), content_type='image/jpeg'),
+                        'task': task.id, 'photo_type': photo_type}, format='multipart').data['id']
+           for photo_type in ('before', 'after')]
+    staged = {image.image.name for image in TaskImage.objects.filter(pk__in=ids)}
+    assert len(staged) == 1 and StoredBlob.objects.get(name=staged.pop()).ref_count == 2
+
+    call_command('process_task_images', '--once', stdout=io.StringIO())
+
+    images = TaskImage.objects.filter(pk__in=ids)
+    assert {image.processing_status for image in images} == {'ready'}
+    assert StoredBlob.objects.filter(ref_count=0).count() == 1  # the staged original
+    final = {image.image.name for image in images}
+    assert len(final) == 1 and StoredBlob.objects.get(name=final.pop()).ref_count == 2
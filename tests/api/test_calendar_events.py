@@ -0,0 +1,122 @@
+"""
+Tests for the shared calendar event engine (api.calendar_events)
+"""
+
+from datetime import date, datetime
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import calendar_events
+from api.models import Booking, Profile, Property, Task
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'calendar-events-tests'}}
+
+
+def _at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@pytest.fixture
+def client(db):
+    client = APIClient()
+    client.force_authenticate(User.objects.create_superuser('cal_admin', 'cal@example.com', 'pass'))
+    return client
+
+
+def _portfolio(count):
+    owner = User.objects.create_user(f'cleaner_{count}', first_name='Casey', last_name='Clean', password='pass')
+    for i in range(count):
+        prop = Property.objects.create(name=f'Villa {count}-{i}', address=f'{i} Range Rd')
+        Task.objects.create(title=f'Turnover {i}', property_ref=prop, assigned_to=owner, created_by=owner,
+                            due_date=_at(2026, 3, 1 + i, 10))
+        Booking.objects.create(property=prop, guest_name=f'Guest {i}', status='confirmed',
+                               check_in_date=_at(2026, 3, 1 + i, 15), check_out_date=_at(2026, 3, 3 + i, 11))
+
+
+def _month(client, **params):
+    return client.get(reverse('calendar-events'), {'start_date': '2026-03-01', 'end_date': '2026-03-31', **params})
+
+
+def test_query_count_does_not_grow_with_events(client):
+    _portfolio(2)
+    with CaptureQueriesContext(connection) as small:
+        _month(client)
+    _portfolio(12)
+    with CaptureQueriesContext(connection) as large:
+        events = _month(client).json()
+
+    assert len(large.captured_queries) == len(small.captured_queries)
+    assert len([e for e in events if e['type'] == 'task']) == 14
+    task = next(e for e in events if e['title'] == 'Turnover 0' and e['property'] == 'Villa 2-0')
+    assert task['assigned_to'] == 'Casey Clean'
+    assert task['url'] == reverse('portal-task-detail', args=[int(task['id'].split('_')[1])])
+
+
+@pytest.mark.django_db
+def test_range_bounds_follow_local_days():
+    prop = Property.objects.create(name='Edge', address='1 Midnight Ln')
+    inside = Task.objects.create(title='Late', property_ref=prop, due_date=_at(2026, 3, 31, 23, 30))
+    Task.objects.create(title='Next month', property_ref=prop, due_date=_at(2026, 4, 1, 0, 0))
+    spanning = Booking.objects.create(property=prop, guest_name='Span', status='booked',
+                                      check_in_date=_at(2026, 3, 30, 15), check_out_date=_at(2026, 4, 2, 11))
+
+    tasks = calendar_events.task_rows(date(2026, 3, 1), date(2026, 3, 31))
+    bookings = calendar_events.booking_rows(date(2026, 3, 15), date(2026, 4, 15))
+
+    assert [row['id'] for row in tasks] == [inside.pk]
+    assert [row['id'] for row in bookings] == [spanning.pk]      # once, though cached in two months
+
+
+@override_settings(CACHES=LOCMEM)
+def test_month_rows_are_cached_until_a_write(client):
+    from django.core.cache import cache
+    cache.clear()
+    _portfolio(3)
+    _month(client)
+
+    with CaptureQueriesContext(connection) as ctx:
+        _month(client, status='confirmed')
+    assert not [q for q in ctx.captured_queries if '"api_task"' in q['sql'] or '"api_booking"' in q['sql']]
+
+    task = Task.objects.get(title='Turnover 0')
+    task.title = 'Renamed'
+    task.save()
+    assert 'Renamed' in [e['title'] for e in _month(client).json()]
+
+
+@override_settings(CACHES=LOCMEM)
+def test_month_keys_depend_only_on_the_shared_version():
+    from django.core.cache import cache
+    cache.clear()
+    before = calendar_events._month_key(calendar_events._get_version(), 'tasks', 'all', date(2026, 3, 1))
+
+    calendar_events.invalidate_all()
+    after = calendar_events._month_key(calendar_events._get_version(), 'tasks', 'all', date(2026, 3, 1))
+
+    # Another worker reading the same version must land on the same key
+    assert after != before
+    assert after == calendar_events._month_key(cache.get(calendar_events.VERSION_KEY), 'tasks', 'all',
+                                               date(2026, 3, 1))
+
+
+@pytest.mark.django_db
+def test_restricted_users_get_their_own_scope():
+    staff = User.objects.create_user('plain_staff', password='pass')
+    prop = Property.objects.create(name='Scoped', address='2 Scope St')
+    mine = Task.objects.create(title='Mine', property_ref=prop, assigned_to=staff, due_date=_at(2026, 3, 5, 9))
+    Task.objects.create(title='Not mine', property_ref=prop, due_date=_at(2026, 3, 5, 9))
+
+    with mock.patch.object(Profile, 'has_permission', return_value=False):
+        scope = calendar_events.task_scope(staff)
+    rows = calendar_events.task_rows(date(2026, 3, 1), date(2026, 3, 31), scope)
+
+    assert scope == staff.pk
+    assert [row['id'] for row in rows] == [mine.pk]
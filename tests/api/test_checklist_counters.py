@@ -0,0 +1,106 @@
+"""
+Tests for the denormalized TaskChecklist progress counters
+"""
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import ChecklistItem, ChecklistResponse, ChecklistTemplate, Property, Task, TaskChecklist
+
+
+@pytest.fixture
+def manager(db):
+    return User.objects.create_superuser('counter_admin', 'counter@example.com', 'pass')
+
+
+@pytest.fixture
+def template(manager):
+    template = ChecklistTemplate.objects.create(name='Turnover', created_by=manager)
+    for i, required in enumerate([True, True, False]):
+        ChecklistItem.objects.create(template=template, title=f'Step {i}', is_required=required, order=i)
+    return template
+
+
+def _checklist(manager, template, title='Clean'):
+    prop = Property.objects.create(name=f'{title} House', address='7 Count Ct')
+    task = Task.objects.create(title=title, property_ref=prop, created_by=manager)
+    checklist = TaskChecklist.objects.create(task=task, template=template)
+    for item in template.items.all():
+        ChecklistResponse.objects.create(checklist=checklist, item=item)
+    return checklist
+
+
+def _counters(checklist):
+    checklist.refresh_from_db()
+    return tuple(getattr(checklist, name) for name in TaskChecklist.COUNTER_FIELDS)
+
+
+def test_counters_follow_response_writes(manager, template):
+    checklist = _checklist(manager, template)
+    assert _counters(checklist) == (3, 0, 2, 0)
+    assert checklist.completion_percentage == 0 and not checklist.is_completed
+
+    first, second, optional = checklist.responses.order_by('item__order')
+    first.is_completed = True
+    first.save()
+    optional.is_completed = True
+    optional.save()
+    assert _counters(checklist) == (3, 2, 2, 1)
+    assert checklist.completion_percentage == 50
+
+    second.is_completed = True
+    second.save()
+    assert checklist.is_completed and checklist.remaining_items == 0
+
+    optional.delete()
+    assert _counters(checklist) == (2, 2, 2, 2)
+
+
+def test_notes_only_save_skips_the_counter_update(manager, template):
+    response = ChecklistResponse.objects.filter(checklist=_checklist(manager, template)).first()
+    response.notes = 'dusty'
+
+    with CaptureQueriesContext(connection) as ctx:
+        response.save()
+
+    assert not [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_taskchecklist"')]
+
+
+def test_required_flag_change_updates_checklists(manager, template):
+    checklist = _checklist(manager, template)
+    optional = template.items.get(is_required=False)
+    optional.is_required = True
+    optional.save()
+
+    assert _counters(checklist)[2] == 3
+
+
+def test_task_list_progress_runs_no_checklist_queries(manager, template):
+    client = APIClient()
+    client.force_authenticate(manager)
+    for i in range(6):
+        _checklist(manager, template, f'More {i}')
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(reverse('task-list'))
+
+    checklist_queries = [q for q in ctx.captured_queries
+                         if 'api_checklistresponse' in q['sql'] or q['sql'].startswith('SELECT "api_taskchecklist"')]
+    assert checklist_queries == []
+    progress = response.json()['results'][0]['checklist_progress']
+    assert progress == {'percentage': 0, 'completed': 0, 'total': 3, 'is_completed': False}
+
+
+def test_repair_command_fixes_drift(manager, template):
+    checklist = _checklist(manager, template)
+    ChecklistResponse.objects.filter(checklist=checklist).update(is_completed=True)   # bypasses save()
+    TaskChecklist.objects.filter(pk=checklist.pk).update(items_total=99)
+
+    call_command('repair_checklist_counters', stdout=open('/dev/null', 'w'))
+
+    assert _counters(checklist) == (3, 3, 2, 2)
@@ -0,0 +1,126 @@
+"""
+Tests for bulk checklist instantiation (api.checklist_materializer)
+"""
+
+import io
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api import checklist_materializer
+from api.models import (
+    ChecklistItem, ChecklistResponse, ChecklistTemplate, Property, ScheduleTemplate, Task, TaskChecklist,
+)
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'checklist-materializer-tests'}}
+
+
+@pytest.fixture
+def manager(db):
+    return User.objects.create_superuser('materialize_admin', 'materialize@example.com', 'pass')
+
+
+@pytest.fixture
+def template(manager):
+    template = ChecklistTemplate.objects.create(name='Turnover', task_type='cleaning', created_by=manager)
+    for i, required in enumerate([True, True, False]):
+        ChecklistItem.objects.create(template=template, title=f'Step {i}', is_required=required, order=i)
+    return template
+
+
+def _tasks(manager, count, task_type='cleaning'):
+    prop = Property.objects.create(name=f'Bulk House {count}', address='9 Batch Rd')
+    return [Task.objects.create(title=f'Clean {i}', task_type=task_type, property_ref=prop, created_by=manager)
+            for i in range(count)]
+
+
+def _materialize_queries(pairs):
+    with CaptureQueriesContext(connection) as ctx:
+        checklist_materializer.materialize(pairs)
+    return len(ctx.captured_queries)
+
+
+def test_materialize_query_count_does_not_grow_with_tasks(manager, template):
+    few = _materialize_queries([(task, template) for task in _tasks(manager, 2)])
+    many = _materialize_queries([(task, template) for task in _tasks(manager, 20)])
+
+    assert many == few
+    assert ChecklistResponse.objects.count() == 22 * 3
+
+
+def test_materialize_prefills_counters_and_skips_existing(manager, template):
+    done, fresh = _tasks(manager, 2)
+    TaskChecklist.objects.create(task=done, template=template)
+
+    created = checklist_materializer.materialize([(done, template), (fresh, template), (fresh, None)])
+
+    assert list(created) == [fresh.pk]
+    checklist = TaskChecklist.objects.get(task=fresh)
+    assert (checklist.items_total, checklist.items_completed,
+            checklist.required_total, checklist.required_completed) == (3, 0, 2, 0)
+    assert not done.checklist.responses.exists()
+
+
+def test_refresh_counters_locks_checklists_before_recounting(manager, template):
+    tasks = _tasks(manager, 2)
+    checklist_materializer.materialize([(task, template) for task in tasks])
+    checklists = TaskChecklist.objects.filter(task__in=tasks)
+    ChecklistResponse.objects.filter(checklist__in=checklists).update(is_completed=True)   # bypasses save()
+
+    ids = list(checklists.values_list('pk', flat=True))
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert TaskChecklist.refresh_counters(ids) == 2
+
+    sql = [q['sql'] for q in ctx.captured_queries if 'api_taskchecklist' in q['sql']]
+    assert sql[0].startswith('SELECT') and sql[1].startswith('UPDATE')
+    if connection.features.has_select_for_update:
+        assert 'FOR UPDATE' in sql[0]
+    assert {c.items_completed for c in checklists} == {3}
+
+
+@override_settings(CACHES=LOCMEM)
+def test_item_cache_is_dropped_when_template_changes(manager, template):
+    checklist_materializer.template_items([template.pk])
+    ChecklistItem.objects.create(template=template, title='Restock', order=9)
+    (task,) = _tasks(manager, 1)
+
+    checklist_materializer.materialize([(task, template)])
+
+    assert task.checklist.responses.count() == 4
+
+
+def test_assign_command_force_fills_missing_responses(manager, template):
+    existing, fresh = _tasks(manager, 2)
+    checklist = TaskChecklist.objects.create(task=existing, template=template)
+    ChecklistResponse.objects.create(checklist=checklist, item=template.items.first())
+
+    call_command('assign_checklists', '--force', stdout=io.StringIO())
+
+    checklist.refresh_from_db()
+    assert checklist.responses.count() == 3
+    assert checklist.items_total == 3
+    assert fresh.checklist.responses.count() == 3
+
+
+def test_generated_schedule_tasks_get_checklists(manager, template):
+    prop = Property.objects.create(name='Schedule House', address='3 Cron Ct')
+    for i in range(3):
+        ScheduleTemplate.objects.create(
+            name=f'Daily {i}', task_type='cleaning', property_ref=prop, task_title_template='Clean {date}',
+            frequency='daily', start_date=date.today() - timedelta(days=1), advance_days=0,
+            checklist_template=template, created_by=manager,
+        )
+
+    call_command('generate_scheduled_tasks', stdout=io.StringIO())
+
+    checklists = TaskChecklist.objects.filter(task__property_ref=prop)
+    assert checklists.count() == 3
+    assert {c.items_total for c in checklists} == {3}
+    assert ChecklistResponse.objects.filter(checklist__in=checklists).count() == 9
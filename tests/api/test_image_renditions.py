@@ -0,0 +1,121 @@
+"""
+Tests for thumbnail/medium renditions (api.image_renditions)
+"""
+
+import io
+import os
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api import image_renditions
+from api.models import (
+    ChecklistItem, ChecklistPhoto, ChecklistResponse, ChecklistTemplate, Profile, Property, Task, TaskChecklist,
+    TaskImage,
+)
+
+
+@pytest.fixture
+def owner(db):
+    user = User.objects.create_superuser('rendition_admin', 'renditions@example.com', 'pass')
+    client = APIClient()
+    client.force_authenticate(user)
+    task = Task.objects.create(title='Rendition task', property_ref=Property.objects.create(name='Rendition House'),
+                               created_by=user)
+    return user, client, task
+
+
+def _photo(name='photo.jpg', size=(1600, 1200)):
+    # Random pixels so every test starts without renditions in the shared test media dir
+    img = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=60)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def _rendition_size(digest, size):
+    with default_storage.open(image_renditions.rendition_name(digest, size)) as fh:
+        return Image.open(fh).size
+
+
+def test_upload_exposes_stored_renditions(owner):
+    user, client, task = owner
+
+    response = client.post(f'/api/tasks/{task.id}/images/create/', {'image': _photo(), 'task': task.id},
+                           format='multipart')
+
+    assert response.status_code == 201, response.data
+    image = TaskImage.objects.get(pk=response.data['id'])
+    assert image.content_digest
+    assert response.data['renditions']['thumb'].endswith(image_renditions.rendition_name(image.content_digest, 'thumb'))
+    assert max(_rendition_size(image.content_digest, 'thumb')) == 320
+    assert max(_rendition_size(image.content_digest, 'medium')) == 1024
+
+
+def test_identical_content_shares_renditions(owner, monkeypatch):
+    user, client, task = owner
+    photo = _photo()
+    first = TaskImage.objects.create(task=task, image=photo)
+    photo.seek(0)
+    second = TaskImage.objects.create(task=task, image=photo, photo_type='after')
+    renders = []
+    render = image_renditions.render_renditions
+    monkeypatch.setattr(image_renditions, 'render_renditions',
+                        lambda data, sizes, **kw: renders.append(sizes) or render(data, sizes, **kw))
+
+    assert image_renditions.ensure(first) == image_renditions.ensure(second)
+    assert len(renders) == 1
+
+
+def test_legacy_checklist_photo_renders_on_first_request(owner):
+    user, client, task = owner
+    template = ChecklistTemplate.objects.create(name='Rendition checklist', created_by=user)
+    item = ChecklistItem.objects.create(template=template, title='Snap', item_type='photo_required')
+    response = ChecklistResponse.objects.create(checklist=TaskChecklist.objects.create(task=task, template=template),
+                                                item=item)
+    photo = ChecklistPhoto.objects.create(response=response, image=_photo(), uploaded_by=user)
+    lazy = image_renditions.url(photo, 'thumb')
+
+    redirect = client.get(lazy)
+
+    photo.refresh_from_db()
+    assert redirect.status_code == 302
+    assert redirect['Location'].endswith(image_renditions.rendition_name(photo.content_digest, 'thumb'))
+    assert image_renditions.url(photo, 'thumb') != lazy
+
+
+def test_view_only_user_can_load_thumbnails(owner):
+    user, client, task = owner
+    image = TaskImage.objects.create(task=task, image=_photo())
+    viewer = User.objects.create_user('rendition_viewer', password='pass')
+    viewer.profile.role = 'viewer'
+    viewer.profile.save()
+    outsider = User.objects.create_user('rendition_outsider', password='pass')
+    viewer_client, outsider_client = APIClient(), APIClient()
+    viewer_client.force_authenticate(viewer)
+    outsider_client.force_authenticate(outsider)
+    thumb = f'/api/renditions/task-image/{image.pk}/thumb/'
+
+    assert viewer_client.get(thumb).status_code == 302
+    with mock.patch.object(Profile, 'has_permission', return_value=False):
+        assert outsider_client.get(thumb).status_code == 403
+
+
+def test_backfill_command_fills_legacy_task_images(owner):
+    user, client, task = owner
+    legacy = TaskImage.objects.create(task=task, image=_photo())
+    pending = TaskImage.objects.create(task=task, image=_photo(), photo_type='after',
+                                       processing_status=TaskImage.PROCESSING_PENDING)
+
+    call_command('backfill_image_renditions', '--kind', 'task-image', stdout=io.StringIO())
+
+    legacy.refresh_from_db()
+    pending.refresh_from_db()
+    assert legacy.content_digest and not pending.content_digest
+    assert default_storage.exists(image_renditions.rendition_name(legacy.content_digest, 'medium'))
@@ -0,0 +1,127 @@
+"""
+Tests for the background log queue, the JSON formatter and request log sampling
+"""
+
+import json
+import logging
+import queue
+import sys
+import threading
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from backend import log_queue
+from backend.formatters import JSONFormatter
+from backend.middleware import RequestLoggingMiddleware
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.append(threading.current_thread())
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def test_queued_records_are_written_by_the_writer_thread():
+    target = ListHandler()
+    target.setFormatter(JSONFormatter())
+    logger = _logger('tests.log_queue.writer', log_queue.QueuedHandler(target))
+    request = RequestFactory().get('/api/tasks/', HTTP_USER_AGENT='pytest', REMOTE_ADDR='10.0.0.1')
+    items = ['a']
+
+    logger.info("Loaded %s", items, extra={'request': request, 'task_count': 3})
+    items.append('b')  # later changes must not leak into the queued message
+    log_queue._queue.join()
+
+    (record,) = target.records
+    assert target.threads[0] is not threading.current_thread()
+    assert record.getMessage() == "Loaded ['a']"
+    data = json.loads(target.format(record))
+    assert data['request']['path'] == '/api/tasks/' and data['request']['remote_addr'] == '10.0.0.1'
+    assert data['extra'] == {'task_count': 3}
+
+
+def test_full_queue_drops_and_counts_instead_of_blocking(monkeypatch):
+    monkeypatch.setattr(log_queue, '_queue', queue.Queue(maxsize=2))
+    monkeypatch.setattr(log_queue, '_ensure_writer', lambda: None)
+    monkeypatch.setattr(log_queue, '_dropped', {})
+    logger = _logger('tests.log_queue.full', log_queue.QueuedHandler(ListHandler()))
+
+    for i in range(5):
+        logger.warning("burst %d", i)
+
+    stats = log_queue.queue_stats()
+    assert stats['queued'] == 2 and stats['capacity'] == 2
+    assert stats['dropped'] == {'WARNING': 3}
+
+
+def test_json_formatter_uses_record_time_and_formats_tracebacks_once():
+    formatter = JSONFormatter()
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = logging.getLogger('tests').makeRecord(
+            'tests', logging.ERROR, __file__, 1, 'failed', None, sys.exc_info(), extra={'job_id': 7}
+        )
+    record.created = 0
+
+    data = json.loads(formatter.format(record))
+
+    assert data['timestamp'] == '1969-12-31T19:00:00-05:00'
+    assert data['exception']['type'] == 'ValueError' and 'boom' in data['exception']['traceback'][-1]
+    assert record.exc_text and data['extra'] == {'job_id': 7}
+
+
+def test_queued_handlers_share_one_formatted_traceback(monkeypatch):
+    calls = []
+    format_exception = log_queue._exc_formatter.formatException
+    monkeypatch.setattr(log_queue._exc_formatter, 'formatException',
+                        lambda exc_info: calls.append(exc_info) or format_exception(exc_info))
+    targets = [ListHandler(), ListHandler()]
+    for target in targets:
+        target.setFormatter(JSONFormatter())
+    logger = logging.getLogger('tests.log_queue.traceback')
+    logger.handlers = [log_queue.QueuedHandler(target) for target in targets]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    try:
+        raise ValueError('shared')
+    except ValueError:
+        logger.exception("failed")
+    log_queue._queue.join()
+
+    tracebacks = [json.loads(t.format(t.records[0]))['exception']['traceback'] for t in targets]
+    assert len(calls) == 1
+    assert tracebacks[0] == tracebacks[1] and 'shared' in tracebacks[0][-1]
+
+
+@pytest.mark.parametrize('threshold, status, expected', [(60_000, 200, 0), (-1, 200, 1), (60_000, 404, 1),
+                                                          (60_000, 500, 1)])
+def test_request_logs_are_sampled_but_slow_and_failed_requests_kept(threshold, status, expected, monkeypatch,
+                                                                     caplog):
+    caplog.set_level(logging.INFO, logger='api.performance')
+    handler = ListHandler()
+    monkeypatch.setattr(logging.getLogger('api.performance'), 'handlers', [handler])
+    middleware = RequestLoggingMiddleware(lambda request: HttpResponse('ok'))
+    request = RequestFactory().get('/api/tasks/')
+
+    with override_settings(REQUEST_LOG_SAMPLE_RATE=0.0, SLOW_REQUEST_THRESHOLD=threshold):
+        middleware.process_request(request)
+        middleware.process_response(request, HttpResponse('ok', status=status))
+
+    assert len(handler.records) == expected
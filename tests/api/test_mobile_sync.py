@@ -0,0 +1,142 @@
+"""
+Tests for the mobile delta sync (api.mobile_sync)
+"""
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import mobile_sync
+from api.models import (
+    ChecklistItem, ChecklistResponse, ChecklistTemplate, Notification, Property, Task, TaskChecklist, TaskHistory,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_settle_window(monkeypatch):
+    monkeypatch.setattr(mobile_sync, 'SYNC_SETTLE_SECONDS', 0)
+
+
+@pytest.fixture
+def people(db):
+    return (
+        User.objects.create_superuser('sync_manager', 'sync@example.com', 'pass'),
+        User.objects.create_user('sync_cleaner', password='pass'),
+    )
+
+
+@pytest.fixture
+def cleaner_client(people):
+    client = APIClient()
+    client.force_authenticate(people[1])
+    return client
+
+
+@pytest.fixture
+def task(people):
+    manager, cleaner = people
+    prop = Property.objects.create(name='Sync Cottage', address='4 Delta Way')
+    task = Task.objects.create(title='Turnover', property_ref=prop, created_by=manager, assigned_to=cleaner)
+    template = ChecklistTemplate.objects.create(name='Sync turnover', created_by=manager)
+    checklist = TaskChecklist.objects.create(task=task, template=template)
+    for i in range(2):
+        item = ChecklistItem.objects.create(template=template, title=f'Step {i}', order=i)
+        ChecklistResponse.objects.create(checklist=checklist, item=item)
+    return task
+
+
+def _pull(client, cursor=None):
+    response = client.get(reverse('mobile-sync-changes'), {'cursor': cursor} if cursor else {})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_delta_returns_only_changes_since_cursor(people, cleaner_client, task):
+    manager, cleaner = people
+    other = Task.objects.create(title='Someone else', property_ref=task.property_ref, assigned_to=manager)
+
+    snapshot = _pull(cleaner_client)
+    assert snapshot['reset'] is True
+    assert [row['id'] for row in snapshot['changes']['tasks']['upserted']] == [task.pk]
+    assert len(snapshot['changes']['checklist_responses']['upserted']) == 2
+
+    assert all(not entity['upserted'] for entity in _pull(cleaner_client, snapshot['cursor'])['changes'].values())
+
+    task.title = 'Turnover (deep clean)'
+    task.save()
+    other.title = 'Not for the cleaner'
+    other.save()
+    delta = _pull(cleaner_client, snapshot['cursor'])
+
+    assert delta['reset'] is False
+    assert [row['title'] for row in delta['changes']['tasks']['upserted']] == ['Turnover (deep clean)']
+    assert delta['changes']['checklist_responses']['upserted'] == []
+
+    task.assigned_to = manager
+    task.save()
+    assert _pull(cleaner_client, delta['cursor'])['changes']['tasks'] == {'upserted': [], 'removed': [task.pk]}
+
+
+def test_push_applies_batch_once_with_per_item_results(people, cleaner_client, task):
+    manager, cleaner = people
+    response_ids = list(ChecklistResponse.objects.filter(checklist__task=task).values_list('pk', flat=True))
+    payload = {'changes': [
+        {'client_id': 'c-1', 'entity': 'checklist_response', 'id': response_ids[0],
+         'fields': {'is_completed': True, 'notes': 'Done'}},
+        {'client_id': 'c-2', 'entity': 'task', 'id': task.pk, 'fields': {'status': 'completed'}},
+        {'client_id': 'c-3', 'entity': 'task', 'id': task.pk, 'fields': {'status': 'bogus'}},
+    ]}
+
+    first = cleaner_client.post(reverse('mobile-sync-push'), payload, format='json').json()
+    replay = cleaner_client.post(reverse('mobile-sync-push'), payload, format='json').json()
+
+    assert [r['status'] for r in first['results']] == ['applied', 'applied', 'error']
+    assert [r.get('duplicate') for r in replay['results']] == [True, True, True]
+    task.refresh_from_db()
+    assert task.status == 'completed'
+    assert TaskHistory.objects.filter(task=task, field='status').count() == 1
+    assert task.checklist.items_completed == 1
+    assert Notification.objects.filter(recipient=manager, task=task).count() == 1
+
+
+def test_push_reports_conflicts_after_base_cursor(people, cleaner_client, task):
+    manager, cleaner = people
+    cursor = _pull(cleaner_client)['cursor']
+
+    task.status = 'canceled'
+    task.modified_by = manager
+    task.save()
+    result = cleaner_client.post(reverse('mobile-sync-push'), {
+        'cursor': cursor,
+        'changes': [{'entity': 'task', 'id': task.pk, 'fields': {'status': 'completed'}}],
+    }, format='json').json()['results'][0]
+
+    assert result['status'] == 'conflict'
+    assert result['current']['status'] == 'canceled'
+    task.refresh_from_db()
+    assert task.status == 'canceled'
+
+
+def test_offline_sync_splits_large_queues_and_counts_unchanged(monkeypatch, cleaner_client, task):
+    monkeypatch.setattr(mobile_sync, 'SYNC_MAX_BATCH', 2)
+    item_ids = list(ChecklistResponse.objects.filter(checklist__task=task).values_list('item_id', flat=True))
+
+    response = cleaner_client.post(reverse('mobile-offline-sync'), {
+        'completed_task_ids': [task.pk],
+        'task_status_updates': [{'id': task.pk, 'status': 'completed'}],   # already applied above
+        'checklist_updates': [{'task_id': task.pk, 'item_id': item_id, 'completed': True} for item_id in item_ids],
+    }, format='json')
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['applied'] == {'completed_tasks': 1, 'status_updates': 0, 'checklist_updates': 2}
+    assert body['unchanged'] == {'completed_tasks': 0, 'status_updates': 1, 'checklist_updates': 0}
+    task.refresh_from_db()
+    assert task.status == 'completed' and task.checklist.items_completed == 2
+
+
+def test_invalid_cursor_is_rejected(cleaner_client):
+    response = cleaner_client.get(reverse('mobile-sync-changes'), {'cursor': 'garbage'})
+
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+"""
+Tests for batched notification fan-out (NotificationService.fan_out)
+"""
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Notification, NotificationVerb, Property, Task
+from api.services.notification_service import NotificationService
+
+
+@pytest.fixture
+def people(db):
+    return (
+        User.objects.create_superuser('fanout_manager', 'fanout@example.com', 'pass'),
+        User.objects.create_user('fanout_cleaner', password='pass'),
+    )
+
+
+@pytest.fixture
+def prop(db):
+    return Property.objects.create(name='Fanout Flat', address='5 Batch St')
+
+
+def _tasks(prop, manager, cleaner, count):
+    return [
+        Task.objects.create(title=f'Task {i}', property_ref=prop, created_by=manager, assigned_to=cleaner)
+        for i in range(count)
+    ]
+
+
+def test_fan_out_query_count_is_constant(people, prop):
+    manager, cleaner = people
+    small = _tasks(prop, manager, cleaner, 2)
+    large = _tasks(prop, manager, cleaner, 20)
+
+    with CaptureQueriesContext(connection) as few:
+        NotificationService.notify_status_changed(small)
+    with CaptureQueriesContext(connection) as many:
+        NotificationService.notify_status_changed(large)
+
+    assert len(many.captured_queries) == len(few.captured_queries) == 4   # mutes, de-dupe, insert, sync log
+    assert Notification.objects.filter(verb=NotificationVerb.STATUS_CHANGED).count() == 44
+
+
+def test_fan_out_skips_actor_muted_and_unread_duplicates(people, prop):
+    manager, cleaner = people
+    first, second = _tasks(prop, manager, cleaner, 2)
+    second.muted_by.add(manager)
+    NotificationService.fan_out([(first, [NotificationVerb.TITLE_CHANGED])], actor=manager)
+
+    created = NotificationService.fan_out([
+        (first, [NotificationVerb.TITLE_CHANGED, NotificationVerb.STATUS_CHANGED]),
+        (second, [NotificationVerb.STATUS_CHANGED]),
+    ])
+
+    assert sorted((n.recipient_id, n.task_id, n.verb) for n in created) == sorted([
+        (manager.pk, first.pk, NotificationVerb.TITLE_CHANGED),
+        (manager.pk, first.pk, NotificationVerb.STATUS_CHANGED),
+        (cleaner.pk, first.pk, NotificationVerb.STATUS_CHANGED),
+        (cleaner.pk, second.pk, NotificationVerb.STATUS_CHANGED),
+    ])
+    assert Notification.objects.filter(recipient=cleaner, verb=NotificationVerb.TITLE_CHANGED).count() == 1
+
+
+def test_offline_sync_notifies_creators_once(people, prop):
+    manager, cleaner = people
+    tasks = _tasks(prop, manager, cleaner, 3)
+    client = APIClient()
+    client.force_authenticate(cleaner)
+
+    response = client.post(reverse('mobile-offline-sync'), {
+        'completed_task_ids': [tasks[0].pk],
+        'task_status_updates': [{'id': tasks[1].pk, 'status': 'in-progress'},
+                                {'id': tasks[2].pk, 'status': 'pending'}],   # unchanged
+    }, format='json')
+
+    assert response.status_code == 200
+    notified = set(Notification.objects.filter(recipient=manager).values_list('task_id', flat=True))
+    assert notified == {tasks[0].pk, tasks[1].pk}
+    assert not Notification.objects.filter(recipient=cleaner).exists()
+
+
+def test_task_update_notifies_from_instance_snapshot(people, prop):
+    manager, cleaner = people
+    task = _tasks(prop, manager, cleaner, 1)[0]
+    client = APIClient()
+    client.force_authenticate(manager)
+
+    response = client.patch(reverse('task-detail', args=[task.pk]), {'title': 'Renamed'}, format='json')
+
+    assert response.status_code == 200
+    assert list(Notification.objects.values_list('recipient_id', 'verb')) == [
+        (cleaner.pk, NotificationVerb.TITLE_CHANGED),
+    ]
@@ -305,3 +305,98 @@ class TestPropertySearchPerformance:
         
         assert response.status_code == 200
         assert duration < 0.5  # Fast search
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'property-autocomplete-tests'}}
+
+
+@pytest.mark.django_db
+class TestPropertyAutocompleteEngine:
+    """Ranking, keyset cursors and cache invalidation of api.property_autocomplete."""
+
+    @pytest.mark.parametrize('backend', ['memory', 'trigram'])
+    def test_prefix_matches_rank_first(self, backend):
+        from api import property_autocomplete
+
+        Property.objects.create(name='Charbor Lofts', address='9 Elm St')
+        Property.objects.create(name='Seaside Villa', address='12 Harbor Rd')
+        Property.objects.create(name='Old Harbor Inn', address='3 Main St')
+        Property.objects.create(name='Harbor View', address='1 Bay St')
+        Property.objects.create(name='Mountain Cabin', address='7 Peak Rd')
+
+        page = property_autocomplete.search('harbor', backend=backend)
+
+        assert [r['name'] for r in page['results']] == [
+            'Harbor View', 'Old Harbor Inn', 'Seaside Villa', 'Charbor Lofts',
+        ]
+        assert page['has_more'] is False and page['next_cursor'] is None
+
+    @pytest.mark.parametrize('backend', ['memory', 'trigram'])
+    def test_cursor_walks_every_match_once(self, client, staff_user, sample_properties,
+                                           monkeypatch, backend):
+        from api import property_autocomplete
+        monkeypatch.setattr(property_autocomplete, 'PROPERTY_AUTOCOMPLETE_BACKEND', backend)
+        client.force_login(staff_user)
+        url = reverse('property-search')
+
+        seen, params = [], {'q': 'property', 'page_size': 7}
+        while True:
+            data = client.get(url, params).json()
+            seen.extend(r['name'] for r in data['results'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+
+        assert seen == sorted(p.name for p in sample_properties)
+        assert data['has_more'] is False
+
+    def test_invalid_cursor_is_rejected(self, client, staff_user):
+        client.force_login(staff_user)
+
+        response = client.get(reverse('property-search'), {'cursor': 'not-a-cursor'})
+
+        assert response.status_code == 400
+
+    def test_hot_prefix_is_cached_until_a_property_changes(self, django_assert_num_queries):
+        from django.core.cache import cache
+        from django.test.utils import override_settings
+        from api import property_autocomplete
+
+        with override_settings(CACHES=LOCMEM):
+            cache.clear()
+            Property.objects.create(name='Harbor View', address='1 Bay St')
+            first = property_autocomplete.search('ha', backend='trigram')
+            with django_assert_num_queries(0):
+                assert property_autocomplete.search('ha', backend='trigram') == first
+
+            Property.objects.create(name='Hat Factory', address='2 Mill Ln')
+            second = property_autocomplete.search('ha', backend='trigram')
+
+        assert [r['name'] for r in first['results']] == ['Harbor View']
+        assert [r['name'] for r in second['results']] == ['Harbor View', 'Hat Factory']
+
+    def test_cached_pages_are_shared_across_worker_generations(self, monkeypatch, django_assert_num_queries):
+        from django.core.cache import cache
+        from django.test.utils import override_settings
+        from api import property_autocomplete
+
+        with override_settings(CACHES=LOCMEM):
+            cache.clear()
+            Property.objects.create(name='Harbor View', address='1 Bay St')
+            first = property_autocomplete.search('ha', backend='trigram')
+            # Another worker has its own process-local generation but sees the same shared version
+            monkeypatch.setattr(property_autocomplete, '_local_generation',
+                                property_autocomplete._local_generation + 5)
+            with django_assert_num_queries(0):
+                assert property_autocomplete.search('ha', backend='trigram') == first
+
+    def test_task_form_renders_only_the_selected_property(self, staff_user, sample_properties):
+        from api.staff_views import TaskForm
+
+        chosen = sample_properties[12]
+        html = str(TaskForm(initial={'property_ref': chosen.pk}, user=staff_user)['property_ref'])
+
+        assert chosen.name in html
+        assert sample_properties[0].name not in html
+        assert 'data-property-autocomplete' in html
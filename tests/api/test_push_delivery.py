@@ -0,0 +1,165 @@
+"""
+Tests for the FCM push delivery pipeline (api.services.push_delivery),
+run against a local stub FCM endpoint
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+
+from api.models import Device, Notification, NotificationVerb, Property, Task
+from api.services.push_delivery import PushDeliveryPipeline, build_messages
+
+
+class StubFCM:
+    """Tiny FCM v1 stand-in; ``responses`` maps token -> list of (status, body, headers)"""
+
+    def __init__(self):
+        self.requests = []
+        self.clients = set()
+        self.responses = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                message = payload['message']
+                stub.requests.append(message)
+                stub.clients.add(self.client_address)
+                queue = stub.responses.get(message['token'])
+                status, body, headers = queue.pop(0) if queue else (200, {'name': 'ok'}, {})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/v1/projects/test/messages:send'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubFCM()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def pipeline(stub):
+    sleeps = []
+    instance = PushDeliveryPipeline(endpoint=stub.url, token_provider=lambda: 'test-token',
+                                    max_workers=4, linger=0, sleep=sleeps.append)
+    instance.sleeps = sleeps
+    yield instance
+    instance.close()
+
+
+@pytest.fixture
+def task(db):
+    creator = User.objects.create_user('push_creator', password='pass')
+    prop = Property.objects.create(name='Push Place', address='8 Token Rd')
+    return Task.objects.create(title='Restock', property_ref=prop, created_by=creator)
+
+
+def _notifications(user, task, verbs):
+    return [Notification.objects.create(recipient=user, task=task, verb=verb) for verb in verbs]
+
+
+def test_coalesces_per_device_and_reuses_connections(pipeline, stub, task):
+    users = [User.objects.create_user(f'push_user_{i}', password='pass') for i in range(6)]
+    for user in users:
+        Device.objects.create(user=user, token=f'token-{user.pk}')
+    notifications = []
+    for user in users:
+        notifications += _notifications(user, task, [NotificationVerb.STATUS_CHANGED, NotificationVerb.TITLE_CHANGED])
+
+    report = pipeline.deliver(build_messages(Notification.objects.select_related('task')))
+
+    assert len(stub.requests) == 6                       # one push per device, not per notification
+    assert stub.requests[0]['notification']['title'] == '2 task updates'
+    assert stub.requests[0]['data']['verb'] == 'multiple'
+    assert len(stub.clients) <= 4                        # pooled keep-alive connections
+    assert report.delivered == {n.pk for n in notifications}
+    assert Notification.objects.filter(push_sent=True).count() == 12
+    assert pipeline.stats['coalesced'] == 6
+
+
+def test_retries_with_backoff_and_honors_retry_after(pipeline, stub, task):
+    user = task.created_by
+    Device.objects.create(user=user, token='flaky')
+    stub.responses['flaky'] = [(503, {}, {}), (429, {}, {'Retry-After': '2'})]
+    notification, = _notifications(user, task, [NotificationVerb.ASSIGNED])
+
+    report = pipeline.deliver(build_messages(Notification.objects.select_related('task')))
+
+    assert report.delivered == {notification.pk}
+    assert report.attempts == 3
+    assert len(pipeline.sleeps) == 2 and pipeline.sleeps[1] == 2.0
+    assert pipeline.stats['retried'] == 2
+
+
+def test_gives_up_after_max_retries(pipeline, stub, task):
+    user = task.created_by
+    Device.objects.create(user=user, token='down')
+    stub.responses['down'] = [(500, {}, {})] * 10
+    _notifications(user, task, [NotificationVerb.ASSIGNED])
+
+    report = pipeline.deliver(build_messages(Notification.objects.select_related('task')))
+
+    assert report.attempts == pipeline.max_retries + 1
+    assert report.failed and not report.delivered
+    assert not Notification.objects.filter(push_sent=True).exists()
+
+
+def test_prunes_unregistered_tokens(pipeline, stub, task):
+    user = task.created_by
+    Device.objects.create(user=user, token='stale')
+    Device.objects.create(user=user, token='fresh')
+    stub.responses['stale'] = [(404, {'error': {'status': 'NOT_FOUND', 'details': [
+        {'@type': 'type.googleapis.com/google.firebase.fcm.v1.FcmError', 'errorCode': 'UNREGISTERED'}]}}, {})]
+    notification, = _notifications(user, task, [NotificationVerb.ASSIGNED])
+
+    report = pipeline.deliver(build_messages(Notification.objects.select_related('task')))
+
+    assert report.invalid_tokens == {'stale'}
+    assert report.delivered == {notification.pk}     # reached the other device
+    assert list(Device.objects.values_list('token', flat=True)) == ['fresh']
+
+
+def test_dispatch_does_not_block_on_delivery(pipeline, task):
+    user = task.created_by
+    Device.objects.create(user=user, token='bg')
+    notification, = _notifications(user, task, [NotificationVerb.ASSIGNED])
+    delivered = threading.Event()
+    release = threading.Event()
+
+    def slow_deliver(messages):
+        release.wait(5)
+        delivered.set()
+
+    with mock.patch.object(pipeline, 'deliver', side_effect=slow_deliver) as deliver:
+        pipeline.dispatch([notification.pk])       # returns while the send is still pending
+        assert not delivered.is_set()
+        release.set()
+        assert delivered.wait(5)
+
+    (messages,), _ = deliver.call_args
+    assert [(m.token, m.notification_ids) for m in messages] == [('bg', [notification.pk])]
@@ -0,0 +1,118 @@
+"""
+Tests for query instrumentation, endpoint histograms and the request profiler (backend.request_profiling)
+"""
+
+import pytest
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+
+from api.models import Property
+from backend import request_profiling
+from backend.request_profiling import EndpointStats, RequestProfilingMiddleware, fingerprint, get_request_stats
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'request-profiling-tests'}}
+
+
+def test_fingerprint_collapses_literals_and_lists():
+    assert fingerprint('SELECT * FROM "api_task" WHERE "id" IN (%s, %s, %s) AND "title" = \'x\'') == \
+        fingerprint('SELECT * FROM "api_task" WHERE "id" IN (%s) AND "title" = \'other\'')
+    assert fingerprint('SELECT 1 FROM t2 LIMIT 21') == 'SELECT ? FROM t2 LIMIT ?'
+
+
+@pytest.mark.django_db
+def test_queries_are_counted_with_debug_off_and_n_plus_one_logged(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(request_profiling.logger, 'warning', lambda msg, **kw: warnings.append(kw['extra']))
+    props = [Property.objects.create(name=f'Profiled {i}') for i in range(12)]
+
+    def view(request):
+        for prop in props:
+            Property.objects.filter(pk=prop.pk).first()
+        return HttpResponse('ok')
+
+    request = RequestFactory().get('/api/properties/')
+    RequestProfilingMiddleware(view)(request)
+
+    assert request.query_stats.count == 12
+    assert warnings and warnings[0]['repeated_queries'][0]['runs'] == 12
+
+
+@pytest.mark.django_db
+def test_endpoint_histograms_are_exposed_by_the_health_check():
+    admin = User.objects.create_superuser('histogram_admin', 'hist@example.com', 'pass')
+    get_request_stats().reset()
+    client = Client()
+    client.force_login(admin)
+    for _ in range(3):
+        client.get('/api/health/')
+
+    endpoints = client.get('/api/health/detailed/').json()['metrics']['endpoints']
+
+    row = next(row for row in endpoints['endpoints'] if row['endpoint'] == 'GET api/health/')
+    assert row['count'] == 3 and row['avg_queries'] >= 1
+    assert sum(row['histogram'].values()) == 3 and row['p50_ms'] is not None
+
+
+def test_endpoint_stats_bound_the_number_of_endpoints():
+    stats = EndpointStats(buckets=(10, 100), max_endpoints=2)
+    for name, ms in [('GET a/', 5), ('GET b/', 50), ('GET c/', 500), ('GET d/', 5)]:
+        stats.record(name, ms)
+
+    snapshot = stats.snapshot()
+
+    assert {row['endpoint'] for row in snapshot['endpoints']} == {'GET a/', 'GET b/', 'other'}
+    other = next(row for row in snapshot['endpoints'] if row['endpoint'] == 'other')
+    assert other['histogram'] == {'<=10': 1, '<=100': 0, '>100': 1} and other['p99_ms'] is None
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM, REQUEST_PROFILER_INTERVAL_MS=1)
+def test_profile_header_is_honoured_for_superusers_only():
+    admin = User.objects.create_superuser('profile_admin', 'profile@example.com', 'pass')
+    staff = User.objects.create_user('profile_staff', 'staff@example.com', 'pass', is_staff=True)
+    client = Client()
+
+    client.force_login(staff)
+    assert 'X-Request-Profile' not in client.get('/api/health/', HTTP_X_PROFILE_REQUEST='1')
+
+    client.force_login(admin)
+    response = client.get('/api/health/', HTTP_X_PROFILE_REQUEST='1')
+    profile = client.get(f"/api/health/profiles/{response['X-Request-Profile']}/").json()
+
+    assert profile['endpoint'] == 'GET api/health/'
+    assert profile['samples'] == sum(stack['samples'] for stack in profile['stacks'])
+    assert client.get('/api/health/profiles/missing/').status_code == 404
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM, REQUEST_PROFILER_INTERVAL_MS=1)
+def test_sampler_is_not_started_for_callers_known_not_to_be_superusers(monkeypatch):
+    started = []
+    start = request_profiling.SamplingProfiler.start
+    monkeypatch.setattr(request_profiling.SamplingProfiler, 'start',
+                        lambda self: started.append(self) or start(self))
+    staff = User.objects.create_user('sampler_staff', 'sampler@example.com', 'pass', is_staff=True)
+    client = Client()
+
+    client.get('/api/health/', HTTP_X_PROFILE_REQUEST='1')
+    client.force_login(staff)
+    client.get('/api/health/', HTTP_X_PROFILE_REQUEST='1')
+    assert started == []
+
+    # A token caller is only authenticated by DRF later, so it is sampled and checked afterwards
+    Client().get('/api/health/', HTTP_X_PROFILE_REQUEST='1', HTTP_AUTHORIZATION='Bearer not-yet-checked')
+    assert len(started) == 1
+
+
+@pytest.mark.django_db
+@override_settings(CACHES=LOCMEM)
+def test_profiles_are_readable_by_superusers_only():
+    from django.core.cache import cache
+    cache.set(f'{request_profiling.PROFILE_CACHE_PREFIX}:known', {'endpoint': 'GET api/health/'})
+    staff = User.objects.create_user('reader_staff', 'reader@example.com', 'pass', is_staff=True)
+    client = Client()
+    client.force_login(staff)
+
+    assert client.get('/api/health/profiles/known/').status_code == 403
@@ -0,0 +1,89 @@
+"""
+Tests for the cached system metrics snapshot and incremental log statistics
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from api.models import Property, Task
+from api.system_metrics import MetricsSnapshot, SystemMetrics
+from backend.log_stats import LogStatsHandler, recent_log_levels
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'system-metrics-tests'}}
+
+
+def _tasks(count, status):
+    prop = Property.objects.create(name=f'Metrics {status} {count}', address='1 Gauge Rd')
+    for i in range(count):
+        Task.objects.create(title=f'{status} {i}', property_ref=prop, status=status,
+                            due_date=timezone.now() - timedelta(days=1))
+
+
+def _count_queries(collector):
+    with CaptureQueriesContext(connection) as ctx:
+        collector.get_database_metrics()
+        collector.get_application_metrics()
+        collector.get_user_activity_metrics()
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_counts_use_one_aggregate_per_table():
+    _tasks(1, 'pending')
+    collector = SystemMetrics()
+    small = _count_queries(collector)
+
+    _tasks(4, 'in-progress')
+    User.objects.create_user('metrics_user', password='pass')
+    collector._counts = None
+    large = _count_queries(collector)
+    app = collector.get_application_metrics()
+
+    assert large == small <= 6
+    assert app['task_metrics']['in_progress'] == 4
+    assert app['task_metrics']['overdue'] == 5
+
+
+@override_settings(CACHES=LOCMEM)
+@pytest.mark.django_db
+def test_dashboard_reads_the_cached_snapshot():
+    from django.core.cache import cache
+    cache.clear()
+    snapshot = MetricsSnapshot(interval=0)
+    first = snapshot.get()
+
+    with CaptureQueriesContext(connection) as ctx:
+        second = snapshot.get()
+
+    assert ctx.captured_queries == []
+    assert second['timestamp'] == first['timestamp']
+    assert 'collected_at' in second and 'snapshot_age_seconds' in second
+
+
+@override_settings(CACHES=LOCMEM)
+def test_log_stats_handler_counts_levels():
+    from django.core.cache import cache
+    cache.clear()
+    handler = LogStatsHandler(flush_seconds=3600)
+    log = logging.getLogger('tests.log_stats')
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG)
+    try:
+        log.info('one')
+        log.info('two')
+        log.error('three')
+        assert recent_log_levels()['info'] == 0    # still buffered in the handler
+        handler.flush()
+    finally:
+        log.removeHandler(handler)
+
+    levels = recent_log_levels(now=time.time())
+    assert levels['info'] == 2 and levels['error'] == 1 and levels['warning'] == 0
@@ -0,0 +1,100 @@
+"""
+Tests for the append-only task history table (api.models.TaskHistory)
+"""
+
+import importlib
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Property, Task, TaskHistory
+
+history_migration = importlib.import_module('api.migrations.0082_taskhistory')
+
+
+@pytest.fixture
+def manager(db):
+    return User.objects.create_superuser('history_admin', 'history@example.com', 'pass')
+
+
+@pytest.fixture
+def task(manager):
+    prop = Property.objects.create(name='History House', address='3 Log Ln')
+    return Task.objects.create(title='Clean', property_ref=prop, created_by=manager, modified_by=manager)
+
+
+def test_save_appends_rows_without_refetching(task, manager):
+    task = Task.objects.select_related('modified_by').get(pk=task.pk)
+    task.status = 'in-progress'
+    task.title = 'Deep clean'
+
+    with CaptureQueriesContext(connection) as ctx:
+        task.save()
+
+    assert len(ctx.captured_queries) == 2   # UPDATE task + bulk INSERT history
+    entries = list(task.history_entries.values_list('field', 'old_value', 'new_value', 'actor_name'))
+    assert entries == [
+        ('status', 'pending', 'in-progress', 'history_admin'),
+        ('title', 'Clean', 'Deep clean', 'history_admin'),
+    ]
+    assert Task.objects.get(pk=task.pk).history == '[]'
+
+
+def test_assignee_change_is_recorded_by_username(task):
+    cleaner = User.objects.create_user('cleaner', password='pass')
+    task.assigned_to = cleaner
+    task.save()
+
+    entry = task.history_entries.get()
+    assert entry.as_text().endswith("history_admin changed assignee from 'unassigned' to 'cleaner'")
+
+
+def test_entries_are_append_only(task):
+    entry = TaskHistory.log(task, message='created task')
+    entry.message = 'rewritten'
+    with pytest.raises(ValueError):
+        entry.save()
+
+
+def test_list_omits_history_and_history_endpoint_pages(task, manager):
+    for i in range(5):
+        task.title = f'Clean {i}'
+        task.save()
+    client = APIClient()
+    client.force_authenticate(manager)
+
+    listing = client.get(reverse('task-list')).json()
+    assert 'history' not in listing['results'][0]
+
+    detail = client.get(reverse('task-detail', args=[task.pk])).json()
+    assert detail['history'][-1].endswith("changed title from 'Clean 3' to 'Clean 4'")
+
+    first = client.get(reverse('task-history', args=[task.pk]), {'page_size': 3}).json()
+    assert [e['new_value'] for e in first['results']] == ['Clean 4', 'Clean 3', 'Clean 2']
+    second = client.get(first['next']).json()
+    assert [e['new_value'] for e in second['results']] == ['Clean 1', 'Clean 0']
+    assert second['next'] is None
+
+
+def test_backfill_parses_legacy_entries(task, manager):
+    Task.objects.filter(pk=task.pk).update(history=json.dumps([
+        "2025-01-08T10:30:00+00:00: history_admin changed status from 'pending' to 'completed'",
+        "2025-01-08T11:00:00+00:00: history_admin added photo /media/a.jpg",
+        "not a history line",
+    ]))
+    TaskHistory.objects.all().delete()
+
+    from django.apps import apps
+    history_migration.backfill_task_history(apps, None)
+
+    entries = list(TaskHistory.objects.filter(task=task))
+    assert [(e.field, e.old_value, e.new_value) for e in entries[:1]] == [('status', 'pending', 'completed')]
+    assert entries[0].actor_id == manager.pk
+    assert entries[1].message == 'added photo /media/a.jpg'
+    assert entries[2].message == 'not a history line'
+    assert Task.objects.get(pk=task.pk).history == '[]'
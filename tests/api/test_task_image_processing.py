@@ -0,0 +1,179 @@
+"""
+Tests for off-request task image optimization (api.services.task_image_processing)
+"""
+
+import io
+import random
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.models import Property, StoredBlob, Task, TaskImage
+from api.services import task_image_processing
+from api.services.file_cleanup_service import ImportFileCleanupService
+from api.utils import image_ops
+
+
+@pytest.fixture
+def uploader(db):
+    user = User.objects.create_superuser('image_worker', 'images@example.com', 'pass')
+    client = APIClient()
+    client.force_authenticate(user)
+    task = Task.objects.create(title='Photo task', property_ref=Property.objects.create(name='Photo House'),
+                               created_by=user)
+    return client, task
+
+
+def _jpeg(size=(800, 600), noise=0):
+    img = Image.new('RGB', size, color='red')
+    rng = random.Random(7)
+    for _ in range(noise):
+        img.putpixel((rng.randrange(size[0]), rng.randrange(size[1])),
+                     (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=95)
+    return buffer.getvalue()
+
+
+def _upload(client, task, photo_type='general'):
+    return client.post(f'/api/tasks/{task.id}/images/create/',
+                       {'image': SimpleUploadedFile('phone.jpg', _jpeg(), content_type='image/jpeg'), 'task': task.id,
+                        'photo_type': photo_type},
+                       format='multipart')
+
+
+@override_settings(TASK_IMAGE_PROCESSING_BACKEND='database')
+def test_upload_returns_pending_and_worker_finishes_it(uploader):
+    client, task = uploader
+
+    response = _upload(client, task)
+
+    assert response.status_code == 201, response.data
+    assert response.data['processing_status'] == 'pending'
+    image = TaskImage.objects.get(pk=response.data['id'])
+    staged = image.image.name
+    assert staged.startswith('task_images/staging/')
+    assert image.original_size_bytes > 0 and image.size_bytes is None
+
+    call_command('process_task_images', '--once', stdout=io.StringIO())
+
+    image.refresh_from_db()
+    assert image.processing_status == 'ready'
+    assert image.image.name.startswith(f'task_images/{task.id}/')
+    assert image.size_bytes and image.width == 800
+    # The staged original is released, then removed by blob garbage collection
+    assert StoredBlob.objects.get(name=staged).ref_count == 0
+    ImportFileCleanupService.collect_unreferenced_blobs(grace_hours=0)
+    assert not image.image.storage.exists(staged)
+    assert client.get(f'/api/tasks/{task.id}/images/{image.pk}/').data['processing_status'] == 'ready'
+
+
+@override_settings(TASK_IMAGE_PROCESSING_BACKEND='database')
+def test_failed_optimization_keeps_raw_upload(uploader, monkeypatch):
+    client, task = uploader
+    image_id = _upload(client, task).data['id']
+
+    def broken(data, **options):
+        raise ValueError('Cannot optimize image to target size')
+    monkeypatch.setattr(task_image_processing, 'optimize_image_bytes', broken)
+    call_command('process_task_images', '--once', stdout=io.StringIO())
+
+    image = TaskImage.objects.get(pk=image_id)
+    assert image.processing_status == 'failed'
+    assert 'target size' in image.processing_error
+    assert image.image.storage.exists(image.image.name)
+
+
+@override_settings(TASK_IMAGE_PROCESSING_BACKEND='database', TASK_IMAGE_CLAIM_TIMEOUT=60)
+def test_worker_reclaims_images_abandoned_mid_processing(uploader):
+    client, task = uploader
+    abandoned, fresh = (_upload(client, task, photo_type).data['id'] for photo_type in ('before', 'after'))
+    TaskImage.objects.filter(pk=abandoned).update(processing_status='processing',
+                                                  processing_started_at=timezone.now() - timedelta(minutes=5))
+    TaskImage.objects.filter(pk=fresh).update(processing_status='processing', processing_started_at=timezone.now())
+
+    call_command('process_task_images', '--once', stdout=io.StringIO())
+
+    assert TaskImage.objects.get(pk=abandoned).processing_status == 'ready'
+    assert TaskImage.objects.get(pk=fresh).processing_status == 'processing'   # its worker may still be alive
+
+
+@override_settings(TASK_IMAGE_PROCESSING_BACKEND='thread', TASK_IMAGE_CLAIM_TIMEOUT=60)
+def test_polling_requeues_images_whose_thread_worker_was_lost(uploader, monkeypatch,
+                                                              django_capture_on_commit_callbacks):
+    client, task = uploader
+    with override_settings(TASK_IMAGE_PROCESSING_BACKEND='database'):
+        abandoned, fresh = (_upload(client, task, photo_type).data['id'] for photo_type in ('before', 'after'))
+    TaskImage.objects.filter(pk=abandoned).update(processing_status='processing',
+                                                  processing_started_at=timezone.now() - timedelta(minutes=5))
+    TaskImage.objects.filter(pk=fresh).update(processing_status='processing', processing_started_at=timezone.now())
+    dispatcher = mock.Mock()
+    monkeypatch.setattr(task_image_processing.TaskImageProcessingService, '_dispatcher', dispatcher)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first = client.get(f'/api/tasks/{task.id}/images/{abandoned}/')
+        client.get(f'/api/tasks/{task.id}/images/{abandoned}/')   # requeued once, not on every poll
+        client.get(f'/api/tasks/{task.id}/images/{fresh}/')
+
+    assert first.data['processing_status'] == 'pending'
+    dispatcher.submit.assert_called_once_with(
+        task_image_processing.TaskImageProcessingService._run_in_worker, abandoned, False
+    )
+    assert TaskImage.objects.get(pk=fresh).processing_status == 'processing'   # its worker may still be alive
+    assert task_image_processing.TaskImageProcessingService.run(abandoned, use_pool=False).processing_status == 'ready'
+
+
+def test_reclaimed_image_ignores_the_late_worker(uploader, monkeypatch):
+    client, task = uploader
+    with override_settings(TASK_IMAGE_PROCESSING_BACKEND='database'):
+        image_id = _upload(client, task).data['id']
+    optimize = task_image_processing.optimize_image_bytes
+
+    def reclaimed_meanwhile(data, **options):
+        TaskImage.objects.filter(pk=image_id).update(processing_started_at=timezone.now() + timedelta(seconds=1))
+        return optimize(data, **options)
+    monkeypatch.setattr(task_image_processing, 'optimize_image_bytes', reclaimed_meanwhile)
+
+    assert task_image_processing.TaskImageProcessingService.run(image_id, use_pool=False) is None
+    assert TaskImage.objects.get(pk=image_id).image.name.startswith('task_images/staging/')
+
+
+def _count_encodes(monkeypatch):
+    calls = []
+    encode = image_ops._encode_image
+
+    def counting(img, quality, use_webp=True):
+        calls.append(quality)
+        return encode(img, quality, use_webp)
+    monkeypatch.setattr(image_ops, '_encode_image', counting)
+    return calls
+
+
+def test_quality_search_encodes_once_when_image_fits(monkeypatch):
+    calls = _count_encodes(monkeypatch)
+
+    image_ops.optimize_image(io.BytesIO(_jpeg()))
+
+    assert calls == [image_ops.MAX_QUALITY]
+
+
+def test_quality_search_bisects_to_target(monkeypatch):
+    data = _jpeg(size=(1200, 900), noise=60000)
+    calls = _count_encodes(monkeypatch)
+    full_size = len(image_ops._encode_image(Image.open(io.BytesIO(data)), image_ops.MAX_QUALITY))
+    calls.clear()
+    target = full_size // 3
+
+    optimized, metadata = image_ops.optimize_image(io.BytesIO(data), target_size=target)
+
+    assert len(optimized) <= target
+    assert len(calls) <= 6
+    assert metadata['original_size_bytes'] == len(data)
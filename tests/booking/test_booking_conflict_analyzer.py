@@ -0,0 +1,121 @@
+"""
+Tests for the batch booking conflict analyzer (api.booking_conflicts)
+"""
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.booking_conflicts import analyze_bookings, prefetch_conflict_summaries
+from api.models import Booking, Property
+from tests.utils.timezone_helpers import days_from_now
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                            'LOCATION': 'booking-conflict-tests'}}
+
+
+@pytest.fixture
+def properties(db):
+    return (
+        Property.objects.create(name='Conflict Cove', address='1 Cove Rd'),
+        Property.objects.create(name='Conflict Peak', address='2 Peak Rd'),
+    )
+
+
+def _booking(prop, start, end, **kwargs):
+    return Booking.objects.create(
+        property=prop, check_in_date=days_from_now(start), check_out_date=days_from_now(end), **kwargs
+    )
+
+
+def test_detects_same_day_and_overlap_conflicts(properties):
+    cove, peak = properties
+    stay = _booking(cove, 1, 4, guest_name='Stay')
+    turnover = _booking(peak, 4, 6, guest_name='Turnover')          # checks in as stay checks out
+    cancelled = _booking(cove, 2, 3, status='cancelled')           # overlaps stay, inactive
+    _booking(peak, 20, 22)                                           # unrelated
+
+    results = analyze_bookings([stay, turnover, cancelled])
+
+    assert [(c['type'], c['booking']) for c in results[stay.pk]] == [
+        ('same_day_checkout_checkin', turnover),
+    ]
+    assert [(c['type'], c['booking']) for c in results[turnover.pk]] == [
+        ('same_day_checkin_checkout', stay),
+    ]
+    assert [(c['type'], c['severity']) for c in results[cancelled.pk]] == [
+        ('overlapping_dates', 'critical'),
+    ]
+    assert stay.check_conflicts()[0]['message'].startswith('Same day conflict: Check-out from Conflict Cove')
+
+
+def test_batch_analysis_uses_one_query(properties):
+    cove, peak = properties
+    bookings = [_booking(cove if i % 2 else peak, 3 * i + 1, 3 * i + 3) for i in range(12)]
+
+    with CaptureQueriesContext(connection) as ctx:
+        analyze_bookings(bookings)
+
+    assert len(ctx.captured_queries) == 1
+
+
+def test_conflict_flag_and_details_share_one_analysis(properties):
+    cove, peak = properties
+    stay = _booking(cove, 1, 4)
+    _booking(peak, 4, 6)
+
+    with CaptureQueriesContext(connection) as ctx:
+        flag = stay.get_conflict_flag()
+        details = stay.get_conflict_details()
+
+    assert flag == '🟡 1 High priority conflicts'
+    assert details.startswith('• Same day conflict')
+    assert len(ctx.captured_queries) == 1
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+def test_summaries_are_cached_and_invalidated_on_save(properties):
+    cove, peak = properties
+    stay = _booking(cove, 1, 4)
+
+    prefetch_conflict_summaries([Booking.objects.get(pk=stay.pk)])
+    with CaptureQueriesContext(connection) as ctx:
+        assert Booking.objects.get(pk=stay.pk).get_conflict_summary()['total'] == 0
+    assert len(ctx.captured_queries) == 1   # just the booking fetch
+
+    _booking(peak, 4, 6)
+
+    assert Booking.objects.get(pk=stay.pk).get_conflict_summary()['high'] == 1
+
+
+def test_memo_is_dropped_after_a_write(properties):
+    cove, peak = properties
+    stay = _booking(cove, 1, 4)
+    assert stay.check_conflicts() == []
+
+    _booking(peak, 4, 5)   # post_save invalidates the instance memo
+
+    assert len(stay.check_conflicts()) == 1
+
+
+def test_admin_changelist_query_count_is_flat(properties, client):
+    cove, peak = properties
+    admin_user = User.objects.create_superuser('conflict_admin', 'admin@example.com', 'pass')
+    client.force_login(admin_user)
+    url = reverse('admin:api_booking_changelist')
+
+    for i in range(3):
+        _booking(cove, 2 * i + 1, 2 * i + 2)
+    with CaptureQueriesContext(connection) as small:
+        assert client.get(url).status_code == 200
+
+    for i in range(15):
+        _booking(peak, 2 * i + 1, 2 * i + 2)
+    with CaptureQueriesContext(connection) as large:
+        assert client.get(url).status_code == 200
+
+    assert len(large.captured_queries) <= len(small.captured_queries) + 2
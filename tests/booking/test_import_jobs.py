@@ -0,0 +1,178 @@
+"""
+Tests for background booking import jobs (api.services.import_job_service)
+"""
+
+import io
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api.models import Booking, BookingImportLog, Property
+from api.services.import_job_service import ImportJobService, job_group_name
+from tests.utils.timezone_helpers import days_from_now
+
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def _upload(count=3):
+    import pandas as pd
+
+    rows = [
+        {
+            'Confirmation code': f'JOB{i}',
+            'Status': 'confirmed',
+            'Guest name': f'Job Guest {i}',
+            'Booking source': 'Airbnb',
+            'Start date': days_from_now(2 * i + 1).strftime('%Y-%m-%d'),
+            'End date': days_from_now(2 * i + 2).strftime('%Y-%m-%d'),
+            'Properties': 'Job Cottage',
+        }
+        for i in range(count)
+    ]
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame(rows).to_excel(writer, sheet_name='Cleaning schedule', index=False)
+    return SimpleUploadedFile('jobs.xlsx', buffer.getvalue())
+
+
+@pytest.fixture
+def importer(db):
+    Property.objects.create(name='Job Cottage', address='2 Queue Ln')
+    return User.objects.create_user(username='job_importer', password='pass', is_superuser=True)
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='immediate', CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+def test_enqueue_runs_job_and_records_progress(importer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        job = ImportJobService.enqueue(importer, _upload())
+
+    job.refresh_from_db()
+    assert job.status == BookingImportLog.STATUS_COMPLETED
+    assert job.started_at and job.finished_at
+    assert job.progress['chunks'] == 1
+    assert job.progress['rows_processed'] == 3
+    assert job.progress['result']['successful_imports'] == 3
+    assert Booking.objects.filter(external_code__startswith='JOB').count() == 3
+    # The queued log is reused, not duplicated
+    assert BookingImportLog.objects.filter(imported_by=importer).count() == 1
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='immediate', CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+def test_failed_job_is_marked_failed(importer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        job = ImportJobService.enqueue(importer, _upload(), sheet_name='Missing sheet')
+
+    job.refresh_from_db()
+    assert job.status == BookingImportLog.STATUS_FAILED
+    assert job.progress['result']['success'] is False
+    assert 'Missing sheet' in job.progress['result']['error']
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='database', CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+def test_database_backend_waits_for_worker(importer):
+    job = ImportJobService.enqueue(importer, _upload(2))
+    assert BookingImportLog.objects.get(pk=job.pk).status == BookingImportLog.STATUS_QUEUED
+
+    call_command('run_import_jobs', '--once', stdout=io.StringIO())
+
+    job.refresh_from_db()
+    assert job.status == BookingImportLog.STATUS_COMPLETED
+    assert ImportJobService.claim_next() is None
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='database', CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+def test_progress_is_broadcast_to_job_group(importer):
+    job = ImportJobService.enqueue(importer, _upload(2))
+    channel_layer = get_channel_layer()
+    channel = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(job_group_name(job.pk), channel)
+
+    ImportJobService.run(job.pk)
+
+    statuses = []
+    while True:
+        message = async_to_sync(channel_layer.receive)(channel)
+        assert message['type'] == 'import.progress'
+        statuses.append(message['job']['status'])
+        if message['job']['done']:
+            break
+    assert statuses[0] == BookingImportLog.STATUS_RUNNING
+    assert statuses[-1] == BookingImportLog.STATUS_COMPLETED
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='database', CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+def test_api_returns_job_id_and_status_is_pollable(importer, client):
+    client.force_login(importer)
+
+    response = client.post(
+        reverse('enhanced-excel-import-api'),
+        {'excel_file': _upload(), 'run_async': '1'},
+    )
+
+    assert response.status_code == 202
+    payload = response.json()
+    assert payload['status'] == BookingImportLog.STATUS_QUEUED
+    assert payload['status_url'] == reverse('import-job-status', args=[payload['job_id']])
+
+    ImportJobService.run(payload['job_id'])
+    status = client.get(payload['status_url']).json()
+    assert status['done'] is True
+    assert status['progress']['result']['successful_imports'] == 3
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='database')
+def test_status_api_hides_other_users_jobs(importer, client):
+    job = ImportJobService.enqueue(importer, _upload(1))
+    manager = User.objects.create_user(username='job_manager', password='pass')
+    manager.profile.role = 'manager'
+    manager.profile.save()
+    client.force_login(manager)
+
+    assert client.get(reverse('import-job-status', args=[job.pk])).status_code == 404
+
+
+@pytest.mark.parametrize('url_name, data, engine', [
+    ('excel-import-api', {}, BookingImportLog.ENGINE_BASIC),
+    ('enhanced-excel-import-api', {}, BookingImportLog.ENGINE_ENHANCED),
+    ('enhanced-excel-import-api', {'import_mode': 'streaming'}, BookingImportLog.ENGINE_STREAMING),
+])
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='database', CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+def test_background_import_keeps_the_requested_engine(importer, client, url_name, data, engine):
+    client.force_login(importer)
+
+    job_id = client.post(reverse(url_name), {'excel_file': _upload(), 'run_async': '1', **data}).json()['job_id']
+    job = ImportJobService.run(job_id)
+
+    assert job.engine == engine
+    assert job.status == BookingImportLog.STATUS_COMPLETED, job.errors_log
+    assert Booking.objects.filter(external_code__startswith='JOB').count() == 3
+    assert BookingImportLog.objects.filter(imported_by=importer).count() == 1
+
+
+@override_settings(BOOKING_IMPORT_JOB_BACKEND='database', BOOKING_IMPORT_JOB_TIMEOUT=60)
+def test_jobs_abandoned_by_their_worker_are_failed(importer, client):
+    queued = ImportJobService.enqueue(importer, _upload(1))
+    running = ImportJobService.enqueue(importer, _upload(1))
+    fresh = ImportJobService.enqueue(importer, _upload(1))
+    long_ago = timezone.now() - timedelta(hours=2)
+    BookingImportLog.objects.filter(pk=queued.pk).update(imported_at=long_ago)
+    BookingImportLog.objects.filter(pk=running.pk).update(status=BookingImportLog.STATUS_RUNNING, started_at=long_ago)
+    client.force_login(importer)
+
+    status = client.get(reverse('import-job-status', args=[queued.pk])).json()
+    assert status['status'] == BookingImportLog.STATUS_FAILED and status['done'] is True
+    assert 'worker stopped' in status['progress']['result']['error']
+
+    call_command('run_import_jobs', '--once', stdout=io.StringIO())
+
+    assert BookingImportLog.objects.get(pk=running.pk).status == BookingImportLog.STATUS_FAILED
+    assert BookingImportLog.objects.get(pk=fresh.pk).status == BookingImportLog.STATUS_COMPLETED
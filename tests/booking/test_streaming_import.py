@@ -0,0 +1,149 @@
+"""
+Tests for the streaming, batched Excel import engine
+(EnhancedExcelImportService.import_excel_file_streaming)
+"""
+
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Booking, BookingImportLog, Property
+from api.services.enhanced_excel_import_service import EnhancedExcelImportService
+from api.services.excel_file_utils import iter_sheet_chunks
+from tests.utils.timezone_helpers import days_from_now
+
+
+COLUMNS = [
+    'Confirmation code', 'Status', 'Guest name', 'Booking source',
+    'Start date', 'End date', '# of nights', 'Properties',
+]
+
+
+def _xlsx_bytes(rows, sheet_name='Cleaning schedule'):
+    import pandas as pd
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        pd.DataFrame(rows, columns=COLUMNS).to_excel(writer, sheet_name=sheet_name, index=False)
+    return buffer.getvalue()
+
+
+def _upload(rows):
+    return SimpleUploadedFile('bookings.xlsx', _xlsx_bytes(rows))
+
+
+def _row(code, guest, start_days, end_days, prop='Streaming Villa', status='confirmed', source='Airbnb'):
+    return [
+        code, status, guest, source,
+        days_from_now(start_days).strftime('%Y-%m-%d'),
+        days_from_now(end_days).strftime('%Y-%m-%d'),
+        end_days - start_days, prop,
+    ]
+
+
+@pytest.fixture
+def importer(db):
+    user = User.objects.create_user(username='stream_importer', password='pass', is_superuser=True)
+    return EnhancedExcelImportService(user)
+
+
+@pytest.fixture
+def villa(db):
+    return Property.objects.create(name='Streaming Villa', address='1 Stream Rd')
+
+
+def test_iter_sheet_chunks_splits_rows():
+    rows = [_row(f'HM{i}', f'Guest {i}', i + 1, i + 3) for i in range(5)]
+    chunks = list(iter_sheet_chunks(_xlsx_bytes(rows), 'Cleaning schedule', chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0][0]['Confirmation code'] == 'HM0'
+    assert chunks[2][0]['Guest name'] == 'Guest 4'
+
+
+def test_iter_sheet_chunks_missing_sheet():
+    with pytest.raises(ValueError, match="not found"):
+        list(iter_sheet_chunks(_xlsx_bytes([]), 'Nope'))
+
+
+def test_streaming_import_creates_bookings(importer, villa):
+    rows = [_row(f'HM{i}', f'Guest {i}', 2 * i + 1, 2 * i + 2) for i in range(6)]
+
+    result = importer.import_excel_file_streaming(_upload(rows), chunk_size=4)
+
+    assert result['success'] is True, result
+    assert result['successful_imports'] == 6
+    assert result['processed_rows'] == 6
+    assert Booking.objects.filter(property=villa).count() == 6
+    assert BookingImportLog.objects.get(pk=importer.import_log.pk).successful_imports == 6
+
+
+def test_streaming_import_resolves_conflicts_in_memory(importer, villa):
+    Booking.objects.create(
+        property=villa, external_code='HMSTATUS', guest_name='Status Guest',
+        check_in_date=days_from_now(10), check_out_date=days_from_now(12),
+        external_status='pending', source='Airbnb',
+    )
+    Booking.objects.create(
+        property=villa, external_code='HMGUEST', guest_name='Original Guest',
+        check_in_date=days_from_now(20), check_out_date=days_from_now(22),
+        external_status='confirmed', source='Airbnb',
+    )
+    rows = [
+        _row('HMSTATUS', 'Status Guest', 10, 12, status='confirmed'),   # status-only -> auto-update
+        _row('HMGUEST', 'Renamed Guest', 20, 22),                       # guest change -> review
+        _row('HMNEW', 'New Guest', 30, 32),                             # new booking
+        _row('HMNEW', 'New Guest', 30, 32),                             # in-file duplicate -> skipped
+    ]
+
+    result = importer.import_excel_file_streaming(_upload(rows))
+
+    assert result['success'] is True, result
+    assert result['auto_updated'] == 1
+    assert result['conflicts_detected'] == 1
+    assert result['requires_review'] is True
+    assert result['successful_imports'] == 2
+    assert Booking.objects.get(external_code='HMSTATUS').external_status == 'confirmed'
+    assert Booking.objects.filter(external_code='HMNEW').count() == 1
+    assert result['conflicts'][0]['existing_booking']['external_code'] == 'HMGUEST'
+
+
+def test_streaming_import_query_count_is_per_chunk(importer, villa):
+    small = [_row(f'HS{i}', f'Small {i}', 2 * i + 1, 2 * i + 2) for i in range(3)]
+    large = [_row(f'HL{i}', f'Large {i}', 2 * i + 1, 2 * i + 2, prop='Streaming Villa') for i in range(40)]
+
+    with CaptureQueriesContext(connection) as small_ctx:
+        importer.import_excel_file_streaming(_upload(small))
+    other = EnhancedExcelImportService(importer.user)
+    with CaptureQueriesContext(connection) as large_ctx:
+        other.import_excel_file_streaming(_upload(large))
+
+    assert Booking.objects.filter(external_code__startswith='HL').count() == 40
+    assert len(large_ctx.captured_queries) <= len(small_ctx.captured_queries) + 2
+
+
+@pytest.mark.parametrize('status, source, expected', [
+    ('Accepted', 'airbnb', 'booked'),
+    ('', 'vrbo', 'booked'),
+    ('Booked', 'Airbnb', 'booked'),
+    ('Canceled by guest', 'Airbnb', 'cancelled'),
+    ('Cancelled by host', 'Airbnb', 'cancelled'),
+    ('Currently hosting', 'Direct', 'currently_hosting'),
+])
+def test_streaming_and_row_imports_map_status_and_source_alike(importer, status, source, expected):
+    Property.objects.create(name='Row Villa', address='2 Row Rd')
+    Property.objects.create(name='Chunk Villa', address='3 Chunk Rd')
+
+    importer.import_excel_file(_upload([_row('HMROW', 'Same Guest', 5, 7, 'Row Villa', status, source)]))
+    EnhancedExcelImportService(importer.user).import_excel_file_streaming(
+        _upload([_row('HMCHUNK', 'Same Guest', 5, 7, 'Chunk Villa', status, source)])
+    )
+
+    row = Booking.objects.get(external_code='HMROW')
+    chunk = Booking.objects.get(external_code='HMCHUNK')
+    assert (chunk.status, chunk.source) == (row.status, row.source)
+    assert row.status == expected
@@ -3,8 +3,14 @@
 Tests for chat REST API endpoints.
 """
 
+from datetime import timedelta
+from io import StringIO
+
 import pytest
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from api.models import Profile
@@ -189,6 +195,41 @@ class TestChatRoomAPI:
         response = api_client.get(f'/api/chat/rooms/{room.id}/')
         
         assert response.status_code == status.HTTP_403_FORBIDDEN
+        
+    def _add_rooms(self, user1, count, start):
+        """Direct rooms with a fresh partner, one read and two unread messages each"""
+        for i in range(start, start + count):
+            partner = User.objects.create_user(username=f'partner{i}', first_name='Pat', last_name=f'No{i}')
+            room = ChatRoom.objects.create(room_type='direct', created_by=user1)
+            ChatParticipant.objects.create(room=room, user=user1, last_read_at=timezone.now())
+            ChatParticipant.objects.create(room=room, user=partner)
+            ChatMessage.objects.filter(pk=ChatMessage.objects.create(room=room, sender=partner, content='old').pk) \
+                .update(created_at=timezone.now() - timedelta(hours=1))
+            ChatMessage.objects.create(room=room, sender=partner, content='new')
+            ChatMessage.objects.create(room=room, sender=None, content=f'latest {i}', message_type='system')
+        
+    def test_room_list_query_count_is_constant(self, auth_client, user1):
+        """Unread counts, previews and participant counts do not add queries per room"""
+        self._add_rooms(user1, 2, 0)
+        with CaptureQueriesContext(connection) as small:
+            auth_client.get('/api/chat/rooms/')
+        self._add_rooms(user1, 8, 2)
+        with CaptureQueriesContext(connection) as large:
+            response = auth_client.get('/api/chat/rooms/')
+        
+        assert len(large.captured_queries) == len(small.captured_queries)
+        rooms = response.data['results']
+        assert len(rooms) == 10
+        for data in rooms:
+            room = ChatRoom.objects.get(pk=data['id'])
+            assert data['unread_count'] == room.get_unread_count(user1) == 2
+            assert data['participant_count'] == 2
+            assert data['last_message_preview'] == '[System Message]'
+            assert data['display_name'].startswith('Pat No')
+        
+        detail = auth_client.get(f"/api/chat/rooms/{rooms[0]['id']}/").data
+        for participant in detail['participants']:
+            assert participant['unread_count'] == ChatParticipant.objects.get(pk=participant['id']).unread_count
 
 
 @pytest.mark.django_db
@@ -406,3 +447,34 @@ class TestChatMessageAPI:
         assert len(response.data['results']) >= 1
         assert 'Hello' in response.data['results'][0]['content']
 
+        
+    def test_search_is_ranked_and_follows_soft_delete(self, auth_client, user1, user2):
+        """Test search ranking, prefix matching and index updates on soft delete"""
+        room = ChatRoom.objects.create(room_type='direct', created_by=user1)
+        ChatParticipant.objects.create(room=room, user=user1)
+        ChatParticipant.objects.create(room=room, user=user2)
+        once = ChatMessage.objects.create(room=room, sender=user2, content='Pool cleaning at noon')
+        twice = ChatMessage.objects.create(room=room, sender=user2, content='Clean the pool, then clean the deck')
+        ChatMessage.objects.create(room=room, sender=user2, content='Deck chairs only')
+        
+        response = auth_client.get('/api/chat/messages/search/', {'q': 'pool clean'})
+        assert [m['id'] for m in response.data['results']] == [str(twice.id), str(once.id)]
+        
+        twice.soft_delete()
+        response = auth_client.get('/api/chat/messages/search/', {'q': 'pool clean'})
+        assert [m['id'] for m in response.data['results']] == [str(once.id)]
+        
+    def test_rebuild_chat_search_backfills_index(self, auth_client, user1):
+        """Test the backfill command indexes messages written without signals"""
+        from django.core.management import call_command
+        from api.models_chat import ChatMessageTerm
+        
+        room = ChatRoom.objects.create(room_type='group', name='Ops', created_by=user1)
+        ChatParticipant.objects.create(room=room, user=user1)
+        ChatMessage.objects.bulk_create([ChatMessage(room=room, sender=user1, content='Linen delivery late')])
+        assert auth_client.get('/api/chat/messages/search/', {'q': 'linen'}).data['results'] == []
+        
+        call_command('rebuild_chat_search', stdout=StringIO())
+        
+        assert ChatMessageTerm.objects.filter(term='linen').exists()
+        assert len(auth_client.get('/api/chat/messages/search/', {'q': 'linen'}).data['results']) == 1
@@ -0,0 +1,127 @@
+# tests/chat/test_chat_state.py
+"""
+Tests for ephemeral chat state (typing, presence, batched read marks).
+"""
+
+import threading
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import chat_state
+from api.models_chat import ChatRoom, ChatParticipant, ChatMessage, ChatTypingIndicator
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                      'LOCATION': 'chat-state-tests'}}
+
+
+@pytest.fixture
+def room(db):
+    alice = User.objects.create_user(username='alice', password='test123')
+    bob = User.objects.create_user(username='bob', password='test123')
+    room = ChatRoom.objects.create(room_type='direct', created_by=alice)
+    ChatParticipant.objects.create(room=room, user=alice)
+    ChatParticipant.objects.create(room=room, user=bob)
+    cache.clear()
+    return room
+
+
+@override_settings(CACHES=LOCMEM)
+def test_typing_state_is_cached_not_stored(room):
+    alice, bob = (p.user for p in room.participants.order_by('user__username'))
+    chat_state.set_typing(room.id, bob)
+    client = APIClient()
+    client.force_authenticate(user=alice)
+
+    response = client.get('/api/chat/typing/', {'room': str(room.id)})
+
+    assert [entry['user']['username'] for entry in response.data['results']] == ['bob']
+    assert not ChatTypingIndicator.objects.exists()
+    chat_state.clear_typing(room.id, bob.id)
+    assert client.get('/api/chat/typing/', {'room': str(room.id)}).data['results'] == []
+
+
+@override_settings(CACHES=LOCMEM)
+def test_presence_tracks_sockets(room):
+    alice = room.created_by
+    chat_state.mark_present(room.id, alice.id, 'channel-1')
+    chat_state.mark_present(room.id, alice.id, 'channel-2')
+    chat_state.mark_absent(room.id, alice.id, 'channel-1')
+    assert chat_state.present_user_ids(room.id, [alice.id]) == {alice.id}
+
+    chat_state.mark_absent(room.id, alice.id, 'channel-2')
+    assert chat_state.present_user_ids(room.id, [alice.id]) == set()
+
+
+@pytest.mark.django_db
+def test_read_marks_only_advance_and_flush_in_one_batch(room):
+    alice = room.created_by
+    now = timezone.now()
+    buffer = chat_state.ReadMarkBuffer(flush_seconds=3600, batch_size=100)
+    buffer.record(room.id, alice.id, now)
+    assert not buffer.record(room.id, alice.id, now - timedelta(minutes=5))   # older mark ignored
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert buffer.flush() == 1
+    assert len([q for q in ctx.captured_queries if 'api_chatparticipant' in q['sql']]) == 2
+    assert ChatParticipant.objects.get(room=room, user=alice).last_read_at == now
+
+    buffer.record(room.id, alice.id, now - timedelta(hours=1))
+    assert buffer.flush() == 0    # never moves a mark backwards
+
+
+def test_single_read_mark_is_flushed_by_timer(monkeypatch):
+    buffer = chat_state.ReadMarkBuffer(flush_seconds=0.01, batch_size=100)
+    flushed = threading.Event()
+    monkeypatch.setattr(buffer, 'flush', flushed.set)
+
+    assert not buffer.record('room', 1, timezone.now())
+
+    assert flushed.wait(timeout=5)
+    assert buffer._timer is None
+
+
+@override_settings(CACHES=LOCMEM)
+def test_room_timestamp_bumps_are_throttled(room):
+    ChatRoom.objects.filter(pk=room.pk).update(modified_at=timezone.now() - timedelta(days=1))
+
+    assert chat_state.touch_room(room.id) is True
+    assert chat_state.touch_room(room.id) is False
+    assert ChatRoom.objects.get(pk=room.pk).modified_at > timezone.now() - timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+def test_read_mark_counts_as_read_in_message_api(room):
+    alice = room.created_by
+    bob = User.objects.get(username='bob')
+    message = ChatMessage.objects.create(room=room, sender=bob, content='hi')
+    ChatParticipant.objects.filter(room=room, user=alice).update(last_read_at=message.created_at)
+    client = APIClient()
+    client.force_authenticate(user=alice)
+
+    response = client.get('/api/chat/messages/', {'room': str(room.id)})
+
+    assert response.data['results'][0]['is_read'] is True
+
+
+@pytest.mark.django_db
+def test_read_count_comes_from_participant_read_marks(room):
+    alice = room.created_by
+    bob = User.objects.get(username='bob')
+    carol = User.objects.create_user(username='carol', password='test123')
+    ChatParticipant.objects.create(room=room, user=carol)
+    message = ChatMessage.objects.create(room=room, sender=bob, content='hi')
+    ChatParticipant.objects.filter(room=room).update(last_read_at=message.created_at)
+    ChatMessage.objects.filter(pk=message.pk).update(read_by={str(alice.id): timezone.now().isoformat()})
+    client = APIClient()
+    client.force_authenticate(user=alice)
+
+    response = client.get('/api/chat/messages/', {'room': str(room.id)})
+
+    assert response.data['results'][0]['read_count'] == 2   # alice and carol; the sender is not counted
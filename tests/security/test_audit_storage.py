@@ -0,0 +1,75 @@
+"""
+Tests for audit storage maintenance and streaming export (api.audit_storage)
+"""
+
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import audit_storage
+from api.models import AuditEvent
+
+
+def _events(count, age_days=0, actor=None):
+    created_at = timezone.now() - timedelta(days=age_days)
+    AuditEvent.objects.bulk_create([
+        AuditEvent(object_type='Task', object_id=str(i), action='update', actor=actor,
+                   changes={'n': i}, created_at=created_at - timedelta(seconds=i))
+        for i in range(count)
+    ])
+
+
+@pytest.mark.django_db
+def test_prune_deletes_in_keyset_batches():
+    _events(25, age_days=120)
+    _events(5)
+
+    with CaptureQueriesContext(connection) as ctx:
+        call_command('prune_audit', '--days', '90', '--batch-size', '10', stdout=StringIO())
+
+    assert AuditEvent.objects.filter(object_type='Task').count() == 5
+    deletes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE')]
+    assert len(deletes) == 3
+    assert not [q for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()]
+
+
+def test_expired_partitions_need_the_whole_month_before_cutoff():
+    march = audit_storage.month_start(timezone.now()).replace(year=2026, month=3)
+    partitions = [
+        ('api_auditevent_legacy', None, march),
+        ('api_auditevent_p2026_03', march, audit_storage.add_months(march, 1)),
+        ('api_auditevent_p2026_04', audit_storage.add_months(march, 1), audit_storage.add_months(march, 2)),
+    ]
+    cutoff = march + timedelta(days=40)     # mid-April
+
+    with mock.patch.object(audit_storage, 'is_partitioned', return_value=True), \
+            mock.patch.object(audit_storage, 'list_partitions', return_value=partitions):
+        assert audit_storage.expired_partitions(cutoff) == ['api_auditevent_legacy', 'api_auditevent_p2026_03']
+
+
+@pytest.mark.django_db
+def test_export_streams_keyset_pages_with_actor_names():
+    admin = User.objects.create_superuser('audit_exporter', 'audit@example.com', 'pass')
+    _events(7, actor=admin)
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    with mock.patch.object(audit_storage, 'AUDIT_EXPORT_PAGE_SIZE', 3), \
+            CaptureQueriesContext(connection) as ctx:
+        response = client.get(reverse('audit-event-export'), {'export_format': 'ndjson', 'object_type': 'Task'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    assert [row['object_id'] for row in rows] == [str(i) for i in range(7)]      # newest first
+    assert {row['actor'] for row in rows} == {'audit_exporter'}
+    assert len([q for q in ctx.captured_queries if 'FROM "api_auditevent"' in q['sql']]) == 3
+    assert not [q for q in ctx.captured_queries if 'OFFSET' in q['sql']]
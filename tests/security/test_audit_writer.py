@@ -0,0 +1,109 @@
+"""
+Tests for the write-behind audit buffer (api.audit_writer)
+"""
+
+import json
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api import audit_writer
+from api.audit_writer import AuditWriter
+from api.models import AuditEvent, Property
+
+
+@pytest.fixture
+def writer():
+    instance = AuditWriter(mode='buffered', max_buffer=50)
+    with mock.patch.object(audit_writer, '_writer', instance):
+        yield instance
+
+
+@pytest.fixture
+def spool_writer(tmp_path):
+    instance = AuditWriter(mode='spool', spool_dir=tmp_path)
+    with mock.patch.object(audit_writer, '_writer', instance):
+        yield instance
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scope_writes_committed_events_in_one_insert(writer):
+    with writer.scope():
+        for i in range(10):
+            with transaction.atomic():
+                Property.objects.create(name=f'Audit {i}', address=f'{i} Buffer St')
+        assert AuditEvent.objects.count() == 0        # still buffered
+
+        with CaptureQueriesContext(connection) as ctx:
+            writer.flush()
+
+    inserts = [q for q in ctx.captured_queries if 'INSERT INTO "api_auditevent"' in q['sql']]
+    assert len(inserts) == 1
+    assert AuditEvent.objects.filter(object_type='Property', action='create').count() == 10
+    assert writer.snapshot()['flushed'] == 10
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_events_are_never_written(writer):
+    with writer.scope():
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Property.objects.create(name='Ghost', address='0 Nowhere')
+                raise RuntimeError
+        Property.objects.create(name='Kept', address='1 Real Rd')
+
+    assert list(AuditEvent.objects.values_list('changes__new_values__name', flat=True)) == ['Kept']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_buffer_is_bounded_and_flushes_early(writer):
+    writer.max_buffer = 4
+    with writer.scope():
+        for i in range(9):
+            Property.objects.create(name=f'Bound {i}', address='2 Cap Ct')
+        assert AuditEvent.objects.count() == 8
+        assert writer.snapshot()['buffered_in_scope'] == 1
+
+    assert AuditEvent.objects.count() == 9
+    assert writer.stats['early_flushes'] == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_bulk_insert_falls_back_to_rows_and_counts_drops(writer):
+    events = [AuditEvent(object_type='X', object_id=str(i), action='create') for i in range(3)]
+
+    real_save = AuditEvent.save
+
+    def save(self, *args, **kwargs):
+        if self.object_id == '1':
+            raise ValueError('bad row')
+        return real_save(self, *args, **kwargs)
+
+    with mock.patch.object(AuditEvent.objects, 'bulk_create', side_effect=RuntimeError('boom')), \
+            mock.patch.object(AuditEvent, 'save', save):
+        writer.write(events)
+
+    assert sorted(AuditEvent.objects.values_list('object_id', flat=True)) == ['0', '2']
+    assert writer.stats['dropped'] == 1
+    assert writer.stats['fallback_rows'] == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_spool_mode_appends_ndjson_and_drain_inserts(spool_writer, tmp_path):
+    with spool_writer.scope():
+        Property.objects.create(name='Spooled', address='3 Queue Ln')
+        Property.objects.create(name='Spooled too', address='4 Queue Ln')
+
+    assert AuditEvent.objects.count() == 0
+    lines = next(tmp_path.glob('audit-*.ndjson')).read_text().splitlines()
+    assert [json.loads(line)['object_type'] for line in lines] == ['Property', 'Property']
+    captured_at = json.loads(lines[0])['created_at']
+
+    call_command('drain_audit_spool', '--once', '--spool-dir', str(tmp_path), stdout=mock.MagicMock())
+
+    assert AuditEvent.objects.count() == 2
+    assert AuditEvent.objects.order_by('created_at').first().created_at.isoformat() == captured_at
+    assert not list(tmp_path.iterdir())
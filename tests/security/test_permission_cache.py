@@ -0,0 +1,99 @@
+"""
+Tests for the compiled permission map behind Profile.has_permission
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.models import CustomPermission, RolePermission, UserPermissionOverride, UserRole
+from api.permission_cache import compile_permission_map
+from tests.utils.timezone_helpers import create_expired_datetime
+
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'permission-cache-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PermissionCacheTestCase(TestCase):
+    """Compiled permission maps: query counts and invalidation"""
+
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='pc_staff', password='testpass123')
+        self.staff.profile.role = UserRole.STAFF
+        self.staff.profile.save()
+        self.view_reports, _ = CustomPermission.objects.get_or_create(name='view_reports')
+        self.export_data, _ = CustomPermission.objects.get_or_create(name='export_data')
+
+    def _fresh_profile(self):
+        return User.objects.select_related('profile').get(pk=self.staff.pk).profile
+
+    def test_single_query_then_memoized(self):
+        RolePermission.objects.create(role=UserRole.STAFF, permission=self.view_reports, granted=True)
+        profile = self._fresh_profile()
+
+        with self.assertNumQueries(1):
+            self.assertTrue(profile.has_permission('view_reports'))
+            self.assertFalse(profile.has_permission('export_data'))
+            self.assertTrue(profile.has_permission('view_tasks'))  # baseline
+
+    def test_cross_request_cache_hit(self):
+        RolePermission.objects.create(role=UserRole.STAFF, permission=self.view_reports, granted=True)
+        self._fresh_profile().has_permission('view_reports')
+
+        profile = self._fresh_profile()
+        with self.assertNumQueries(0):
+            self.assertTrue(profile.has_permission('view_reports'))
+
+    def test_role_permission_write_invalidates(self):
+        profile = self._fresh_profile()
+        self.assertFalse(profile.has_permission('export_data'))
+
+        RolePermission.objects.create(role=UserRole.STAFF, permission=self.export_data, granted=True)
+        self.assertTrue(profile.has_permission('export_data'))
+        self.assertTrue(self._fresh_profile().has_permission('export_data'))
+
+    def test_override_write_and_delete_invalidate(self):
+        profile = self._fresh_profile()
+        self.assertTrue(profile.has_permission('view_tasks'))
+
+        override = UserPermissionOverride.objects.create(
+            user=self.staff, permission=CustomPermission.objects.get_or_create(name='view_tasks')[0],
+            granted=False,
+        )
+        self.assertFalse(self._fresh_profile().has_permission('view_tasks'))
+
+        override.delete()
+        self.assertTrue(self._fresh_profile().has_permission('view_tasks'))
+
+    def test_deactivated_permission_invalidates(self):
+        RolePermission.objects.create(role=UserRole.STAFF, permission=self.export_data, granted=True)
+        self.assertTrue(self._fresh_profile().has_permission('export_data'))
+
+        self.export_data.is_active = False
+        self.export_data.save()
+        self.assertFalse(self._fresh_profile().has_permission('export_data'))
+
+    def test_expired_override_falls_through_to_role(self):
+        RolePermission.objects.create(role=UserRole.STAFF, permission=self.view_reports, granted=True)
+        UserPermissionOverride.objects.create(
+            user=self.staff, permission=self.view_reports, granted=False,
+            expires_at=create_expired_datetime(days_ago=1),
+        )
+        self.assertTrue(self._fresh_profile().has_permission('view_reports'))
+
+    def test_compile_permission_map_shape(self):
+        RolePermission.objects.create(
+            role=UserRole.STAFF, permission=self.view_reports, granted=True, can_delegate=True
+        )
+        UserPermissionOverride.objects.create(user=self.staff, permission=self.export_data, granted=True)
+
+        compiled = compile_permission_map(self.staff.pk, UserRole.STAFF)
+        self.assertEqual(compiled['view_reports'], (True, True, None, None))
+        self.assertEqual(compiled['export_data'], (None, None, True, None))
@@ -435,8 +435,8 @@ class DynamicPermissionsTestCase(APITestCase):
         # STAFF role should have view_tasks permission
         self.assertTrue(perm.has_permission(request, None))
 
-    def test_permission_cleanup_on_expiry(self):
-        """Test that expired overrides are cleaned up"""
+    def test_expired_override_not_deleted_on_read(self):
+        """Test that expired overrides are ignored lazily, without a delete on read"""
         # Create an expired override
         expired_time = create_expired_datetime(days_ago=1)
         override = UserPermissionOverride.objects.create(
@@ -448,14 +448,11 @@ class DynamicPermissionsTestCase(APITestCase):
             expires_at=expired_time
         )
         
-        # Check that override exists
-        self.assertTrue(UserPermissionOverride.objects.filter(id=override.id).exists())
-        
-        # Call has_permission - this should trigger cleanup
-        self.staff_profile.has_permission('view_reports')
+        # Expired override is ignored
+        self.assertFalse(self.staff_profile.has_permission('view_reports'))
         
-        # Check that expired override was deleted
-        self.assertFalse(UserPermissionOverride.objects.filter(id=override.id).exists())
+        # ...but the read path leaves the row alone
+        self.assertTrue(UserPermissionOverride.objects.filter(id=override.id).exists())
         
     def test_permission_override_precedence(self):
         """Test that user overrides take precedence over role permissions"""
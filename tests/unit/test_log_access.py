@@ -0,0 +1,103 @@
+"""
+Tests for the seekable log access layer (api.log_access)
+"""
+
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from api import log_access
+from api.log_access import LogFile, tail_lines
+
+LEVELS = ['INFO', 'DEBUG', 'ERROR', 'WARNING']
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = tmp_path / 'app.log'
+    path.write_text(''.join(f'2026-03-01 {LEVELS[i % 4]} message {i}\n' for i in range(1, 1001)))
+    return path
+
+
+@pytest.fixture
+def log(log_path, tmp_path):
+    return LogFile(str(log_path), index_dir=str(tmp_path / 'idx'))
+
+
+def test_tail_reads_backwards_across_blocks(log_path):
+    assert tail_lines(str(log_path), 3, block_size=7) == [
+        '2026-03-01 ERROR message 998', '2026-03-01 WARNING message 999', '2026-03-01 INFO message 1000',
+    ]
+
+
+def test_index_pages_by_line_number_and_level(log):
+    page = log.tail(5, level='ERROR')
+    assert [entry['number'] for entry in page] == [982, 986, 990, 994, 998]   # every 4th line from 2
+    assert {entry['level'] for entry in page} == {'ERROR'}
+
+    older = log.tail(3, before=page[0]['number'])
+    assert [(entry['number'], entry['content']) for entry in older] == [
+        (979, '2026-03-01 WARNING message 979'), (980, '2026-03-01 INFO message 980'),
+        (981, '2026-03-01 DEBUG message 981'),
+    ]
+
+
+def test_index_extends_incrementally_and_rebuilds_after_truncation(log, log_path):
+    log.tail(1)
+    indexed = log.index.indexed_size
+    with open(log_path, 'a') as fh:
+        fh.write('2026-03-02 ERROR appended\n2026-03-02 INFO partial')
+
+    assert log.tail(1)[0] == {'number': 1001, 'content': '2026-03-02 ERROR appended', 'level': 'ERROR'}
+    # only the new complete line was indexed; the partial one waits for its newline
+    assert log.index.indexed_size == indexed + len('2026-03-02 ERROR appended\n')
+
+    log_path.write_text('2026-03-03 INFO fresh\n')
+    assert [entry['number'] for entry in log.tail(10)] == [1]
+
+
+def test_search_streams_with_a_bounded_window(log):
+    page = log.tail(2, search='MESSAGE 99')
+    assert [entry['number'] for entry in page] == [998, 999]
+
+
+@pytest.mark.django_db
+def test_viewer_and_download_use_the_log_layer(log_path, tmp_path):
+    client = Client()
+    client.force_login(User.objects.create_superuser('log_admin', 'log@example.com', 'pass'))
+
+    with override_settings(LOG_INDEX_DIR=str(tmp_path / 'idx')), \
+            mock.patch.object(log_access, 'log_dir', return_value=str(tmp_path)):
+        viewer = client.get(reverse('admin-logs'), {'file': 'app.log', 'lines': 50})
+        full = client.get(reverse('admin-logs-download'), {'file': 'app.log'})
+        errors = client.get(reverse('admin-logs-download'), {'file': 'app.log', 'level': 'ERROR'})
+
+    assert [line['number'] for line in viewer.context['log_content']][:2] == [951, 952]
+    assert viewer.context['older_before'] == 951
+    assert full.streaming and int(full['Content-Length']) == log_path.stat().st_size
+    assert b''.join(full.streaming_content) == log_path.read_bytes()
+    lines = b''.join(errors.streaming_content).decode().splitlines()
+    assert len(lines) == 250 and all(' ERROR ' in line for line in lines)
+
+
+@pytest.mark.parametrize('line, level', [
+    ('INFO 2026-03-01 12:00:00 views 1 2 Retrying after error in upstream call', 'INFO'),
+    ('2026-03-01 WARNING disk error budget at 80%', 'WARNING'),
+    ('{"timestamp": "2026-03-01T12:00:00", "level": "INFO", "logger": "api", "message": "ERROR page rendered"}',
+     'INFO'),
+    ('    raise ValueError("error")', 'UNKNOWN'),
+])
+def test_level_comes_from_the_levelname_not_the_message(line, level):
+    assert log_access.line_level(line) == level
+
+
+def test_level_filter_keeps_info_lines_that_mention_errors(tmp_path):
+    path = tmp_path / 'mixed.log'
+    path.write_text('INFO Retrying after error\nERROR Upstream failed\n')
+    log = LogFile(str(path), index_dir=str(tmp_path / 'idx'))
+
+    assert [entry['content'] for entry in log.tail(10, level='INFO')] == ['INFO Retrying after error']
+    assert [number for number, _ in log.iter_lines(level='ERROR')] == [2]
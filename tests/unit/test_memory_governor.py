@@ -0,0 +1,96 @@
+"""
+Tests for the sampled memory governor (backend.memory_middleware)
+"""
+
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from backend.memory_middleware import MemoryGovernor, MemoryManagementMiddleware
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _governor(rss, clock=None, **kwargs):
+    options = dict(sample_every=5, sample_interval=30, soft_limit_mb=100, hard_limit_mb=200,
+                   min_gc_interval=10, pause_budget_ms=1000, budget_window=60)
+    options.update(kwargs)
+    return MemoryGovernor(rss_reader=lambda: rss[0], clock=clock or FakeClock(), **options)
+
+
+def test_samples_every_n_requests_without_collecting_below_limit():
+    rss = [50.0]
+    governor = _governor(rss)
+
+    with mock.patch('backend.memory_middleware.gc.collect') as collect:
+        decisions = [governor.record_request() for _ in range(10)]
+
+    assert decisions == [None, None, None, None, 'ok'] * 2
+    assert governor.samples == 2
+    collect.assert_not_called()
+
+
+def test_samples_on_timer_between_request_batches():
+    clock = FakeClock()
+    governor = _governor([50.0], clock=clock, sample_every=1000)
+
+    assert governor.record_request() is None
+    clock.now += 31
+    assert governor.record_request() == 'ok'
+
+
+def test_generation_depends_on_threshold_and_cooldown_applies():
+    clock = FakeClock()
+    rss = [150.0]
+    governor = _governor(rss, clock=clock, sample_every=1)
+
+    with mock.patch('backend.memory_middleware.gc.collect', return_value=3) as collect:
+        assert governor.record_request() == 'collected_gen1'
+        rss[0] = 250.0
+        assert governor.record_request() == 'skipped_cooldown'
+        clock.now += 11
+        assert governor.record_request() == 'collected_gen2'
+
+    assert [call.args for call in collect.call_args_list] == [(1,), (2,)]
+    metrics = governor.snapshot()
+    assert metrics['collections'] == {'gen0': 0, 'gen1': 1, 'gen2': 1}
+    assert metrics['objects_collected'] == 6
+    assert metrics['skipped']['cooldown'] == 1
+    assert len(metrics['rss_trend']['samples']) == 3
+
+
+def test_pause_budget_limits_collections():
+    clock = FakeClock()
+    governor = _governor([250.0], clock=clock, sample_every=1, min_gc_interval=0, pause_budget_ms=5)
+
+    with mock.patch('backend.memory_middleware.gc.collect') as collect, \
+            mock.patch('backend.memory_middleware.time.perf_counter', side_effect=[0.0, 0.01]):
+        assert governor.record_request() == 'collected_gen2'   # 10 ms pause spends the budget
+        assert governor.record_request() == 'skipped_budget'
+        clock.now += 61
+        with mock.patch('backend.memory_middleware.time.perf_counter', side_effect=[0.0, 0.001]):
+            assert governor.record_request() == 'collected_gen2'   # window rolled over
+
+    assert collect.call_count == 2
+    assert governor.snapshot()['skipped']['budget'] == 1
+
+
+def test_middleware_never_clears_cache():
+    governor = _governor([500.0], sample_every=1)
+    middleware = MemoryManagementMiddleware(lambda request: HttpResponse('ok'))
+    middleware.governor = governor
+
+    with mock.patch('django.core.cache.cache.clear') as clear, \
+            mock.patch('backend.memory_middleware.gc.collect', return_value=0):
+        response = middleware(RequestFactory().get('/'))
+
+    assert response.status_code == 200
+    assert governor.last_decision == 'collected_gen2'
+    clear.assert_not_called()